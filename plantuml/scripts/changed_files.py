@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Find the markdown and .puml files affected by changes since a git ref.
+
+Files modified on this branch since it diverged from the ref (committed,
+staged, unstaged or untracked; like `git diff ref...HEAD`, so commits that
+landed on the ref afterwards are not counted) are expanded through the dependency graph: markdown files that link a changed
+.puml (`![x](diagram.puml)`), and markdown/.puml files that `!include` a
+changed file, directly or transitively. CI then only processes that set
+instead of the whole repository.
+
+Usage:
+    python changed_files.py <git-ref> [root]
+
+Examples:
+    # What would a PR against main need to re-render?
+    python changed_files.py origin/main docs/
+"""
+
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+LINK_PATTERN = re.compile(r'!\[[^\]]*\]\(([^)\s]+\.puml)(?:\s+"[^"]*")?\)')
+INCLUDE_PATTERN = re.compile(r'^\s*!include(?:_many|_once|sub)?\s+([^\s<][^\s!]*)', re.MULTILINE)
+
+SOURCE_SUFFIXES = ('.md', '.puml', '.plantuml', '.iuml', '.pu')
+
+
+class GitError(RuntimeError):
+    """Raised when git cannot answer a query."""
+
+
+def _git(args: List[str], cwd: Path) -> str:
+    result = subprocess.run(['git'] + args, cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise GitError(result.stderr.strip() or f"git {' '.join(args)} failed")
+    return result.stdout
+
+
+def repository_root(path: Path) -> Path:
+    """Return the top-level directory of the git repository containing path."""
+    start = path if path.is_dir() else path.parent
+    return Path(_git(['rev-parse', '--show-toplevel'], start).strip())
+
+
+def git_changed_files(ref: str, repo_root: Path) -> Set[Path]:
+    """
+    Files changed since HEAD diverged from ref, including uncommitted and untracked files.
+
+    The diff starts at the merge-base of ref and HEAD, so files changed only on ref
+    are not reported. Without a common ancestor (e.g. a shallow clone) it falls back
+    to diffing against ref itself, which can only over-report.
+    """
+    try:
+        base = _git(['merge-base', ref, 'HEAD'], repo_root).strip()
+    except GitError:
+        base = ref
+    changed = _git(['diff', '--name-only', base, '--'], repo_root).splitlines()
+    changed += _git(['ls-files', '--others', '--exclude-standard'], repo_root).splitlines()
+    return {(repo_root / name).resolve() for name in changed if name}
+
+
+def _source_files(root: Path) -> Iterable[Path]:
+    """Tracked and untracked (not ignored) markdown/PlantUML files under root."""
+    names = _git(['ls-files', '--cached', '--others', '--exclude-standard', '--', '.'], root).splitlines()
+    for name in names:
+        path = root / name
+        if path.suffix in SOURCE_SUFFIXES and not is_generated(path):
+            yield path
+
+
+def is_generated(path: Path) -> bool:
+    """Markdown written by the processors themselves (`*_with_images.md`)."""
+    return path.name.endswith('_with_images.md')
+
+
+def has_diagrams(markdown_path: Path) -> bool:
+    """Whether a markdown file embeds or links any PlantUML diagram."""
+    content = markdown_path.read_text(encoding='utf-8', errors='replace')
+    return '```puml' in content or bool(LINK_PATTERN.search(content))
+
+
+def _dependencies(path: Path) -> Set[Path]:
+    """Files a markdown or PlantUML file links or includes."""
+    try:
+        content = path.read_text(encoding='utf-8')
+    except (OSError, UnicodeDecodeError):
+        return set()
+
+    targets = INCLUDE_PATTERN.findall(content)
+    if path.suffix == '.md':
+        targets += LINK_PATTERN.findall(content)
+
+    return {(path.parent / target).resolve() for target in targets if '://' not in target}
+
+
+def build_reverse_dependencies(root: Path) -> Dict[Path, Set[Path]]:
+    """Map each file to the files under root that link or include it."""
+    dependents: Dict[Path, Set[Path]] = {}
+    for path in _source_files(root):
+        source = path.resolve()
+        for target in _dependencies(source):
+            dependents.setdefault(target, set()).add(source)
+    return dependents
+
+
+def affected_files(ref: str, root: Path) -> Tuple[List[Path], List[Path]]:
+    """
+    Expand the files changed since HEAD diverged from ref to everything that depends on them.
+
+    Args:
+        ref: Any git revision (branch, tag, commit, HEAD~3, origin/main...)
+        root: Directory to search for dependent files
+
+    Returns:
+        Tuple of (markdown_files, puml_files) under root, sorted
+    """
+    root = root.resolve()
+    changed = git_changed_files(ref, repository_root(root))
+    dependents = build_reverse_dependencies(root)
+
+    affected: Set[Path] = set()
+    frontier = [path for path in changed if path.suffix in SOURCE_SUFFIXES]
+    while frontier:
+        path = frontier.pop()
+        if path in affected:
+            continue
+        affected.add(path)
+        frontier.extend(dependents.get(path, ()))
+
+    in_root = [path for path in affected
+               if path.exists() and root in path.parents and not is_generated(path)]
+    markdown = sorted(path for path in in_root if path.suffix == '.md')
+    puml = sorted(path for path in in_root if path.suffix != '.md')
+    return markdown, puml
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python changed_files.py <git-ref> [root]")
+        sys.exit(1)
+
+    ref = sys.argv[1]
+    root = Path(sys.argv[2]) if len(sys.argv) > 2 else Path('.')
+
+    try:
+        markdown, puml = affected_files(ref, root)
+    except GitError as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for path in markdown + puml:
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
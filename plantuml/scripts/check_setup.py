@@ -2,14 +2,42 @@
 """
 Check PlantUML setup: Java, Graphviz, and plantuml.jar availability.
 
+With --profile, also measure how fast the toolchain is on this machine (JVM
+cold start, warm render latency per diagram type, Graphviz `dot` latency,
+available memory), recommend a concurrency level and JVM heap, and save them
+where the processors read them (see perf_config.py).
+
 Usage:
     python check_setup.py
+    python check_setup.py --profile [--config perf.json]
 """
 
+import argparse
 import subprocess
 import os
 import sys
+import time
+from datetime import datetime
 from pathlib import Path
+from typing import Dict, Optional
+
+from perf_config import PerfProfile, load_perf_profile, perf_config_path, save_perf_profile
+
+# One small diagram per family; warm latency is measured for each
+PROFILE_DIAGRAMS = {
+    'sequence': "@startuml\nAlice -> Bob: request\nBob --> Alice: response\n@enduml\n",
+    'class': "@startuml\nclass Order {\n  +id: int\n}\nclass Line\nOrder \"1\" *-- \"n\" Line\n@enduml\n",
+    'activity': "@startuml\nstart\nif (ok?) then (yes)\n  :ship;\nelse (no)\n  :retry;\nendif\nstop\n@enduml\n",
+    'component': "@startuml\n[API] --> [DB]\n[Web] --> [API]\n@enduml\n",
+    'mindmap': "@startmindmap\n* root\n** a\n** b\n@endmindmap\n",
+    'json': "@startjson\n{\"a\": [1, 2], \"b\": {\"c\": true}}\n@endjson\n",
+}
+
+# Renders per diagram type through one JVM when measuring warm latency
+WARM_REPEATS = 5
+
+# Memory a JVM needs beyond its heap (metaspace, code cache, threads)
+JVM_OVERHEAD_MB = 256
 
 def check_java() -> bool:
     """Check if Java is installed and accessible."""
@@ -84,8 +112,119 @@ Alice -> Bob: Test
         print(f"❌ PlantUML test error: {e}")
         return False
 
+def _timed_run(cmd: list, stdin: str = '', timeout: int = 120) -> Optional[float]:
+    """Run a command and return its wall time, or None if it failed."""
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(cmd, input=stdin, capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    elapsed = time.perf_counter() - start
+    return elapsed if result.returncode == 0 else None
+
+def measure_cold_start(jar_path: str) -> Optional[float]:
+    """Seconds for a JVM to start PlantUML and render one trivial diagram."""
+    cmd = ['java', '-jar', jar_path, '-pipe', '-tsvg']
+    _timed_run(cmd, PROFILE_DIAGRAMS['sequence'])  # warm the OS file cache first
+    return _timed_run(cmd, PROFILE_DIAGRAMS['sequence'])
+
+def measure_warm_latency(jar_path: str) -> Dict[str, float]:
+    """
+    Per diagram type render latency once the JVM is running.
+
+    One `-pipe` process renders the diagram once and another renders it
+    1 + WARM_REPEATS times; the difference divided by WARM_REPEATS excludes
+    JVM startup and class loading.
+    """
+    cmd = ['java', '-jar', jar_path, '-pipe', '-tsvg']
+    latencies = {}
+    for dtype, diagram in PROFILE_DIAGRAMS.items():
+        once = _timed_run(cmd, diagram)
+        many = _timed_run(cmd, diagram * (1 + WARM_REPEATS))
+        if once is None or many is None:
+            print(f"   ⚠️  {dtype}: render failed, skipped")
+            continue
+        latencies[dtype] = max(0.0, (many - once) / WARM_REPEATS)
+        print(f"   {dtype:<10} {latencies[dtype] * 1000:7.1f} ms")
+    return latencies
+
+def measure_dot_latency() -> Optional[float]:
+    """Seconds for Graphviz to lay out a small graph."""
+    return _timed_run(['dot', '-Tsvg'], 'digraph { a -> b; b -> c; a -> c; }')
+
+def available_memory_mb() -> Optional[int]:
+    """Memory available to new processes, in MB."""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def recommend(available_mb: Optional[int], cpu_count: int) -> tuple:
+    """
+    Derive (jobs, heap_mb) from the measurements.
+
+    Heap: half the available memory shared across one JVM per CPU, rounded to
+    256 MB and kept within 512..2048 MB. Jobs: as many JVMs as fit in 75% of
+    available memory, at most one per CPU.
+    """
+    if available_mb:
+        heap_mb = 256 * round(available_mb * 0.5 / cpu_count / 256)
+        heap_mb = min(2048, max(512, heap_mb))
+        jobs = max(1, min(cpu_count, int(available_mb * 0.75 // (heap_mb + JVM_OVERHEAD_MB))))
+    else:
+        heap_mb, jobs = 1024, cpu_count
+
+    return jobs, heap_mb
+
+def profile_toolchain(jar_path: str, graphviz_ok: bool) -> PerfProfile:
+    """Measure this machine and return the recommended profile."""
+    print("\nProfiling toolchain...")
+
+    cold_start = measure_cold_start(jar_path)
+    if cold_start is not None:
+        print(f"   JVM cold start: {cold_start:.2f}s")
+    else:
+        print("   ⚠️  JVM cold start: render failed")
+
+    print("   Warm render latency:")
+    warm_latency = measure_warm_latency(jar_path)
+
+    dot_latency = measure_dot_latency() if graphviz_ok else None
+    if dot_latency is not None:
+        print(f"   Graphviz dot: {dot_latency * 1000:.1f} ms")
+
+    available_mb = available_memory_mb()
+    cpu_count = os.cpu_count() or 1
+    print(f"   Memory available: {available_mb if available_mb is not None else '?'} MB, CPUs: {cpu_count}")
+
+    jobs, heap_mb = recommend(available_mb, cpu_count)
+    return PerfProfile(
+        jobs=jobs,
+        heap_mb=heap_mb,
+        cold_start=cold_start,
+        warm_latency=warm_latency,
+        dot_latency=dot_latency,
+        available_mb=available_mb,
+        cpu_count=cpu_count,
+        profiled_at=datetime.now().isoformat(timespec='seconds'),
+    )
+
 def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description='Check (and optionally profile) the PlantUML setup')
+    parser.add_argument('--profile', action='store_true',
+                        help='Measure toolchain performance and save recommended settings')
+    parser.add_argument('--config', default=None,
+                        help='Where to save the profile (default: PLANTUML_PERF_CONFIG or ~/.config/plantuml/perf.json)')
+    args = parser.parse_args()
+
     print("Checking PlantUML setup...\n")
 
     java_ok = check_java()
@@ -107,6 +246,22 @@ def main():
         print("\nTesting PlantUML...")
         test_plantuml(jar_path)
 
+    if args.profile:
+        profile = profile_toolchain(jar_path, graphviz_ok)
+        config_path = Path(args.config) if args.config else None
+        previous = load_perf_profile(config_path)
+        if previous:
+            profile.governor = previous.governor
+        config_path = save_perf_profile(profile, config_path)
+        print("\n📋 Recommended settings:")
+        print(f"   Concurrency: {profile.jobs} JVM(s)")
+        print(f"   Heap: -Xmx{profile.heap_mb}m")
+        print(f"   Saved to: {config_path}")
+        if config_path != perf_config_path():
+            # The processors only read PLANTUML_PERF_CONFIG (or the default location)
+            print(f"   Processors read {perf_config_path() or 'no profile'}; "
+                  f"set PLANTUML_PERF_CONFIG={config_path} to use this one")
+
     print("\n✅ PlantUML setup complete!")
 
 if __name__ == '__main__':
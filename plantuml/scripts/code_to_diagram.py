@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+"""
+Generate class and component diagrams from a Python codebase.
+
+Every module is parsed with `ast` (no imports, so nothing is executed) on a
+process pool. From each file the generator extracts its classes (bases,
+attributes, methods, enum/dataclass/protocol/abstract kind), the classes its
+attributes hold, and its imports. The results are then resolved across the
+codebase into:
+
+- a class diagram: classes per module, inheritance (`<|--`), composition
+  (`*--`, from attribute annotations and `self.x = Part(...)` in `__init__`)
+  and aggregation (`o-- "*"`, for List[Part], Dict[str, Part], ...);
+- a component diagram: one component per module (or per package with
+  --depth), grouped by package, with an edge per import dependency.
+
+Re-exports through `__init__.py` are followed, so `from pkg import Order` links
+to the module that defines Order. Extracted facts are cached per file by
+content hash, so regenerating after the first run only parses changed files.
+Outputs are written only when their content changed (stable_output).
+
+Large class diagrams render best with `process_markdown_puml.py --paginate`
+or `decompose_diagram.py`, which split them by package.
+
+Usage:
+    python code_to_diagram.py SRC_DIR [--kind class|component|both] [--output-dir DIR]
+                              [--depth N] [--exclude GLOB ...] [--no-members]
+                              [--include-external] [--jobs N] [--no-cache]
+
+Examples:
+    # Class and component diagrams for a package
+    python code_to_diagram.py src/shop --output-dir docs/diagrams
+
+    # Package-level dependencies of a monorepo, skipping tests
+    python code_to_diagram.py services/ --kind component --depth 2 --exclude '*/tests/*'
+"""
+
+import argparse
+import ast
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from stable_output import OutputWriter
+
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'plantuml' / 'code_to_diagram'
+
+# Bump when the extracted facts change shape, to invalidate old caches
+CACHE_VERSION = 1
+
+# Below this many files to parse, the process pool costs more than it saves
+POOL_THRESHOLD = 32
+
+SKIP_DIRS = {'.git', '.hg', '.svn', '__pycache__', '.venv', 'venv', 'env', '.tox', '.nox',
+             'node_modules', 'build', 'dist', '.eggs', '.mypy_cache', '.pytest_cache'}
+
+# Subscripted annotations that hold many parts
+COLLECTIONS = {'List', 'list', 'Set', 'set', 'FrozenSet', 'frozenset', 'Sequence', 'MutableSequence',
+               'Iterable', 'Iterator', 'Collection', 'Tuple', 'tuple', 'Dict', 'dict', 'Mapping',
+               'MutableMapping', 'DefaultDict', 'defaultdict', 'OrderedDict', 'Deque', 'deque'}
+
+# Members listed per class before the rest are summarized
+MAX_MEMBERS = 12
+
+
+# --- Extraction (runs in worker processes; facts are plain JSON data) ---
+
+def _names_in(annotation: ast.AST) -> List[Tuple[str, bool]]:
+    """Dotted names referenced by an annotation, each with whether it sits inside a collection."""
+    found = []
+
+    def visit(node: ast.AST, many: bool) -> None:
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            try:
+                visit(ast.parse(node.value, mode='eval').body, many)
+            except SyntaxError:
+                pass
+        elif isinstance(node, (ast.Name, ast.Attribute)):
+            found.append((ast.unparse(node), many))
+        elif isinstance(node, ast.Subscript):
+            container = ast.unparse(node.value).rsplit('.', 1)[-1]
+            visit(node.slice, many or container in COLLECTIONS)
+        elif isinstance(node, (ast.Tuple, ast.List)):
+            for element in node.elts:
+                visit(element, many)
+        elif isinstance(node, ast.BinOp):  # X | None
+            visit(node.left, many)
+            visit(node.right, many)
+
+    visit(annotation, False)
+    return found
+
+
+def _decorator_names(node: ast.AST) -> List[str]:
+    names = []
+    for decorator in node.decorator_list:
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        names.append(ast.unparse(target).rsplit('.', 1)[-1])
+    return names
+
+
+def _class_facts(node: ast.ClassDef) -> Dict:
+    """Bases, kind, members and held types of one class."""
+    bases = [ast.unparse(base) for base in node.bases]
+    base_names = {base.rsplit('.', 1)[-1] for base in bases}
+    metaclass = next((ast.unparse(k.value) for k in node.keywords if k.arg == 'metaclass'), '')
+    decorators = _decorator_names(node)
+
+    attributes: List[List[Optional[str]]] = []
+    methods: List[str] = []
+    refs: List[List] = []
+    abstract = 'ABC' in base_names or metaclass.endswith('ABCMeta')
+
+    def add_attribute(name: str, annotation: Optional[ast.AST]) -> None:
+        if any(existing[0] == name for existing in attributes):
+            return
+        attributes.append([name, ast.unparse(annotation) if annotation is not None else None])
+        if annotation is not None:
+            refs.extend([name, ref, many] for ref, many in _names_in(annotation))
+
+    for item in node.body:
+        if isinstance(item, ast.AnnAssign) and isinstance(item.target, ast.Name):
+            add_attribute(item.target.id, item.annotation)
+        elif isinstance(item, ast.Assign):
+            for target in item.targets:
+                if isinstance(target, ast.Name):
+                    add_attribute(target.id, None)
+        elif isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            methods.append(item.name)
+            if 'abstractmethod' in _decorator_names(item):
+                abstract = True
+            if item.name != '__init__':
+                continue
+            for statement in ast.walk(item):
+                if (isinstance(statement, ast.AnnAssign) and isinstance(statement.target, ast.Attribute)
+                        and ast.unparse(statement.target.value) == 'self'):
+                    add_attribute(statement.target.attr, statement.annotation)
+                elif isinstance(statement, ast.Assign):
+                    for target in statement.targets:
+                        if isinstance(target, ast.Attribute) and ast.unparse(target.value) == 'self':
+                            add_attribute(target.attr, None)
+                            if isinstance(statement.value, ast.Call) and \
+                                    isinstance(statement.value.func, (ast.Name, ast.Attribute)):
+                                refs.append([target.attr, ast.unparse(statement.value.func), False])
+
+    if base_names & {'Enum', 'IntEnum', 'StrEnum', 'Flag', 'IntFlag'}:
+        kind = 'enum'
+    elif base_names & {'Protocol'}:
+        kind = 'protocol'
+    elif 'dataclass' in decorators:
+        kind = 'dataclass'
+    elif any(name.endswith(('Error', 'Exception')) for name in base_names):
+        kind = 'exception'
+    else:
+        kind = 'class'
+
+    return {
+        'name': node.name,
+        'bases': [base for base in bases if base.rsplit('.', 1)[-1] not in ('ABC', 'Protocol', 'Generic', 'object')
+                  and not base.startswith(('Generic[', 'Protocol['))],
+        'kind': kind,
+        'abstract': abstract,
+        'attributes': attributes,
+        'methods': methods,
+        'refs': refs,
+    }
+
+
+def extract_facts(source: bytes) -> Dict:
+    """
+    Classes and imports of one module, as JSON-serializable data.
+
+    Returns:
+        {'classes': [...], 'imports': [[module, name, alias, level], ...], 'error': None},
+        or {'classes': [], 'imports': [], 'error': message} if the file does not parse
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        return {'classes': [], 'imports': [], 'error': f"line {e.lineno}: {e.msg}"}
+    except ValueError as e:  # null bytes
+        return {'classes': [], 'imports': [], 'error': str(e)}
+
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend([alias.name, None, alias.asname, 0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.extend([node.module or '', alias.name, alias.asname, node.level] for alias in node.names)
+
+    classes = [_class_facts(node) for node in tree.body if isinstance(node, ast.ClassDef)]
+    return {'classes': classes, 'imports': imports, 'error': None}
+
+
+def _extract_item(item: Tuple[str, bytes]) -> Tuple[str, Dict]:
+    path, source = item
+    return path, extract_facts(source)
+
+
+# --- Collection and caching ---
+
+def find_sources(root: Path, exclude: Optional[List[str]] = None) -> List[Path]:
+    """Python files under root, skipping virtualenvs, build output and excluded globs."""
+    sources = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.endswith('.egg-info'))
+        for filename in sorted(filenames):
+            if filename.endswith('.py'):
+                path = Path(directory) / filename
+                if not any(fnmatch.fnmatch(path.as_posix(), pattern) for pattern in exclude or []):
+                    sources.append(path)
+    return sources
+
+
+def module_name(path: Path, base: Path) -> str:
+    """Dotted module name of a file relative to the import base (pkg/__init__.py -> pkg)."""
+    parts = list(path.relative_to(base).with_suffix('').parts)
+    if parts[-1] == '__init__' and len(parts) > 1:
+        parts.pop()
+    return '.'.join(parts)
+
+
+class FactCache:
+    """Extracted facts keyed by source hash, stored as one JSON file per source root."""
+
+    def __init__(self, root: Path, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR):
+        self.path = None
+        self.entries: Dict[str, Dict] = {}
+        self.used: Dict[str, Dict] = {}
+        if cache_dir is None:
+            return
+        key = hashlib.sha1(str(root.resolve()).encode('utf-8')).hexdigest()[:16]
+        self.path = cache_dir / f"{key}.json"
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            if data.get('version') == CACHE_VERSION:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def get(self, digest: str) -> Optional[Dict]:
+        facts = self.entries.get(digest)
+        if facts is not None:
+            self.used[digest] = facts
+        return facts
+
+    def put(self, digest: str, facts: Dict) -> None:
+        self.used[digest] = facts
+
+    def save(self) -> None:
+        """Write the entries used in this run (dropping stale ones) atomically."""
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({'version': CACHE_VERSION, 'entries': self.used}), encoding='utf-8')
+        os.replace(tmp_path, self.path)
+
+
+@dataclass
+class ScanStats:
+    """How a scan got its facts, and which modules are packages (__init__.py)."""
+    packages: Set[str] = field(default_factory=set)
+    modules: int = 0
+    cached: int = 0
+    parsed: int = 0
+    errors: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def scan_codebase(
+    root: Path,
+    exclude: Optional[List[str]] = None,
+    jobs: Optional[int] = None,
+    cache_dir: Optional[Path] = DEFAULT_CACHE_DIR
+) -> Tuple[Dict[str, Dict], ScanStats]:
+    """
+    Extract facts for every module under root, parsing only files not in the cache.
+
+    Args:
+        root: Package directory (with __init__.py) or a source directory of modules/packages
+        exclude: Glob patterns (matched against POSIX paths) of files to skip
+        jobs: Worker processes for parsing (default: CPU count)
+        cache_dir: Where the per-root fact cache lives, or None to disable caching
+
+    Returns:
+        Tuple of ({module_name: facts}, ScanStats)
+    """
+    started = time.monotonic()
+    base = root.parent if (root / '__init__.py').exists() else root
+    cache = FactCache(root, cache_dir)
+    stats = ScanStats()
+
+    modules: Dict[str, Dict] = {}
+    todo: List[Tuple[str, bytes]] = []
+    digests: Dict[str, str] = {}
+    for path in find_sources(root, exclude):
+        name = module_name(path, base)
+        if path.name == '__init__.py':
+            stats.packages.add(name)
+        source = path.read_bytes()
+        digest = hashlib.sha256(source).hexdigest()
+        facts = cache.get(digest)
+        if facts is None:
+            todo.append((name, source))
+            digests[name] = digest
+        else:
+            modules[name] = facts
+            stats.cached += 1
+
+    workers = max(1, jobs or os.cpu_count() or 1)
+    if len(todo) < POOL_THRESHOLD or workers == 1:
+        parsed = [_extract_item(item) for item in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(_extract_item, todo, chunksize=max(1, len(todo) // (workers * 4))))
+    for name, facts in parsed:
+        modules[name] = facts
+        cache.put(digests[name], facts)
+        stats.parsed += 1
+
+    for name, facts in sorted(modules.items()):
+        if facts['error']:
+            stats.errors.append(f"{name}: {facts['error']}")
+    cache.save()
+    stats.modules = len(modules)
+    stats.seconds = time.monotonic() - started
+    return dict(sorted(modules.items())), stats
+
+
+# --- Resolution ---
+
+@dataclass
+class ClassInfo:
+    """A class resolved to its qualified name and project-internal relations."""
+    qualified: str
+    module: str
+    facts: Dict
+    bases: List[str] = field(default_factory=list)
+    parts: List[Tuple[str, str, bool]] = field(default_factory=list)  # (attribute, class, many)
+
+
+@dataclass
+class CodeModel:
+    """Modules, classes and their dependencies across one codebase."""
+    modules: Dict[str, Dict]
+    classes: Dict[str, ClassInfo]
+    dependencies: Dict[str, Set[str]]
+    external: Dict[str, Set[str]]
+
+
+def _absolute(module: str, target: str, level: int, is_package: bool) -> str:
+    """Absolute module for a (possibly relative) import inside module."""
+    if not level:
+        return target
+    package = module.split('.') if is_package else module.split('.')[:-1]
+    package = package[:len(package) - (level - 1)] if level > 1 else package
+    return '.'.join(part for part in package + ([target] if target else []) if part)
+
+
+def build_model(modules: Dict[str, Dict], packages: Set[str]) -> CodeModel:
+    """
+    Resolve names, inheritance, composition and import dependencies between modules.
+
+    Args:
+        modules: Facts per module name, as returned by scan_codebase
+        packages: Module names that are packages (relative imports resolve inside them)
+    """
+    bindings: Dict[str, Dict[str, str]] = {}
+    dependencies: Dict[str, Set[str]] = defaultdict(set)
+    external: Dict[str, Set[str]] = defaultdict(set)
+
+    for name, facts in modules.items():
+        local = {cls['name']: f"{name}.{cls['name']}" for cls in facts['classes']}
+        for target, imported, alias, level in facts['imports']:
+            target = _absolute(name, target, level, name in packages)
+            if imported is None:
+                local.setdefault(alias or target.split('.')[0], target if alias else target.split('.')[0])
+                dependency = target
+            elif imported == '*':
+                dependency = target
+            else:
+                qualified = f"{target}.{imported}" if target else imported
+                local.setdefault(alias or imported, qualified)
+                dependency = qualified if qualified in modules else target
+            while dependency and dependency not in modules and '.' in dependency:
+                dependency = dependency.rsplit('.', 1)[0]
+            if dependency in modules:
+                if dependency != name:
+                    dependencies[name].add(dependency)
+            elif target and not level:
+                external[name].add(target.split('.')[0])
+        bindings[name] = local
+
+    classes = {f"{name}.{cls['name']}": ClassInfo(f"{name}.{cls['name']}", name, cls)
+               for name, facts in modules.items() for cls in facts['classes']}
+
+    def resolve(module: str, dotted: str) -> Optional[str]:
+        """Qualified project class for a name as written in module, following re-exports."""
+        head, _, rest = dotted.partition('.')
+        qualified = bindings[module].get(head)
+        if qualified is None:
+            return None
+        qualified = f"{qualified}.{rest}" if rest else qualified
+        for _ in range(8):
+            if qualified in classes:
+                return qualified
+            owner, _, attribute = qualified.rpartition('.')
+            forwarded = bindings.get(owner, {}).get(attribute)
+            if forwarded is None or forwarded == qualified:
+                return None
+            qualified = forwarded
+        return None
+
+    for info in classes.values():
+        info.bases = [base for base in (resolve(info.module, b) for b in info.facts['bases']) if base]
+        seen = set()
+        for attribute, ref, many in info.facts['refs']:
+            part = resolve(info.module, ref)
+            if part and part != info.qualified and (attribute, part) not in seen:
+                seen.add((attribute, part))
+                info.parts.append((attribute, part, many))
+
+    return CodeModel(modules, classes, dependencies, external)
+
+
+# --- Rendering ---
+
+def _alias(qualified: str) -> str:
+    return re.sub(r'\W', '_', qualified)
+
+
+def _members(facts: Dict) -> List[str]:
+    """Class body lines: attributes, then methods, public first; long lists are summarized."""
+    if facts['kind'] == 'enum':
+        lines = [name for name, _ in facts['attributes'] if not name.startswith('_')]
+    else:
+        lines = []
+        for name, annotation in facts['attributes']:
+            visibility = '-' if name.startswith('_') else '+'
+            lines.append(f"{visibility}{name}: {annotation}" if annotation else f"{visibility}{name}")
+        for name in facts['methods']:
+            if name.startswith('__') and name.endswith('__'):
+                continue
+            lines.append(f"{'-' if name.startswith('_') else '+'}{name}()")
+    if len(lines) > MAX_MEMBERS:
+        lines = lines[:MAX_MEMBERS] + [f".. {len(lines) - MAX_MEMBERS} more .."]
+    return [line.replace('{', '(').replace('}', ')') for line in lines]
+
+
+def class_diagram(model: CodeModel, title: str, members: bool = True) -> str:
+    """PlantUML class diagram: classes grouped by module, inheritance and composition."""
+    lines = ['@startuml', f'title {title} classes', 'set separator none', 'hide empty members']
+    by_module: Dict[str, List[ClassInfo]] = defaultdict(list)
+    for info in model.classes.values():
+        by_module[info.module].append(info)
+
+    for module, infos in by_module.items():
+        lines.append(f'package "{module}" {{')
+        for info in infos:
+            facts = info.facts
+            keyword = {'enum': 'enum', 'protocol': 'interface'}.get(facts['kind'], 'class')
+            if keyword == 'class' and facts['abstract']:
+                keyword = 'abstract class'
+            stereotype = f" <<{facts['kind']}>>" if facts['kind'] in ('dataclass', 'exception') else ''
+            body = _members(facts) if members else []
+            declaration = f'  {keyword} "{facts["name"]}" as {_alias(info.qualified)}{stereotype}'
+            if body:
+                lines.append(declaration + ' {')
+                lines.extend(f"    {line}" for line in body)
+                lines.append('  }')
+            else:
+                lines.append(declaration)
+        lines.append('}')
+
+    for info in model.classes.values():
+        for base in info.bases:
+            lines.append(f"{_alias(base)} <|-- {_alias(info.qualified)}")
+        for attribute, part, many in info.parts:
+            arrow = 'o-- "*"' if many else '*--'
+            lines.append(f"{_alias(info.qualified)} {arrow} {_alias(part)} : {attribute}")
+    return '\n'.join(lines + ['@enduml'])
+
+
+def component_diagram(model: CodeModel, title: str, depth: Optional[int] = None,
+                      include_external: bool = False) -> str:
+    """PlantUML component diagram: modules (or packages cut at depth) and their imports."""
+    def unit(module: str) -> str:
+        return '.'.join(module.split('.')[:depth]) if depth else module
+
+    units = sorted({unit(module) for module in model.modules})
+    edges = sorted({(unit(source), unit(target)) for source, targets in model.dependencies.items()
+                    for target in targets if unit(source) != unit(target)})
+
+    lines = ['@startuml', f'title {title} components', 'set separator none']
+    # A unit with units below it is a package; its own module (__init__) sits inside its box
+    parents = {name.rpartition('.')[0] for name in units}
+    by_package: Dict[str, List[str]] = defaultdict(list)
+    for name in units:
+        by_package[name if name in parents else name.rpartition('.')[0]].append(name)
+    for package, names in sorted(by_package.items()):
+        indent = '  ' if package else ''
+        if package:
+            lines.append(f'package "{package}" as pkg_{_alias(package)} {{')
+        for name in names:
+            label = '__init__' if name == package else name.rpartition('.')[2]
+            lines.append(f'{indent}component "{label}" as {_alias(name)}')
+        if package:
+            lines.append('}')
+
+    if include_external:
+        used = sorted({(unit(source), library) for source, libraries in model.external.items()
+                       for library in libraries})
+        for library in sorted({library for _, library in used}):
+            lines.append(f'component "{library}" as ext_{_alias(library)} <<external>>')
+        edges_external = sorted(set(used))
+        lines.extend(f"{_alias(source)} ..> ext_{_alias(library)}" for source, library in edges_external)
+
+    lines.extend(f"{_alias(source)} --> {_alias(target)}" for source, target in edges)
+    return '\n'.join(lines + ['@enduml'])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate PlantUML class and component diagrams from Python source',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('source', help='Package or source directory to scan')
+    parser.add_argument('--kind', choices=['class', 'component', 'both'], default='both',
+                        help='Diagrams to generate (default: both)')
+    parser.add_argument('--output-dir', default='.', help='Where to write the .puml files (default: .)')
+    parser.add_argument('--name', default=None, help='Base name of the output files (default: source dir name)')
+    parser.add_argument('--depth', type=int, default=None,
+                        help='Component diagram: collapse modules to their first N name parts')
+    parser.add_argument('--exclude', action='append', default=[],
+                        help="Glob of files to skip, e.g. '*/tests/*' (repeatable)")
+    parser.add_argument('--no-members', action='store_true', help='Class diagram: omit attributes and methods')
+    parser.add_argument('--include-external', action='store_true',
+                        help='Component diagram: show third-party and stdlib imports')
+    parser.add_argument('--jobs', type=int, default=None, help='Parser processes (default: CPU count)')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the fact cache')
+    args = parser.parse_args()
+
+    root = Path(args.source).resolve()
+    if not root.is_dir():
+        print(f"❌ Error: Not a directory: {args.source}", file=sys.stderr)
+        sys.exit(1)
+    if args.depth is not None and args.depth < 1:
+        parser.error("--depth must be at least 1")
+
+    modules, stats = scan_codebase(root, args.exclude, args.jobs, None if args.no_cache else DEFAULT_CACHE_DIR)
+    if not modules:
+        print(f"❌ Error: No Python files under {args.source}", file=sys.stderr)
+        sys.exit(1)
+    for error in stats.errors:
+        print(f"⚠️  Skipping {error}", file=sys.stderr)
+    print(f"📦 {stats.modules} modules ({stats.cached} cached, {stats.parsed} parsed) in {stats.seconds:.2f}s")
+
+    model = build_model(modules, stats.packages)
+
+    name = args.name or root.name
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    writer = OutputWriter()
+    outputs = []
+    if args.kind in ('class', 'both'):
+        outputs.append((output_dir / f"{name}_classes.puml", class_diagram(model, name, not args.no_members)))
+    if args.kind in ('component', 'both'):
+        outputs.append((output_dir / f"{name}_components.puml",
+                        component_diagram(model, name, args.depth, args.include_external)))
+    for path, source in outputs:
+        status = 'Created' if writer.write_text(path, source + '\n') else 'Unchanged'
+        print(f"✅ {status}: {path}")
+    print(f"   {len(model.classes)} classes, "
+          f"{sum(len(targets) for targets in model.dependencies.values())} module dependencies")
+
+
+if __name__ == '__main__':
+    main()
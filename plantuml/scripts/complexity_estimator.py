@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Static render-cost estimator for PlantUML diagrams.
+
+Counts participants, classes, edges, nesting depth and notes with a single
+pass over the source (no JVM) and turns them into a predicted render cost.
+The batch processors use the estimate to start expensive diagrams first
+(longest-processing-time-first scheduling) and to give each diagram a timeout
+and JVM heap proportional to its size instead of one fixed value.
+
+Render timeouts never drop below 30 seconds, the old fixed timeout; set the
+PLANTUML_MIN_TIMEOUT environment variable to change that floor.
+
+Usage:
+    python complexity_estimator.py diagram.puml [more.puml ...]
+"""
+
+import math
+import os
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, TypeVar
+
+# Cost model (seconds). JVM start-up dominates small diagrams; Graphviz layout
+# grows super-linearly with nodes x edges on class/component-style graphs.
+BASE_COST = 1.5
+PARTICIPANT_COST = 0.02
+CLASS_COST = 0.05
+EDGE_COST = 0.01
+NOTE_COST = 0.01
+DEPTH_COST = 0.1
+GRAPH_COST = 0.0005
+
+# Timeout and heap policy derived from the predicted cost
+TIMEOUT_FACTOR = 4.0
+DEFAULT_MIN_TIMEOUT = 30
+MAX_TIMEOUT = 600
+BASE_HEAP_MB = 512
+HEAP_MB_PER_ELEMENT = 4
+MAX_HEAP_MB = 8192
+
+PARTICIPANT_RE = re.compile(
+    r'^(participant|actor|boundary|control|entity|database|collections|queue)\s', re.IGNORECASE)
+CLASS_RE = re.compile(
+    r'^(abstract\s+class|abstract|class|interface|enum|annotation|entity|object|map'
+    r'|component|node|artifact|cloud|frame|folder|rectangle|storage|usecase|state)\s', re.IGNORECASE)
+EDGE_RE = re.compile(
+    r'(<\|--|--\|>|\*--|--\*|o--|--o|\.\.>|<\.\.|-+>|<-+|-+\\|-+/|\]>|<\[|--|\.\.)')
+NOTE_RE = re.compile(r'^(h|r)?note\b', re.IGNORECASE)
+OPEN_RE = re.compile(
+    r'^(alt|opt|loop|par|break|critical|group|if\s*\(|while\s*\(|repeat\b|fork\b|split\b'
+    r'|switch\s*\(|partition\b|package\b|namespace\b|box\b)|\{\s*$', re.IGNORECASE)
+CLOSE_RE = re.compile(
+    r'^(end\b|endif|endwhile|repeat\s+while|endswitch|end\s*fork|end\s*split|\})', re.IGNORECASE)
+NOTE_END_RE = re.compile(r'^end\s*(h|r)?note\b', re.IGNORECASE)
+
+
+def min_timeout() -> int:
+    """Render timeout floor in seconds: PLANTUML_MIN_TIMEOUT, else DEFAULT_MIN_TIMEOUT."""
+    value = os.environ.get('PLANTUML_MIN_TIMEOUT')
+    if not value:
+        return DEFAULT_MIN_TIMEOUT
+    try:
+        seconds = int(value)
+    except ValueError:
+        seconds = 0
+    if seconds < 1:
+        print(f"⚠️  Ignoring PLANTUML_MIN_TIMEOUT={value!r}: expected a positive number of seconds",
+              file=sys.stderr)
+        return DEFAULT_MIN_TIMEOUT
+    return min(seconds, MAX_TIMEOUT)
+
+
+@dataclass
+class ComplexityEstimate:
+    """Structural counts and the derived render budget for one diagram."""
+    participants: int = 0
+    classes: int = 0
+    edges: int = 0
+    notes: int = 0
+    max_depth: int = 0
+    lines: int = 0
+
+    @property
+    def elements(self) -> int:
+        return self.participants + self.classes + self.edges + self.notes
+
+    @property
+    def cost(self) -> float:
+        """Predicted render time in seconds."""
+        nodes = self.participants + self.classes
+        return (BASE_COST
+                + PARTICIPANT_COST * self.participants
+                + CLASS_COST * self.classes
+                + EDGE_COST * self.edges
+                + NOTE_COST * self.notes
+                + DEPTH_COST * self.max_depth
+                + GRAPH_COST * nodes * self.edges)
+
+    @property
+    def timeout(self) -> int:
+        """Render timeout in seconds, proportional to the predicted cost."""
+        return int(min(MAX_TIMEOUT, max(min_timeout(), math.ceil(self.cost * TIMEOUT_FACTOR))))
+
+    @property
+    def heap_mb(self) -> int:
+        """JVM heap (-Xmx) in MB, rounded up to a multiple of 256."""
+        heap = BASE_HEAP_MB + HEAP_MB_PER_ELEMENT * self.elements
+        return int(min(MAX_HEAP_MB, math.ceil(heap / 256) * 256))
+
+
+def estimate_complexity(puml_content: str) -> ComplexityEstimate:
+    """Estimate the structural complexity of a PlantUML diagram."""
+    estimate = ComplexityEstimate()
+    depth = 0
+    in_note = False
+
+    for raw in puml_content.splitlines():
+        line = raw.strip()
+        if not line or line.startswith("'") or line.startswith('@'):
+            continue
+        estimate.lines += 1
+
+        if in_note:
+            if NOTE_END_RE.match(line):
+                in_note = False
+            continue
+
+        if NOTE_RE.match(line):
+            estimate.notes += 1
+            in_note = ':' not in line
+            continue
+
+        if PARTICIPANT_RE.match(line):
+            estimate.participants += 1
+        elif CLASS_RE.match(line):
+            estimate.classes += 1
+        elif EDGE_RE.search(line.split(':', 1)[0]):
+            estimate.edges += 1
+
+        if CLOSE_RE.match(line):
+            depth = max(0, depth - 1)
+        elif OPEN_RE.search(line):
+            depth += 1
+            estimate.max_depth = max(estimate.max_depth, depth)
+
+    return estimate
+
+
+T = TypeVar('T')
+
+
+def longest_first(items: List[T], content_of: Callable[[T], str]) -> List[T]:
+    """
+    Order work items by predicted render cost, most expensive first (LPT).
+
+    Feeding a worker pool in this order keeps one heavy diagram from starting
+    last and stretching the wall-clock time of the whole batch.
+    """
+    return sorted(items, key=lambda item: estimate_complexity(content_of(item)).cost, reverse=True)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python complexity_estimator.py diagram.puml [more.puml ...]")
+        sys.exit(1)
+
+    for path in map(Path, sys.argv[1:]):
+        if not path.exists():
+            print(f"❌ Error: File not found: {path}", file=sys.stderr)
+            continue
+        est = estimate_complexity(path.read_text(encoding='utf-8'))
+        print(f"{path}: participants={est.participants} classes={est.classes} edges={est.edges} "
+              f"notes={est.notes} depth={est.max_depth} → cost≈{est.cost:.1f}s "
+              f"timeout={est.timeout}s heap={est.heap_mb}m")
+
+
+if __name__ == '__main__':
+    main()
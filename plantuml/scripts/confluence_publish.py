@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Publish rendered diagrams to a Confluence page as attachments, uploading only what changed.
+
+Takes the processor output (a `_with_images.md` file, whose image links name
+the files, or image files/directories) and compares each image's SHA-256
+with the remote manifest. The remote manifest is the page's attachment list:
+every upload stores its hash in the attachment comment, so the hashes on the
+page always describe what is actually there, whichever machine published
+them. New and changed images are uploaded with Confluence's create-or-update
+endpoint. Unchanged images are not sent at all.
+
+Uploads run on `--jobs` threads that share a pool of keep-alive connections
+(one TLS handshake per connection, not per file). On HTTP 429/503 every worker
+pauses for the server's Retry-After (or an exponential backoff with jitter)
+before retrying. Plain http:// URLs are accepted, so the publisher can be
+exercised against a local mock server.
+
+Credentials come from the environment: CONFLUENCE_URL (e.g.
+https://example.atlassian.net/wiki), CONFLUENCE_TOKEN, and CONFLUENCE_USER for
+Cloud API tokens (basic auth). Without CONFLUENCE_USER the token is sent as
+a bearer personal access token (Server/Data Center).
+
+Usage:
+    python confluence_publish.py plan <page_id> article_with_images.md [images/ ...] [--url URL]
+    python confluence_publish.py publish <page_id> article_with_images.md [images/ ...] [--url URL] [--jobs 4]
+
+Examples:
+    # Show what would be uploaded
+    python confluence_publish.py plan 123456 docs/architecture_with_images.md
+
+    # Render, then publish only new or changed images
+    python process_markdown_puml.py docs/architecture.md --optimize
+    python confluence_publish.py publish 123456 docs/architecture_with_images.md --jobs 8
+"""
+
+import argparse
+import base64
+import email.utils
+import hashlib
+import http.client
+import json
+import os
+import queue
+import random
+import re
+import ssl
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+# Images linked from processed markdown: ![name](images/diagram_1_uml.png)
+IMAGE_LINK = re.compile(r'!\[[^\]]*\]\(([^)\s]+\.(?:png|svg))(?:\s+"[^"]*")?\)')
+IMAGE_SUFFIXES = ('.png', '.svg')
+CONTENT_TYPES = {'.png': 'image/png', '.svg': 'image/svg+xml'}
+
+# Attachment comments carry the content hash: "sha256:<hex>"
+HASH_PREFIX = 'sha256:'
+
+DEFAULT_JOBS = 4
+PAGE_SIZE = 200
+REQUEST_TIMEOUT = 60
+
+# Rate limiting: retries per request and the backoff when no Retry-After is given
+MAX_RETRIES = 8
+BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+RETRY_STATUSES = (429, 503)
+
+
+class PublishError(RuntimeError):
+    """Raised when Confluence rejects a request or the local files are inconsistent."""
+
+
+@dataclass
+class LocalAttachment:
+    """One image to publish."""
+    name: str
+    path: Path
+    sha256: str
+    size: int
+
+
+@dataclass
+class PublishPlan:
+    """Local images sorted by what the remote manifest says about them."""
+    new: List[LocalAttachment] = field(default_factory=list)
+    changed: List[LocalAttachment] = field(default_factory=list)
+    unchanged: List[LocalAttachment] = field(default_factory=list)
+    remote_only: List[str] = field(default_factory=list)
+
+    @property
+    def uploads(self) -> List[LocalAttachment]:
+        return self.new + self.changed
+
+
+@dataclass
+class Response:
+    """A fully read HTTP response."""
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to one host, shared by worker threads.
+
+    At most `size` requests are in flight; idle connections are reused, and a
+    reused connection the server has meanwhile closed is replaced transparently.
+    """
+
+    def __init__(self, base_url: str, size: int = DEFAULT_JOBS, timeout: int = REQUEST_TIMEOUT):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise PublishError(f"Invalid Confluence URL: {base_url}")
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._context = ssl.create_default_context() if self.https else None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.connections_opened += 1
+        if self.https:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self._context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None) -> Response:
+        """Send one request on a pooled connection and read the whole response."""
+        with self._slots:
+            try:
+                conn, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                conn, reused = self._connect(), False
+            try:
+                try:
+                    response = self._send(conn, method, path, body, headers)
+                except (http.client.HTTPException, ConnectionError):
+                    if not reused:
+                        raise
+                    # The server dropped the idle connection; retry once on a fresh one
+                    conn.close()
+                    conn = self._connect()
+                    response = self._send(conn, method, path, body, headers)
+            except BaseException:
+                conn.close()
+                raise
+            if response.headers.get('connection', '').lower() == 'close':
+                conn.close()
+            else:
+                self._idle.put(conn)
+            return response
+
+    def _send(self, conn: http.client.HTTPConnection, method: str, path: str,
+              body: Optional[bytes], headers: Optional[Dict[str, str]]) -> Response:
+        conn.request(method, self.prefix + path, body=body, headers=headers or {})
+        raw = conn.getresponse()
+        data = raw.read()
+        return Response(raw.status, {k.lower(): v for k, v in raw.getheaders()}, data)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def _retry_delay(response: Response, attempt: int) -> float:
+    """Seconds to wait before retrying a rate-limited request."""
+    value = response.headers.get('retry-after', '').strip()
+    if value.isdigit():
+        return min(float(value), MAX_BACKOFF_SECONDS)
+    if value:
+        try:
+            return min(max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time()),
+                       MAX_BACKOFF_SECONDS)
+        except (TypeError, ValueError):
+            pass
+    return min(BACKOFF_SECONDS * 2 ** attempt * (0.5 + random.random()), MAX_BACKOFF_SECONDS)
+
+
+def _multipart(fields: Dict[str, str], filename: str, data: bytes, content_type: str) -> Tuple[bytes, str]:
+    """Encode form fields and one file as multipart/form-data; returns (body, content_type_header)."""
+    boundary = uuid.uuid4().hex
+    parts = [
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode('utf-8')
+        for key, value in fields.items()
+    ]
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                  f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8') + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def auth_header(token: str, user: Optional[str] = None) -> str:
+    """Basic auth for Cloud (user + API token), bearer for Server/DC personal access tokens."""
+    if user:
+        return 'Basic ' + base64.b64encode(f"{user}:{token}".encode('utf-8')).decode('ascii')
+    return f'Bearer {token}'
+
+
+class ConfluenceAttachments:
+    """Attachment operations on one Confluence page over a shared connection pool."""
+
+    def __init__(self, base_url: str, page_id: str, authorization: Optional[str], jobs: int = DEFAULT_JOBS):
+        self.page_id = page_id
+        self.pool = ConnectionPool(base_url, size=jobs)
+        self.headers = {'Accept': 'application/json', 'X-Atlassian-Token': 'no-check'}
+        if authorization:
+            self.headers['Authorization'] = authorization
+        self.retries = 0
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def _path(self) -> str:
+        return f"/rest/api/content/{quote(self.page_id)}/child/attachment"
+
+    def call(self, method: str, path: str, body: Optional[bytes] = None,
+             headers: Optional[Dict[str, str]] = None) -> Response:
+        """
+        Send a request, retrying on rate limits.
+
+        A 429/503 pauses every worker until the server's Retry-After has
+        passed, so a bulk upload backs off as a whole instead of hammering the
+        server from the other threads.
+
+        Raises:
+            PublishError: on any other error status, or when retries run out
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            wait = self._resume_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            response = self.pool.request(method, path, body, {**self.headers, **(headers or {})})
+            if response.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                delay = _retry_delay(response, attempt)
+                with self._lock:
+                    self.retries += 1
+                    self._resume_at = max(self._resume_at, time.monotonic() + delay)
+                continue
+            if response.status >= 400:
+                detail = response.body.decode('utf-8', errors='replace').strip()[:200]
+                raise PublishError(f"{method} {path}: HTTP {response.status} {detail}")
+            return response
+        raise PublishError(f"{method} {path}: still rate limited after {MAX_RETRIES} retries")
+
+    def remote_manifest(self) -> Dict[str, Optional[str]]:
+        """
+        Attachment name -> SHA-256 from its comment (None when uploaded by other means).
+
+        Pages are followed through `_links.next`. Servers that cap `limit`
+        below PAGE_SIZE (Confluence Cloud does) return short pages that are
+        not the last, so without a next link paging stops only once a page
+        comes back smaller than the limit the server echoes.
+        """
+        manifest = {}
+        start = 0
+        path = f"{self._path}?start=0&limit={PAGE_SIZE}&expand=version,metadata"
+        while path:
+            data = self.call('GET', path).json()
+            results = data.get('results', [])
+            for attachment in results:
+                comment = (attachment.get('metadata') or {}).get('comment') or ''
+                manifest[attachment['title']] = (comment[len(HASH_PREFIX):]
+                                                  if comment.startswith(HASH_PREFIX) else None)
+            start += len(results)
+            next_link = (data.get('_links') or {}).get('next')
+            if next_link:
+                path = self._relative(next_link)
+            elif results and len(results) >= data.get('limit', PAGE_SIZE):
+                path = f"{self._path}?start={start}&limit={PAGE_SIZE}&expand=version,metadata"
+            else:
+                path = None
+        return manifest
+
+    def _relative(self, link: str) -> str:
+        """A `_links` URL as a path below the base URL, as call() expects."""
+        parts = urlsplit(link)
+        path = parts.path + (f"?{parts.query}" if parts.query else '')
+        prefix = self.pool.prefix
+        if prefix and path.startswith(prefix + '/'):
+            path = path[len(prefix):]
+        return path
+
+    def upload(self, attachment: LocalAttachment) -> None:
+        """Create or update one attachment, recording its hash in the comment."""
+        body, content_type = _multipart(
+            {'comment': f"{HASH_PREFIX}{attachment.sha256}", 'minorEdit': 'true'},
+            attachment.name,
+            attachment.path.read_bytes(),
+            CONTENT_TYPES.get(attachment.path.suffix.lower(), 'application/octet-stream')
+        )
+        self.call('PUT', self._path, body, {'Content-Type': content_type})
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+def collect_attachments(paths: List[Path]) -> List[LocalAttachment]:
+    """
+    Images to publish: files linked from markdown, image files, and images in directories.
+
+    Raises:
+        PublishError: for missing linked images, or two different files with the same name
+    """
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir()
+                                if p.suffix.lower() in IMAGE_SUFFIXES and not p.name.startswith('.')))
+        elif path.suffix == '.md':
+            for link in IMAGE_LINK.findall(path.read_text(encoding='utf-8')):
+                if re.match(r'^[a-z]+://', link):
+                    continue
+                image = (path.parent / link).resolve()
+                if not image.is_file():
+                    raise PublishError(f"{path}: linked image not found: {link}")
+                files.append(image)
+        else:
+            files.append(path)
+
+    attachments: Dict[str, LocalAttachment] = {}
+    for path in files:
+        data = path.read_bytes()
+        attachment = LocalAttachment(path.name, path, hashlib.sha256(data).hexdigest(), len(data))
+        existing = attachments.get(attachment.name)
+        if existing and existing.sha256 != attachment.sha256:
+            raise PublishError(f"Two different images would both be attached as {attachment.name}: "
+                               f"{existing.path} and {path}")
+        attachments[attachment.name] = attachment
+    return list(attachments.values())
+
+
+def plan_publish(local: List[LocalAttachment], remote: Dict[str, Optional[str]]) -> PublishPlan:
+    """Compare local hashes with the remote manifest."""
+    plan = PublishPlan()
+    for attachment in local:
+        if attachment.name not in remote:
+            plan.new.append(attachment)
+        elif remote[attachment.name] != attachment.sha256:
+            plan.changed.append(attachment)
+        else:
+            plan.unchanged.append(attachment)
+    names = {attachment.name for attachment in local}
+    plan.remote_only = sorted(name for name in remote if name not in names)
+    return plan
+
+
+def publish(
+    client: ConfluenceAttachments,
+    plan: PublishPlan,
+    jobs: int = DEFAULT_JOBS
+) -> List[Tuple[LocalAttachment, Optional[str]]]:
+    """
+    Upload the plan's new and changed attachments with bounded concurrency.
+
+    Returns:
+        (attachment, error or None) per upload, in plan order
+    """
+    new_names = {attachment.name for attachment in plan.new}
+
+    def upload(attachment: LocalAttachment) -> Tuple[LocalAttachment, Optional[str]]:
+        try:
+            client.upload(attachment)
+        except (PublishError, OSError, http.client.HTTPException) as e:
+            print(f"❌ {attachment.name}: {e}", file=sys.stderr)
+            return attachment, str(e)
+        state = 'new' if attachment.name in new_names else 'changed'
+        print(f"⬆️  {attachment.name} ({state}, {attachment.size:,} bytes)")
+        return attachment, None
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        return list(executor.map(upload, plan.uploads))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Publish rendered diagrams as Confluence page attachments, changed files only',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('plan', 'Show which images would be uploaded'),
+                            ('publish', 'Upload new and changed images')):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument('page_id', help='Confluence page (content) id')
+        cmd.add_argument('paths', nargs='+', help='Processed markdown, image files or image directories')
+        cmd.add_argument('--url', default=os.environ.get('CONFLUENCE_URL'),
+                         help='Confluence base URL (default: $CONFLUENCE_URL)')
+        cmd.add_argument('--jobs', '-j', type=int, default=DEFAULT_JOBS,
+                         help=f'Concurrent uploads and pooled connections (default: {DEFAULT_JOBS})')
+    args = parser.parse_args()
+
+    if not args.url:
+        print("❌ Error: Confluence URL not set (--url or CONFLUENCE_URL)", file=sys.stderr)
+        sys.exit(1)
+    token = os.environ.get('CONFLUENCE_TOKEN')
+    authorization = auth_header(token, os.environ.get('CONFLUENCE_USER')) if token else None
+
+    client = None
+    try:
+        local = collect_attachments([Path(p) for p in args.paths])
+        if not local:
+            print("ℹ️  No images to publish")
+            return
+        client = ConfluenceAttachments(args.url, args.page_id, authorization, args.jobs)
+        plan = plan_publish(local, client.remote_manifest())
+
+        print(f"📎 {len(local)} image(s): {len(plan.new)} new, {len(plan.changed)} changed, "
+              f"{len(plan.unchanged)} unchanged")
+        if plan.remote_only:
+            print(f"ℹ️  {len(plan.remote_only)} attachment(s) on the page are not in this output "
+                  f"(left in place): {', '.join(plan.remote_only[:5])}"
+                  + (' ...' if len(plan.remote_only) > 5 else ''))
+        if args.command == 'plan':
+            for attachment in plan.new:
+                print(f"   new      {attachment.name}")
+            for attachment in plan.changed:
+                print(f"   changed  {attachment.name}")
+            return
+
+        started = time.monotonic()
+        results = publish(client, plan, args.jobs)
+    except (PublishError, OSError, http.client.HTTPException) as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if client:
+            client.close()
+
+    failed = [attachment for attachment, error in results if error]
+    print(f"\n✅ Uploaded {len(results) - len(failed)} of {len(results)} in {time.monotonic() - started:.1f}s "
+          f"({client.pool.connections_opened} connection(s), {client.retries} rate-limit retries)")
+    if failed:
+        print(f"❌ {len(failed)} upload(s) failed; rerun to retry them", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,14 +3,32 @@
 Simple converter for standalone PlantUML files to PNG or SVG.
 
 Usage:
-    python convert_puml.py <file.puml> [--format png|svg] [--output-dir out/]
+    python convert_puml.py <file.puml> [--format png|svg] [--output-dir out/] [--no-lint]
+    python convert_puml.py <dir> --changed-since <git-ref> [--format png|svg] [--output-dir out/]
+
+With --changed-since, every .puml under <dir> that changed since the ref, or
+that includes a changed file, is converted. Include-only fragments (no
+@start tag) are skipped. Diagrams failing puml_lint are reported without
+starting PlantUML unless --no-lint is given. Images are normalized and only
+written when their bytes changed (stable_output), so unchanged diagrams keep
+their file's mtime.
 """
 
 import sys
 import subprocess
 import os
 import shutil
+import tempfile
+import time
 from pathlib import Path
+from typing import Optional, Tuple
+
+from changed_files import GitError, affected_files
+from complexity_estimator import estimate_complexity
+from puml_lint import lint_message, lint_puml
+from render_history import RenderHistory
+from resource_governor import jvm_command, jvm_slot
+from stable_output import OutputWriter
 
 
 def find_plantuml_command() -> tuple:
@@ -76,17 +94,53 @@ def find_plantuml_jar() -> str:
     return ''
 
 
-def convert_puml(puml_file: str, format: str = 'png', output_dir: str = None) -> bool:
+def convert_puml(
+    puml_file: str,
+    format: str = 'png',
+    output_dir: str = None,
+    timeout: Optional[int] = None,
+    history: Optional[RenderHistory] = None,
+    lint: bool = True,
+    writer: Optional[OutputWriter] = None
+) -> bool:
     """
     Convert a .puml file to image format.
 
+    See render_puml for the arguments.
+
+    Returns:
+        True if successful, False otherwise
+    """
+    return render_puml(puml_file, format, output_dir, timeout, history, lint, writer)[0]
+
+
+def render_puml(
+    puml_file: str,
+    format: str = 'png',
+    output_dir: str = None,
+    timeout: Optional[int] = None,
+    history: Optional[RenderHistory] = None,
+    lint: bool = True,
+    writer: Optional[OutputWriter] = None
+) -> Tuple[bool, str]:
+    """
+    Convert a .puml file to image format, keeping PlantUML's error output.
+
+    PlantUML renders into a staging directory; the images are then moved into
+    place by the writer, which skips files whose bytes did not change.
+
     Args:
         puml_file: Path to .puml file
         format: 'png' or 'svg'
         output_dir: Optional output directory
+        timeout: Seconds before the render is abandoned; by default learned
+            from the render history, falling back to a complexity estimate
+        history: RenderHistory to consult and record into (default: shared local database)
+        lint: Reject structurally broken diagrams (puml_lint) without starting PlantUML
+        writer: OutputWriter counting written vs unchanged images (default: a private one)
 
     Returns:
-        True if successful, False otherwise
+        Tuple of (success, error_output)
     """
     cmd_base, method = find_plantuml_command()
     if not cmd_base:
@@ -94,44 +148,70 @@ def convert_puml(puml_file: str, format: str = 'png', output_dir: str = None) ->
         print("Install via Homebrew: brew install plantuml")
         print("Or download JAR from: https://plantuml.com/download")
         print("Or set PLANTUML_JAR environment variable.")
-        return False
+        return False, "PlantUML not found"
 
     format_flag = '-tsvg' if format == 'svg' else '-tpng'
     cmd = cmd_base + [format_flag]
 
-    if output_dir:
-        # Use absolute path - PlantUML's -o flag is relative to input file location
-        abs_output_dir = str(Path(output_dir).resolve())
-        Path(abs_output_dir).mkdir(exist_ok=True, parents=True)
-        cmd.extend(['-o', abs_output_dir])
-
-    cmd.append(puml_file)
-
-    print(f"Converting {puml_file} to {format.upper()}...")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    # Absolute path - PlantUML's -o flag is relative to input file location
+    target_dir = Path(output_dir).resolve() if output_dir else Path(puml_file).resolve().parent
+    target_dir.mkdir(exist_ok=True, parents=True)
 
-    if result.returncode != 0:
-        print(f"ERROR: {result.stderr}")
-        return False
+    puml_content = Path(puml_file).read_text(encoding='utf-8')
+    if lint:
+        findings = lint_puml(puml_content)
+        if findings:
+            for finding in findings:
+                print(f"ERROR: {puml_file}:{finding}")
+            return False, lint_message(findings)
 
-    output_name = Path(puml_file).stem + f".{format}"
-    if output_dir:
-        output_path = Path(output_dir).resolve() / output_name
-    else:
-        output_path = Path(puml_file).parent / output_name
+    history = history or RenderHistory()
+    if timeout is None:
+        fallback = estimate_complexity(puml_content).timeout
+        timeout = history.timeout_for(puml_content, 'render', fallback=fallback)
 
-    print(f"✅ Created: {output_path}")
-    return True
+    writer = writer or OutputWriter()
+    print(f"Converting {puml_file} to {format.upper()}...")
+    with tempfile.TemporaryDirectory(prefix='.render-', dir=target_dir) as staging:
+        started = time.monotonic()
+        try:
+            with jvm_slot() as prefix:
+                started = time.monotonic()
+                result = subprocess.run(prefix + jvm_command(cmd) + ['-o', staging, puml_file],
+                                        capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            history.record(puml_content, 'render', time.monotonic() - started, False, timeout, source=puml_file)
+            print(f"ERROR: Conversion timed out after {timeout}s")
+            return False, f"Conversion timed out after {timeout}s"
+
+        history.record(puml_content, 'render', time.monotonic() - started,
+                       result.returncode == 0, timeout, source=puml_file)
+
+        if result.returncode != 0:
+            print(f"ERROR: {result.stderr}")
+            return False, result.stderr or result.stdout or "Conversion failed"
+
+        # One file per page (name.png, name_001.png, ...)
+        for produced in sorted(Path(staging).iterdir()):
+            output_path = target_dir / produced.name
+            if writer.write_render(output_path, produced.read_bytes()):
+                print(f"✅ Created: {output_path}")
+            else:
+                print(f"✅ Unchanged: {output_path}")
+    return True, ""
 
 def main():
     """Main entry point."""
     if len(sys.argv) < 2:
-        print("Usage: python convert_puml.py <file.puml> [--format png|svg] [--output-dir out/]")
+        print("Usage: python convert_puml.py <file.puml> [--format png|svg] [--output-dir out/] [--no-lint]")
+        print("       python convert_puml.py <dir> --changed-since <git-ref> [--format png|svg] [--output-dir out/]")
         sys.exit(1)
 
     puml_file = sys.argv[1]
     format = 'png'
     output_dir = None
+    changed_since = None
+    lint = True
 
     # Parse optional arguments
     i = 2
@@ -142,6 +222,12 @@ def main():
         elif sys.argv[i] == '--output-dir' and i + 1 < len(sys.argv):
             output_dir = sys.argv[i + 1]
             i += 2
+        elif sys.argv[i] == '--changed-since' and i + 1 < len(sys.argv):
+            changed_since = sys.argv[i + 1]
+            i += 2
+        elif sys.argv[i] == '--no-lint':
+            lint = False
+            i += 1
         else:
             i += 1
 
@@ -153,7 +239,23 @@ def main():
         print(f"ERROR: Invalid format '{format}'. Use 'png' or 'svg'")
         sys.exit(1)
 
-    success = convert_puml(puml_file, format, output_dir)
+    if changed_since:
+        try:
+            _, puml_files = affected_files(changed_since, Path(puml_file))
+        except GitError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+
+        # Fragments pulled in with !include have no @start tag of their own
+        diagrams = [path for path in puml_files
+                    if '@start' in path.read_text(encoding='utf-8', errors='replace')]
+        print(f"Converting {len(diagrams)} diagram(s) affected since {changed_since}")
+        writer = OutputWriter()
+        results = [convert_puml(str(path), format, output_dir, lint=lint, writer=writer) for path in diagrams]
+        print(f"Files: {writer.summary()}")
+        sys.exit(0 if all(results) else 1)
+
+    success = convert_puml(puml_file, format, output_dir, lint=lint)
     sys.exit(0 if success else 1)
 
 if __name__ == '__main__':
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Split oversized class and component diagrams into an overview plus one diagram per package.
+
+Graphviz layout cost grows with nodes x edges, so generated class diagrams
+with hundreds of classes take minutes or crash (performance_guide.md
+Error #16, which recommends package structure and focused diagrams). This
+module does that split mechanically:
+
+- The overview has one node per top-level package (with its element count)
+  and one edge per pair of related packages, labelled with how many
+  relationships it stands for.
+- Each package gets a detail diagram with its own block (nested packages,
+  members and notes included), the relationships inside it, and the
+  relationships to other packages summarized as one edge per element and
+  external package.
+
+Elements outside any package are grouped by their dotted name prefix
+(`com.shop.Order` belongs to `com.shop`), or else into an "(ungrouped)"
+diagram. Every piece repeats the header (skinparams, styles, includes), so
+the pieces render independently and in parallel. Diagrams that use
+preprocessor conditionals or procedures are never split.
+
+Usage:
+    python decompose_diagram.py big.puml [--max-elements 60] [--output-dir parts/]
+"""
+
+import argparse
+import re
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from layout_engine import graph_kind
+from paginate_diagram import HEADER_RE, NOTE_END_RE, NOTE_OPEN_RE, UNSAFE_RE, _split_envelope, _take_block
+
+# Above this many elements (or relationships) a diagram is split per package
+MAX_ELEMENTS = 60
+MAX_RELATIONS = 150
+
+# Deployment diagrams are component diagrams with nodes, and split the same way
+DECOMPOSABLE_KINDS = ('class', 'component', 'deployment')
+
+# Name of the group for elements outside any package
+UNGROUPED = '(ungrouped)'
+
+# Output name suffixes: <base>_overview, <base>_pkg_<package>
+OVERVIEW_SUFFIX = '_overview'
+DETAIL_INFIX = '_pkg_'
+
+EXTRA_HEADER_RE = re.compile(r'^(set\s+\w+|allowmixing|allow_mixing|skinparam|caption|header|footer)\b',
+                             re.IGNORECASE)
+LEGEND_RE = re.compile(r'^legend\b', re.IGNORECASE)
+LEGEND_END_RE = re.compile(r'^end\s*legend\b', re.IGNORECASE)
+TOGETHER_RE = re.compile(r'^together\s*\{\s*$', re.IGNORECASE)
+CONTAINER_RE = re.compile(
+    r'^(package|namespace|node|folder|frame|cloud|database|rectangle)\b\s*(.*?)\s*\{\s*$',
+    re.IGNORECASE
+)
+NAME = r'"[^"]+"|\[[^\]]+\]|[\w$]+(?:(?:\.|::)[\w$]+)*'
+DECLARATION_RE = re.compile(
+    r'^(?:abstract\s+class|abstract|class|interface|enum|annotation|entity|struct|protocol|exception'
+    r'|metaclass|stereotype|component|artifact|usecase|actor|port|portin|portout|storage|agent|card'
+    r'|circle|collections|file|hexagon|label|person|queue|stack|database|node|folder|frame|cloud|rectangle'
+    r'|boundary|control)\s+(' + NAME + r')(?:\s+as\s+(' + NAME + r'))?',
+    re.IGNORECASE
+)
+BRACKET_DECLARATION_RE = re.compile(r'^(\[[^\]]+\])(?:\s+as\s+(' + NAME + r'))?\s*(?:<<.*>>)?\s*$')
+ARROW = (r'[<>*o#x+^|}{]*(?:[-.=]+(?:\[[^\]]*\]|left|right|up|down|le|ri|do|l|r|u|d)?[-.=]*)'
+         r'[<>*o#x+^|}{]*')
+RELATION_RE = re.compile(
+    r'^(' + NAME + r')\s*(?:"[^"]*"\s*)?(' + ARROW + r')\s*(?:"[^"]*"\s*)?(' + NAME + r')\s*(?::.*)?$'
+)
+MEMBER_RE = re.compile(r'^(' + NAME + r')\s*:\s*\S')
+NOTE_OF_RE = re.compile(r'^note\s+(?:left|right|top|bottom)\s+of\s+(' + NAME + r')', re.IGNORECASE)
+
+
+@dataclass
+class Relation:
+    """One relationship line, its endpoints as written, and the groups they belong to."""
+    source: str
+    target: str
+    line: str
+    source_group: str = UNGROUPED
+    target_group: str = UNGROUPED
+
+
+@dataclass
+class Group:
+    """A top-level package (or the ungrouped elements) and the lines that belong to it."""
+    name: str
+    keyword: str = 'package'
+    lines: List[str] = field(default_factory=list)
+    elements: int = 0
+
+
+@dataclass
+class Structure:
+    """A class/component diagram parsed into header, groups and relationships."""
+    start_line: str
+    header: List[str]
+    groups: Dict[str, Group]
+    relations: List[Relation]
+
+    @property
+    def elements(self) -> int:
+        return sum(group.elements for group in self.groups.values())
+
+
+def _plain(name: str) -> str:
+    """Element name without quotes or component brackets."""
+    return name.strip().strip('"').strip('[]').strip()
+
+
+def _group_of_dotted(name: str) -> Optional[str]:
+    """Package implied by a qualified name (a.b.C -> a.b), if any."""
+    plain = _plain(name).replace('::', '.')
+    return plain.rsplit('.', 1)[0] if '.' in plain else None
+
+
+def _relation(line: str) -> Optional[re.Match]:
+    """Match a relationship line; None for anything else (including `a.b`)."""
+    match = RELATION_RE.match(line)
+    if not match or len(match.group(2)) < 2 or not re.search(r'[-.]', match.group(2)):
+        return None
+    return match
+
+
+def _declared_names(line: str) -> List[str]:
+    """Names (and aliases) declared by an element declaration line."""
+    match = DECLARATION_RE.match(line) or BRACKET_DECLARATION_RE.match(line)
+    if not match:
+        return []
+    return [_plain(name) for name in match.groups() if name]
+
+
+def _container_name(rest: str) -> str:
+    """Package name from what follows the container keyword (`"Name" as P <<s>>`)."""
+    match = re.match(NAME, rest.strip())
+    return _plain(match.group(0)) if match else rest.strip() or UNGROUPED
+
+
+def parse_structure(puml_content: str) -> Optional[Structure]:
+    """
+    Parse a class or component diagram into top-level groups and relationships.
+
+    Returns:
+        The structure, or None if the diagram cannot be split safely
+    """
+    start_line, lines = _split_envelope(puml_content)
+    if any(UNSAFE_RE.match(line.strip()) for line in lines):
+        return None
+
+    header: List[str] = []
+    groups: Dict[str, Group] = {}
+    relations: List[Tuple[str, Optional[str]]] = []
+    owners: Dict[str, str] = {}
+    pending: List[Tuple[str, List[str]]] = []  # (element, lines) attached once all owners are known
+
+    def group(name: str, keyword: str = 'package') -> Group:
+        if name not in groups:
+            groups[name] = Group(name, keyword)
+        return groups[name]
+
+    def declare(names: List[str], owner: str) -> None:
+        for name in names:
+            owners.setdefault(name, owner)
+        if names:
+            group(owner).elements += 1
+
+    together = 0
+    i = 0
+    while i < len(lines):
+        raw = lines[i]
+        line = raw.strip()
+        lower = line.lower()
+
+        if lower.startswith('<style>'):
+            end = _take_block(lines, i, re.compile(r'^</style>'))
+            header.extend(lines[i:end])
+            i = end
+            continue
+        if lower.startswith('skinparam') and line.endswith('{'):
+            end = _take_block(lines, i, re.compile(r'^\}'))
+            header.extend(lines[i:end])
+            i = end
+            continue
+        if HEADER_RE.match(line) or EXTRA_HEADER_RE.match(line):
+            header.append(raw)
+            i += 1
+            continue
+
+        if LEGEND_RE.match(line):
+            end = _take_block(lines, i, LEGEND_END_RE)
+            header.extend(lines[i:end])
+            i = end
+            continue
+        # `together` only groups for layout; its braces are dropped along with the hint
+        if TOGETHER_RE.match(line):
+            together += 1
+            i += 1
+            continue
+        if together and line == '}':
+            together -= 1
+            i += 1
+            continue
+
+        container = CONTAINER_RE.match(line)
+        if container:
+            # A whole top-level package: copy it, pulling relationships out
+            owner = _container_name(container.group(2))
+            target = group(owner, container.group(1).lower())
+            target.lines.append(raw)
+            depth, i = 1, i + 1
+            while i < len(lines) and depth:
+                inner = lines[i].strip()
+                if _relation(inner) and not _declared_names(inner):
+                    relations.append((lines[i], owner))
+                else:
+                    target.lines.append(lines[i])
+                    declare(_declared_names(inner), owner)
+                    depth += inner.endswith('{') - (inner.startswith('}') and not inner.endswith('{'))
+                i += 1
+            continue
+
+        names = _declared_names(line)
+        if names:
+            end = i + 1
+            if line.endswith('{'):
+                end = _take_block(lines, i, re.compile(r'^\}'))
+            owner = _group_of_dotted(names[0]) or UNGROUPED
+            declare(names, owner)
+            group(owner).lines.extend(lines[i:end])
+            i = end
+            continue
+
+        if _relation(line):
+            relations.append((raw, None))
+            i += 1
+            continue
+
+        end = i + 1
+        if NOTE_OPEN_RE.match(line) and ':' not in line:
+            end = _take_block(lines, i, NOTE_END_RE)
+        note_of = NOTE_OF_RE.match(line)
+        member = MEMBER_RE.match(line)
+        subject = note_of or member
+        if subject:
+            pending.append((_plain(subject.group(1)), lines[i:end]))
+        elif line and not line.startswith("'"):
+            group(UNGROUPED).lines.extend(lines[i:end])
+        i = end
+
+    for name, block in pending:
+        group(owners.get(name) or _group_of_dotted(name) or UNGROUPED).lines.extend(block)
+
+    parsed = []
+    for raw, inside in relations:
+        match = _relation(raw.strip())
+        source, arrow, target = match.group(1), match.group(2), match.group(3)
+        if '<' in arrow and '>' not in arrow:
+            source, target = target, source
+
+        def owner_of(name: str) -> str:
+            name = _plain(name)
+            return owners.get(name) or _group_of_dotted(name) or inside or UNGROUPED
+
+        relation = Relation(source, target, raw, owner_of(source), owner_of(target))
+        group(relation.source_group)
+        group(relation.target_group)
+        parsed.append(relation)
+
+    return Structure(start_line, header, groups, parsed)
+
+
+def is_decomposable(puml_content: str, max_elements: Optional[int] = None) -> bool:
+    """Check whether a class/component diagram is oversized and spread over at least two packages."""
+    if graph_kind(puml_content) not in DECOMPOSABLE_KINDS:
+        return False
+    structure = parse_structure(puml_content)
+    if structure is None or len(structure.groups) < 2:
+        return False
+    return structure.elements > (max_elements or MAX_ELEMENTS) or len(structure.relations) > MAX_RELATIONS
+
+
+def _alias(num: int) -> str:
+    return f"P{num}"
+
+
+def _overview(structure: Structure) -> str:
+    """Package-level diagram: one node per group, one counted edge per related pair."""
+    aliases = {name: _alias(num) for num, name in enumerate(structure.groups, 1)}
+    lines = [structure.start_line] + structure.header + ['set separator none']
+    for name, group in structure.groups.items():
+        keyword = group.keyword if group.keyword != 'namespace' else 'package'
+        lines.append(f'{keyword} "{name}" as {aliases[name]} <<{group.elements} element{"s" if group.elements != 1 else ""}>> {{')
+        lines.append('}')
+
+    edges = Counter((r.source_group, r.target_group) for r in structure.relations
+                    if r.source_group != r.target_group)
+    for (source, target), count in edges.items():
+        lines.append(f"{aliases[source]} ..> {aliases[target]} : {count}")
+    return '\n'.join(lines + ['@enduml'])
+
+
+def _detail(structure: Structure, name: str) -> str:
+    """One group with its internal relationships and a summary of the external ones."""
+    group = structure.groups[name]
+    lines = [structure.start_line] + structure.header + group.lines
+    lines.extend(r.line for r in structure.relations if r.source_group == name and r.target_group == name)
+
+    external: Dict[str, str] = {}
+    summary = Counter()
+    for r in structure.relations:
+        if r.source_group == name and r.target_group != name:
+            summary[(r.source, r.target_group, False)] += 1
+        elif r.target_group == name and r.source_group != name:
+            summary[(r.target, r.source_group, True)] += 1
+    for (element, other, incoming), count in summary.items():
+        if other not in external:
+            external[other] = f"X{len(external) + 1}"
+            lines.append(f'package "{other}" as {external[other]} <<external>> {{')
+            lines.append('}')
+        label = f"{count} relation{'s' if count != 1 else ''}"
+        if incoming:
+            lines.append(f"{external[other]} ..> {element} : {label}")
+        else:
+            lines.append(f"{element} ..> {external[other]} : {label}")
+    return '\n'.join(lines + ['@enduml'])
+
+
+def slug(name: str) -> str:
+    """File-name-safe form of a package name."""
+    return re.sub(r'[^\w.-]+', '-', name).strip('-.') or 'ungrouped'
+
+
+def decompose_diagram(puml_content: str, max_elements: Optional[int] = None) -> List[Tuple[str, str]]:
+    """
+    Split an oversized class/component diagram into an overview and per-package details.
+
+    Args:
+        puml_content: PlantUML source (with @startuml/@enduml)
+        max_elements: Elements above which the diagram is split (default MAX_ELEMENTS)
+
+    Returns:
+        (name_suffix, source) pairs: the overview first (OVERVIEW_SUFFIX), then
+        one detail per package (DETAIL_INFIX + package slug). A single pair
+        ('', original source) when the diagram cannot or need not be split
+    """
+    if not is_decomposable(puml_content, max_elements):
+        return [('', puml_content)]
+    structure = parse_structure(puml_content)
+
+    parts = [(OVERVIEW_SUFFIX, _overview(structure))]
+    used = set()
+    for name in structure.groups:
+        suffix = DETAIL_INFIX + slug(name)
+        while suffix in used:
+            suffix += '_'
+        used.add(suffix)
+        parts.append((suffix, _detail(structure, name)))
+    return parts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Split oversized class/component diagrams into an overview plus per-package diagrams',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('puml_file', help='PlantUML file to split')
+    parser.add_argument('--max-elements', type=int, default=None,
+                        help=f'Split diagrams with more elements than this (default: {MAX_ELEMENTS})')
+    parser.add_argument('--output-dir', default=None,
+                        help='Directory for the parts (default: next to input)')
+
+    args = parser.parse_args()
+
+    puml_path = Path(args.puml_file)
+    if not puml_path.exists():
+        print(f"❌ Error: File not found: {puml_path}", file=sys.stderr)
+        sys.exit(1)
+
+    parts = decompose_diagram(puml_path.read_text(encoding='utf-8'), args.max_elements)
+    if len(parts) == 1:
+        print(f"ℹ️  {puml_path} is small enough (or cannot be split by package)")
+        return
+
+    output_dir = Path(args.output_dir) if args.output_dir else puml_path.parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for suffix, source in parts:
+        part_path = output_dir / f"{puml_path.stem}{suffix}.puml"
+        part_path.write_text(source + '\n', encoding='utf-8')
+        print(f"✅ {part_path}")
+
+
+if __name__ == '__main__':
+    main()
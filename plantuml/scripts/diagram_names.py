@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Stable, content-derived names for rendered diagrams, and orphan cleanup.
+
+Positional names (diagram_3_sequence, article_003_sequence_...) shift whenever
+a diagram is inserted or removed above them, so one new diagram at the top of
+a document renames, re-renders and re-uploads every diagram below it. A
+stable name depends only on the diagram itself: its explicit id
+(`@startuml checkout_flow` or `@startuml(id=checkout_flow)`), else its title,
+else its diagram type, plus a short hash of its source:
+
+    checkout_flow_3f9a2c1b
+
+Reordering diagrams, or inserting one, leaves the names of all the others
+alone; editing a diagram gives it a new name. Identical diagrams share a name
+and so one image.
+
+Each run records the files a document produced in a manifest in the output
+directory (`.<document>.outputs.json`). sync_outputs() then deletes files the
+previous run of the same document produced but this one did not, such as the
+image of an edited or removed diagram. Only files listed in the manifest are
+ever deleted, and never one that another document's manifest in the same
+directory still lists: documents in one folder share an images directory, and
+identical diagrams in two documents share a file. Nothing is deleted after a
+run in which a diagram failed.
+
+Usage:
+    python diagram_names.py article.md
+
+Examples:
+    # Show the stable name each diagram in a document gets
+    python diagram_names.py docs/architecture.md
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import List, Optional, Set
+
+# Hex digits of the source hash in a stable name
+HASH_LENGTH = 8
+
+# Longest id/title part of a stable name
+MAX_SLUG_LENGTH = 40
+
+ID_RE = re.compile(r'^[ \t]*@start\w+\b[ \t]*(?:\([ \t]*id[ \t]*=[ \t]*([^)\s]+)[ \t]*\)|([^\s(][^\n]*?))[ \t]*$',
+                   re.MULTILINE)
+TITLE_RE = re.compile(r'^[ \t]*title[ \t]+(\S[^\n]*?)[ \t]*$', re.MULTILINE | re.IGNORECASE)
+
+
+def diagram_id(puml_content: str) -> Optional[str]:
+    """The explicit id of a diagram: `@startuml name` or `@startuml(id=name)`."""
+    match = ID_RE.search(puml_content)
+    if not match:
+        return None
+    return match.group(1) or match.group(2)
+
+
+def diagram_title(puml_content: str) -> Optional[str]:
+    """The single-line title of a diagram, if it has one."""
+    match = TITLE_RE.search(puml_content)
+    return match.group(1) if match else None
+
+
+def slugify(text: str, max_length: int = MAX_SLUG_LENGTH) -> str:
+    """Lowercase ASCII letters, digits and single underscores."""
+    slug = re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+    return slug[:max_length].rstrip('_')
+
+
+def content_hash(puml_content: str) -> str:
+    """Short hash of a diagram's source, ignoring trailing whitespace and surrounding blank lines."""
+    normalized = '\n'.join(line.rstrip() for line in puml_content.strip().splitlines())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:HASH_LENGTH]
+
+
+def stable_name(puml_content: str, diagram_type: str) -> str:
+    """
+    Output name (without extension) that only changes when the diagram does.
+
+    Args:
+        puml_content: Diagram source
+        diagram_type: Used when the diagram has neither an id nor a title
+
+    Returns:
+        `<id, title or type>_<source hash>`
+    """
+    label = slugify(diagram_id(puml_content) or diagram_title(puml_content) or '') or slugify(diagram_type)
+    return f"{label or 'diagram'}_{content_hash(puml_content)}"
+
+
+MANIFEST_SUFFIX = '.outputs.json'
+
+
+def manifest_path(output_dir: Path, document: str) -> Path:
+    return output_dir / f".{document}{MANIFEST_SUFFIX}"
+
+
+def _read_manifest(path: Path) -> List[str]:
+    try:
+        return list(json.loads(path.read_text(encoding='utf-8')).get('outputs', []))
+    except (OSError, ValueError, AttributeError, TypeError):
+        return []
+
+
+def _claimed_by_others(output_dir: Path, own_manifest: Path) -> Set[str]:
+    """Files listed by the manifests of the other documents sharing output_dir."""
+    claimed: Set[str] = set()
+    for path in output_dir.glob(f".*{MANIFEST_SUFFIX}"):
+        if path != own_manifest:
+            claimed.update(_read_manifest(path))
+    return claimed
+
+
+def sync_outputs(output_dir: Path, document: str, files: List[str], complete: bool = True) -> List[Path]:
+    """
+    Record the files a document's run produced and delete the previous run's orphans.
+
+    An orphan another document's manifest in output_dir still lists is kept.
+
+    Args:
+        output_dir: Directory the files were written to
+        document: Name of the document, unique within output_dir (e.g. its stem)
+        files: File names (with extension, without directory) produced by this run
+        complete: Whether every diagram rendered; otherwise nothing is deleted
+            and the previous files stay recorded, so a failed render never
+            loses a good image
+
+    Returns:
+        The files deleted
+    """
+    path = manifest_path(output_dir, document)
+    previous = _read_manifest(path)
+
+    current = list(dict.fromkeys(files))
+    removed = []
+    if complete:
+        claimed = _claimed_by_others(output_dir, path) if output_dir.is_dir() else set()
+        for name in previous:
+            # Plain file names only: a tampered manifest must not reach outside output_dir
+            if name in current or name in claimed or Path(name).name != name:
+                continue
+            orphan = output_dir / name
+            if orphan.is_file():
+                orphan.unlink()
+                removed.append(orphan)
+    else:
+        current += [name for name in previous if name not in current]
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps({'document': document, 'outputs': current}, indent=2) + '\n', encoding='utf-8')
+    os.replace(tmp_path, path)
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Show the stable output name of each diagram in a markdown file',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('markdown_file', help='Markdown file with PlantUML diagrams')
+    args = parser.parse_args()
+
+    path = Path(args.markdown_file)
+    if not path.is_file():
+        print(f"❌ Error: File not found: {path}", file=sys.stderr)
+        sys.exit(1)
+
+    # Imported lazily: process_markdown_puml builds on this module
+    from process_markdown_puml import detect_diagram_type, extract_embedded_puml_blocks, extract_linked_puml_files
+
+    content = path.read_text(encoding='utf-8')
+    diagrams = [(puml, start) for puml, start, _ in extract_embedded_puml_blocks(content)]
+    diagrams += [(puml, start) for puml, _, start, _ in extract_linked_puml_files(content, path.parent)]
+    for puml_content, start in sorted(diagrams, key=lambda d: d[1]):
+        line = content.count('\n', 0, start) + 1
+        print(f"{line:>6}  {stable_name(puml_content, detect_diagram_type(puml_content))}")
+
+
+if __name__ == '__main__':
+    main()
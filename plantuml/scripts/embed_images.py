@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Inline rendered diagrams into the `_with_images` markdown.
+
+Instead of `![diagram_N](images/diagram_N.svg)` links, each diagram becomes
+either an inline `<svg>` element (minified) or, for PNG, a base64 data URI
+when the image is under a size threshold. Embedded image files are removed
+afterwards, so there is nothing extra to sync at build time and no extra HTTP
+request at serve time.
+
+Because every inline SVG shares one HTML id namespace, ids are prefixed per
+diagram, and identical `<defs>` children (filters, gradients, markers that
+PlantUML emits in every diagram) are kept only in the first SVG that defines
+them; later diagrams reference that single copy.
+
+Used by `process_markdown_puml.py --embed`.
+"""
+
+import base64
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+from optimize_images import optimize_svg_bytes
+
+# PNGs larger than this stay as linked files
+DEFAULT_MAX_PNG_BYTES = 64 * 1024
+
+DEFS_RE = re.compile(r'<defs>(.*?)</defs>', re.DOTALL)
+DEF_CHILD_RE = re.compile(r'<(\w+)\b[^>]*?(?:/>|>.*?</\1>)', re.DOTALL)
+ID_RE = re.compile(r'\bid="([^"]+)"')
+
+
+class ImageEmbedder:
+    """Turns rendered images into inline markdown/HTML, de-duplicating SVG defs."""
+
+    def __init__(self, max_png_bytes: int = DEFAULT_MAX_PNG_BYTES):
+        self.max_png_bytes = max_png_bytes
+        self._defs: Dict[str, str] = {}  # content hash -> id of the kept definition
+        self._count = 0
+        self._inlined: Dict[Path, bytes] = {}  # deleted image -> its bytes, for repeated links
+        self.bytes_inlined = 0
+
+    def markdown_for(self, image_path: Path, alt_text: str) -> Optional[str]:
+        """
+        Return inline markup for an image, or None if it should stay a link.
+
+        The image file is deleted once its bytes have been inlined. Identical
+        diagrams share one image with stable naming, so the bytes are kept and
+        later links to the same path are inlined from memory.
+        """
+        suffix = image_path.suffix.lower()
+        data = self._inlined.get(image_path)
+        if data is None:
+            data = image_path.read_bytes()
+
+        if suffix == '.svg':
+            markup = self.inline_svg(data, alt_text)
+        elif suffix == '.png' and len(data) <= self.max_png_bytes:
+            encoded = base64.b64encode(data).decode('ascii')
+            markup = f"![{alt_text}](data:image/png;base64,{encoded})"
+        else:
+            return None
+
+        self.bytes_inlined += len(markup)
+        if image_path not in self._inlined:
+            self._inlined[image_path] = data
+            image_path.unlink()
+        return markup
+
+    def inline_svg(self, svg_bytes: bytes, alt_text: str) -> str:
+        """Minify an SVG and rewrite its ids for embedding in a shared HTML page."""
+        self._count += 1
+        prefix = f"d{self._count}_"
+        text = optimize_svg_bytes(svg_bytes).decode('utf-8')
+
+        # Drop the XML declaration / doctype; everything before the root element
+        text = text[text.find('<svg'):]
+
+        renames = {old: prefix + old for old in ID_RE.findall(text)}
+
+        match = DEFS_RE.search(text)
+        if match:
+            kept = []
+            for child in DEF_CHILD_RE.finditer(match.group(1)):
+                element = child.group(0)
+                ids = ID_RE.findall(element)
+                if not ids:
+                    kept.append(element)
+                    continue
+                key = hashlib.sha256(ID_RE.sub('id=""', element).encode('utf-8')).hexdigest()
+                if key in self._defs:
+                    renames[ids[0]] = self._defs[key]
+                else:
+                    self._defs[key] = renames[ids[0]]
+                    kept.append(element)
+            defs = f"<defs>{''.join(kept)}</defs>" if kept else ''
+            text = text[:match.start()] + defs + text[match.end():]
+
+        text = self._rename_ids(text, renames)
+        text = text.replace('\r', '').replace('\n', ' ')
+        label = alt_text.replace('"', '&quot;')
+        return text.replace('<svg', f'<svg role="img" aria-label="{label}"', 1)
+
+    @staticmethod
+    def _rename_ids(text: str, renames: Dict[str, str]) -> str:
+        """Rewrite id attributes and their url(#...) / href="#..." references."""
+        if not renames:
+            return text
+
+        def replace(match: re.Match) -> str:
+            old = match.group(2)
+            return f"{match.group(1)}{renames.get(old, old)}{match.group(3)}"
+
+        text = re.sub(r'(\bid=")([^"]+)(")', replace, text)
+        text = re.sub(r'(url\(#)([^)]+)(\))', replace, text)
+        return re.sub(r'(href="#)([^"]+)(")', replace, text)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Append-only JSONL log of conversion errors and per-diagram render metrics.
+
+Each event is one JSON object on its own line, appended as it happens. A crash
+in the middle of a long batch keeps everything logged so far, and a truncated
+last line is skipped when reading. Several processes can share one log: every
+event is written with a single O_APPEND write under an advisory lock, and the
+same lock guards size-based rotation (`render_log.jsonl` → `.1` → `.2` ...).
+
+Event kinds:
+    render  one diagram finished: diagram, diagram_type, duration, attempts, success
+    error   one failed attempt: diagram, error, guide, error_number, resolved
+
+Usage:
+    python event_log.py report [log.jsonl] [--top 10]
+
+Examples:
+    # Failure rates per diagram type, slowest diagrams, guide hits
+    python event_log.py report diagrams/render_log.jsonl
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends stay atomic, rotation is unguarded
+    fcntl = None
+
+DEFAULT_LOG_NAME = 'render_log.jsonl'
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+
+
+class EventLog:
+    """Rotating JSONL sink, safe for concurrent writers across processes and threads."""
+
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock_path = self.path.with_name(f".{self.path.name}.lock")
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def write(self, kind: str, **fields) -> None:
+        """Append one event; logging failures are reported, never raised."""
+        event = {'ts': time.time(), 'kind': kind, 'host': socket.gethostname(), 'pid': os.getpid()}
+        event.update(fields)
+        line = (json.dumps(event, default=str) + '\n').encode('utf-8')
+        try:
+            with self._locked():
+                self._rotate_if_needed(len(line))
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+        except OSError as e:
+            print(f"⚠️  Could not write event log {self.path}: {e}", file=sys.stderr)
+
+    def _rotate_if_needed(self, incoming: int) -> None:
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+        if self.max_bytes <= 0 or size + incoming <= self.max_bytes:
+            return
+        for num in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{num}")
+            if older.exists():
+                os.replace(older, self.path.with_name(f"{self.path.name}.{num + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def files(self) -> List[Path]:
+        """The log and its rotated backups, oldest first."""
+        backups = [self.path.with_name(f"{self.path.name}.{num}") for num in range(self.backups, 0, -1)]
+        return [path for path in backups + [self.path] if path.exists()]
+
+
+def read_events(paths: List[Path]) -> Iterator[dict]:
+    """Yield events from JSONL files in order, skipping torn or corrupt lines."""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(event, dict):
+                    yield event
+
+
+@dataclass
+class LogReport:
+    """Aggregates over a set of events."""
+    renders: int = 0
+    failures: int = 0
+    by_type: Dict[str, Tuple[int, int]] = field(default_factory=dict)  # type -> (renders, failures)
+    slowest: List[Tuple[float, str, str]] = field(default_factory=list)  # (worst duration, diagram, type)
+    guide_hits: Counter = field(default_factory=Counter)
+    unclassified_errors: int = 0
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failures / self.renders if self.renders else 0.0
+
+
+def aggregate(events: Iterator[dict], top: int = 10) -> LogReport:
+    """Summarize render and error events into a LogReport."""
+    report = LogReport()
+    worst: Dict[Tuple[str, str], float] = {}  # (diagram, type) -> longest duration
+
+    for event in events:
+        if event.get('kind') == 'render':
+            dtype = event.get('diagram_type') or 'unknown'
+            success = bool(event.get('success'))
+            renders, failures = report.by_type.get(dtype, (0, 0))
+            report.by_type[dtype] = (renders + 1, failures + (not success))
+            report.renders += 1
+            report.failures += not success
+            if isinstance(event.get('duration'), (int, float)):
+                key = (str(event.get('diagram', '?')), dtype)
+                worst[key] = max(worst.get(key, 0.0), event['duration'])
+        elif event.get('kind') == 'error':
+            guide = event.get('guide')
+            if guide:
+                number = event.get('error_number')
+                report.guide_hits[f"{guide} #{number}" if number else guide] += 1
+            else:
+                report.unclassified_errors += 1
+
+    report.slowest = sorted(((duration, diagram, dtype) for (diagram, dtype), duration in worst.items()),
+                            reverse=True)[:top]
+    return report
+
+
+def print_report(report: LogReport) -> None:
+    print(f"📊 {report.renders} render(s), {report.failures} failed ({report.failure_rate:.1%})")
+
+    if report.by_type:
+        print("\nFailure rate by diagram type:")
+        for dtype, (renders, failures) in sorted(report.by_type.items(),
+                                                 key=lambda item: item[1][1] / item[1][0], reverse=True):
+            print(f"  {dtype:<15} {failures}/{renders} ({failures / renders:.1%})")
+
+    if report.slowest:
+        print("\nSlowest diagrams:")
+        for duration, diagram, dtype in report.slowest:
+            print(f"  {duration:7.2f}s  {diagram} ({dtype})")
+
+    if report.guide_hits or report.unclassified_errors:
+        print("\nTroubleshooting guide hits:")
+        for guide, count in report.guide_hits.most_common():
+            print(f"  {count:5d}  {guide}")
+        if report.unclassified_errors:
+            print(f"  {report.unclassified_errors:5d}  (no matching guide)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Aggregate PlantUML render/error JSONL logs',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    report = subparsers.add_parser('report', help='Failure rates, slowest diagrams and guide hits')
+    report.add_argument('log', nargs='?', default=f"diagrams/{DEFAULT_LOG_NAME}",
+                        help=f'Log file; rotated backups are included (default: diagrams/{DEFAULT_LOG_NAME})')
+    report.add_argument('--top', type=int, default=10, help='Slowest diagrams to list (default: 10)')
+
+    args = parser.parse_args()
+
+    log = EventLog(Path(args.log))
+    files = log.files()
+    if not files:
+        print(f"❌ Error: No log found at {args.log}", file=sys.stderr)
+        sys.exit(1)
+
+    print_report(aggregate(read_events(files), args.top))
+
+
+if __name__ == '__main__':
+    main()
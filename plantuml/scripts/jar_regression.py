@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Render a corpus with two plantuml.jar versions and flag regressions.
+
+Before upgrading plantuml.jar, render every diagram of the bundled examples/
+and your own docs with the current and the candidate jar, and compare:
+
+- wall time (median of --repeats SVG renders) and peak memory (max RSS of the
+  JVM process)
+- SVG output, byte for byte and normalized (embedded source, comments,
+  whitespace and float jitter removed)
+- PNG output, pixel by pixel
+
+Diagrams that render slower or use more memory beyond the thresholds, that
+look different, or that stop rendering are flagged. Results are written to
+<out-dir>/report.json and a side-by-side <out-dir>/report.html (old, new and a
+diff image with changed pixels in red). The exit code is 1 when anything is
+flagged, so the harness can gate a jar upgrade in CI.
+
+Usage:
+    python jar_regression.py OLD.jar NEW.jar [docs/ more.md ...] [--repeats 3] [--out-dir jar_regression]
+        [--slower 1.25] [--memory 1.25] [--pixel-threshold 0.001] [--no-examples]
+
+Examples:
+    # Compare the installed jar with a candidate on the examples and our docs
+    python jar_regression.py ~/plantuml.jar ~/Downloads/plantuml-1.2025.2.jar docs/
+
+    # Stricter timing gate with more samples per diagram
+    python jar_regression.py old.jar new.jar docs/ --repeats 5 --slower 1.1
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from optimize_images import PNG_SIGNATURE, optimize_svg_bytes, png_chunk, read_png_chunks
+
+EXAMPLES_DIR = Path(__file__).resolve().parent.parent / 'examples'
+
+# Flag thresholds: new/old ratios plus absolute floors that keep noise out
+SLOWER_RATIO = 1.25
+SLOWER_MIN_SECONDS = 0.05
+MEMORY_RATIO = 1.25
+MEMORY_MIN_MB = 32
+PIXEL_THRESHOLD = 0.001  # fraction of pixels that may differ
+CHANNEL_TOLERANCE = 16  # per-channel difference still counted as equal (anti-aliasing)
+
+RENDER_TIMEOUT = 120
+
+
+@dataclass
+class RenderRun:
+    """One jar's renders of one diagram."""
+    seconds: Optional[float] = None  # median SVG render wall time; None if it failed
+    peak_mb: Optional[float] = None
+    error: str = ''
+    svg: bytes = field(default=b'', repr=False)
+    png: bytes = field(default=b'', repr=False)
+
+
+@dataclass
+class DiagramComparison:
+    """Old vs new jar for one diagram."""
+    label: str
+    old: RenderRun
+    new: RenderRun
+    svg_identical: bool = False
+    svg_equivalent: bool = False  # equal after normalization
+    pixel_diff: Optional[float] = None  # fraction of pixels that differ
+    png_size: Tuple[Tuple[int, int], Tuple[int, int]] = ((0, 0), (0, 0))
+    flags: List[str] = field(default_factory=list)
+
+    @property
+    def slowdown(self) -> Optional[float]:
+        if self.old.seconds and self.new.seconds:
+            return self.new.seconds / self.old.seconds
+        return None
+
+
+def _run_measured(cmd: List[str], stdin_path: str, timeout: int) -> Tuple[int, float, Optional[float], bytes, bytes]:
+    """
+    Run a command on a file's contents, measuring its wall time and peak RSS.
+
+    Returns:
+        Tuple of (returncode, seconds, peak_mb or None, stdout, stderr)
+    """
+    with open(stdin_path, 'rb') as stdin, tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        started = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdin=stdin, stdout=out, stderr=err)
+        timer = threading.Timer(timeout, proc.kill)
+        timer.start()
+        try:
+            if hasattr(os, 'wait4'):
+                # wait4 reports this child's own rusage; RUSAGE_CHILDREN would mix in earlier renders
+                _, status, usage = os.wait4(proc.pid, 0)
+                proc.returncode = os.waitstatus_to_exitcode(status)
+                peak_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+            else:
+                proc.wait()
+                peak_mb = None
+        finally:
+            timer.cancel()
+        seconds = time.perf_counter() - started
+        out.seek(0)
+        err.seek(0)
+        return proc.returncode, seconds, peak_mb, out.read(), err.read()
+
+
+def jar_version(jar: str) -> str:
+    """First line of `java -jar jar -version`, or '?' if unavailable."""
+    try:
+        result = subprocess.run(['java', '-jar', jar, '-version'], capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        return '?'
+    lines = (result.stdout or result.stderr).strip().splitlines()
+    return lines[0] if lines else '?'
+
+
+def render_with_jar(jar: str, source_path: str, repeats: int, timeout: int = RENDER_TIMEOUT) -> RenderRun:
+    """Render one diagram to SVG `repeats` times and to PNG once with a jar."""
+    run = RenderRun()
+    times, peaks = [], []
+    for _ in range(max(1, repeats)):
+        code, seconds, peak_mb, out, err = _run_measured(
+            ['java', '-Djava.awt.headless=true', '-jar', jar, '-pipe', '-tsvg'], source_path, timeout)
+        if code != 0:
+            run.error = err.decode('utf-8', errors='replace').strip()[:500] or f"exit code {code}"
+            return run
+        times.append(seconds)
+        if peak_mb is not None:
+            peaks.append(peak_mb)
+        run.svg = out
+
+    code, _, peak_mb, out, err = _run_measured(
+        ['java', '-Djava.awt.headless=true', '-jar', jar, '-pipe', '-tpng'], source_path, timeout)
+    if code != 0:
+        run.error = err.decode('utf-8', errors='replace').strip()[:500] or f"exit code {code}"
+        return run
+    run.png = out
+    if peak_mb is not None:
+        peaks.append(peak_mb)
+
+    run.seconds = statistics.median(times)
+    run.peak_mb = max(peaks) if peaks else None
+    return run
+
+
+def normalize_svg(data: bytes) -> str:
+    """SVG with embedded source, comments, whitespace and sub-0.1px jitter removed."""
+    text = optimize_svg_bytes(data).decode('utf-8', errors='replace')
+    return re.sub(r'-?\d+\.\d+', lambda match: f"{float(match.group(0)):.1f}", text)
+
+
+def _paeth(a: int, b: int, c: int) -> int:
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def decode_png(data: bytes) -> Tuple[int, int, List[bytes]]:
+    """
+    Decode a non-interlaced PNG into RGBA rows.
+
+    Returns:
+        Tuple of (width, height, rows) with 4 bytes per pixel in each row
+
+    Raises:
+        ValueError: for interlaced or otherwise unsupported PNGs
+    """
+    chunks = read_png_chunks(data)
+    header = next(payload for chunk_type, payload in chunks if chunk_type == b'IHDR')
+    width, height, depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', header)
+    if interlace:
+        raise ValueError("interlaced PNG")
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}.get(color_type)
+    if channels is None or (depth != 8 and color_type not in (0, 3)) or depth == 16:
+        raise ValueError(f"unsupported PNG format (color type {color_type}, depth {depth})")
+
+    palette = next((payload for chunk_type, payload in chunks if chunk_type == b'PLTE'), b'')
+    alpha = next((payload for chunk_type, payload in chunks if chunk_type == b'tRNS'), b'')
+    raw = zlib.decompress(b''.join(payload for chunk_type, payload in chunks if chunk_type == b'IDAT'))
+
+    stride = (width * channels * depth + 7) // 8
+    bpp = max(1, channels * depth // 8)
+    rows, previous, pos = [], bytearray(stride), 0
+    for _ in range(height):
+        filter_type, line = raw[pos], bytearray(raw[pos + 1:pos + 1 + stride])
+        pos += 1 + stride
+        for i in range(stride):
+            left = line[i - bpp] if i >= bpp else 0
+            up = previous[i]
+            if filter_type == 1:
+                line[i] = (line[i] + left) & 0xff
+            elif filter_type == 2:
+                line[i] = (line[i] + up) & 0xff
+            elif filter_type == 3:
+                line[i] = (line[i] + ((left + up) >> 1)) & 0xff
+            elif filter_type == 4:
+                line[i] = (line[i] + _paeth(left, up, previous[i - bpp] if i >= bpp else 0)) & 0xff
+        previous = line
+
+        if color_type == 6:
+            rows.append(bytes(line))
+            continue
+        rgba = bytearray()
+        if depth < 8:
+            samples = [(line[i * depth // 8] >> (8 - depth - (i * depth) % 8)) & ((1 << depth) - 1)
+                       for i in range(width)]
+        else:
+            samples = None
+        for x in range(width):
+            if color_type == 2:
+                rgba += line[x * 3:x * 3 + 3] + b'\xff'
+            elif color_type == 4:
+                rgba += bytes([line[x * 2]] * 3) + line[x * 2 + 1:x * 2 + 2]
+            elif color_type == 3:
+                index = samples[x] if samples else line[x]
+                rgba += palette[index * 3:index * 3 + 3] + bytes([alpha[index] if index < len(alpha) else 255])
+            else:
+                value = samples[x] * 255 // ((1 << depth) - 1) if samples else line[x]
+                rgba += bytes([value, value, value, 255])
+        rows.append(bytes(rgba))
+    return width, height, rows
+
+
+def encode_png(width: int, height: int, rows: List[bytes]) -> bytes:
+    """Encode RGBA rows as an unfiltered 8-bit PNG."""
+    header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+    raw = b''.join(b'\x00' + row for row in rows)
+    return (PNG_SIGNATURE + png_chunk(b'IHDR', header)
+            + png_chunk(b'IDAT', zlib.compress(raw, 6)) + png_chunk(b'IEND', b''))
+
+
+def pixel_diff(old_png: bytes, new_png: bytes) -> Tuple[Optional[float], Optional[bytes], Tuple[int, int], Tuple[int, int]]:
+    """
+    Compare two PNGs pixel by pixel.
+
+    Returns:
+        Tuple of (fraction of differing pixels or None if the sizes differ or
+        the PNGs cannot be decoded, diff image PNG or None, old size, new size)
+    """
+    try:
+        old_w, old_h, old_rows = decode_png(old_png)
+        new_w, new_h, new_rows = decode_png(new_png)
+    except (ValueError, StopIteration, zlib.error, struct.error):
+        return None, None, (0, 0), (0, 0)
+    if (old_w, old_h) != (new_w, new_h):
+        return None, None, (old_w, old_h), (new_w, new_h)
+
+    changed = 0
+    diff_rows = []
+    for old_row, new_row in zip(old_rows, new_rows):
+        if old_row == new_row:
+            # Unchanged rows are drawn faded so changes stand out
+            diff_rows.append(bytes(channel if i % 4 == 3 else 255 - (255 - channel) // 4
+                                   for i, channel in enumerate(new_row)))
+            continue
+        out = bytearray()
+        for x in range(0, len(new_row), 4):
+            if any(abs(a - b) > CHANNEL_TOLERANCE for a, b in zip(old_row[x:x + 4], new_row[x:x + 4])):
+                changed += 1
+                out += b'\xff\x00\x00\xff'
+            else:
+                out += bytes(255 - (255 - channel) // 4 for channel in new_row[x:x + 3]) + new_row[x + 3:x + 4]
+        diff_rows.append(bytes(out))
+    total = max(1, new_w * new_h)
+    return changed / total, encode_png(new_w, new_h, diff_rows) if changed else None, (old_w, old_h), (new_w, new_h)
+
+
+def collect_corpus(paths: List[Path]) -> List[Tuple[str, str]]:
+    """(label, source) for every diagram in the given files/directories, deduplicated by content."""
+    # Imported lazily: the processor pulls in most of the other scripts
+    from process_markdown_puml import extract_embedded_puml_blocks, extract_linked_puml_files
+
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob('*') if p.suffix in ('.md', '.puml')
+                                and not p.stem.endswith('_with_images')))
+        else:
+            files.append(path)
+
+    diagrams, seen = [], set()
+    for path in files:
+        content = path.read_text(encoding='utf-8', errors='replace')
+        if path.suffix == '.md':
+            found = [(f"{path}#{num}", block)
+                     for num, (block, _, _) in enumerate(extract_embedded_puml_blocks(content), 1)]
+            found += [(f"{path}:{link}", source)
+                      for source, link, _, _ in extract_linked_puml_files(content, path.parent)]
+        else:
+            found = [(str(path), content)]
+        for label, source in found:
+            digest = hashlib.sha256(source.strip().encode('utf-8')).hexdigest()
+            if '@start' in source and digest not in seen:
+                seen.add(digest)
+                diagrams.append((label, source))
+    return diagrams
+
+
+def compare_jars(
+    old_jar: str,
+    new_jar: str,
+    diagrams: List[Tuple[str, str]],
+    out_dir: Path,
+    repeats: int = 3,
+    slower: float = SLOWER_RATIO,
+    memory: float = MEMORY_RATIO,
+    pixel_threshold: float = PIXEL_THRESHOLD
+) -> List[DiagramComparison]:
+    """Render every diagram with both jars, keep the outputs in out_dir and compare them."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    results = []
+    for num, (label, source) in enumerate(diagrams, 1):
+        with tempfile.NamedTemporaryFile('w', suffix='.puml', delete=False, encoding='utf-8') as tmp:
+            tmp.write(source)
+        try:
+            old = render_with_jar(old_jar, tmp.name, repeats)
+            new = render_with_jar(new_jar, tmp.name, repeats)
+        finally:
+            os.unlink(tmp.name)
+
+        comparison = DiagramComparison(label, old, new)
+        for side, run in (('old', old), ('new', new)):
+            if run.svg:
+                (out_dir / f"{num:03d}_{side}.svg").write_bytes(run.svg)
+            if run.png:
+                (out_dir / f"{num:03d}_{side}.png").write_bytes(run.png)
+
+        if old.error and not new.error:
+            comparison.flags.append('fixed')
+        elif new.error:
+            if not old.error:
+                comparison.flags.append('broken')
+        else:
+            comparison.svg_identical = old.svg == new.svg
+            comparison.svg_equivalent = comparison.svg_identical or normalize_svg(old.svg) == normalize_svg(new.svg)
+            fraction, diff_png, old_size, new_size = pixel_diff(old.png, new.png)
+            comparison.pixel_diff, comparison.png_size = fraction, (old_size, new_size)
+            if diff_png:
+                (out_dir / f"{num:03d}_diff.png").write_bytes(diff_png)
+            if old_size != new_size:
+                comparison.flags.append('resized')
+            elif fraction is not None and fraction > pixel_threshold:
+                comparison.flags.append('changed')
+            elif fraction is None and not comparison.svg_equivalent:
+                comparison.flags.append('changed')
+
+            if (comparison.slowdown and comparison.slowdown > slower
+                    and new.seconds - old.seconds > SLOWER_MIN_SECONDS):
+                comparison.flags.append('slower')
+            if (old.peak_mb and new.peak_mb and new.peak_mb > old.peak_mb * memory
+                    and new.peak_mb - old.peak_mb > MEMORY_MIN_MB):
+                comparison.flags.append('memory')
+
+        results.append(comparison)
+        _print_row(comparison)
+    return results
+
+
+def _print_row(comparison: DiagramComparison) -> None:
+    old, new = comparison.old, comparison.new
+    if old.seconds and new.seconds:
+        timing = f"{old.seconds:6.2f}s → {new.seconds:6.2f}s"
+    else:
+        timing = f"{'failed' if old.error else 'ok':>7} → {'failed' if new.error else 'ok':<7}"
+    if comparison.pixel_diff:
+        output = f"{comparison.pixel_diff:.2%} px differ"
+    else:
+        output = ('identical' if comparison.svg_identical else 'equivalent' if comparison.svg_equivalent
+                  else 'differs')
+    marker = '⚠️ ' if set(comparison.flags) - {'fixed'} else '  '
+    flags = f" [{', '.join(comparison.flags)}]" if comparison.flags else ''
+    print(f"{marker}{comparison.label:<50} {timing}  {output}{flags}")
+
+
+def write_reports(results: List[DiagramComparison], out_dir: Path, old_version: str, new_version: str) -> None:
+    """Write report.json and a side-by-side report.html into out_dir."""
+    rows = []
+    for comparison in results:
+        data = asdict(comparison)
+        for side in ('old', 'new'):
+            data[side].pop('svg')
+            data[side].pop('png')
+        data['slowdown'] = comparison.slowdown
+        rows.append(data)
+    (out_dir / 'report.json').write_text(json.dumps(
+        {'old': old_version, 'new': new_version, 'diagrams': rows}, indent=2) + '\n', encoding='utf-8')
+
+    cells = []
+    for num, comparison in enumerate(results, 1):
+        if not comparison.flags:
+            continue
+        images = ''.join(
+            f"<td><img src=\"{num:03d}_{side}.png\"></td>" if (out_dir / f"{num:03d}_{side}.png").exists()
+            else "<td>-</td>" for side in ('old', 'new', 'diff'))
+        errors = ''.join(f"<br>{side}: {html.escape(run.error)}"
+                         for side, run in (('old', comparison.old), ('new', comparison.new)) if run.error)
+        slowdown = f"<br>{comparison.slowdown:.2f}× time" if comparison.slowdown else ''
+        memory = (f"<br>{comparison.old.peak_mb:.0f} → {comparison.new.peak_mb:.0f} MB"
+                  if comparison.old.peak_mb and comparison.new.peak_mb else '')
+        cells.append(f"<tr><td>{html.escape(comparison.label)}<br><b>{', '.join(comparison.flags)}</b>"
+                     f"{slowdown}{memory}{errors}</td>{images}</tr>")
+    (out_dir / 'report.html').write_text(
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>plantuml.jar regression</title></head><body>"
+        f"<h1>{html.escape(old_version)} → {html.escape(new_version)}</h1>"
+        f"<p>{len(results)} diagram(s), {len(cells)} flagged</p>"
+        "<table border=\"1\" cellpadding=\"6\"><tr><th>Diagram</th><th>Old</th><th>New</th><th>Diff</th></tr>"
+        + ''.join(cells) + "</table></body></html>\n", encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare render time, memory and output of two plantuml.jar versions',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('old_jar', help='Current plantuml.jar')
+    parser.add_argument('new_jar', help='Candidate plantuml.jar')
+    parser.add_argument('paths', nargs='*', help='Extra markdown/.puml files or directories')
+    parser.add_argument('--no-examples', action='store_true', help=f'Do not include {EXAMPLES_DIR}')
+    parser.add_argument('--repeats', type=int, default=3, help='SVG renders timed per diagram and jar (default: 3)')
+    parser.add_argument('--out-dir', default='jar_regression', help='Output directory (default: jar_regression)')
+    parser.add_argument('--slower', type=float, default=SLOWER_RATIO,
+                        help=f'Flag diagrams whose render time grows by this factor (default: {SLOWER_RATIO})')
+    parser.add_argument('--memory', type=float, default=MEMORY_RATIO,
+                        help=f'Flag diagrams whose peak memory grows by this factor (default: {MEMORY_RATIO})')
+    parser.add_argument('--pixel-threshold', type=float, default=PIXEL_THRESHOLD,
+                        help=f'Fraction of PNG pixels allowed to differ (default: {PIXEL_THRESHOLD})')
+    args = parser.parse_args()
+
+    for jar in (args.old_jar, args.new_jar):
+        if not os.path.isfile(jar):
+            print(f"❌ Error: Jar not found: {jar}", file=sys.stderr)
+            sys.exit(1)
+    paths = [Path(p) for p in args.paths] + ([] if args.no_examples else [EXAMPLES_DIR])
+    missing = [p for p in paths if not p.exists()]
+    if missing:
+        print(f"❌ Error: Not found: {missing[0]}", file=sys.stderr)
+        sys.exit(1)
+
+    diagrams = collect_corpus(paths)
+    if not diagrams:
+        print("ℹ️  No diagrams found")
+        return
+
+    old_version, new_version = jar_version(args.old_jar), jar_version(args.new_jar)
+    print(f"🔬 {len(diagrams)} diagram(s): {old_version} → {new_version}")
+    out_dir = Path(args.out_dir)
+    results = compare_jars(args.old_jar, args.new_jar, diagrams, out_dir, args.repeats,
+                           args.slower, args.memory, args.pixel_threshold)
+    write_reports(results, out_dir, old_version, new_version)
+
+    flagged = [c for c in results if set(c.flags) - {'fixed'}]
+    print(f"\n📄 Report: {out_dir / 'report.html'}")
+    if flagged:
+        print(f"❌ {len(flagged)} of {len(results)} diagram(s) regressed")
+        sys.exit(1)
+    print(f"✅ No regressions in {len(results)} diagram(s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory processing of very large markdown files.
+
+`process_markdown` reads the whole document into a string and copies it on
+every replacement. For generated markdown that runs to hundreds of MB, this
+module instead memory-maps the file, finds diagram spans with byte-level
+regular expressions (nothing outside a diagram is ever decoded), and writes the
+`_with_images` output by splicing the untouched byte ranges and the new image
+links straight into the destination file. Peak memory is proportional to the
+largest diagram (times the number of concurrent renders), not to the document.
+
+Used by `process_markdown_puml.py --large-input`; diagram numbering, naming
+and rendering are identical to the in-memory path.
+"""
+
+import mmap
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple
+
+from optimize_images import print_optimization_report
+from process_markdown_puml import RenderSettings, image_links, record_outputs, schedule_renders
+from stable_output import OutputWriter
+
+# Byte-level equivalents of extract_embedded_puml_blocks / extract_linked_puml_files
+EMBEDDED_PATTERN = re.compile(rb'```puml\s*\n(.*?)```', re.DOTALL)
+LINKED_PATTERN = re.compile(rb'!\[([^\]]*)\]\(([^)\s]+\.puml)(?:\s+"[^"]*")?\)')
+
+# Untouched ranges are copied to the output in chunks of this size
+COPY_CHUNK = 1024 * 1024
+
+
+@dataclass
+class DiagramSpan:
+    """Byte range of one diagram in the mapped document."""
+    start: int
+    end: int
+    content_start: int = 0
+    content_end: int = 0
+    linked_path: Optional[Path] = None
+
+
+def scan_diagram_spans(mapped: mmap.mmap, markdown_dir: Path) -> List[DiagramSpan]:
+    """
+    Locate embedded blocks and linked .puml files without decoding the document.
+
+    Returns:
+        Spans sorted from the end of the document to the start, matching the
+        numbering used by process_markdown
+    """
+    spans = []
+
+    for match in EMBEDDED_PATTERN.finditer(mapped):
+        spans.append(DiagramSpan(match.start(), match.end(), match.start(1), match.end(1)))
+
+    for match in LINKED_PATTERN.finditer(mapped):
+        puml_path = match.group(2).decode('utf-8')
+        full_path = (markdown_dir / puml_path).resolve()
+        if full_path.exists():
+            spans.append(DiagramSpan(match.start(), match.end(), linked_path=full_path))
+        else:
+            print(f"⚠️  Warning: Linked .puml file not found: {puml_path}", file=sys.stderr)
+
+    spans.sort(key=lambda span: span.start, reverse=True)
+    return spans
+
+
+def load_span_content(mapped: mmap.mmap, span: DiagramSpan) -> str:
+    """Decode just one diagram's source."""
+    if span.linked_path is not None:
+        return span.linked_path.read_text(encoding='utf-8')
+    return mapped[span.content_start:span.content_end].decode('utf-8').strip()
+
+
+def copy_range(mapped: mmap.mmap, out: BinaryIO, start: int, end: int) -> None:
+    """Copy mapped[start:end] to out in bounded chunks."""
+    pos = start
+    while pos < end:
+        size = min(COPY_CHUNK, end - pos)
+        out.write(mapped[pos:pos + size])
+        pos += size
+
+
+def process_markdown_large(
+    markdown_path: Path,
+    output_path: Path,
+    settings: RenderSettings
+) -> Tuple[int, int]:
+    """
+    Process a large markdown file through a memory map.
+
+    The output is written to a temporary file next to output_path and renamed
+    into place only if at least one diagram was converted and the result
+    differs from the existing output. Images are written (and optimized)
+    through settings.writer.
+
+    Returns:
+        Tuple of (diagrams_processed, validation_errors)
+    """
+    settings.output_dir.mkdir(parents=True, exist_ok=True)
+    if settings.writer is None:
+        settings.writer = OutputWriter()
+
+    if markdown_path.stat().st_size == 0:
+        print("ℹ️  No PlantUML diagrams found (embedded or linked)")
+        return 0, 0
+
+    with open(markdown_path, 'rb') as source, \
+            mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+
+        spans = scan_diagram_spans(mapped, markdown_path.parent)
+        if not spans:
+            print("ℹ️  No PlantUML diagrams found (embedded or linked)")
+            if not settings.validate_only:
+                record_outputs(settings.output_dir, markdown_path.stem, {}, settings.image_format)
+            return 0, 0
+
+        print(f"📊 Found {len(spans)} PlantUML diagram(s)")
+
+        numbered = list(enumerate(spans, 1))
+        outcomes = schedule_renders(
+            [(idx, lambda span=span: load_span_content(mapped, span)) for idx, span in numbered],
+            settings
+        )
+
+        validation_errors = sum(1 for status, _ in outcomes.values() if status == 'invalid')
+        converted = [(idx, span) for idx, span in numbered if outcomes[idx][1]]
+        if not settings.validate_only:
+            record_outputs(settings.output_dir, markdown_path.stem, outcomes, settings.image_format)
+
+        if settings.validate_only or not converted:
+            return 0, validation_errors
+
+        if settings.writer.optimize and settings.writer.optimization:
+            print_optimization_report(settings.writer.optimization)
+
+        # Splice: unchanged byte ranges from the map, image links in between
+        tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+        with open(tmp_path, 'wb') as out:
+            pos = 0
+            for idx, span in reversed(converted):
+                if span.start < pos:
+                    continue  # a link inside an already replaced block
+                copy_range(mapped, out, pos, span.start)
+                out.write(image_links(idx, outcomes[idx][1], settings).encode('utf-8'))
+                pos = span.end
+            copy_range(mapped, out, pos, len(mapped))
+
+    settings.writer.replace(tmp_path, output_path)
+
+    return len(converted), validation_errors
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Per-diagram layout engine selection (Graphviz dot, Smetana, ELK).
+
+Class, component, use case, state and deployment diagrams are laid out by
+Graphviz `dot` unless the source sets `!pragma layout ...`. On large graphs
+dot is slow and is the most common cause of "dot/GraphViz has crashed"
+(performance guide Errors #4 and #16). This module picks an engine per diagram
+from its type and size, using benchmark results from this machine when there
+are any, and supplies the next engine to try when a render crashes in
+Graphviz.
+
+Sequence diagrams, new-syntax activity diagrams and the non-UML diagram
+types (mindmap, gantt, json...) do not use Graphviz and are never changed, nor
+are diagrams that already choose an engine themselves.
+
+Usage:
+    python layout_engine.py choose diagram.puml [more.puml ...]
+    python layout_engine.py benchmark docs/*.md diagrams/*.puml [--save]
+
+Examples:
+    # Which engine would the renderer use for these diagrams?
+    python layout_engine.py choose diagrams/*.puml
+
+    # Time every engine on the corpus and keep the winners for auto-selection
+    python layout_engine.py benchmark docs/*.md --save
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from complexity_estimator import estimate_complexity
+from paginate_diagram import detect_layout_kind
+
+ENGINES = ('dot', 'smetana', 'elk')
+
+# Above this many classes + edges, dot is replaced by Smetana unless benchmarks say otherwise
+LARGE_GRAPH = 120
+
+# Size buckets used to key benchmark results
+SIZE_BUCKETS = ((30, 'small'), (LARGE_GRAPH, 'medium'))
+
+DEFAULT_BENCHMARK_PATH = Path.home() / '.config' / 'plantuml' / 'layout.json'
+
+PRAGMA_RE = re.compile(r'^\s*!pragma\s+layout\s+(\w+)', re.IGNORECASE | re.MULTILINE)
+START_RE = re.compile(r'^\s*@startuml\b.*$', re.IGNORECASE | re.MULTILINE)
+SEQUENCE_ONLY_RE = re.compile(
+    r'^\s*(participant|boundary|control|collections|queue|activate|deactivate|autonumber'
+    r'|alt|loop|ref\s+over|return)\b', re.IGNORECASE | re.MULTILINE)
+
+GRAPH_KINDS = (
+    ('class', re.compile(r'^\s*(abstract\s+class|class|interface|enum|annotation)\s', re.I | re.M)),
+    ('usecase', re.compile(r'^\s*(usecase\s|actor\s.*\(|\(.+\)\s*(-|\.))', re.I | re.M)),
+    ('state', re.compile(r'^\s*(state\s|\[\*\])', re.I | re.M)),
+    ('deployment', re.compile(r'^\s*(node|cloud|artifact|database|frame|storage)\s', re.I | re.M)),
+    ('component', re.compile(r'^\s*(component\s|package\s|\[[^\]]+\])', re.I | re.M)),
+)
+
+
+def graph_kind(puml_content: str) -> Optional[str]:
+    """Diagram kind for a Graphviz-laid-out diagram, or None if dot is not used."""
+    if not START_RE.search(puml_content) or SEQUENCE_ONLY_RE.search(puml_content):
+        return None  # non-UML or sequence
+    if detect_layout_kind(puml_content) == 'activity':
+        return None  # new-syntax activity diagrams have their own layout
+    for kind, pattern in GRAPH_KINDS:
+        if pattern.search(puml_content):
+            return kind
+    return None
+
+
+def size_bucket(puml_content: str) -> str:
+    """'small', 'medium' or 'large' by class + edge count."""
+    estimate = estimate_complexity(puml_content)
+    size = estimate.classes + estimate.edges
+    for limit, name in SIZE_BUCKETS:
+        if size < limit:
+            return name
+    return 'large'
+
+
+def benchmark_path() -> Path:
+    env_path = os.environ.get('PLANTUML_LAYOUT_BENCHMARK')
+    return Path(env_path) if env_path else DEFAULT_BENCHMARK_PATH
+
+
+def load_benchmarks(path: Optional[Path] = None) -> Dict[str, str]:
+    """Best engine per '<kind>:<bucket>' from a saved benchmark, or {}."""
+    path = path or benchmark_path()
+    try:
+        data = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    best = data.get('best', {}) if isinstance(data, dict) else {}
+    return {key: engine for key, engine in best.items() if engine in ENGINES}
+
+
+def choose_engine(puml_content: str, benchmarks: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """
+    Pick the layout engine for a diagram.
+
+    Args:
+        puml_content: PlantUML diagram source
+        benchmarks: Best engine per '<kind>:<bucket>' (see load_benchmarks)
+
+    Returns:
+        Engine name, or None to leave the diagram as written
+    """
+    if PRAGMA_RE.search(puml_content):
+        return None
+    kind = graph_kind(puml_content)
+    if kind is None:
+        return None
+
+    if not shutil.which('dot'):
+        return 'smetana'  # bundled in plantuml.jar; dot would fail outright
+
+    bucket = size_bucket(puml_content)
+    if benchmarks and f"{kind}:{bucket}" in benchmarks:
+        return benchmarks[f"{kind}:{bucket}"]
+
+    return 'smetana' if bucket == 'large' else 'dot'
+
+
+def current_engine(puml_content: str) -> str:
+    """Engine a diagram will be laid out with as written."""
+    match = PRAGMA_RE.search(puml_content)
+    return match.group(1).lower() if match else 'dot'
+
+
+def fallback_engine(puml_content: str) -> Optional[str]:
+    """Next engine to try after a Graphviz crash, or None if there is none."""
+    if graph_kind(puml_content) is None:
+        return None
+    engine = current_engine(puml_content)
+    if engine not in ENGINES or engine == ENGINES[-1]:
+        return None
+    return ENGINES[ENGINES.index(engine) + 1]
+
+
+def apply_engine(puml_content: str, engine: Optional[str]) -> str:
+    """Return the diagram with its `!pragma layout` set to engine."""
+    if engine is None:
+        return puml_content
+    pragma = f"!pragma layout {engine}"
+    if PRAGMA_RE.search(puml_content):
+        replacement = '' if engine == 'dot' else pragma
+        return PRAGMA_RE.sub(replacement, puml_content, count=1)
+    if engine == 'dot':
+        return puml_content
+    return START_RE.sub(lambda match: f"{match.group(0)}\n{pragma}", puml_content, count=1)
+
+
+def _corpus_diagrams(paths: List[Path]) -> List[Tuple[str, str]]:
+    """(label, source) for every Graphviz-laid-out diagram in the given files."""
+    # Imported lazily: the processor itself builds on this module
+    from process_markdown_puml import extract_embedded_puml_blocks, extract_linked_puml_files
+
+    diagrams = []
+    for path in paths:
+        content = path.read_text(encoding='utf-8')
+        if path.suffix == '.md':
+            for num, (block, _, _) in enumerate(extract_embedded_puml_blocks(content), 1):
+                diagrams.append((f"{path}#{num}", block))
+            for source, link, _, _ in extract_linked_puml_files(content, path.parent):
+                diagrams.append((f"{path}:{link}", source))
+        else:
+            diagrams.append((str(path), content))
+    return [(label, source) for label, source in diagrams if graph_kind(source)]
+
+
+def benchmark(paths: List[Path], plantuml_jar: str, repeats: int = 1) -> dict:
+    """
+    Render every Graphviz-laid-out diagram with every engine and time it.
+
+    Returns:
+        {'results': [{diagram, kind, bucket, engine, seconds|None}], 'best': {kind:bucket: engine}}
+    """
+    from process_markdown_puml import convert_puml_to_image
+
+    results = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        for label, source in _corpus_diagrams(paths):
+            kind, bucket = graph_kind(source), size_bucket(source)
+            for engine in ENGINES:
+                variant = apply_engine(source, engine)
+                times = []
+                for _ in range(repeats):
+                    started = time.monotonic()
+                    ok = convert_puml_to_image(variant, os.path.join(out_dir, 'bench'), 'svg',
+                                               plantuml_jar, timeout=120, layout=None)
+                    if not ok:
+                        times = []
+                        break
+                    times.append(time.monotonic() - started)
+                seconds = statistics.median(times) if times else None
+                results.append({'diagram': label, 'kind': kind, 'bucket': bucket,
+                                'engine': engine, 'seconds': seconds})
+                shown = f"{seconds:.2f}s" if seconds is not None else 'FAILED'
+                print(f"  {label:<50} {engine:<8} {shown}")
+
+    # Per bucket: the fastest engine among those that rendered every diagram
+    grouped: Dict[str, Dict[str, List[Optional[float]]]] = {}
+    for row in results:
+        key = f"{row['kind']}:{row['bucket']}"
+        grouped.setdefault(key, {}).setdefault(row['engine'], []).append(row['seconds'])
+
+    best = {}
+    for key, by_engine in grouped.items():
+        reliable = {engine: statistics.median(times) for engine, times in by_engine.items()
+                    if all(t is not None for t in times)}
+        if reliable:
+            best[key] = min(reliable, key=reliable.get)
+
+    return {'results': results, 'best': best}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Choose and benchmark PlantUML layout engines',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    choose = subparsers.add_parser('choose', help='Show the engine chosen for each diagram')
+    choose.add_argument('files', nargs='+', help='.puml files')
+
+    bench = subparsers.add_parser('benchmark', help='Time every engine on a corpus')
+    bench.add_argument('files', nargs='+', help='Markdown and/or .puml files')
+    bench.add_argument('--repeats', type=int, default=1, help='Renders per engine (default: 1)')
+    bench.add_argument('--save', action='store_true',
+                       help=f'Save the winners for auto-selection (default: {DEFAULT_BENCHMARK_PATH}, '
+                            'or PLANTUML_LAYOUT_BENCHMARK)')
+
+    args = parser.parse_args()
+    paths = [Path(f) for f in args.files]
+    missing = [p for p in paths if not p.exists()]
+    if missing:
+        print(f"❌ Error: File not found: {missing[0]}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == 'choose':
+        benchmarks = load_benchmarks()
+        for path in paths:
+            content = path.read_text(encoding='utf-8')
+            kind = graph_kind(content)
+            engine = choose_engine(content, benchmarks) or current_engine(content)
+            detail = f"{kind}, {size_bucket(content)}" if kind else 'no Graphviz layout'
+            print(f"  {path}: {engine} ({detail})")
+        return
+
+    from process_markdown_puml import find_plantuml_jar
+
+    plantuml_jar = find_plantuml_jar()
+    if not plantuml_jar:
+        print("❌ Error: plantuml.jar not found", file=sys.stderr)
+        sys.exit(1)
+
+    print("⏱️  Benchmarking layout engines...")
+    report = benchmark(paths, plantuml_jar, args.repeats)
+    if not report['results']:
+        print("ℹ️  No Graphviz-laid-out diagrams found")
+        return
+
+    print("\n🏁 Fastest reliable engine:")
+    for key, engine in sorted(report['best'].items()):
+        print(f"  {key:<20} {engine}")
+
+    if args.save:
+        path = benchmark_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+        print(f"💾 Saved to {path}")
+
+
+if __name__ == '__main__':
+    main()
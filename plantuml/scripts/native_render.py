@@ -0,0 +1,741 @@
+#!/usr/bin/env python3
+"""
+Native SVG renderer for tree- and data-shaped diagrams (json, yaml, mindmap, wbs).
+
+These diagram types are plain tree layouts, yet each one normally costs a JVM
+launch. This module lays them out in Python and writes SVG in PlantUML's
+default look (light grey boxes, dark outlines, 14px sans-serif). It only
+accepts the plain form of each type: sources with skinparams, `<style>`,
+the preprocessor, titles/legends, creole markup, `#highlight`, WBS
+direction markers or YAML beyond block mappings/sequences are declined, and
+the caller falls back to PlantUML. Text is measured with a fixed per-character
+width table, so box sizes are close to, not identical with, PlantUML's.
+
+`process_markdown_puml.py --native` uses it for SVG output.
+
+Usage:
+    python native_render.py render diagram.puml [-o diagram.svg]
+    python native_render.py compare docs/*.md diagrams/*.puml [--out-dir native_compare] [--repeats 3]
+
+Examples:
+    # Render one diagram without Java
+    python native_render.py render org.puml -o org.svg
+
+    # Time native vs PlantUML on a corpus and write a side-by-side HTML report;
+    # exits 1 if any native rendering is missing or adds a label
+    python native_render.py compare docs/*.md --out-dir native_compare
+"""
+
+import argparse
+import html
+import json
+import re
+import statistics
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+NATIVE_TYPES = ('json', 'yaml', 'mindmap', 'wbs')
+
+# PlantUML default styling
+FONT_FAMILY = 'sans-serif'
+FONT_SIZE = 14
+LINE_HEIGHT = 16.5
+LINE_COLOR = '#181818'
+FILL_COLOR = '#F1F1F1'
+STROKE_WIDTH = 1.5
+
+# Tree geometry
+PAD_X = 10
+PAD_Y = 8
+H_GAP = 40
+V_GAP = 10
+MARGIN = 10
+WBS_INDENT = 20
+WBS_LEVEL_GAP = 30
+CELL_PAD_X = 6
+CELL_PAD_Y = 3
+MIN_VALUE_WIDTH = 20
+
+START_RE = re.compile(r'^\s*@start(\w+)\b.*$', re.IGNORECASE)
+END_RE = re.compile(r'^\s*@end(\w+)\b', re.IGNORECASE)
+
+# Anything that changes the look or needs PlantUML's own parser
+UNSUPPORTED_RE = re.compile(
+    r'^\s*(!|skinparam\b|<style|#highlight|title\b|header\b|footer\b|legend\b|caption\b'
+    r'|scale\b|(left\s+to\s+right|top\s+to\s+bottom|right\s+to\s+left)\s+direction)', re.IGNORECASE)
+MARKUP_RE = re.compile(r'<[a-zA-Z/&$=#]|\*\*|//|""|__|~~|--|\[\[')
+NODE_RE = re.compile(r'^([*+\-])\1*')
+COLOR_RE = re.compile(r'^\[(#[0-9A-Fa-f]{3,8}|#[A-Za-z]+)\]')
+
+# Relative glyph widths (em) of a typical sans-serif face
+NARROW = set("iljtfrI.,:;|!'()[] ")
+WIDE = set('mwMW@%')
+
+
+class _Unsupported(Exception):
+    """Raised while parsing when the source needs PlantUML."""
+
+
+def text_width(text: str, size: float = FONT_SIZE) -> float:
+    """Approximate rendered width of one line of text."""
+    width = 0.0
+    for char in text:
+        if char in NARROW:
+            width += 0.3
+        elif char in WIDE:
+            width += 0.85
+        elif char.isupper():
+            width += 0.68
+        elif char.isdigit():
+            width += 0.56
+        else:
+            width += 0.55
+    return width * size
+
+
+def _text(x: float, y: float, content: str, anchor: str = 'start') -> str:
+    return (f'<text x="{x:.1f}" y="{y:.1f}" font-family="{FONT_FAMILY}" font-size="{FONT_SIZE}" '
+            f'text-anchor="{anchor}" fill="#000000">{html.escape(content, quote=False)}</text>')
+
+
+def _line(x1: float, y1: float, x2: float, y2: float) -> str:
+    return (f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" '
+            f'stroke="{LINE_COLOR}" stroke-width="1"/>')
+
+
+def _curve(x1: float, y1: float, x2: float, y2: float) -> str:
+    mid = (x1 + x2) / 2
+    return (f'<path d="M{x1:.1f},{y1:.1f} C{mid:.1f},{y1:.1f} {mid:.1f},{y2:.1f} {x2:.1f},{y2:.1f}" '
+            f'fill="none" stroke="{LINE_COLOR}" stroke-width="1"/>')
+
+
+def _rect(x: float, y: float, w: float, h: float, fill: str = FILL_COLOR, radius: float = 0) -> str:
+    return (f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" rx="{radius}" ry="{radius}" '
+            f'fill="{fill}" stroke="{LINE_COLOR}" stroke-width="{STROKE_WIDTH}"/>')
+
+
+def _document(elements: List[str], bounds: Tuple[float, float, float, float]) -> str:
+    """Wrap elements in an <svg> sized to bounds (min_x, min_y, max_x, max_y) plus a margin."""
+    min_x, min_y, max_x, max_y = bounds
+    width = max_x - min_x + 2 * MARGIN
+    height = max_y - min_y + 2 * MARGIN
+    shift = f"translate({MARGIN - min_x:.1f},{MARGIN - min_y:.1f})"
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>'
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}px" height="{height:.0f}px" '
+        f'viewBox="0 0 {width:.0f} {height:.0f}" style="width:{width:.0f}px;height:{height:.0f}px;background:#FFFFFF;">'
+        '<!-- rendered by native_render.py -->'
+        f'<g transform="{shift}">' + ''.join(elements) + '</g></svg>\n'
+    )
+
+
+# --- Mindmap / WBS -----------------------------------------------------------
+
+@dataclass
+class TreeNode:
+    """One mindmap/WBS node and, after layout, its box."""
+    lines: List[str]
+    color: Optional[str] = None
+    boxless: bool = False
+    left: bool = False
+    children: List['TreeNode'] = field(default_factory=list)
+    x: float = 0.0
+    y: float = 0.0
+    w: float = 0.0
+    h: float = 0.0
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def _label_lines(label: str) -> List[str]:
+    if MARKUP_RE.search(label):
+        raise _Unsupported('creole markup')
+    return [part.strip() for part in label.split('\\n')]
+
+
+def parse_tree(lines: List[str], wbs: bool) -> TreeNode:
+    """Build the node tree of a mindmap/WBS body (OrgMode and +/- notations)."""
+    root = None
+    stack: List[TreeNode] = []
+    left_side = False
+    pending: Optional[Tuple[int, TreeNode, List[str]]] = None
+
+    def attach(depth: int, node: TreeNode) -> None:
+        nonlocal root
+        if depth == 1:
+            if root is not None:
+                raise _Unsupported('several roots')
+            root = node
+        elif depth > len(stack) + 1:
+            raise _Unsupported('hierarchy jump')
+        else:
+            stack[depth - 2].children.append(node)
+        del stack[depth - 1:]
+        stack.append(node)
+
+    for raw in lines:
+        line = raw.strip()
+        if pending:
+            depth, node, parts = pending
+            parts.append(line.rstrip(';'))
+            if line.endswith(';'):
+                node.lines = [part for text in parts for part in _label_lines(text)]
+                pending = None
+            continue
+        if not line or line.startswith("'"):
+            continue
+        if not wbs and re.match(r'^(left|right)\s+side$', line, re.IGNORECASE):
+            left_side = line.lower().startswith('left')
+            continue
+        match = NODE_RE.match(line)
+        if not match or raw[:1].isspace():
+            raise _Unsupported(f'unrecognised line: {line}')
+        marker, depth = match.group(1), len(match.group(0))
+        if wbs and marker != '*':
+            raise _Unsupported('WBS +/- notation')
+
+        rest = line[depth:]
+        boxless = rest.startswith('_')
+        rest = rest.lstrip('_')
+        if rest.startswith(('<', '>')):
+            raise _Unsupported('WBS direction markers')
+        color = None
+        color_match = COLOR_RE.match(rest)
+        if color_match:
+            color, rest = color_match.group(1), rest[color_match.end():]
+        rest = rest.strip()
+
+        node = TreeNode([], color, boxless, left=left_side or marker == '-')
+        attach(depth, node)
+        if rest.startswith(':') and not rest.endswith(';'):
+            pending = (depth, node, [rest[1:]])
+        else:
+            node.lines = _label_lines(rest[1:-1] if rest.startswith(':') else rest)
+
+    if pending or root is None:
+        raise _Unsupported('unterminated or empty tree')
+    return root
+
+
+def _measure_tree(root: TreeNode) -> None:
+    for node in root.walk():
+        node.w = max(text_width(line) for line in node.lines) + 2 * PAD_X
+        node.h = len(node.lines) * LINE_HEIGHT + 2 * PAD_Y
+
+
+def _span(node: TreeNode) -> float:
+    """Vertical extent of a left-to-right subtree."""
+    if not node.children:
+        return node.h
+    return max(node.h, sum(_span(child) for child in node.children) + V_GAP * (len(node.children) - 1))
+
+
+def _place_side(parent: TreeNode, children: List[TreeNode], direction: int) -> None:
+    total = sum(_span(child) for child in children) + V_GAP * (len(children) - 1)
+    y = parent.y + parent.h / 2 - total / 2
+    for child in children:
+        span = _span(child)
+        child.y = y + span / 2 - child.h / 2
+        child.x = parent.x + parent.w + H_GAP if direction > 0 else parent.x - H_GAP - child.w
+        _place_side(child, child.children, direction)
+        y += span + V_GAP
+
+
+def _node_elements(node: TreeNode) -> List[str]:
+    elements = []
+    if node.boxless:
+        elements.append(_line(node.x, node.y + node.h, node.x + node.w, node.y + node.h))
+    else:
+        elements.append(_rect(node.x, node.y, node.w, node.h, node.color or FILL_COLOR, radius=12.5))
+    for num, line in enumerate(node.lines):
+        elements.append(_text(node.x + PAD_X, node.y + PAD_Y + num * LINE_HEIGHT + FONT_SIZE, line))
+    return elements
+
+
+def _tree_bounds(root: TreeNode) -> Tuple[float, float, float, float]:
+    nodes = list(root.walk())
+    return (min(n.x for n in nodes), min(n.y for n in nodes),
+            max(n.x + n.w for n in nodes), max(n.y + n.h for n in nodes))
+
+
+def render_mindmap(lines: List[str]) -> str:
+    root = parse_tree(lines, wbs=False)
+    _measure_tree(root)
+    right = [child for child in root.children if not child.left]
+    left = [child for child in root.children if child.left]
+    _place_side(root, right, 1)
+    _place_side(root, left, -1)
+
+    edges = []
+    for direction, children in ((1, right), (-1, left)):
+        queue = [(root, child) for child in children]
+        while queue:
+            parent, child = queue.pop()
+            if direction > 0:
+                edges.append(_curve(parent.x + parent.w, parent.y + parent.h / 2, child.x, child.y + child.h / 2))
+            else:
+                edges.append(_curve(parent.x, parent.y + parent.h / 2, child.x + child.w, child.y + child.h / 2))
+            queue.extend((child, grandchild) for grandchild in child.children)
+
+    nodes = [element for node in root.walk() for element in _node_elements(node)]
+    return _document(edges + nodes, _tree_bounds(root))
+
+
+def _wbs_column(node: TreeNode, x: float, y: float) -> Tuple[float, float]:
+    """Place node at (x, y) with its descendants listed below it; returns (right, bottom)."""
+    node.x, node.y = x, y
+    right, bottom = x + node.w, y + node.h
+    for child in node.children:
+        child_right, bottom = _wbs_column(child, x + WBS_INDENT, bottom + V_GAP)
+        right = max(right, child_right)
+    return right, bottom
+
+
+def render_wbs(lines: List[str]) -> str:
+    root = parse_tree(lines, wbs=True)
+    _measure_tree(root)
+
+    cursor = 0.0
+    for child in root.children:
+        right, _ = _wbs_column(child, cursor, root.h + WBS_LEVEL_GAP)
+        cursor = right + H_GAP / 2
+    row_width = cursor - H_GAP / 2 if root.children else root.w
+    root.x, root.y = row_width / 2 - root.w / 2, 0.0
+
+    edges = []
+    if root.children:
+        bus_y = root.h + WBS_LEVEL_GAP / 2
+        centers = [child.x + child.w / 2 for child in root.children] + [root.x + root.w / 2]
+        edges.append(_line(root.x + root.w / 2, root.h, root.x + root.w / 2, bus_y))
+        edges.append(_line(min(centers), bus_y, max(centers), bus_y))
+        edges.extend(_line(child.x + child.w / 2, bus_y, child.x + child.w / 2, child.y)
+                     for child in root.children)
+    for node in root.walk():
+        if node is root or not node.children:
+            continue
+        trunk = node.x + WBS_INDENT / 2
+        last = node.children[-1]
+        edges.append(_line(trunk, node.y + node.h, trunk, last.y + last.h / 2))
+        edges.extend(_line(trunk, child.y + child.h / 2, child.x, child.y + child.h / 2)
+                     for child in node.children)
+
+    nodes = [element for node in root.walk() for element in _node_elements(node)]
+    return _document(edges + nodes, _tree_bounds(root))
+
+
+# --- JSON / YAML -------------------------------------------------------------
+
+@dataclass
+class DataTable:
+    """One JSON/YAML object or array drawn as a key/value table."""
+    rows: List[Tuple[Optional[str], str, Optional['DataTable']]]  # (key, value text, nested table)
+    x: float = 0.0
+    y: float = 0.0
+    key_w: float = 0.0
+    w: float = 0.0
+
+    @property
+    def row_h(self) -> float:
+        return LINE_HEIGHT + 2 * CELL_PAD_Y
+
+    @property
+    def h(self) -> float:
+        return self.row_h * len(self.rows)
+
+    def walk(self):
+        yield self
+        for _, _, child in self.rows:
+            if child:
+                yield from child.walk()
+
+
+def _scalar_text(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if value is None:
+        return 'null'
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def build_table(value: Any) -> DataTable:
+    """Tables for a parsed JSON/YAML value; nested containers become child tables."""
+    if isinstance(value, dict) and value:
+        items = [(str(key), item) for key, item in value.items()]
+    elif isinstance(value, list) and value:
+        items = [(None, item) for item in value]
+    else:
+        items = [(None, value if not isinstance(value, (dict, list)) else ('{}' if isinstance(value, dict) else '[]'))]
+
+    rows = []
+    for key, item in items:
+        if isinstance(item, (dict, list)) and item:
+            rows.append((key, '', build_table(item)))
+        elif isinstance(item, (dict, list)):
+            rows.append((key, '{}' if isinstance(item, dict) else '[]', None))
+        else:
+            rows.append((key, _scalar_text(item), None))
+
+    table = DataTable(rows)
+    keys = [key for key, _, _ in rows if key is not None]
+    table.key_w = max(text_width(key) for key in keys) + 2 * CELL_PAD_X if keys else 0.0
+    value_w = max([text_width(text) for _, text, _ in rows] + [MIN_VALUE_WIDTH]) + 2 * CELL_PAD_X
+    table.w = table.key_w + value_w
+    return table
+
+
+def _table_span(table: DataTable) -> float:
+    children = [child for _, _, child in table.rows if child]
+    if not children:
+        return table.h
+    return max(table.h, sum(_table_span(child) for child in children) + V_GAP * (len(children) - 1))
+
+
+def _place_table(table: DataTable, x: float, y: float) -> None:
+    table.x, table.y = x, y
+    cursor = y
+    for _, _, child in table.rows:
+        if child:
+            _place_table(child, x + table.w + H_GAP, cursor)
+            cursor += _table_span(child) + V_GAP
+
+
+def render_data(value: Any) -> str:
+    root = build_table(value)
+    _place_table(root, 0.0, 0.0)
+
+    elements = []
+    for table in root.walk():
+        elements.append(_rect(table.x, table.y, table.w, table.h, radius=5))
+        if table.key_w:
+            elements.append(_line(table.x + table.key_w, table.y, table.x + table.key_w, table.y + table.h))
+        for num, (key, text, child) in enumerate(table.rows):
+            top = table.y + num * table.row_h
+            baseline = top + CELL_PAD_Y + FONT_SIZE
+            if num:
+                elements.append(_line(table.x, top, table.x + table.w, top))
+            if key is not None:
+                elements.append(_text(table.x + CELL_PAD_X, baseline, key))
+            if text:
+                elements.append(_text(table.x + table.key_w + CELL_PAD_X, baseline, text))
+            if child:
+                elements.append(_curve(table.x + table.w, top + table.row_h / 2,
+                                       child.x, child.y + child.row_h / 2))
+
+    tables = list(root.walk())
+    bounds = (0.0, 0.0, max(t.x + t.w for t in tables), max(t.y + t.h for t in tables))
+    return _document(elements, bounds)
+
+
+def _yaml_scalar(text: str) -> str:
+    quoted = re.match(r'^\s*("([^"]*)"|\'([^\']*)\')\s*(#.*)?$', text)
+    if quoted:
+        return quoted.group(2) if quoted.group(2) is not None else quoted.group(3)
+    text = re.sub(r'\s+#.*$', '', text).strip()
+    if text[:1] in '{[&*!|>%@`' or text == '?':
+        raise _Unsupported('YAML beyond block mappings and sequences')
+    return text
+
+
+def parse_yaml(lines: List[str]) -> Any:
+    """Parse block-style YAML (mappings, sequences, plain and quoted scalars)."""
+    tokens = []
+    for raw in lines:
+        if '\t' in raw[:len(raw) - len(raw.lstrip())]:
+            raise _Unsupported('tab indentation')
+        stripped = raw.strip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        if stripped in ('---', '...'):
+            raise _Unsupported('multi-document YAML')
+        tokens.append([len(raw) - len(raw.lstrip()), stripped])
+    if not tokens:
+        raise _Unsupported('empty YAML')
+
+    key_re = re.compile(r'^("[^"]*"|\'[^\']*\'|[^\s#"\'][^:]*?):(?:\s+(.*))?$')
+
+    def block(pos: int, indent: int) -> Tuple[Any, int]:
+        if tokens[pos][1] == '-' or tokens[pos][1].startswith('- '):
+            items = []
+            while pos < len(tokens) and tokens[pos][0] == indent and (
+                    tokens[pos][1] == '-' or tokens[pos][1].startswith('- ')):
+                rest = tokens[pos][1][1:].lstrip()
+                if not rest:
+                    if pos + 1 < len(tokens) and tokens[pos + 1][0] > indent:
+                        item, pos = block(pos + 1, tokens[pos + 1][0])
+                    else:
+                        item, pos = '', pos + 1
+                elif key_re.match(rest):
+                    # "- key: value" opens a mapping indented past the dash
+                    tokens[pos] = [indent + len(tokens[pos][1]) - len(rest), rest]
+                    item, pos = block(pos, tokens[pos][0])
+                else:
+                    item, pos = _yaml_scalar(rest), pos + 1
+                items.append(item)
+            return items, pos
+
+        mapping = {}
+        while pos < len(tokens) and tokens[pos][0] == indent:
+            match = key_re.match(tokens[pos][1])
+            if not match:
+                if not mapping and len(tokens) == 1:
+                    return _yaml_scalar(tokens[pos][1]), pos + 1
+                raise _Unsupported(f'unrecognised YAML line: {tokens[pos][1]}')
+            key, value = _yaml_scalar(match.group(1)), match.group(2)
+            pos += 1
+            if value is not None and value.strip() and not value.strip().startswith('#'):
+                mapping[key] = _yaml_scalar(value)
+            elif pos < len(tokens) and tokens[pos][0] > indent:
+                mapping[key], pos = block(pos, tokens[pos][0])
+            elif pos < len(tokens) and tokens[pos][0] == indent and tokens[pos][1].startswith('-'):
+                mapping[key], pos = block(pos, indent)
+            else:
+                mapping[key] = ''
+        return mapping, pos
+
+    value, pos = block(0, tokens[0][0])
+    if pos != len(tokens):
+        raise _Unsupported('inconsistent YAML indentation')
+    return value
+
+
+# --- Entry points ------------------------------------------------------------
+
+def _diagram_body(puml_content: str) -> Tuple[str, List[str]]:
+    """(tag, body lines) of a source holding exactly one diagram."""
+    lines = puml_content.strip().splitlines()
+    if not lines:
+        raise _Unsupported('empty source')
+    start, end = START_RE.match(lines[0]), END_RE.match(lines[-1])
+    if not start or not end or start.group(1).lower() != end.group(1).lower():
+        raise _Unsupported('not a single @start/@end diagram')
+    body = lines[1:-1]
+    if any(START_RE.match(line) or END_RE.match(line) for line in body):
+        raise _Unsupported('several diagrams')
+    return start.group(1).lower(), body
+
+
+def render_native_svg(puml_content: str) -> Optional[str]:
+    """
+    Render a json/yaml/mindmap/wbs diagram to SVG without PlantUML.
+
+    Args:
+        puml_content: PlantUML diagram source
+
+    Returns:
+        SVG markup, or None if the diagram needs PlantUML
+    """
+    try:
+        tag, body = _diagram_body(puml_content)
+        if tag not in NATIVE_TYPES:
+            return None
+        if any(UNSUPPORTED_RE.match(line) for line in body):
+            return None
+        if tag == 'json':
+            try:
+                value = json.loads('\n'.join(body))
+            except ValueError:
+                return None
+            return render_data(value)
+        if tag == 'yaml':
+            return render_data(parse_yaml(body))
+        if tag == 'mindmap':
+            return render_mindmap(body)
+        return render_wbs(body)
+    except (_Unsupported, RecursionError):
+        return None
+
+
+@dataclass
+class SvgDiff:
+    """How a native rendering differs from PlantUML's."""
+    missing_labels: List[str]  # drawn by PlantUML only
+    extra_labels: List[str]  # drawn natively only
+    width_ratio: float
+    height_ratio: float
+
+    @property
+    def matches(self) -> bool:
+        return not self.missing_labels and not self.extra_labels
+
+
+def svg_labels(svg: str) -> Counter:
+    """Text drawn by an SVG, one entry per <text> element."""
+    labels = Counter()
+    for match in re.finditer(r'<text\b[^>]*>(.*?)</text>', svg, re.DOTALL):
+        text = html.unescape(re.sub(r'<[^>]+>', '', match.group(1))).strip()
+        if text:
+            labels[text] += 1
+    return labels
+
+
+def svg_size(svg: str) -> Tuple[float, float]:
+    """(width, height) of an SVG's root element, 0 when unknown."""
+    root = re.search(r'<svg\b[^>]*>', svg)
+    if not root:
+        return 0.0, 0.0
+    sizes = []
+    for attr in ('width', 'height'):
+        match = re.search(rf'\b{attr}="([\d.]+)', root.group(0))
+        sizes.append(float(match.group(1)) if match else 0.0)
+    return sizes[0], sizes[1]
+
+
+def compare_svgs(native_svg: str, plantuml_svg: str) -> SvgDiff:
+    """Compare the labels and canvas size of a native and a PlantUML rendering."""
+    native, reference = svg_labels(native_svg), svg_labels(plantuml_svg)
+    native_w, native_h = svg_size(native_svg)
+    reference_w, reference_h = svg_size(plantuml_svg)
+    return SvgDiff(
+        missing_labels=sorted((reference - native).elements()),
+        extra_labels=sorted((native - reference).elements()),
+        width_ratio=native_w / reference_w if reference_w else 0.0,
+        height_ratio=native_h / reference_h if reference_h else 0.0,
+    )
+
+
+def _corpus(paths: List[Path]) -> List[Tuple[str, str]]:
+    """(label, source) for every natively renderable diagram in the given files."""
+    # Imported lazily: the processor itself builds on this module
+    from process_markdown_puml import extract_embedded_puml_blocks, extract_linked_puml_files
+
+    diagrams = []
+    for path in paths:
+        content = path.read_text(encoding='utf-8')
+        if path.suffix == '.md':
+            for num, (block, _, _) in enumerate(extract_embedded_puml_blocks(content), 1):
+                diagrams.append((f"{path}#{num}", block))
+            for source, link, _, _ in extract_linked_puml_files(content, path.parent):
+                diagrams.append((f"{path}:{link}", source))
+        else:
+            diagrams.append((str(path), content))
+    return [(label, source) for label, source in diagrams if render_native_svg(source) is not None]
+
+
+def compare(paths: List[Path], plantuml_jar: str, out_dir: Path, repeats: int = 3) -> bool:
+    """
+    Render every native-capable diagram both ways, time both and diff them.
+
+    Writes <out_dir>/NNN_native.svg, NNN_plantuml.svg and report.html.
+
+    Returns:
+        True if every native rendering draws the same labels as PlantUML
+    """
+    from process_markdown_puml import convert_puml_to_image
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rows = []
+    native_total = plantuml_total = 0.0
+    for num, (label, source) in enumerate(_corpus(paths), 1):
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            svg = render_native_svg(source)
+            timings.append(time.perf_counter() - started)
+        native_time = statistics.median(timings)
+        native_path = out_dir / f"{num:03d}_native.svg"
+        native_path.write_text(svg, encoding='utf-8')
+
+        started = time.perf_counter()
+        ok = convert_puml_to_image(source, str(out_dir / f"{num:03d}_plantuml"), 'svg', plantuml_jar,
+                                   timeout=60, layout=None)
+        plantuml_time = time.perf_counter() - started
+        plantuml_path = out_dir / f"{num:03d}_plantuml.svg"
+        diff = compare_svgs(svg, plantuml_path.read_text(encoding='utf-8')) if ok else None
+
+        native_total += native_time
+        plantuml_total += plantuml_time if ok else 0.0
+        rows.append((num, label, native_time, plantuml_time if ok else None, diff))
+        status = ('PlantUML failed' if diff is None else 'labels match' if diff.matches
+                  else f"{len(diff.missing_labels)} missing, {len(diff.extra_labels)} extra label(s)")
+        speed = f"{plantuml_time / native_time:7.0f}x" if ok and native_time else '      -'
+        print(f"  {label:<50} {native_time * 1000:7.2f} ms  {speed}  {status}")
+
+    _write_report(out_dir / 'report.html', rows)
+    if not rows:
+        print("ℹ️  No natively renderable diagrams found")
+        return True
+    print(f"\n⏱️  Native {native_total:.3f}s vs PlantUML {plantuml_total:.3f}s for {len(rows)} diagram(s)")
+    print(f"📄 Report: {out_dir / 'report.html'}")
+    return all(diff is not None and diff.matches for *_, diff in rows)
+
+
+def _write_report(path: Path, rows: List[tuple]) -> None:
+    cells = []
+    for num, label, native_time, plantuml_time, diff in rows:
+        notes = 'PlantUML failed' if diff is None else (
+            f"size {diff.width_ratio:.2f}× × {diff.height_ratio:.2f}×"
+            + (f"<br>missing: {html.escape(', '.join(diff.missing_labels))}" if diff.missing_labels else '')
+            + (f"<br>extra: {html.escape(', '.join(diff.extra_labels))}" if diff.extra_labels else ''))
+        plantuml_ms = f"{plantuml_time * 1000:.0f} ms" if plantuml_time is not None else '-'
+        cells.append(
+            f"<tr><td>{html.escape(label)}<br>native {native_time * 1000:.2f} ms / PlantUML {plantuml_ms}"
+            f"<br>{notes}</td><td><img src=\"{num:03d}_native.svg\"></td>"
+            f"<td><img src=\"{num:03d}_plantuml.svg\"></td></tr>")
+    path.write_text(
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Native vs PlantUML</title></head><body>"
+        "<table border=\"1\" cellpadding=\"6\"><tr><th>Diagram</th><th>Native</th><th>PlantUML</th></tr>"
+        + ''.join(cells) + "</table></body></html>\n", encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Render json/yaml/mindmap/wbs diagrams to SVG without PlantUML',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    render = subparsers.add_parser('render', help='Render one diagram')
+    render.add_argument('file', help='.puml file')
+    render.add_argument('-o', '--output', default=None, help='Output .svg (default: next to the input)')
+
+    comparison = subparsers.add_parser('compare', help='Benchmark and diff against PlantUML')
+    comparison.add_argument('files', nargs='+', help='Markdown and/or .puml files')
+    comparison.add_argument('--out-dir', default='native_compare', help='Output directory (default: native_compare)')
+    comparison.add_argument('--repeats', type=int, default=3, help='Native renders to time per diagram (default: 3)')
+
+    args = parser.parse_args()
+
+    if args.command == 'render':
+        path = Path(args.file)
+        if not path.exists():
+            print(f"❌ Error: File not found: {path}", file=sys.stderr)
+            sys.exit(1)
+        svg = render_native_svg(path.read_text(encoding='utf-8'))
+        if svg is None:
+            print(f"❌ {path} needs PlantUML (unsupported type or features)", file=sys.stderr)
+            sys.exit(1)
+        output = Path(args.output) if args.output else path.with_suffix('.svg')
+        output.write_text(svg, encoding='utf-8')
+        print(f"✅ Created: {output}")
+        return
+
+    paths = [Path(f) for f in args.files]
+    missing = [p for p in paths if not p.exists()]
+    if missing:
+        print(f"❌ Error: File not found: {missing[0]}", file=sys.stderr)
+        sys.exit(1)
+
+    from process_markdown_puml import find_plantuml_jar
+
+    plantuml_jar = find_plantuml_jar()
+    if not plantuml_jar:
+        print("❌ Error: plantuml.jar not found", file=sys.stderr)
+        sys.exit(1)
+
+    print("⚖️  Comparing native rendering with PlantUML...")
+    if not compare(paths, plantuml_jar, Path(args.out_dir), args.repeats):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
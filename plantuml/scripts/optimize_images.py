@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Post-render optimizer for PlantUML PNG and SVG output.
+
+PNG files are recompressed losslessly (IDAT data re-deflated at maximum level)
+and stripped of metadata chunks, including the zTXt/iTXt chunk where PlantUML
+embeds the diagram source. SVG files are minified by removing comments, the
+embedded `<?plantuml-src ...?>` source and whitespace between tags.
+
+Optimized bytes are cached in a `.optimized/` directory next to the images,
+keyed by a hash of the raw render, so re-running on unchanged diagrams is a
+file copy rather than a recompression.
+
+Usage:
+    python optimize_images.py images/*.png [--jobs 4] [--no-cache]
+
+Examples:
+    # Optimize every image produced by process_markdown_puml.py
+    python optimize_images.py images/*.png images/*.svg
+
+    # Use 8 workers and skip the cache
+    python optimize_images.py images/*.png --jobs 8 --no-cache
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import struct
+import sys
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Ancillary chunks that carry metadata only; dropping them never changes pixels
+PNG_METADATA_CHUNKS = {b'tEXt', b'zTXt', b'iTXt', b'tIME', b'eXIf'}
+
+CACHE_DIRNAME = '.optimized'
+
+
+@dataclass
+class OptimizationResult:
+    """Result of optimizing a single image."""
+    path: Path
+    original_size: int = 0
+    optimized_size: int = 0
+    from_cache: bool = False
+    error: Optional[str] = None
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_size - self.optimized_size
+
+
+def read_png_chunks(data: bytes) -> List[Tuple[bytes, bytes]]:
+    """Split PNG bytes into (chunk_type, payload) pairs."""
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+
+    chunks = []
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+        payload = data[pos + 8:pos + 8 + length]
+        chunks.append((chunk_type, payload))
+        pos += 12 + length
+        if chunk_type == b'IEND':
+            break
+
+    return chunks
+
+
+def png_chunk(chunk_type: bytes, payload: bytes) -> bytes:
+    """Serialize a PNG chunk with its CRC."""
+    crc = zlib.crc32(chunk_type + payload) & 0xffffffff
+    return struct.pack('>I', len(payload)) + chunk_type + payload + struct.pack('>I', crc)
+
+
+def optimize_png_bytes(data: bytes) -> bytes:
+    """
+    Losslessly recompress a PNG and strip metadata chunks.
+
+    Returns:
+        The optimized bytes, or the input unchanged if nothing was gained
+    """
+    chunks = read_png_chunks(data)
+    idat = b''.join(payload for chunk_type, payload in chunks if chunk_type == b'IDAT')
+    raw = zlib.decompress(idat)
+
+    # Try the default and filtered strategies and keep whichever is smaller
+    best = idat
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        candidate = compressor.compress(raw) + compressor.flush()
+        if len(candidate) < len(best):
+            best = candidate
+
+    out = [PNG_SIGNATURE]
+    idat_written = False
+    for chunk_type, payload in chunks:
+        if chunk_type in PNG_METADATA_CHUNKS:
+            continue
+        if chunk_type == b'IDAT':
+            if not idat_written:
+                out.append(png_chunk(b'IDAT', best))
+                idat_written = True
+            continue
+        out.append(png_chunk(chunk_type, payload))
+
+    optimized = b''.join(out)
+    return optimized if len(optimized) < len(data) else data
+
+
+def optimize_svg_bytes(data: bytes) -> bytes:
+    """
+    Minify a PlantUML SVG: drop comments, embedded source and inter-tag whitespace.
+
+    Returns:
+        The optimized bytes, or the input unchanged if nothing was gained
+    """
+    text = data.decode('utf-8')
+
+    # PlantUML embeds the diagram source as a processing instruction and a comment
+    text = re.sub(r'<\?plantuml(?:-src)?\b.*?\?>', '', text, flags=re.DOTALL)
+    text = re.sub(r'<!--.*?-->', '', text, flags=re.DOTALL)
+    text = re.sub(r'>\s+<', '><', text)
+
+    optimized = text.strip().encode('utf-8')
+    return optimized if len(optimized) < len(data) else data
+
+
+OPTIMIZERS = {
+    '.png': optimize_png_bytes,
+    '.svg': optimize_svg_bytes,
+}
+
+
+def optimize_bytes(raw: bytes, suffix: str, cache_dir: Optional[Path] = None) -> Tuple[bytes, bool]:
+    """
+    Optimize image bytes in memory, reusing a cached result when available.
+
+    Args:
+        raw: PNG or SVG bytes
+        suffix: '.png' or '.svg'
+        cache_dir: `.optimized/` directory to look up and store results in, or None
+
+    Returns:
+        Tuple of (optimized_bytes, from_cache); never larger than raw
+
+    Raises:
+        ValueError: for unsupported image types or malformed PNGs
+    """
+    optimizer = OPTIMIZERS.get(suffix.lower())
+    if optimizer is None:
+        raise ValueError(f"Unsupported image type: {suffix}")
+
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = cache_dir / f"{hashlib.sha256(raw).hexdigest()}{suffix.lower()}"
+        if cache_path.exists():
+            return cache_path.read_bytes(), True
+
+    optimized = optimizer(raw)
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_bytes(optimized)
+    return (optimized if len(optimized) < len(raw) else raw), False
+
+
+def optimize_image(image_path: Path, use_cache: bool = True) -> OptimizationResult:
+    """
+    Optimize one image in place, reusing a cached result when available.
+
+    Args:
+        image_path: Path to a .png or .svg file
+        use_cache: Look up and store optimized bytes in the `.optimized/` cache
+
+    Returns:
+        OptimizationResult describing sizes and cache use
+    """
+    result = OptimizationResult(path=image_path)
+    if image_path.suffix.lower() not in OPTIMIZERS:
+        result.error = f"Unsupported image type: {image_path.suffix}"
+        return result
+
+    try:
+        raw = image_path.read_bytes()
+        result.original_size = len(raw)
+
+        cache_dir = image_path.parent / CACHE_DIRNAME if use_cache else None
+        optimized, result.from_cache = optimize_bytes(raw, image_path.suffix, cache_dir)
+
+        if len(optimized) < len(raw):
+            image_path.write_bytes(optimized)
+        result.optimized_size = min(len(optimized), len(raw))
+
+    except (OSError, ValueError, zlib.error) as e:
+        result.error = str(e)
+        result.optimized_size = result.original_size
+
+    return result
+
+
+def optimize_images(
+    image_paths: List[Path],
+    jobs: Optional[int] = None,
+    use_cache: bool = True
+) -> List[OptimizationResult]:
+    """
+    Optimize many images on a worker pool.
+
+    zlib releases the GIL while compressing, so threads scale across cores
+    without the pickling overhead of a process pool.
+
+    Returns:
+        One OptimizationResult per input path, in input order
+    """
+    if not image_paths:
+        return []
+
+    workers = max(1, jobs or os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda path: optimize_image(path, use_cache), image_paths))
+
+
+def print_optimization_report(results: List[OptimizationResult]) -> None:
+    """Print per-image errors and the total bytes saved."""
+    original = sum(r.original_size for r in results)
+    saved = sum(r.bytes_saved for r in results)
+    cached = sum(1 for r in results if r.from_cache)
+
+    for r in results:
+        if r.error:
+            print(f"⚠️  Could not optimize {r.path}: {r.error}", file=sys.stderr)
+
+    percent = (saved / original * 100) if original else 0.0
+    print(f"🗜️  Optimized {len(results)} image(s): saved {saved:,} bytes ({percent:.1f}%), "
+          f"{cached} from cache")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Losslessly optimize PlantUML PNG and SVG output',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('images', nargs='+', help='PNG or SVG files to optimize')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Number of worker threads (default: CPU count)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not read or write the .optimized/ cache')
+
+    args = parser.parse_args()
+
+    paths = [Path(p) for p in args.images]
+    missing = [p for p in paths if not p.exists()]
+    if missing:
+        for p in missing:
+            print(f"❌ Error: File not found: {p}", file=sys.stderr)
+        sys.exit(1)
+
+    results = optimize_images(paths, args.jobs, not args.no_cache)
+    print_optimization_report(results)
+
+    sys.exit(1 if any(r.error for r in results) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Split oversized sequence and activity diagrams into standalone pages.
+
+Very large diagrams hit timeouts, PLANTUML_LIMIT_SIZE and Graphviz crashes
+(performance_guide.md Errors #1, #3, #5, #9). This module cuts them at safe
+boundaries so each page can be rendered on its own, in parallel:
+
+- Sequence diagrams break at existing `newpage` markers and, once a page holds
+  enough messages, at the next point outside any group, note or ref. Every page
+  repeats the header (skinparams, styles, participant declarations) and
+  re-activates lifelines and autonumbering carried over from the previous page.
+- Activity diagrams break between top-level statements (for example between
+  partitions or groups), re-declaring the current swimlane on each page.
+
+Diagrams that use preprocessor conditionals or procedures are never split,
+since their structure cannot be known without running the preprocessor.
+
+Usage:
+    python paginate_diagram.py big.puml [--max-units 120] [--output-dir pages/]
+"""
+
+import argparse
+import re
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Page budgets: messages per sequence page, actions per activity page
+MAX_SEQUENCE_MESSAGES = 120
+MAX_ACTIVITY_ACTIONS = 80
+
+# Header directives repeated on every page
+HEADER_RE = re.compile(
+    r'^(skinparam|hide|show|autoactivate|title|scale|left to right direction|top to bottom direction'
+    r'|!include|!theme|!pragma|!define|!\$|mainframe)\b',
+    re.IGNORECASE
+)
+PARTICIPANT_RE = re.compile(
+    r'^(participant|actor|boundary|control|entity|database|collections|queue)\s',
+    re.IGNORECASE
+)
+# Preprocessor structures that make line-based splitting unsafe
+UNSAFE_RE = re.compile(
+    r'^!(if|ifdef|ifndef|else|elseif|endif|while|endwhile|foreach|endfor'
+    r'|procedure|endprocedure|function|endfunction|unquoted)\b',
+    re.IGNORECASE
+)
+
+SEQ_GROUP_OPEN_RE = re.compile(r'^(alt|opt|loop|par|par2|break|critical|group)\b', re.IGNORECASE)
+SEQ_GROUP_END_RE = re.compile(r'^end\s*$', re.IGNORECASE)
+SEQ_MESSAGE_RE = re.compile(r'->|<-|-\\|\\-|-/|/-|\]>|<\[|-x\b')
+
+ACT_OPEN_RE = re.compile(
+    r'^(if\s*\(|while\s*\(|repeat\s*$|repeat\s*:|fork\s*$|split\s*$|switch\s*\(|group\b|partition\b.*\{\s*$)',
+    re.IGNORECASE
+)
+ACT_CLOSE_RE = re.compile(
+    r'^(endif|endwhile|end\s+while|repeat\s+while|repeatwhile|end\s*fork|end\s*merge'
+    r'|end\s*split|endswitch|end\s+group|\})',
+    re.IGNORECASE
+)
+ACT_ACTION_END_RE = re.compile(r'[;|<>/\]}]\s*$')
+# Arrow (label) between two actions: `-> label;`, `-[#red]-> label;`
+ACT_ARROW_RE = re.compile(r'^-+(\[[^\]]*\])?-*>')
+
+NOTE_OPEN_RE = re.compile(r'^(h|r)?note\b', re.IGNORECASE)
+NOTE_END_RE = re.compile(r'^end\s*(h|r)?note\b', re.IGNORECASE)
+
+
+def _split_envelope(puml_content: str) -> Tuple[str, List[str]]:
+    """Return the @start line and the body lines between @start and @end."""
+    lines = puml_content.strip().splitlines()
+    start_line = '@startuml'
+    if lines and lines[0].strip().lower().startswith('@start'):
+        start_line = lines.pop(0).strip()
+    if lines and lines[-1].strip().lower().startswith('@end'):
+        lines.pop()
+    return start_line, lines
+
+
+def detect_layout_kind(puml_content: str) -> Optional[str]:
+    """
+    Classify a diagram as 'sequence' or 'activity' for pagination purposes.
+
+    Returns:
+        'sequence', 'activity', or None if the diagram cannot be paginated
+    """
+    start_line, lines = _split_envelope(puml_content)
+    if not start_line.lower().startswith('@startuml'):
+        return None
+
+    stripped = [line.strip() for line in lines]
+    if any(line.startswith(':') or line.lower() in ('start', 'stop') for line in stripped):
+        return 'activity'
+    if any(SEQ_MESSAGE_RE.search(line.split(':', 1)[0]) for line in stripped if line):
+        return 'sequence'
+    return None
+
+
+def count_units(puml_content: str) -> int:
+    """Count messages (sequence) or actions (activity) in a diagram."""
+    kind = detect_layout_kind(puml_content)
+    _, lines = _split_envelope(puml_content)
+    stripped = [line.strip() for line in lines]
+
+    if kind == 'sequence':
+        return sum(1 for line in stripped
+                   if line and not line.startswith("'") and SEQ_MESSAGE_RE.search(line.split(':', 1)[0]))
+    if kind == 'activity':
+        return sum(1 for line in stripped if line.startswith(':'))
+    return 0
+
+
+def default_page_size(kind: Optional[str]) -> int:
+    """Return the default per-page budget for a diagram kind."""
+    return MAX_ACTIVITY_ACTIONS if kind == 'activity' else MAX_SEQUENCE_MESSAGES
+
+
+def is_oversized(puml_content: str, max_units: Optional[int] = None) -> bool:
+    """Check whether a diagram exceeds the single-page budget for its kind."""
+    kind = detect_layout_kind(puml_content)
+    if kind is None:
+        return False
+    return count_units(puml_content) > (max_units or default_page_size(kind))
+
+
+def _take_block(lines: List[str], i: int, end_re: re.Pattern) -> int:
+    """Return the index just past a multi-line block starting at lines[i]."""
+    j = i + 1
+    while j < len(lines) and not end_re.match(lines[j].strip()):
+        j += 1
+    return min(j + 1, len(lines))
+
+
+def _split_header(lines: List[str]) -> Tuple[List[str], List[str]]:
+    """Separate header directives and declarations from the diagram body."""
+    header, body = [], []
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        lower = line.lower()
+
+        if lower.startswith('<style>'):
+            end = _take_block(lines, i, re.compile(r'^</style>'))
+            header.extend(lines[i:end])
+            i = end
+        elif lower.startswith('skinparam') and line.endswith('{'):
+            end = _take_block(lines, i, re.compile(r'^\}'))
+            header.extend(lines[i:end])
+            i = end
+        elif lower.startswith('box') and not SEQ_MESSAGE_RE.search(line):
+            end = _take_block(lines, i, re.compile(r'^end\s*box', re.IGNORECASE))
+            header.extend(lines[i:end])
+            i = end
+        elif HEADER_RE.match(line) or PARTICIPANT_RE.match(line):
+            header.append(lines[i])
+            i += 1
+        else:
+            body.append(lines[i])
+            i += 1
+
+    return header, body
+
+
+def _message_participants(line: str) -> Tuple[Optional[str], Optional[str]]:
+    """Return (source, target) participant names of a sequence message line."""
+    head = line.split(':', 1)[0]
+    match = re.match(r'^\s*("[^"]+"|[\w.]+)?\s*\S*?[-.]+\S*\s*("[^"]+"|[\w.]+)?', head)
+    if not match:
+        return None, None
+    return match.group(1), match.group(2)
+
+
+def _paginate_sequence(header: List[str], body: List[str], max_units: int) -> List[List[str]]:
+    """Split a sequence body into pages of lines (prefix state included)."""
+    pages = []
+    current: List[str] = []
+    units = 0
+    depth = 0
+    in_block: Optional[re.Pattern] = None
+    active: List[str] = []
+    autonumber_next: Optional[int] = None
+
+    def close_page():
+        nonlocal current, units
+        if any(line.strip() for line in current):
+            pages.append(current)
+        prefix = []
+        if autonumber_next is not None:
+            prefix.append(f"autonumber {autonumber_next}")
+        prefix.extend(f"activate {name}" for name in active)
+        current = prefix
+        units = 0
+
+    for raw in body:
+        line = raw.strip()
+        lower = line.lower()
+
+        if in_block is not None:
+            current.append(raw)
+            if in_block.match(line):
+                in_block = None
+            continue
+
+        if lower == 'newpage' or lower.startswith('newpage '):
+            if depth == 0:
+                close_page()
+            continue
+
+        # An arrow belongs to the action before it: never start a page with one
+        if (depth == 0 and units >= max_units and line and not line.startswith("'")
+                and not ACT_ARROW_RE.match(line)):
+            close_page()
+
+        current.append(raw)
+
+        if not line or line.startswith("'"):
+            continue
+        if NOTE_OPEN_RE.match(line) and ':' not in line:
+            in_block = NOTE_END_RE
+        elif lower.startswith('ref over') and ':' not in line:
+            in_block = re.compile(r'^end\s*ref\b', re.IGNORECASE)
+        elif SEQ_GROUP_OPEN_RE.match(line):
+            depth += 1
+        elif SEQ_GROUP_END_RE.match(line):
+            depth = max(0, depth - 1)
+        elif lower.startswith('autonumber'):
+            args = lower.split()[1:]
+            if args and args[0] == 'stop':
+                autonumber_next = None
+            elif args and args[0].isdigit():
+                autonumber_next = int(args[0])
+            elif autonumber_next is None:
+                autonumber_next = 1
+        elif lower.startswith('activate '):
+            active.append(line.split(None, 1)[1].split()[0])
+        elif lower.startswith(('deactivate ', 'destroy ')):
+            name = line.split(None, 1)[1].split()[0]
+            if name in active:
+                active.reverse()
+                active.remove(name)
+                active.reverse()
+        elif lower == 'return' or lower.startswith('return '):
+            if active:
+                active.pop()
+            units += 1
+        elif SEQ_MESSAGE_RE.search(line.split(':', 1)[0]):
+            units += 1
+            if autonumber_next is not None:
+                autonumber_next += 1
+            source, target = _message_participants(line)
+            head = line.split(':', 1)[0]
+            if '++' in head and target:
+                active.append(target)
+            if '--' in head.split()[-1] and source and source in active:
+                active.remove(source)
+
+    if any(line.strip() for line in current):
+        pages.append(current)
+
+    return pages
+
+
+def _paginate_activity(header: List[str], body: List[str], max_units: int) -> List[List[str]]:
+    """Split an activity body into pages at top-level statement boundaries."""
+    pages = []
+    current: List[str] = []
+    units = 0
+    depth = 0
+    in_block: Optional[re.Pattern] = None
+    in_action = False
+    lane: Optional[str] = None
+
+    for raw in body:
+        line = raw.strip()
+
+        if in_action:
+            current.append(raw)
+            if ACT_ACTION_END_RE.search(line):
+                in_action = False
+            continue
+        if in_block is not None:
+            current.append(raw)
+            if in_block.match(line):
+                in_block = None
+            continue
+
+        # An arrow belongs to the action before it: never start a page with one
+        if (depth == 0 and units >= max_units and line and not line.startswith("'")
+                and not ACT_ARROW_RE.match(line)):
+            if any(l.strip() for l in current):
+                pages.append(current)
+            current = [lane] if lane else []
+            units = 0
+
+        current.append(raw)
+
+        if not line or line.startswith("'"):
+            continue
+        if line.startswith(':'):
+            units += 1
+            in_action = not ACT_ACTION_END_RE.search(line)
+        elif NOTE_OPEN_RE.match(line) and ':' not in line:
+            in_block = NOTE_END_RE
+        elif re.match(r'^\|.*\|', line) and depth == 0:
+            lane = line
+        elif ACT_CLOSE_RE.match(line):
+            depth = max(0, depth - 1)
+        elif ACT_OPEN_RE.match(line):
+            depth += 1
+
+    if any(l.strip() for l in current):
+        pages.append(current)
+
+    return pages
+
+
+def paginate_diagram(puml_content: str, max_units: Optional[int] = None) -> List[str]:
+    """
+    Split a diagram into standalone page diagrams.
+
+    Args:
+        puml_content: PlantUML source (with @startuml/@enduml)
+        max_units: Messages (sequence) or actions (activity) per page
+
+    Returns:
+        List of standalone page sources; a single-element list containing the
+        original source when the diagram cannot or need not be split
+    """
+    kind = detect_layout_kind(puml_content)
+    if kind is None:
+        return [puml_content]
+
+    start_line, lines = _split_envelope(puml_content)
+    if any(UNSAFE_RE.match(line.strip()) for line in lines):
+        return [puml_content]
+
+    header, body = _split_header(lines)
+    budget = max_units or default_page_size(kind)
+
+    if kind == 'sequence':
+        pages = _paginate_sequence(header, body, budget)
+    else:
+        pages = _paginate_activity(header, body, budget)
+
+    if len(pages) <= 1:
+        return [puml_content]
+
+    return ['\n'.join([start_line] + header + page + ['@enduml']) for page in pages]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Split oversized sequence/activity diagrams into standalone pages',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('puml_file', help='PlantUML file to split')
+    parser.add_argument('--max-units', type=int, default=None,
+                        help='Messages or actions per page (default: by diagram kind)')
+    parser.add_argument('--output-dir', default=None,
+                        help='Directory for page files (default: next to input)')
+
+    args = parser.parse_args()
+
+    puml_path = Path(args.puml_file)
+    if not puml_path.exists():
+        print(f"❌ Error: File not found: {puml_path}", file=sys.stderr)
+        sys.exit(1)
+
+    pages = paginate_diagram(puml_path.read_text(encoding='utf-8'), args.max_units)
+    if len(pages) == 1:
+        print(f"ℹ️  {puml_path} fits on one page (or cannot be split safely)")
+        return
+
+    output_dir = Path(args.output_dir) if args.output_dir else puml_path.parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for num, page in enumerate(pages, 1):
+        page_path = output_dir / f"{puml_path.stem}_p{num}.puml"
+        page_path.write_text(page + '\n', encoding='utf-8')
+        print(f"✅ Page {num}/{len(pages)} → {page_path}")
+
+
+if __name__ == '__main__':
+    main()
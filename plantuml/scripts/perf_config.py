@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Per-machine performance settings written by `check_setup.py --profile`.
+
+The profile records what was measured on this machine (JVM cold start, warm
+render latency per diagram type, Graphviz latency, available memory) and the
+settings recommended from it. Processors read it to pick their defaults:
+`process_markdown_puml.py` uses `jobs` when `--jobs` is not given and caps the
+per-diagram `-Xmx` at `heap_mb`. The optional `governor` section holds the
+per-machine limits for resource_governor.py; re-profiling keeps it.
+
+The file lives at ~/.config/plantuml/perf.json unless the
+PLANTUML_PERF_CONFIG environment variable points elsewhere (set it to "off"
+to ignore any profile). Unknown keys, such as the `backend` older versions
+recommended, are ignored.
+"""
+
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_CONFIG_PATH = Path.home() / '.config' / 'plantuml' / 'perf.json'
+
+
+@dataclass
+class PerfProfile:
+    """Measurements and recommended settings for one machine."""
+    jobs: int
+    heap_mb: int
+    cold_start: Optional[float] = None
+    warm_latency: Dict[str, float] = field(default_factory=dict)
+    dot_latency: Optional[float] = None
+    available_mb: Optional[int] = None
+    cpu_count: Optional[int] = None
+    profiled_at: Optional[str] = None
+    governor: Dict[str, Any] = field(default_factory=dict)
+
+
+def perf_config_path() -> Optional[Path]:
+    """Location of the profile, or None when disabled."""
+    env_path = os.environ.get('PLANTUML_PERF_CONFIG')
+    if env_path == 'off':
+        return None
+    return Path(env_path) if env_path else DEFAULT_CONFIG_PATH
+
+
+def load_perf_profile(path: Optional[Path] = None) -> Optional[PerfProfile]:
+    """Read the machine profile; None if there is none or it is unreadable."""
+    path = path or perf_config_path()
+    if path is None or not path.exists():
+        return None
+    try:
+        data = json.loads(path.read_text(encoding='utf-8'))
+        known = {key: value for key, value in data.items() if key in PerfProfile.__dataclass_fields__}
+        profile = PerfProfile(**known)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"⚠️  Ignoring performance profile {path}: {e}", file=sys.stderr)
+        return None
+    if profile.jobs < 1 or profile.heap_mb < 1:
+        print(f"⚠️  Ignoring performance profile {path}: invalid values", file=sys.stderr)
+        return None
+    return profile
+
+
+def save_perf_profile(profile: PerfProfile, path: Optional[Path] = None) -> Path:
+    """Write the profile atomically and return where it was written."""
+    path = path or perf_config_path() or DEFAULT_CONFIG_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps(asdict(profile), indent=2) + '\n', encoding='utf-8')
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,933 @@
+#!/usr/bin/env python3
+"""
+Python implementation of the common PlantUML preprocessor features.
+
+Hashing, deduplicating, splitting or linting a diagram needs its fully
+expanded source, and spawning `plantuml -preproc` for every diagram costs a JVM
+each time. This module expands the commonly used subset in-process:
+
+- `!include`, `!include_once`, `!include_many` and `!includesub file!NAME`
+  with paths relative to the including file (then any -I directories);
+  `file!N` and `file!ID` select one diagram of a multi-diagram file
+- `!define` / `!definelong` macros (with parameters) and `!undef`
+- variables: `!$var = expr`, `!$var ?= expr`, `!local` / `!global`
+- `!if` / `!elseif` / `!else` / `!endif`, `!ifdef` / `!ifndef`, `!while`
+- `!procedure`, `!function` / `!return` (including one-line functions and
+  `!unquoted`), default and keyword arguments, and the common `%` builtins
+- `!theme name [from dir]` when `puml-theme-<name>.puml` exists locally
+
+Standard-library (`<C4/C4>`) and URL includes, and themes bundled in the jar,
+are left in place for PlantUML (see `Preprocessor.unresolved`). Directives
+outside this subset raise PreprocessorUnsupported so callers can fall back to
+PlantUML. Included files are parsed once and cached by path, modification
+time and size, so include-heavy documentation trees expand in milliseconds.
+
+Usage:
+    python preprocessor.py expand diagram.puml [-I dir] [-D NAME=value] [-o out.puml]
+    python preprocessor.py bench docs/ [more paths ...]
+
+Examples:
+    # Print the expanded source of a diagram
+    python preprocessor.py expand architecture.puml -I shared/
+
+    # Expand every diagram under docs/ and report timings and include cache hits
+    python preprocessor.py bench docs/
+"""
+
+import argparse
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+GUIDE = 'references/troubleshooting/preprocessor_includes_guide.md'
+
+# Headings of the preprocessor guide that errors point to
+ERROR_HEADINGS = {
+    1: 'Error #1: File Not Found - !include',
+    3: 'Error #3: Multiple Include with !include_once',
+    5: 'Error #5: Undefined Macro/Variable',
+    6: 'Error #6: !procedure Syntax Error',
+    8: 'Error #8: Circular Dependencies',
+    16: 'Error #16: Conditional Compilation Errors',
+    18: 'Error #18: Macro Parameter Errors',
+    19: 'Error #19: !return in !procedure',
+}
+
+# Guards against runaway recursion and loops
+MAX_CALL_DEPTH = 100
+MAX_WHILE_ITERATIONS = 10000
+MAX_MACRO_PASSES = 10
+
+DIRECTIVE_RE = re.compile(r'^\s*!(\w+)\b\s*(.*?)\s*$')
+ASSIGN_RE = re.compile(r'^\s*!(?:(local|global)\s+)?(\$\w+)\s*(\?=|=)\s*(.*?)\s*$')
+START_RE = re.compile(r'^\s*@start\w+(?:\(id=([^)]+)\))?', re.IGNORECASE)
+END_RE = re.compile(r'^\s*@end\w+', re.IGNORECASE)
+DEFINE_RE = re.compile(r'^(\w+)(?:\(([^)]*)\))?\s*(.*)$')
+CALLABLE_RE = re.compile(r'^(\$?\w+)\s*\((.*?)\)\s*(?:!return\s+(.*))?$')
+NAME_RE = re.compile(r'(\$\w+|%\w+|\b[A-Za-z_]\w*)(\s*\()?')
+PREPROCESSOR_LINE_RE = re.compile(r'^\s*!', re.MULTILINE)
+TOKEN_RE = re.compile(r'''\s*(?:
+    (?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<num>\d+)
+  | (?P<name>[$%]?\w+)
+  | (?P<op>\|\||&&|==|!=|<=|>=|[-+*/<>!(),=])
+)''', re.VERBOSE)
+
+# Directives that are handled here or passed through untouched
+BLOCK_ENDS = {'endprocedure': 'procedure', 'endfunction': 'function', 'enddefinelong': 'definelong',
+              'endwhile': 'while', 'endsub': 'startsub'}
+PASS_THROUGH = ('pragma',)
+IGNORED = ('log', 'dump_memory')
+
+
+class PreprocessorError(Exception):
+    """
+    A preprocessing failure PlantUML would also report.
+
+    structural marks errors in the block structure of the source itself
+    (unbalanced !if/!endif, unclosed !procedure, ...), which do not depend on
+    how faithfully expressions, builtins or includes are emulated.
+    """
+
+    def __init__(self, message: str, error_number: int, line: int = 0, path: Optional[Path] = None,
+                 structural: bool = False):
+        super().__init__(message)
+        self.message = message
+        self.error_number = error_number
+        self.line = line
+        self.path = path
+        self.structural = structural
+
+    @property
+    def section(self) -> str:
+        """Heading of the preprocessor guide entry for this error."""
+        return ERROR_HEADINGS[self.error_number]
+
+    def __str__(self) -> str:
+        where = f"{self.path}:" if self.path else ''
+        return f"{where}line {self.line}: {self.message}" if self.line else self.message
+
+
+class PreprocessorUnsupported(Exception):
+    """The source uses preprocessor features outside the supported subset."""
+
+
+class _Return(Exception):
+    def __init__(self, value: Any):
+        super().__init__()
+        self.value = value
+
+
+@dataclass
+class _Line:
+    kind: str  # 'text', 'verbatim' (comments), 'assign' or a directive name
+    arg: Any
+    text: str
+    lineno: int
+
+
+@dataclass
+class _Program:
+    """A parsed source: classified lines plus block structure."""
+    path: Optional[Path]
+    lines: List[_Line]
+    chains: Dict[int, List[int]] = field(default_factory=dict)  # !if index -> branch indices + !endif
+    ends: Dict[int, int] = field(default_factory=dict)  # block opener index -> closer index
+    subs: Dict[str, Tuple[int, int]] = field(default_factory=dict)  # !startsub name -> body range
+    diagrams: List[Tuple[Optional[str], int, int]] = field(default_factory=list)  # (id, body start, body end)
+
+
+@dataclass
+class _Callable:
+    name: str
+    kind: str  # 'procedure' or 'function'
+    params: List[Tuple[str, Optional[str]]]  # (name, default expression)
+    program: _Program
+    start: int
+    end: int
+    unquoted: bool = False
+    inline_return: Optional[str] = None
+
+
+@dataclass
+class _Macro:
+    params: Optional[List[str]]
+    body: str
+
+
+def _compile(text: str, path: Optional[Path] = None) -> _Program:
+    """Classify lines and match blocks once, so a file can be run many times."""
+    program = _Program(path, [])
+    stack: List[Tuple[str, int]] = []
+    in_comment = False
+    diagram_start: Optional[Tuple[Optional[str], int]] = None
+
+    def fail(message: str, number: int, lineno: int) -> None:
+        raise PreprocessorError(message, number, lineno, path, structural=True)
+
+    for index, raw in enumerate(text.splitlines()):
+        lineno = index + 1
+        stripped = raw.strip()
+        if in_comment or stripped.startswith("'") or stripped.startswith("/'"):
+            if not in_comment and stripped.startswith("/'"):
+                in_comment = "'/" not in stripped[2:]
+            elif in_comment:
+                in_comment = "'/" not in stripped
+            program.lines.append(_Line('verbatim', None, raw, lineno))
+            continue
+
+        start = START_RE.match(raw)
+        if start:
+            diagram_start = (start.group(1), index + 1)
+        elif END_RE.match(raw) and diagram_start:
+            program.diagrams.append((diagram_start[0], diagram_start[1], index))
+            diagram_start = None
+
+        assign = ASSIGN_RE.match(raw)
+        if assign:
+            program.lines.append(_Line('assign', assign.groups(), raw, lineno))
+            continue
+        directive = DIRECTIVE_RE.match(raw)
+        if not directive:
+            program.lines.append(_Line('text', None, raw, lineno))
+            continue
+
+        kind, arg = directive.group(1).lower(), directive.group(2)
+        if kind == 'unquoted':
+            inner = DIRECTIVE_RE.match('!' + arg)
+            if not inner or inner.group(1).lower() not in ('procedure', 'function'):
+                fail("!unquoted must be followed by !procedure or !function", 6, lineno)
+            kind, arg = inner.group(1).lower(), (inner.group(2), True)
+        elif kind in ('procedure', 'function'):
+            arg = (arg, False)
+        program.lines.append(_Line(kind, arg, raw, lineno))
+
+        if kind in ('if', 'ifdef', 'ifndef'):
+            stack.append(('if', index))
+            program.chains[index] = [index]
+        elif kind in ('elseif', 'else', 'endif'):
+            if not stack or stack[-1][0] != 'if':
+                fail(f"!{kind} without a matching !if", 16, lineno)
+            chain = program.chains[stack[-1][1]]
+            if kind != 'endif' and program.lines[chain[-1]].kind == 'else':
+                fail(f"!{kind} after !else", 16, lineno)
+            chain.append(index)
+            if kind == 'endif':
+                stack.pop()
+        elif kind == 'function' and '!return' in arg[0]:
+            pass  # one-line function, no !endfunction
+        elif kind in ('procedure', 'function', 'definelong', 'while', 'startsub'):
+            stack.append((kind, index))
+        elif kind in BLOCK_ENDS:
+            if not stack or stack[-1][0] != BLOCK_ENDS[kind]:
+                fail(f"!{kind} without a matching !{BLOCK_ENDS[kind]}", 6 if kind != 'endwhile' else 16, lineno)
+            _, opener = stack.pop()
+            program.ends[opener] = index
+            if kind == 'endsub':
+                program.subs[program.lines[opener].arg.strip()] = (opener + 1, index)
+
+    if stack:
+        kind, opener = stack[-1]
+        expected = 'endif' if kind == 'if' else f"end{kind}" if kind != 'startsub' else 'endsub'
+        fail(f"!{program.lines[opener].kind} is never closed with !{expected}",
+             16 if kind in ('if', 'while') else 6, program.lines[opener].lineno)
+    return program
+
+
+_CACHE: Dict[Path, Tuple[Tuple[int, int], _Program]] = {}
+_CACHE_LOCK = threading.Lock()
+CACHE_STATS: Counter = Counter()
+
+
+def load_program(path: Path) -> _Program:
+    """Parsed include file, cached by path, modification time and size."""
+    stat = path.stat()
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _CACHE_LOCK:
+        cached = _CACHE.get(path)
+    if cached and cached[0] == key:
+        CACHE_STATS['hits'] += 1
+        return cached[1]
+    CACHE_STATS['misses'] += 1
+    program = _compile(path.read_text(encoding='utf-8'), path)
+    with _CACHE_LOCK:
+        _CACHE[path] = (key, program)
+    return program
+
+
+def _split_args(text: str) -> List[str]:
+    """Split a call's argument list on top-level commas."""
+    args, depth, quote, current = [], 0, None, ''
+    for char in text:
+        if quote:
+            quote = None if char == quote else quote
+        elif char in '"\'':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            args.append(current.strip())
+            current = ''
+            continue
+        current += char
+    if current.strip():
+        args.append(current.strip())
+    return args
+
+
+def _matching_paren(text: str, open_index: int) -> Optional[int]:
+    depth, quote = 0, None
+    for index in range(open_index, len(text)):
+        char = text[index]
+        if quote:
+            quote = None if char == quote else quote
+        elif char in '"\'':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return index
+    return None
+
+
+def truthy(value: Any) -> bool:
+    if isinstance(value, int):
+        return value != 0
+    return value not in ('', '0', 'false')
+
+
+class Preprocessor:
+    """
+    Expands one diagram. Holds macro/variable state, so use a fresh instance
+    per expansion; parsed include files are shared through the module cache.
+
+    Args:
+        include_dirs: Extra directories searched for includes and themes
+        defines: Macros predefined as with `-DNAME=value`
+        missing_includes: 'error' to raise on a missing include file, 'keep'
+            to leave the directive in place and list it in `unresolved`
+    """
+
+    def __init__(
+        self,
+        include_dirs: Optional[List[Path]] = None,
+        defines: Optional[Dict[str, str]] = None,
+        missing_includes: str = 'error'
+    ):
+        self.include_dirs = [Path(d) for d in include_dirs or []]
+        self.missing_includes = missing_includes
+        self.macros: Dict[str, _Macro] = {name: _Macro(None, str(value)) for name, value in (defines or {}).items()}
+        self.globals: Dict[str, Any] = {}
+        self.callables: Dict[str, _Callable] = {}
+        self.included: List[Path] = []
+        self.unresolved: List[str] = []
+        self._locals: List[Dict[str, Any]] = []
+        self._files: List[Path] = []
+        self._dirs: List[Path] = []
+        self._macro_re: Optional[Tuple[Tuple[str, ...], re.Pattern]] = None
+
+    def expand(self, text: str, base_dir: Optional[Path] = None) -> str:
+        """
+        Expand a PlantUML source.
+
+        Args:
+            text: Source to expand
+            base_dir: Directory relative includes are resolved against (default: cwd)
+
+        Returns:
+            The expanded source; directives are removed, comments are kept
+        """
+        program = _compile(text)
+        out: List[str] = []
+        self._dirs = [Path(base_dir) if base_dir else Path.cwd()]
+        try:
+            self._run(program, 0, len(program.lines), out)
+        except _Return:
+            raise PreprocessorError("!return outside a !function", 19)
+        return '\n'.join(out) + ('\n' if text.endswith('\n') else '')
+
+    # --- Execution -----------------------------------------------------------
+
+    def _run(self, program: _Program, start: int, end: int, out: List[str]) -> None:
+        index = start
+        while index < end:
+            line = program.lines[index]
+            try:
+                index = self._step(program, index, line, out)
+            except PreprocessorError as e:
+                if not e.line:
+                    e.line, e.path = line.lineno, program.path
+                raise
+
+    def _step(self, program: _Program, index: int, line: _Line, out: List[str]) -> int:
+        kind = line.kind
+        if kind == 'text':
+            out.append(self.substitute(line.text))
+        elif kind == 'verbatim':
+            out.append(line.text)
+        elif kind == 'assign':
+            scope, name, op, expr = line.arg
+            target = self.globals if scope == 'global' or (scope is None and not self._locals) else self._locals[-1]
+            if op == '=' or not self._defined(name):
+                target[name] = self.evaluate(expr)
+        elif kind in ('if', 'ifdef', 'ifndef'):
+            chain = program.chains[index]
+            for branch, next_branch in zip(chain, chain[1:]):
+                if self._condition(program.lines[branch]):
+                    self._run(program, branch + 1, next_branch, out)
+                    break
+            return chain[-1] + 1
+        elif kind == 'while':
+            for _ in range(MAX_WHILE_ITERATIONS):
+                if not truthy(self.evaluate(line.arg)):
+                    return program.ends[index] + 1
+                self._run(program, index + 1, program.ends[index], out)
+            raise PreprocessorError(f"!while did not terminate after {MAX_WHILE_ITERATIONS} iterations", 16)
+        elif kind in ('procedure', 'function'):
+            self._declare(program, index, line)
+            if index in program.ends:
+                return program.ends[index] + 1
+        elif kind == 'definelong':
+            match = DEFINE_RE.match(line.arg)
+            body = [program.lines[i].text for i in range(index + 1, program.ends[index])]
+            self._define(match.group(1), match.group(2), '\n'.join(body))
+            return program.ends[index] + 1
+        elif kind == 'define':
+            match = DEFINE_RE.match(line.arg)
+            if not match:
+                raise PreprocessorError(f"invalid !define: {line.arg}", 18)
+            self._define(match.group(1), match.group(2), match.group(3))
+        elif kind == 'undef':
+            name = line.arg.strip()
+            self.macros.pop(name, None)
+            self.globals.pop(name if name.startswith('$') else f"${name}", None)
+            self._macro_re = None
+        elif kind == 'return':
+            raise _Return(self.evaluate(line.arg))
+        elif kind in ('include', 'include_once', 'include_many', 'includesub'):
+            self._include(kind, self.substitute(line.arg).strip(), line, out)
+        elif kind == 'includeurl':
+            self.unresolved.append(line.arg)
+            out.append(line.text)
+        elif kind == 'theme':
+            self._theme(line, out)
+        elif kind == 'assert':
+            condition, _, message = line.arg.partition(':')
+            if not truthy(self.evaluate(condition)):
+                raise PreprocessorError(f"assertion failed: {message.strip() or condition.strip()}", 16)
+        elif kind in ('startsub', 'endsub') or kind in IGNORED:
+            pass
+        elif kind in PASS_THROUGH:
+            out.append(self.substitute(line.text))
+        else:
+            raise PreprocessorUnsupported(f"!{kind} is not supported")
+        return index + 1
+
+    def _condition(self, line: _Line) -> bool:
+        if line.kind == 'else':
+            return True
+        if line.kind in ('ifdef', 'ifndef'):
+            name = line.arg.strip()
+            defined = name in self.macros or self._defined(name if name.startswith('$') else f"${name}")
+            return defined if line.kind == 'ifdef' else not defined
+        return truthy(self.evaluate(line.arg))
+
+    # --- Includes ------------------------------------------------------------
+
+    def _resolve(self, name: str) -> Optional[Path]:
+        for directory in [self._dirs[-1]] + self.include_dirs:
+            candidate = (directory / name).resolve()
+            if candidate.is_file():
+                return candidate
+        return None
+
+    def _include(self, kind: str, arg: str, line: _Line, out: List[str]) -> None:
+        if arg.startswith('<') or re.match(r'^https?://', arg):
+            self.unresolved.append(arg)
+            out.append(line.text)
+            return
+
+        name, _, selector = arg.partition('!')
+        path = self._resolve(name)
+        if path is None:
+            if self.missing_includes == 'keep':
+                self.unresolved.append(arg)
+                out.append(line.text)
+                return
+            raise PreprocessorError(f"cannot include file {name}", 1)
+        if path in self._files:
+            chain = ' -> '.join(p.name for p in self._files + [path])
+            raise PreprocessorError(f"circular include: {chain}", 8)
+        if kind == 'include_once' and path in self.included:
+            raise PreprocessorError(f"File already included: {name}", 3)
+
+        program = load_program(path)
+        if kind == 'includesub':
+            if selector not in program.subs:
+                raise PreprocessorError(f"cannot include file {name}: no !startsub {selector}", 1)
+            start, end = program.subs[selector]
+        elif program.diagrams:
+            diagrams = program.diagrams
+            if selector.isdigit():
+                picked = diagrams[int(selector)] if int(selector) < len(diagrams) else None
+            elif selector:
+                picked = next((d for d in diagrams if d[0] == selector), None)
+            else:
+                picked = diagrams[0]
+            if picked is None:
+                raise PreprocessorError(f"cannot include file {name}: no diagram {selector}", 1)
+            _, start, end = picked
+        else:
+            start, end = 0, len(program.lines)
+
+        self.included.append(path)
+        self._files.append(path)
+        self._dirs.append(path.parent)
+        try:
+            self._run(program, start, end, out)
+        finally:
+            self._files.pop()
+            self._dirs.pop()
+
+    def _theme(self, line: _Line, out: List[str]) -> None:
+        match = re.match(r'^(\S+)(?:\s+from\s+(.+))?$', self.substitute(line.arg).strip())
+        if match:
+            file_name = f"puml-theme-{match.group(1)}.puml"
+            path = self._resolve(f"{match.group(2).strip()}/{file_name}" if match.group(2) else file_name)
+            if path:
+                self._include('include_many', str(path), line, out)
+                return
+        out.append(line.text)  # bundled in plantuml.jar
+
+    # --- Macros, variables and calls -----------------------------------------
+
+    def _define(self, name: str, params: Optional[str], body: str) -> None:
+        self.macros[name] = _Macro([p.strip() for p in params.split(',') if p.strip()] if params is not None else None,
+                                   body)
+        self._macro_re = None
+
+    def _declare(self, program: _Program, index: int, line: _Line) -> None:
+        signature, unquoted = line.arg
+        match = CALLABLE_RE.match(signature)
+        if not match:
+            raise PreprocessorError(f"invalid !{line.kind} declaration: {signature}", 6)
+        params = []
+        for param in _split_args(match.group(2)):
+            name, _, default = param.partition('=')
+            params.append((name.strip(), default.strip() if default else None))
+        end = program.ends.get(index, index)
+        self.callables[match.group(1)] = _Callable(match.group(1), line.kind, params, program, index + 1, end,
+                                                   unquoted, match.group(3))
+
+    def _defined(self, name: str) -> bool:
+        return (bool(self._locals) and name in self._locals[-1]) or name in self.globals
+
+    def lookup(self, name: str) -> Any:
+        if self._locals and name in self._locals[-1]:
+            return self._locals[-1][name]
+        if name in self.globals:
+            return self.globals[name]
+        raise PreprocessorError(f"Undefined variable {name}", 5)
+
+    def call(self, name: str, raw_args: str) -> Any:
+        """Call a builtin, function or procedure; procedures return their lines joined."""
+        if name in BUILTINS:
+            args = [self.evaluate(arg) for arg in _split_args(raw_args)]
+            try:
+                return BUILTINS[name](self, *args)
+            except (TypeError, ValueError) as e:
+                raise PreprocessorError(f"invalid arguments to {name}: {e}", 18)
+        target = self.callables[name]
+        if len(self._locals) >= MAX_CALL_DEPTH:
+            raise PreprocessorError(f"stack overflow calling {name}", 8)
+
+        bound: Dict[str, Any] = {}
+        positional = []
+        for arg in _split_args(raw_args):
+            keyword = re.match(r'^(\$\w+)\s*=(?!=)\s*(.*)$', arg)
+            if keyword:
+                bound[keyword.group(1)] = keyword.group(2) if target.unquoted else self.evaluate(keyword.group(2))
+            else:
+                positional.append(arg if target.unquoted else self.evaluate(arg))
+        if len(positional) > len(target.params):
+            raise PreprocessorError(f"{name} takes {len(target.params)} argument(s), got {len(positional)}", 18)
+        for (param, default), value in zip(target.params, positional):
+            bound[param] = value
+        for param, default in target.params:
+            if param not in bound:
+                if default is None:
+                    raise PreprocessorError(f"missing argument {param} for {name}", 18)
+                bound[param] = self.evaluate(default)
+
+        out: List[str] = []
+        self._locals.append(bound)
+        try:
+            if target.inline_return is not None:
+                return self.evaluate(target.inline_return)
+            self._run(target.program, target.start, target.end, out)
+        except _Return as returned:
+            if target.kind == 'procedure':
+                raise PreprocessorError(f"!return in procedure {name}; use !function", 19)
+            return returned.value
+        finally:
+            self._locals.pop()
+        return '\n'.join(out) if target.kind == 'procedure' else ''
+
+    def substitute(self, text: str) -> str:
+        """Replace variables, calls and macros in a text line."""
+        if '$' in text or '%' in text or self.callables:
+            parts, pos = [], 0
+            for match in NAME_RE.finditer(text):
+                if match.start() < pos:
+                    continue
+                name, paren = match.group(1), match.group(2)
+                if paren and (name in self.callables or name in BUILTINS):
+                    close = _matching_paren(text, match.end() - 1)
+                    if close is None:
+                        raise PreprocessorError(f"missing ')' in call to {name}", 18)
+                    parts.append(text[pos:match.start()] + str(self.call(name, text[match.end():close])))
+                    pos = close + 1
+                elif name.startswith('$') and self._defined(name):
+                    parts.append(text[pos:match.start()] + str(self.lookup(name)))
+                    pos = match.end(1)
+            text = ''.join(parts) + text[pos:]
+        return self._apply_macros(text) if self.macros else text
+
+    def _apply_macros(self, text: str) -> str:
+        names = tuple(sorted(self.macros, key=len, reverse=True))
+        if not self._macro_re or self._macro_re[0] != names:
+            self._macro_re = (names, re.compile(r'\b(' + '|'.join(map(re.escape, names)) + r')\b'))
+        pattern = self._macro_re[1]
+
+        for _ in range(MAX_MACRO_PASSES):
+            parts, pos, changed = [], 0, False
+            for match in pattern.finditer(text):
+                if match.start() < pos:
+                    continue
+                macro = self.macros[match.group(1)]
+                if macro.params is None:
+                    parts.append(text[pos:match.start()] + macro.body)
+                    pos, changed = match.end(), True
+                    continue
+                if match.end() >= len(text) or text[match.end()] != '(':
+                    continue
+                close = _matching_paren(text, match.end())
+                if close is None:
+                    raise PreprocessorError(f"missing ')' in macro {match.group(1)}", 18)
+                args = _split_args(text[match.end() + 1:close])
+                if len(args) != len(macro.params):
+                    raise PreprocessorError(
+                        f"macro {match.group(1)} takes {len(macro.params)} argument(s), got {len(args)}", 18)
+                body = macro.body
+                for param, arg in zip(macro.params, args):
+                    body = re.sub(rf'\b{re.escape(param)}\b', lambda _, arg=arg: arg, body)
+                parts.append(text[pos:match.start()] + body)
+                pos, changed = close + 1, True
+            text = ''.join(parts) + text[pos:]
+            if not changed:
+                return text
+        return text
+
+    # --- Expressions ---------------------------------------------------------
+
+    def evaluate(self, expr: str) -> Any:
+        """
+        Evaluate a preprocessor expression to an int or a string.
+
+        JSON values and anything else this parser cannot read raise
+        PreprocessorUnsupported: PlantUML's grammar is wider than this one,
+        so a parse failure here does not mean the diagram is wrong.
+        """
+        tokens = []
+        pos = 0
+        expr = expr.strip()
+        if expr.startswith(('[', '{')):
+            raise PreprocessorUnsupported(f"JSON values are not supported: {expr}")
+        while pos < len(expr):
+            match = TOKEN_RE.match(expr, pos)
+            if not match or match.end() == pos:
+                raise PreprocessorUnsupported(f"cannot parse expression: {expr}")
+            kind = match.lastgroup
+            tokens.append((kind, match.group(kind)))
+            pos = match.end()
+            while pos < len(expr) and expr[pos].isspace():
+                pos += 1
+        if not tokens:
+            return ''
+        parser = _ExpressionParser(self, tokens, expr)
+        value = parser.parse_or()
+        if parser.pos != len(tokens):
+            raise PreprocessorUnsupported(f"cannot parse expression: {expr}")
+        return value
+
+
+class _ExpressionParser:
+    """Recursive-descent parser for `||`, `&&`, comparisons, `+ - * /`, `!` and calls."""
+
+    def __init__(self, preprocessor: Preprocessor, tokens: List[Tuple[str, str]], source: str):
+        self.pp = preprocessor
+        self.tokens = tokens
+        self.source = source
+        self.pos = 0
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos][1] if self.pos < len(self.tokens) else None
+
+    def _take(self) -> Tuple[str, str]:
+        if self.pos >= len(self.tokens):
+            raise PreprocessorUnsupported(f"cannot parse expression: {self.source}")
+        self.pos += 1
+        return self.tokens[self.pos - 1]
+
+    def parse_or(self) -> Any:
+        value = self.parse_and()
+        while self._peek() == '||':
+            self._take()
+            right = self.parse_and()
+            value = int(truthy(value) or truthy(right))
+        return value
+
+    def parse_and(self) -> Any:
+        value = self.parse_comparison()
+        while self._peek() == '&&':
+            self._take()
+            right = self.parse_comparison()
+            value = int(truthy(value) and truthy(right))
+        return value
+
+    def parse_comparison(self) -> Any:
+        value = self.parse_additive()
+        while self._peek() in ('==', '!=', '<', '>', '<=', '>='):
+            op = self._take()[1]
+            right = self.parse_additive()
+            if not (isinstance(value, int) and isinstance(right, int)):
+                value, right = str(value), str(right)
+            value = int({'==': value == right, '!=': value != right, '<': value < right,
+                         '>': value > right, '<=': value <= right, '>=': value >= right}[op])
+        return value
+
+    def parse_additive(self) -> Any:
+        value = self.parse_multiplicative()
+        while self._peek() in ('+', '-'):
+            op = self._take()[1]
+            right = self.parse_multiplicative()
+            if isinstance(value, int) and isinstance(right, int):
+                value = value + right if op == '+' else value - right
+            elif op == '+':
+                value = f"{value}{right}"
+            else:
+                raise PreprocessorError(f"cannot subtract strings: {self.source}", 18)
+        return value
+
+    def parse_multiplicative(self) -> Any:
+        value = self.parse_unary()
+        while self._peek() in ('*', '/'):
+            op = self._take()[1]
+            right = self.parse_unary()
+            if not (isinstance(value, int) and isinstance(right, int)):
+                raise PreprocessorError(f"arithmetic on strings: {self.source}", 18)
+            if op == '/' and right == 0:
+                raise PreprocessorError(f"division by zero: {self.source}", 18)
+            value = value * right if op == '*' else value // right
+        return value
+
+    def parse_unary(self) -> Any:
+        if self._peek() == '!':
+            self._take()
+            return int(not truthy(self.parse_unary()))
+        if self._peek() == '-':
+            self._take()
+            value = self.parse_unary()
+            if not isinstance(value, int):
+                raise PreprocessorError(f"cannot negate a string: {self.source}", 18)
+            return -value
+        return self.parse_primary()
+
+    def parse_primary(self) -> Any:
+        kind, text = self._take()
+        if kind == 'str':
+            return re.sub(r'\\(.)', r'\1', text[1:-1])
+        if kind == 'num':
+            return int(text)
+        if text == '(':
+            value = self.parse_or()
+            if self._take()[1] != ')':
+                raise PreprocessorUnsupported(f"cannot parse expression: {self.source}")
+            return value
+        if kind != 'name':
+            raise PreprocessorUnsupported(f"cannot parse expression: {self.source}")
+
+        if self._peek() == '(':
+            if text not in BUILTINS and text not in self.pp.callables:
+                if text.startswith('%'):
+                    raise PreprocessorUnsupported(f"builtin {text} is not supported")
+                raise PreprocessorError(f"Undefined function {text}", 5)
+            start = self.pos
+            depth = 0
+            while True:
+                token = self._take()[1]
+                depth += token == '('
+                depth -= token == ')'
+                if depth == 0:
+                    break
+            raw_args = self._raw(start + 1, self.pos - 1)
+            return self.pp.call(text, raw_args)
+        if text.startswith('$'):
+            return self.pp.lookup(text)
+        if text in self.pp.macros and self.pp.macros[text].params is None:
+            body = self.pp.macros[text].body
+            try:
+                return self.pp.evaluate(body)
+            except PreprocessorError:
+                return body
+        return text
+
+    def _raw(self, start: int, end: int) -> str:
+        """Re-join tokens [start, end) into source text for argument splitting."""
+        return ' '.join(token for _, token in self.tokens[start:end])
+
+
+def _builtin_substr(_, text, start, length=None):
+    text = str(text)
+    return text[start:] if length is None else text[start:start + length]
+
+
+BUILTINS = {
+    '%strlen': lambda _, text: len(str(text)),
+    '%substr': _builtin_substr,
+    '%strpos': lambda _, text, sub: str(text).find(str(sub)),
+    '%upper': lambda _, text: str(text).upper(),
+    '%lower': lambda _, text: str(text).lower(),
+    '%intval': lambda _, text: int(text),
+    '%string': lambda _, value: str(value),
+    '%true': lambda _: 1,
+    '%false': lambda _: 0,
+    '%not': lambda _, value: int(not truthy(value)),
+    '%boolval': lambda _, value: int(truthy(value)),
+    '%newline': lambda _: '\n',
+    '%chr': lambda _, code: chr(int(code)),
+    '%dec2hex': lambda _, value: format(int(value), 'x'),
+    '%hex2dec': lambda _, value: int(str(value), 16),
+    '%variable_exists': lambda pp, name: int(pp._defined(name if str(name).startswith('$') else f"${name}")),
+    '%function_exists': lambda pp, name: int(name in pp.callables),
+    '%get_variable_value': lambda pp, name: pp.lookup(name) if pp._defined(name) else '',
+    '%set_variable_value': lambda pp, name, value: pp.globals.__setitem__(name, value) or '',
+}
+
+
+def uses_preprocessor(puml_content: str) -> bool:
+    """True if a source contains any preprocessor directive."""
+    return bool(PREPROCESSOR_LINE_RE.search(puml_content))
+
+
+def expand_puml(
+    puml_content: str,
+    base_dir: Optional[Path] = None,
+    include_dirs: Optional[List[Path]] = None,
+    defines: Optional[Dict[str, str]] = None
+) -> str:
+    """
+    Expand a PlantUML source (see Preprocessor).
+
+    Raises:
+        PreprocessorError: for errors PlantUML would also report
+        PreprocessorUnsupported: for features outside the supported subset
+    """
+    return Preprocessor(include_dirs, defines).expand(puml_content, base_dir)
+
+
+def _bench(paths: List[Path], include_dirs: List[Path]) -> None:
+    # Imported lazily: the processor itself builds on the lint that uses this module
+    from process_markdown_puml import extract_embedded_puml_blocks
+
+    files = []
+    for path in paths:
+        files.extend(sorted(p for p in path.rglob('*') if p.suffix in ('.md', '.puml')) if path.is_dir() else [path])
+
+    outcomes = Counter()
+    started = time.perf_counter()
+    for path in files:
+        content = path.read_text(encoding='utf-8', errors='replace')
+        sources = [block for block, _, _ in extract_embedded_puml_blocks(content)] if path.suffix == '.md' \
+            else [content] if '@start' in content else []
+        for source in sources:
+            try:
+                expand_puml(source, path.parent, include_dirs)
+                outcomes['expanded'] += 1
+            except PreprocessorError as e:
+                outcomes['errors'] += 1
+                print(f"  ❌ {path}: {e}")
+            except PreprocessorUnsupported as e:
+                outcomes['unsupported'] += 1
+                print(f"  ⚠️  {path}: {e}")
+    elapsed = time.perf_counter() - started
+
+    total = sum(outcomes.values())
+    print(f"\n⏱️  {total} diagram(s) from {len(files)} file(s) in {elapsed * 1000:.1f} ms "
+          f"({outcomes['expanded']} expanded, {outcomes['errors']} error(s), {outcomes['unsupported']} unsupported)")
+    print(f"📦 Include cache: {CACHE_STATS['hits']} hit(s), {CACHE_STATS['misses']} miss(es)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Expand PlantUML preprocessor directives without a JVM',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    expand = subparsers.add_parser('expand', help='Print the expanded source of a diagram')
+    expand.add_argument('file', help='.puml file')
+    expand.add_argument('-o', '--output', default=None, help='Write to this file instead of stdout')
+
+    bench = subparsers.add_parser('bench', help='Expand every diagram under the given paths and time it')
+    bench.add_argument('paths', nargs='+', help='Markdown/.puml files or directories')
+
+    for sub in (expand, bench):
+        sub.add_argument('-I', '--include-dir', action='append', default=[], help='Extra include directory')
+    expand.add_argument('-D', '--define', action='append', default=[], metavar='NAME=VALUE',
+                        help='Predefine a macro')
+
+    args = parser.parse_args()
+    include_dirs = [Path(d) for d in args.include_dir]
+
+    if args.command == 'bench':
+        missing = [p for p in args.paths if not Path(p).exists()]
+        if missing:
+            print(f"❌ Error: Not found: {missing[0]}", file=sys.stderr)
+            sys.exit(1)
+        _bench([Path(p) for p in args.paths], include_dirs)
+        return
+
+    path = Path(args.file)
+    if not path.exists():
+        print(f"❌ Error: File not found: {path}", file=sys.stderr)
+        sys.exit(1)
+    defines = dict(item.partition('=')[::2] for item in args.define)
+    try:
+        expanded = expand_puml(path.read_text(encoding='utf-8'), path.parent, include_dirs, defines)
+    except PreprocessorError as e:
+        print(f"❌ {e} (see {GUIDE})", file=sys.stderr)
+        sys.exit(1)
+    except PreprocessorUnsupported as e:
+        print(f"⚠️  {e}; use `plantuml -preproc` instead", file=sys.stderr)
+        sys.exit(2)
+
+    if args.output:
+        Path(args.output).write_text(expanded, encoding='utf-8')
+        print(f"✅ Created: {args.output}")
+    else:
+        sys.stdout.write(expanded)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,669 @@
+#!/usr/bin/env python3
+"""
+Live preview server for markdown documents with PlantUML diagrams.
+
+The Performance guide (Error #7, "Real-time Preview Lag") blames slow
+previews on starting a JVM per render and re-rendering every diagram on every
+save. This server does neither:
+
+- Warm renderers: each worker keeps one PlantUML JVM running in `-pipe` mode
+  and feeds it one diagram at a time, so a render costs the layout only.
+- Incremental: the document (and any linked .puml files) is polled for
+  changes; only diagram blocks whose source changed are re-rendered, and
+  renders are cached by content hash, so undoing an edit is instant.
+- Push: the browser holds a Server-Sent Events stream and swaps in the new
+  image of just the changed diagram; edits to the text around the diagrams
+  reload the page, with the diagrams coming from the cache.
+- Cancellation: a render whose source has been edited again is abandoned.
+  Once it has run for longer than CANCEL_AFTER seconds (longer than it takes
+  to start a fresh JVM), its JVM is killed and restarted rather than left to
+  finish a result nobody will see.
+
+With a warm JVM a typical diagram is on screen well under a second after the
+file is saved. Renders are SVG. The page uses the `markdown` package when it
+is installed and a basic built-in converter otherwise. Preview JVMs are
+interactive, so they run outside resource_governor.py's slots and limits.
+
+Usage:
+    python preview_server.py article.md [--port 8765] [--host 127.0.0.1] [--workers 2] [--open]
+
+Examples:
+    # Preview a document, opening it in the browser
+    python preview_server.py docs/architecture.md --open
+
+    # Three warm JVMs for a document with many diagrams
+    python preview_server.py docs/api.md --workers 3
+"""
+
+import argparse
+import html
+import json
+import queue
+import re
+import subprocess
+import sys
+import threading
+import time
+import webbrowser
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import markdown as markdown_lib
+except ImportError:
+    markdown_lib = None
+
+from complexity_estimator import estimate_complexity
+from diagram_names import content_hash
+from perf_config import load_perf_profile
+from process_markdown_puml import extract_embedded_puml_blocks, extract_linked_puml_files, find_plantuml_jar
+
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+
+# Seconds between checks of the document for changes
+POLL_INTERVAL = 0.1
+
+# Seconds a superseded render may keep its JVM before it is killed and restarted
+CANCEL_AFTER = 1.0
+
+# Rendered diagrams kept by content hash
+CACHE_SIZE = 256
+
+# Seconds between keep-alive comments on idle event streams
+HEARTBEAT_INTERVAL = 15
+
+# Seconds a new JVM gets to start and render the warm-up diagram
+STARTUP_TIMEOUT = 60
+
+DELIMITER = '___PLANTUML_PREVIEW_END___'
+WARMUP_DIAGRAM = '@startuml\nAlice -> Bob : warm up\n@enduml\n'
+PLACEHOLDER_PREFIX = 'PUMLPREVIEWSLOT'
+PLACEHOLDER_RE = re.compile(rf'(?:<p>\s*)?{PLACEHOLDER_PREFIX}(\d+)(?:\s*</p>)?')
+LINK_PATH_RE = re.compile(r'\(([^)\s]+\.puml)')
+DIAGRAM_RE = re.compile(r'^[ \t]*@start(\w+)\b.*?^[ \t]*@end\1\b[^\n]*', re.MULTILINE | re.DOTALL)
+
+PENDING_SVG = (b'<svg xmlns="http://www.w3.org/2000/svg" width="160" height="32">'
+               b'<text x="4" y="20" fill="#888" font-family="sans-serif" font-size="14">Rendering...</text></svg>')
+
+
+class WarmRenderer:
+    """One PlantUML JVM in pipe mode, rendering one diagram at a time to SVG."""
+
+    def __init__(self, plantuml_jar: str, heap_mb: Optional[int] = None):
+        self.plantuml_jar = plantuml_jar
+        self.heap_mb = heap_mb
+        self.process: Optional[subprocess.Popen] = None
+        self.outputs: 'queue.Queue[Optional[bytes]]' = queue.Queue()
+        self.restarts = 0
+
+    def start(self) -> Optional[str]:
+        """Start the JVM and render a warm-up diagram; returns an error message on failure."""
+        self.stop()
+        cmd = ['java', '-Djava.awt.headless=true']
+        if self.heap_mb:
+            cmd.append(f'-Xmx{self.heap_mb}m')
+        cmd += ['-jar', self.plantuml_jar, '-pipe', '-tsvg', '-charset', 'UTF-8', '-pipedelimitor', DELIMITER]
+        try:
+            self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                            stderr=subprocess.DEVNULL)
+        except OSError as e:
+            self.process = None
+            return f"Cannot start PlantUML: {e}"
+        self.outputs = queue.Queue()
+        threading.Thread(target=self._read, args=(self.process, self.outputs), daemon=True).start()
+        _, error = self._exchange(WARMUP_DIAGRAM, STARTUP_TIMEOUT, lambda elapsed: False)
+        return error
+
+    @staticmethod
+    def _read(process: subprocess.Popen, outputs: 'queue.Queue[Optional[bytes]]') -> None:
+        """Split the JVM's output into one chunk per diagram; None once it exits."""
+        chunk: List[bytes] = []
+        delimiter = DELIMITER.encode('ascii')
+        for line in process.stdout:
+            if line.rstrip(b'\r\n') == delimiter:
+                outputs.put(b''.join(chunk))
+                chunk = []
+            else:
+                chunk.append(line)
+        outputs.put(None)
+
+    def _exchange(
+        self,
+        source: str,
+        timeout: float,
+        cancel: Callable[[float], bool]
+    ) -> Tuple[Optional[bytes], Optional[str]]:
+        process = self.process
+        try:
+            process.stdin.write(source.rstrip('\n').encode('utf-8') + b'\n')
+            process.stdin.flush()
+        except (OSError, ValueError):
+            self.stop()
+            return None, "PlantUML exited"
+        started = time.monotonic()
+        while True:
+            try:
+                output = self.outputs.get(timeout=0.05)
+            except queue.Empty:
+                elapsed = time.monotonic() - started
+                if elapsed > timeout:
+                    self.stop()
+                    return None, f"Render timed out after {timeout:.0f}s"
+                if cancel(elapsed):
+                    self.stop()
+                    return None, None
+                continue
+            if output is None:
+                self.stop()
+                return None, "PlantUML exited"
+            return output, None
+
+    def render(
+        self,
+        source: str,
+        timeout: float,
+        cancel: Callable[[float], bool]
+    ) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Render one diagram, (re)starting the JVM first if needed.
+
+        Args:
+            source: Diagram source (@startuml ... @enduml)
+            timeout: Seconds before the render is abandoned
+            cancel: Called with the elapsed seconds while waiting; True
+                abandons the render (the JVM is killed and restarted later)
+
+        Returns:
+            Tuple of (svg, error): the SVG (PlantUML draws syntax errors into
+            it), or None with an error message, or (None, None) when cancelled
+        """
+        if self.process is None or self.process.poll() is not None:
+            self.restarts += self.process is not None
+            error = self.start()
+            if error:
+                return None, error
+        return self._exchange(source, timeout, cancel)
+
+    def stop(self) -> None:
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+
+def split_diagrams(source: str) -> List[str]:
+    """
+    The @start...@end blocks of a diagram source, one per diagram.
+
+    A linked .puml file may hold several diagrams, and PlantUML's pipe mode
+    answers each block separately, so every block is rendered (and shown) on
+    its own. A source without a complete block is returned whole.
+    """
+    return [match.group(0) for match in DIAGRAM_RE.finditer(source)] or [source]
+
+
+@dataclass
+class Document:
+    """A markdown document split into its text (with placeholders) and diagram sources."""
+    skeleton: str
+    sources: List[str]
+    linked: List[Path] = field(default_factory=list)
+
+
+def parse_document(markdown_path: Path) -> Document:
+    """Read a document, replacing each embedded or linked diagram with numbered placeholders."""
+    content = markdown_path.read_text(encoding='utf-8')
+    spans = [(start, end, puml) for puml, start, end in extract_embedded_puml_blocks(content)]
+    linked = []
+    for puml, link, start, end in extract_linked_puml_files(content, markdown_path.parent):
+        spans.append((start, end, puml))
+        match = LINK_PATH_RE.search(link)
+        if match:
+            linked.append((markdown_path.parent / match.group(1)).resolve())
+
+    parts, sources, pos = [], [], 0
+    for start, end, puml in sorted(spans):
+        if start < pos:
+            continue  # a link inside an embedded block
+        parts.append(content[pos:start])
+        for diagram in split_diagrams(puml):
+            parts.append(f"\n\n{PLACEHOLDER_PREFIX}{len(sources)}\n\n")
+            sources.append(diagram)
+        pos = end
+    parts.append(content[pos:])
+    return Document(''.join(parts), sources, linked)
+
+
+def _inline(text: str) -> str:
+    text = html.escape(text)
+    text = re.sub(r'`([^`]+)`', r'<code>\1</code>', text)
+    text = re.sub(r'\*\*([^*]+)\*\*', r'<strong>\1</strong>', text)
+    text = re.sub(r'\*([^*]+)\*', r'<em>\1</em>', text)
+    return re.sub(r'\[([^\]]+)\]\(([^)\s]+)\)', r'<a href="\2">\1</a>', text)
+
+
+def basic_markdown(text: str) -> str:
+    """Headings, paragraphs, lists, code blocks and inline code/emphasis/links: enough to preview."""
+    out: List[str] = []
+    paragraph: List[str] = []
+    items: List[str] = []
+    code: Optional[List[str]] = None
+
+    def flush() -> None:
+        if paragraph:
+            out.append(f"<p>{_inline(' '.join(paragraph))}</p>")
+            paragraph.clear()
+        if items:
+            out.append('<ul>' + ''.join(f"<li>{_inline(item)}</li>" for item in items) + '</ul>')
+            items.clear()
+
+    for line in text.splitlines():
+        if code is not None:
+            if line.strip().startswith('```'):
+                out.append(f"<pre><code>{html.escape(chr(10).join(code))}</code></pre>")
+                code = None
+            else:
+                code.append(line)
+            continue
+        stripped = line.strip()
+        heading = re.match(r'(#{1,6})\s+(.*)', stripped)
+        item = re.match(r'[-*+]\s+(.*)', stripped)
+        if stripped.startswith('```'):
+            flush()
+            code = []
+        elif heading:
+            flush()
+            level = len(heading.group(1))
+            out.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+        elif item:
+            if paragraph:
+                flush()
+            items.append(item.group(1))
+        elif not stripped:
+            flush()
+        else:
+            if items:
+                flush()
+            paragraph.append(stripped)
+    flush()
+    if code is not None:
+        out.append(f"<pre><code>{html.escape(chr(10).join(code))}</code></pre>")
+    return '\n'.join(out)
+
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: system-ui, sans-serif; max-width: 60rem; margin: 2rem auto; padding: 0 1rem; line-height: 1.5; }}
+pre {{ background: #f6f8fa; padding: 0.75rem; overflow-x: auto; }}
+figure.diagram {{ margin: 1.5rem 0; transition: opacity 0.15s; }}
+figure.diagram img {{ max-width: 100%; }}
+figure.diagram.pending {{ opacity: 0.5; }}
+figure.diagram figcaption {{ color: #b00020; font-size: 0.85rem; white-space: pre-wrap; }}
+#status {{ position: fixed; top: 0.5rem; right: 0.75rem; font-size: 0.8rem; color: #666; }}
+</style>
+</head>
+<body>
+<div id="status">connecting...</div>
+{body}
+<script>
+const status = document.getElementById('status');
+const events = new EventSource('/events');
+const figure = slot => document.getElementById('d' + slot);
+events.onopen = () => status.textContent = 'live';
+events.onerror = () => status.textContent = 'disconnected, retrying...';
+events.addEventListener('pending', e => {{
+  const f = figure(JSON.parse(e.data).slot);
+  if (f) f.classList.add('pending');
+}});
+events.addEventListener('diagram', e => {{
+  const d = JSON.parse(e.data), f = figure(d.slot);
+  if (!f) return;
+  f.querySelector('img').src = '/diagram/' + d.slot + '.svg?v=' + d.version;
+  f.querySelector('figcaption').textContent = d.error || '';
+  f.classList.remove('pending');
+  status.textContent = 'diagram ' + (d.slot + 1) + ' updated in ' + d.ms + ' ms';
+}});
+events.addEventListener('reload', () => location.reload());
+</script>
+</body>
+</html>
+"""
+
+
+@dataclass
+class Slot:
+    """The current state of one diagram block."""
+    source: str
+    digest: str
+    version: int = 0
+    svg: Optional[bytes] = None
+    error: Optional[str] = None
+    changed_at: float = 0.0
+
+
+class Preview:
+    """Watches one document, renders changed diagrams on warm JVMs and notifies subscribers."""
+
+    def __init__(self, markdown_path: Path, plantuml_jar: str, workers: int = DEFAULT_WORKERS,
+                 heap_mb: Optional[int] = None):
+        self.markdown_path = markdown_path
+        self.document: Optional[Document] = None
+        self.slots: List[Slot] = []
+        self.renderers = [WarmRenderer(plantuml_jar, heap_mb) for _ in range(max(1, workers))]
+        self._lock = threading.Condition()
+        self._pending: 'OrderedDict[int, None]' = OrderedDict()
+        self._inflight: Set[str] = set()
+        self._cache: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._clients: List['queue.Queue[Tuple[str, Dict]]'] = []
+        self._stopped = False
+
+    def start(self) -> None:
+        """Read the document and start the watcher and one worker per renderer."""
+        self.refresh()
+        threading.Thread(target=self._watch, daemon=True).start()
+        for renderer in self.renderers:
+            threading.Thread(target=self._work, args=(renderer,), daemon=True).start()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stopped = True
+            self._lock.notify_all()
+        for renderer in self.renderers:
+            renderer.stop()
+
+    # --- Subscribers ---
+
+    def subscribe(self) -> 'queue.Queue[Tuple[str, Dict]]':
+        client: 'queue.Queue[Tuple[str, Dict]]' = queue.Queue()
+        with self._lock:
+            self._clients.append(client)
+        return client
+
+    def unsubscribe(self, client: 'queue.Queue[Tuple[str, Dict]]') -> None:
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+
+    def _broadcast(self, event: str, data: Dict) -> None:
+        for client in self._clients:
+            client.put((event, data))
+
+    # --- Document changes ---
+
+    def _stamps(self) -> List[Optional[Tuple[int, int]]]:
+        stamps = []
+        for path in [self.markdown_path] + (self.document.linked if self.document else []):
+            try:
+                stat = path.stat()
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamps.append(None)
+        return stamps
+
+    def _watch(self) -> None:
+        stamps = self._stamps()
+        while not self._stopped:
+            time.sleep(POLL_INTERVAL)
+            current = self._stamps()
+            if current != stamps:
+                stamps = current
+                try:
+                    self.refresh()
+                except (OSError, UnicodeDecodeError) as e:
+                    print(f"⚠️  Cannot read {self.markdown_path}: {e}", file=sys.stderr)
+
+    def refresh(self) -> None:
+        """
+        Re-read the document and schedule renders for diagrams whose source changed.
+
+        When only diagram sources changed, subscribers get per-diagram events;
+        when the surrounding text or the number of diagrams changed, they are
+        told to reload the page.
+        """
+        document = parse_document(self.markdown_path)
+        now = time.monotonic()
+        with self._lock:
+            structural = self.document is None or self.document.skeleton != document.skeleton
+            slots = []
+            for number, source in enumerate(document.sources):
+                digest = content_hash(source)
+                previous = self.slots[number] if number < len(self.slots) else None
+                if previous and previous.digest == digest:
+                    slots.append(previous)
+                    continue
+                # Keep showing the previous image until the new one is ready
+                slot = Slot(source, digest, previous.version if previous else 0,
+                            previous.svg if previous else None, None, now)
+                slots.append(slot)
+                cached = self._cache.get(digest)
+                if cached is not None:
+                    self._cache.move_to_end(digest)
+                    slot.svg, slot.version = cached, slot.version + 1
+                    if not structural:
+                        self._broadcast('diagram', self._event(number, slot, now))
+                else:
+                    self._pending[number] = None
+                    self._pending.move_to_end(number)
+                    if not structural:
+                        self._broadcast('pending', {'slot': number})
+            self.slots = slots
+            self.document = document
+            for number in [n for n in self._pending if n >= len(slots)]:
+                del self._pending[number]
+            if structural:
+                self._broadcast('reload', {})
+            self._lock.notify_all()
+
+    @staticmethod
+    def _event(number: int, slot: Slot, finished: float) -> Dict:
+        return {'slot': number, 'version': slot.version, 'error': slot.error,
+                'ms': round((finished - slot.changed_at) * 1000)}
+
+    # --- Rendering ---
+
+    def _wanted(self, digest: str) -> bool:
+        return any(slot.digest == digest for slot in self.slots)
+
+    def _work(self, renderer: WarmRenderer) -> None:
+        # Start the JVM before the first edit, not on it
+        error = renderer.start()
+        if error:
+            print(f"⚠️  {error}", file=sys.stderr)
+        while True:
+            with self._lock:
+                while not self._pending and not self._stopped:
+                    self._lock.wait()
+                if self._stopped:
+                    return
+                number, _ = self._pending.popitem(last=False)
+                slot = self.slots[number]
+                source, digest = slot.source, slot.digest
+                if not DIAGRAM_RE.search(source):
+                    # PlantUML would never answer: it renders only complete blocks
+                    self._apply(digest, None, "No @start... / @end... block")
+                    continue
+                if digest in self._inflight or digest in self._cache:
+                    # Being rendered for another block, or rendered since it was queued
+                    if digest in self._cache:
+                        self._apply(digest, self._cache[digest], None)
+                    continue
+                self._inflight.add(digest)
+
+            svg, error = renderer.render(
+                source,
+                timeout=estimate_complexity(source).timeout,
+                cancel=lambda elapsed: elapsed >= CANCEL_AFTER and not self._wanted(digest)
+            )
+
+            cancelled = svg is None and error is None
+            with self._lock:
+                self._inflight.discard(digest)
+                if svg is not None:
+                    self._cache[digest] = svg
+                    while len(self._cache) > CACHE_SIZE:
+                        self._cache.popitem(last=False)
+                if not cancelled:
+                    self._apply(digest, svg, error)
+            if cancelled:
+                print(f"⏹️  Cancelled an outdated render of diagram {number + 1}")
+                # Warm up the replacement JVM now rather than on the next edit
+                renderer.start()
+
+    def _apply(self, digest: str, svg: Optional[bytes], error: Optional[str]) -> None:
+        """Show a finished render in every block with this source (call with the lock held)."""
+        finished = time.monotonic()
+        for number, slot in enumerate(self.slots):
+            if slot.digest != digest:
+                continue
+            if svg is not None:
+                slot.svg = svg
+            slot.error = error
+            slot.version += 1
+            event = self._event(number, slot, finished)
+            self._broadcast('diagram', event)
+            print(f"🖼️  Diagram {number + 1} {'failed' if error else 'updated'} in {event['ms']} ms"
+                  + (f": {error}" if error else ''))
+
+    # --- Content ---
+
+    def page(self) -> str:
+        """The document as HTML, each diagram an <img> of its current render."""
+        with self._lock:
+            document, slots = self.document, list(self.slots)
+        if markdown_lib is not None:
+            body = markdown_lib.markdown(document.skeleton, extensions=['fenced_code', 'tables'])
+        else:
+            body = basic_markdown(document.skeleton)
+
+        def figure(match: re.Match) -> str:
+            number = int(match.group(1))
+            if number >= len(slots):
+                return ''
+            slot = slots[number]
+            waiting = number in self._pending or (slot.svg is None and not slot.error)
+            pending = ' pending' if waiting else ''
+            caption = html.escape(slot.error or '')
+            return (f'<figure class="diagram{pending}" id="d{number}">'
+                    f'<img src="/diagram/{number}.svg?v={slot.version}" alt="Diagram {number + 1}">'
+                    f'<figcaption>{caption}</figcaption></figure>')
+
+        return PAGE_TEMPLATE.format(title=html.escape(self.markdown_path.name),
+                                    body=PLACEHOLDER_RE.sub(figure, body))
+
+    def diagram(self, number: int) -> Optional[bytes]:
+        """The current SVG of a diagram, a placeholder while it renders, or None if there is no such diagram."""
+        with self._lock:
+            if not 0 <= number < len(self.slots):
+                return None
+            return self.slots[number].svg or PENDING_SVG
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    """Serves the page, diagram SVGs and the event stream of the server's Preview."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        preview: Preview = self.server.preview
+        path = self.path.split('?', 1)[0]
+        if path in ('/', '/index.html'):
+            self._send(200, 'text/html; charset=utf-8', preview.page().encode('utf-8'))
+        elif path == '/events':
+            self._events(preview)
+        else:
+            match = re.fullmatch(r'/diagram/(\d+)\.svg', path)
+            svg = preview.diagram(int(match.group(1))) if match else None
+            if svg is None:
+                self._send(404, 'text/plain', b'Not found')
+            else:
+                self._send(200, 'image/svg+xml', svg)
+
+    def _send(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _events(self, preview: Preview) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        client = preview.subscribe()
+        try:
+            while True:
+                try:
+                    event, data = client.get(timeout=HEARTBEAT_INTERVAL)
+                    self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+                except queue.Empty:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            preview.unsubscribe(client)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Live preview of a markdown document with its PlantUML diagrams',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('markdown_file', help='Markdown file to preview')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Warm PlantUML JVMs (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--open', action='store_true', help='Open the preview in a browser')
+    args = parser.parse_args()
+
+    markdown_path = Path(args.markdown_file)
+    if not markdown_path.is_file():
+        print(f"❌ Error: Markdown file not found: {markdown_path}", file=sys.stderr)
+        sys.exit(1)
+
+    plantuml_jar = find_plantuml_jar()
+    if not plantuml_jar:
+        print("❌ Error: plantuml.jar not found", file=sys.stderr)
+        print("   Place in ~/plantuml.jar or set PLANTUML_JAR env variable", file=sys.stderr)
+        sys.exit(1)
+
+    profile = load_perf_profile()
+    preview = Preview(markdown_path, plantuml_jar, args.workers, profile.heap_mb if profile else None)
+    try:
+        server = ThreadingHTTPServer((args.host, args.port), PreviewHandler)
+    except OSError as e:
+        print(f"❌ Error: Cannot listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        sys.exit(1)
+    server.daemon_threads = True
+    server.preview = preview
+    preview.start()
+
+    url = f"http://{args.host}:{args.port}/"
+    print(f"👀 Previewing {markdown_path} ({len(preview.slots)} diagram(s)) at {url}")
+    print("   Press Ctrl+C to stop")
+    if args.open:
+        webbrowser.open(url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping preview")
+    finally:
+        server.server_close()
+        preview.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -14,7 +14,7 @@ This allows IDEs that support PlantUML to display diagrams during development,
 while generating image-based markdown for publication (e.g., Confluence).
 
 Usage:
-    python process_markdown_puml.py article.md [--format png|svg] [--output-dir images/] [--validate]
+    python process_markdown_puml.py article.md [--format png|svg] [--output-dir images/] [--validate] [--optimize]
 
 Examples:
     # Process embedded and linked diagrams, convert to PNG
@@ -28,6 +28,29 @@ Examples:
 
     # Validate PlantUML syntax without conversion
     python process_markdown_puml.py article.md --validate
+
+    # Shrink published images (lossless PNG recompression, SVG minification)
+    python process_markdown_puml.py article.md --optimize --jobs 4
+
+    # Split huge sequence/activity diagrams into pages, and huge class/component
+    # diagrams into a package overview plus per-package diagrams, rendered in parallel
+    python process_markdown_puml.py article.md --paginate
+
+    # Inline SVGs into the output instead of linking image files
+    python process_markdown_puml.py article.md --format svg --embed
+
+    # Bounded-memory mode for markdown files of hundreds of MB
+    python process_markdown_puml.py api_reference.md --large-input
+
+    # Draw plain json/yaml/mindmap/wbs diagrams without a JVM
+    python process_markdown_puml.py article.md --format svg --native
+
+    # Name images by diagram id/title and content hash, so inserting a diagram
+    # does not rename the ones below it
+    python process_markdown_puml.py article.md --naming stable
+
+    # CI: only markdown affected by changes since the target branch
+    python process_markdown_puml.py docs/ --changed-since origin/main
 """
 
 import argparse
@@ -36,8 +59,37 @@ import re
 import subprocess
 import sys
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
+
+from changed_files import GitError, affected_files, has_diagrams
+from complexity_estimator import estimate_complexity, longest_first
+from decompose_diagram import DECOMPOSABLE_KINDS, DETAIL_INFIX, OVERVIEW_SUFFIX, decompose_diagram
+from diagram_names import stable_name, sync_outputs
+from embed_images import DEFAULT_MAX_PNG_BYTES, ImageEmbedder
+from event_log import EventLog
+from layout_engine import ENGINES, apply_engine, choose_engine, fallback_engine, graph_kind, load_benchmarks
+from native_render import render_native_svg
+from optimize_images import print_optimization_report
+from paginate_diagram import count_units, is_oversized, paginate_diagram
+from perf_config import load_perf_profile
+from puml_lint import lint_message, lint_puml
+from render_history import RenderHistory
+from resilient_processor import ErrorHandler
+from resource_governor import jvm_command, jvm_slot
+from stable_output import OutputWriter
+
+# Fallback validation timeout (seconds) for diagrams without render history
+VALIDATE_TIMEOUT = 10
+
+# Machine-specific defaults measured by `check_setup.py --profile`
+PERF_PROFILE = load_perf_profile()
+
+# Best layout engine per diagram kind and size (`layout_engine.py benchmark --save`)
+LAYOUT_BENCHMARKS = load_benchmarks()
 
 
 def find_plantuml_jar() -> Optional[str]:
@@ -60,26 +112,51 @@ def find_plantuml_jar() -> Optional[str]:
     return None
 
 
-def validate_puml_syntax(puml_content: str, plantuml_jar: str) -> Tuple[bool, str]:
+def validate_puml_syntax(
+    puml_content: str,
+    plantuml_jar: str,
+    history: Optional[RenderHistory] = None,
+    lint: bool = True
+) -> Tuple[bool, str]:
     """
     Validate PlantUML syntax without generating output.
 
+    With lint set, structural mistakes caught by puml_lint fail the diagram
+    without starting a JVM. When a RenderHistory is given, the timeout is
+    learned from previous validations of the same diagram and this run's
+    duration is recorded.
+
     Returns:
         Tuple of (is_valid, error_message)
     """
+    if lint:
+        findings = lint_puml(puml_content)
+        if findings:
+            return False, lint_message(findings)
+
+    timeout = VALIDATE_TIMEOUT
+    if history:
+        timeout = history.timeout_for(puml_content, 'validate', fallback=VALIDATE_TIMEOUT)
+
     with tempfile.NamedTemporaryFile(mode='w', suffix='.puml', delete=False) as tmp:
         tmp.write(puml_content)
         tmp_path = tmp.name
 
+    started = time.monotonic()
     try:
-        result = subprocess.run(
-            ['java', '-jar', plantuml_jar, '-syntax', tmp_path],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
+        with jvm_slot() as prefix:
+            started = time.monotonic()
+            result = subprocess.run(
+                prefix + jvm_command(['java', '-jar', plantuml_jar, '-syntax', tmp_path]),
+                capture_output=True,
+                text=True,
+                timeout=timeout
+            )
 
         os.unlink(tmp_path)
+        if history:
+            history.record(puml_content, 'validate', time.monotonic() - started,
+                           result.returncode == 0, timeout)
 
         # PlantUML returns 0 for valid syntax
         if result.returncode == 0:
@@ -89,6 +166,8 @@ def validate_puml_syntax(puml_content: str, plantuml_jar: str) -> Tuple[bool, st
 
     except subprocess.TimeoutExpired:
         os.unlink(tmp_path)
+        if history:
+            history.record(puml_content, 'validate', time.monotonic() - started, False, timeout)
         return False, "Validation timeout"
     except Exception as e:
         if os.path.exists(tmp_path):
@@ -96,19 +175,61 @@ def validate_puml_syntax(puml_content: str, plantuml_jar: str) -> Tuple[bool, st
         return False, f"Validation error: {str(e)}"
 
 
-def convert_puml_to_image(puml_content: str, output_path: str, image_format: str, plantuml_jar: str) -> bool:
+def convert_puml_to_image(
+    puml_content: str,
+    output_path: str,
+    image_format: str,
+    plantuml_jar: str,
+    timeout: int = 30,
+    heap_mb: Optional[int] = None,
+    history: Optional[RenderHistory] = None,
+    layout: Optional[str] = 'auto',
+    native: bool = False,
+    writer: Optional[OutputWriter] = None
+) -> bool:
     """
     Convert PlantUML content to image file.
 
+    The image is normalized (stable_output) and written only if its bytes
+    changed, so re-rendering an unchanged diagram keeps the file's mtime.
+
     Args:
         puml_content: PlantUML diagram source
         output_path: Path for output image (without extension)
         image_format: 'png' or 'svg'
         plantuml_jar: Path to plantuml.jar
+        timeout: Seconds before the render is abandoned (the fallback when
+            history is given and knows this diagram)
+        heap_mb: JVM maximum heap (-Xmx) in MB, or None for the JVM default;
+            capped at the machine profile's heap (check_setup.py --profile)
+        history: Optional RenderHistory used to learn the timeout and record this run
+        layout: 'auto' to choose the layout engine by diagram kind and size,
+            an engine name to force it, or None to render the source as written.
+            Unless None, a Graphviz crash is retried with the next engine.
+        native: Render json/yaml/mindmap/wbs SVGs in Python (native_render),
+            using PlantUML only for diagrams it declines
+        writer: OutputWriter that writes the image and counts written vs
+            unchanged files (default: a private one, no optimization)
 
     Returns:
         True if conversion successful
     """
+    writer = writer or OutputWriter()
+
+    if native and image_format == 'svg':
+        svg = render_native_svg(puml_content)
+        if svg is not None:
+            writer.write_render(f"{output_path}.svg", svg.encode('utf-8'))
+            return True
+
+    if layout == 'auto':
+        puml_content = apply_engine(puml_content, choose_engine(puml_content, LAYOUT_BENCHMARKS))
+    elif layout in ENGINES:
+        puml_content = apply_engine(puml_content, layout)
+
+    if history:
+        timeout = history.timeout_for(puml_content, 'render', fallback=timeout)
+
     # Create temporary .puml file
     with tempfile.NamedTemporaryFile(mode='w', suffix='.puml', delete=False) as tmp:
         tmp.write(puml_content)
@@ -116,7 +237,12 @@ def convert_puml_to_image(puml_content: str, output_path: str, image_format: str
 
     try:
         # Build command
-        cmd = ['java', '-jar', plantuml_jar]
+        cmd = ['java']
+        if heap_mb:
+            if PERF_PROFILE:
+                heap_mb = min(heap_mb, PERF_PROFILE.heap_mb)
+            cmd.append(f'-Xmx{heap_mb}m')
+        cmd.extend(['-jar', plantuml_jar])
         if image_format == 'svg':
             cmd.append('-tsvg')
         else:
@@ -124,30 +250,48 @@ def convert_puml_to_image(puml_content: str, output_path: str, image_format: str
 
         cmd.extend(['-o', os.path.dirname(output_path), tmp_path])
 
-        # Run PlantUML
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        # Run PlantUML once the governor has a JVM slot free
+        started = time.monotonic()
+        with jvm_slot(heap_mb) as prefix:
+            started = time.monotonic()
+            result = subprocess.run(
+                prefix + jvm_command(cmd),
+                capture_output=True,
+                text=True,
+                timeout=timeout
+            )
 
         # PlantUML generates output with the temp filename
         tmp_output = tmp_path.replace('.puml', f'.{image_format}')
         expected_output = f"{output_path}.{image_format}"
 
-        # Move to desired location
+        if history:
+            history.record(puml_content, 'render', time.monotonic() - started,
+                           os.path.exists(tmp_output), timeout, source=expected_output)
+
+        # Move to desired location, unless the file there already has these bytes
         if os.path.exists(tmp_output):
-            os.rename(tmp_output, expected_output)
+            with open(tmp_output, 'rb') as f:
+                writer.write_render(expected_output, f.read())
+            os.unlink(tmp_output)
             os.unlink(tmp_path)
             return True
         else:
-            print(f"❌ Conversion failed: {result.stderr}", file=sys.stderr)
             os.unlink(tmp_path)
+            next_engine = fallback_engine(puml_content) if layout else None
+            if next_engine and ErrorHandler().is_layout_crash(result.stderr):
+                print(f"⚠️  Graphviz crashed on {os.path.basename(output_path)}, "
+                      f"retrying with layout {next_engine}", file=sys.stderr)
+                return convert_puml_to_image(puml_content, output_path, image_format, plantuml_jar,
+                                             timeout, heap_mb, history, layout=next_engine, writer=writer)
+            print(f"❌ Conversion failed: {result.stderr}", file=sys.stderr)
             return False
 
     except subprocess.TimeoutExpired:
-        print(f"❌ Conversion timeout for {output_path}", file=sys.stderr)
+        print(f"❌ Conversion timeout for {output_path} after {timeout}s", file=sys.stderr)
+        if history:
+            history.record(puml_content, 'render', time.monotonic() - started, False, timeout,
+                           source=f"{output_path}.{image_format}")
         if os.path.exists(tmp_path):
             os.unlink(tmp_path)
         return False
@@ -158,6 +302,94 @@ def convert_puml_to_image(puml_content: str, output_path: str, image_format: str
         return False
 
 
+def validate_pages(
+    pages: List[str],
+    plantuml_jar: str,
+    jobs: Optional[int] = None,
+    history: Optional[RenderHistory] = None,
+    lint: bool = True
+) -> Tuple[bool, str]:
+    """
+    Validate one or more page diagrams, in parallel when there are several.
+
+    Returns:
+        Tuple of (all_valid, first_error_message)
+    """
+    if len(pages) == 1:
+        return validate_puml_syntax(pages[0], plantuml_jar, history, lint)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs or os.cpu_count() or 1)) as pool:
+        results = list(pool.map(lambda page: validate_puml_syntax(page, plantuml_jar, history, lint), pages))
+
+    for num, (is_valid, error_msg) in enumerate(results, 1):
+        if not is_valid:
+            return False, f"page {num}: {error_msg}"
+    return True, "Syntax OK"
+
+
+def render_pages(
+    pages: List[str],
+    output_dir: Path,
+    base_name: str,
+    image_format: str,
+    plantuml_jar: str,
+    jobs: Optional[int] = None,
+    history: Optional[RenderHistory] = None,
+    layout: Optional[str] = 'auto',
+    writer: Optional[OutputWriter] = None,
+    names: Optional[List[str]] = None
+) -> Optional[List[str]]:
+    """
+    Render page diagrams in parallel as <base_name>_p1, <base_name>_p2, ...
+
+    names overrides the output names, one per page (e.g. for decomposed diagrams).
+
+    Returns:
+        Output names (without extension) in page order, or None if any page failed
+    """
+    names = names or [f"{base_name}_p{num}" for num in range(1, len(pages) + 1)]
+
+    def render(item: Tuple[str, str]) -> bool:
+        page, name = item
+        estimate = estimate_complexity(page)
+        return convert_puml_to_image(
+            page, str(output_dir / name), image_format, plantuml_jar,
+            timeout=estimate.timeout, heap_mb=estimate.heap_mb, history=history, layout=layout,
+            writer=writer
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs or os.cpu_count() or 1)) as pool:
+        results = list(pool.map(render, longest_first(list(zip(pages, names)), lambda item: item[0])))
+
+    return names if all(results) else None
+
+
+def split_diagram(puml_content: str, force: bool = False) -> List[Tuple[str, str]]:
+    """
+    Split a diagram into parts that render independently.
+
+    Class/component diagrams spread over packages become a package overview
+    plus one diagram per package (decompose_diagram); sequence/activity
+    diagrams become pages (paginate_diagram). Only oversized diagrams are
+    split unless force is set, as after a failed whole-diagram render; then
+    a diagram within the page budget is still split, in halves.
+
+    Returns:
+        (name_suffix, source) pairs; a single ('', puml_content) pair when the
+        diagram stays whole
+    """
+    if graph_kind(puml_content) in DECOMPOSABLE_KINDS:
+        return decompose_diagram(puml_content, max_elements=1 if force else None)
+    if force or is_oversized(puml_content):
+        max_units = None
+        if force and not is_oversized(puml_content):
+            max_units = max(1, (count_units(puml_content) + 1) // 2)
+        pages = paginate_diagram(puml_content, max_units)
+        if len(pages) > 1:
+            return [(f"_p{num}", page) for num, page in enumerate(pages, 1)]
+    return [('', puml_content)]
+
+
 def extract_embedded_puml_blocks(content: str) -> List[Tuple[str, int, int]]:
     """
     Extract embedded ```puml code blocks from markdown.
@@ -209,16 +441,277 @@ def detect_diagram_type(puml_content: str) -> str:
     return 'uml'
 
 
+def output_name(idx: int, puml_content: str, naming: str = 'index') -> str:
+    """
+    Image name (without extension) for a diagram.
+
+    Args:
+        idx: Position of the diagram in the document's processing order
+        puml_content: Diagram source
+        naming: 'index' for diagram_<idx>_<type>, or 'stable' for a name
+            derived from the diagram's id or title and its content hash
+            (see diagram_names.py)
+    """
+    diagram_type = detect_diagram_type(puml_content)
+    if naming == 'stable':
+        return stable_name(puml_content, diagram_type)
+    return f"diagram_{idx}_{diagram_type}"
+
+
+def record_outputs(
+    output_dir: Path,
+    document: str,
+    outcomes: Dict[int, Tuple[str, Optional[List[str]]]],
+    image_format: str
+) -> None:
+    """
+    Record a document's images and delete those of its previous run it no longer produces.
+
+    Nothing is deleted when a diagram failed (see diagram_names.sync_outputs).
+    """
+    files = [f"{name}.{image_format}" for _, names in outcomes.values() for name in names or []]
+    complete = all(status == 'converted' for status, _ in outcomes.values())
+    removed = sync_outputs(output_dir, document, files, complete)
+    if removed:
+        print(f"🧹 Removed {len(removed)} orphaned image(s) from earlier runs")
+
+
+@dataclass
+class RenderSettings:
+    """Options shared by every diagram render in one processing run."""
+    output_dir: Path
+    image_format: str
+    plantuml_jar: str
+    validate_only: bool = False
+    paginate: bool = False
+    jobs: Optional[int] = None
+    history: Optional[RenderHistory] = None
+    embedder: Optional[ImageEmbedder] = None
+    layout: Optional[str] = 'auto'
+    event_log: Optional[EventLog] = None
+    lint: bool = True
+    native: bool = False
+    writer: Optional[OutputWriter] = None
+    naming: str = 'index'
+
+
+def render_diagram(idx: int, puml_content: str, settings: RenderSettings) -> Tuple[str, Optional[List[str]]]:
+    """
+    Validate and render one diagram.
+
+    Returns:
+        Tuple of (status, output_names) where status is 'invalid', 'valid'
+        (validate-only), 'failed' or 'converted', and output_names lists the
+        image names (without extension) written for a converted diagram
+    """
+    diagram_type = detect_diagram_type(puml_content)
+    plantuml_jar = settings.plantuml_jar
+
+    # Oversized diagrams skip the whole-diagram JVM passes and go straight to parts
+    parts = split_diagram(puml_content) if settings.paginate else [('', puml_content)]
+    if len(parts) > 1 and parts[0][0] == OVERVIEW_SUFFIX:
+        print(f"📄 Diagram {idx} is oversized - split into an overview and {len(parts) - 1} package diagrams")
+    elif len(parts) > 1:
+        print(f"📄 Diagram {idx} is oversized - split into {len(parts)} pages")
+    pages = [source for _, source in parts]
+
+    # Diagrams native_render accepts never start a JVM: lint is their only syntax check
+    native_svg = None
+    if settings.native and settings.image_format == 'svg' and len(pages) == 1:
+        native_svg = render_native_svg(puml_content)
+
+    # Validate syntax
+    if native_svg is not None:
+        findings = lint_puml(puml_content) if settings.lint else []
+        is_valid, error_msg = (False, lint_message(findings)) if findings else (True, "Syntax OK")
+    else:
+        is_valid, error_msg = validate_pages(pages, plantuml_jar, settings.jobs, settings.history, settings.lint)
+
+    if not is_valid:
+        print(f"❌ Diagram {idx} - Syntax error: {error_msg}", file=sys.stderr)
+        resolution = ErrorHandler().handle_error(error_msg, puml_content, diagram_type)
+        if resolution.suggested_fix:
+            print(f"   💡 {resolution.suggested_fix}", file=sys.stderr)
+        if settings.event_log:
+            settings.event_log.write('error', diagram=output_name(idx, puml_content, settings.naming),
+                                     error=error_msg[:200],
+                                     guide=resolution.guide_loaded, error_number=resolution.error_number,
+                                     sections=[str(section) for section in resolution.guide_sections],
+                                     resolved=False)
+        return 'invalid', None
+    else:
+        print(f"✅ Diagram {idx} - Syntax valid ({diagram_type})")
+
+    if settings.validate_only:
+        return 'valid', None
+
+    # Generate output filename
+    name = output_name(idx, puml_content, settings.naming)
+    output_path = settings.output_dir / name
+
+    # Convert to image with a timeout and heap sized to the diagram
+    output_names = None
+    if native_svg is not None:
+        (settings.writer or OutputWriter()).write_render(f"{output_path}.svg", native_svg.encode('utf-8'))
+        output_names = [name]
+    elif len(pages) == 1:
+        estimate = estimate_complexity(puml_content)
+        success = convert_puml_to_image(
+            puml_content,
+            str(output_path),
+            settings.image_format,
+            plantuml_jar,
+            timeout=estimate.timeout,
+            heap_mb=estimate.heap_mb,
+            history=settings.history,
+            layout=settings.layout,
+            native=settings.native,
+            writer=settings.writer
+        )
+        if success:
+            output_names = [name]
+
+    # A failed single render gets one more chance as separate parts
+    if output_names is None and settings.paginate:
+        if len(parts) == 1:
+            parts = split_diagram(puml_content, force=True)
+        if len(parts) > 1:
+            output_names = render_pages([source for _, source in parts], settings.output_dir, name,
+                                        settings.image_format, plantuml_jar, settings.jobs, settings.history,
+                                        settings.layout, settings.writer,
+                                        names=[name + suffix for suffix, _ in parts])
+
+    if output_names is None:
+        print(f"❌ Failed to convert diagram {idx}", file=sys.stderr)
+        return 'failed', None
+
+    return 'converted', output_names
+
+
+def schedule_renders(
+    diagrams: List[Tuple[int, Callable[[], str]]],
+    settings: RenderSettings
+) -> Dict[int, Tuple[str, Optional[List[str]]]]:
+    """
+    Render numbered diagrams on a worker pool, most expensive first.
+
+    Each diagram is given as (idx, load_content) so callers can keep sources
+    out of memory until a worker picks them up.
+
+    Returns:
+        Mapping of idx to the (status, output_names) from render_diagram
+    """
+    # Start the most expensive diagrams first so one heavy render cannot trail the batch
+    ordered = longest_first(diagrams, lambda item: item[1]())
+    with ThreadPoolExecutor(max_workers=max(1, settings.jobs or os.cpu_count() or 1)) as pool:
+        futures = {
+            idx: pool.submit(lambda idx=idx, load=load: _logged_render(idx, load(), settings))
+            for idx, load in ordered
+        }
+        return {idx: future.result() for idx, future in futures.items()}
+
+
+def _logged_render(idx: int, puml_content: str, settings: RenderSettings) -> Tuple[str, Optional[List[str]]]:
+    """render_diagram, recording a render metric event when a log is configured."""
+    started = time.monotonic()
+    status, output_names = render_diagram(idx, puml_content, settings)
+    if settings.event_log and status != 'valid':
+        settings.event_log.write(
+            'render',
+            diagram=output_name(idx, puml_content, settings.naming),
+            diagram_type=detect_diagram_type(puml_content),
+            duration=round(time.monotonic() - started, 3),
+            pages=len(output_names or []),
+            success=status == 'converted'
+        )
+    return status, output_names
+
+
+def image_links(idx: int, output_names: List[str], settings: RenderSettings) -> str:
+    """
+    Build the markdown that replaces a converted diagram.
+
+    Normally one image link per output; with an embedder, inline SVG or data
+    URIs instead. A decomposed diagram shows its overview, followed by a list
+    of links to the per-package diagrams. Call in document order so shared
+    SVG defs stay in the first diagram that uses them.
+    """
+    details = []
+    if len(output_names) > 1 and output_names[0].endswith(OVERVIEW_SUFFIX):
+        output_names, details = output_names[:1], output_names[1:]
+
+    links = []
+    for name in output_names:
+        relative_image_path = f"{settings.output_dir.name}/{name}.{settings.image_format}"
+        inline = None
+        if settings.embedder:
+            image_path = settings.output_dir / f"{name}.{settings.image_format}"
+            inline = settings.embedder.markdown_for(image_path, name)
+        if inline:
+            links.append(inline)
+            print(f"✅ Converted diagram {idx} → embedded {name}")
+        else:
+            links.append(f"![{name}]({relative_image_path})")
+            print(f"✅ Converted diagram {idx} → {relative_image_path}")
+
+    if details:
+        prefix = output_names[0][:-len(OVERVIEW_SUFFIX)] + DETAIL_INFIX
+        items = [f"- [{name[len(prefix):]}]({settings.output_dir.name}/{name}.{settings.image_format})"
+                 for name in details]
+        links.append("Package details:\n\n" + '\n'.join(items))
+        print(f"✅ Converted diagram {idx} → {len(details)} package diagrams")
+    return '\n\n'.join(links)
+
+
 def process_markdown(
     markdown_path: Path,
     output_dir: Path,
     image_format: str,
     plantuml_jar: str,
-    validate_only: bool = False
+    validate_only: bool = False,
+    optimize: bool = False,
+    jobs: Optional[int] = None,
+    paginate: bool = False,
+    history: Optional[RenderHistory] = None,
+    embedder: Optional[ImageEmbedder] = None,
+    layout: Optional[str] = 'auto',
+    event_log: Optional[EventLog] = None,
+    lint: bool = True,
+    native: bool = False,
+    writer: Optional[OutputWriter] = None,
+    naming: str = 'index'
 ) -> Tuple[str, int, int]:
     """
     Process markdown file, converting all PlantUML diagrams to images.
 
+    Diagrams are rendered on a pool of `jobs` threads, most expensive first
+    according to complexity_estimator, each with its own timeout and heap.
+    With a RenderHistory, timeouts are learned from previous runs instead.
+
+    Images are normalized and only written when their bytes changed; pass a
+    writer to read the written/unchanged counts afterwards. When optimize is
+    set, images are recompressed/minified in memory before that comparison.
+
+    When paginate is set, oversized diagrams (and diagrams whose single
+    render fails) are split into parts that render in parallel: sequence and
+    activity diagrams into pages, replaced by one image link per page; class
+    and component diagrams into a package overview, replaced by the overview
+    image followed by links to the per-package diagrams.
+
+    When an embedder is given, images are inlined (SVG markup or PNG data
+    URIs) instead of linked.
+
+    layout selects the Graphviz layout engine per diagram (see
+    convert_puml_to_image). With an event_log, per-diagram render metrics and
+    syntax errors are appended to it as they happen. Unless lint is turned
+    off, diagrams failing puml_lint are reported without starting a JVM.
+    With native set, SVGs of plain json/yaml/mindmap/wbs diagrams are drawn
+    in Python (native_render) instead of by PlantUML.
+
+    naming selects the image names (see output_name). Images the previous
+    run of this document wrote but this one did not are deleted, unless a
+    diagram failed.
+
     Returns:
         Tuple of (new_markdown_content, diagrams_processed, validation_errors)
     """
@@ -258,53 +751,36 @@ def process_markdown(
 
     if not all_diagrams:
         print("ℹ️  No PlantUML diagrams found (embedded or linked)")
+        if not validate_only:
+            record_outputs(output_dir, markdown_path.stem, {}, image_format)
         return content, 0, 0
 
     print(f"📊 Found {len(all_diagrams)} PlantUML diagram(s)")
 
-    validation_errors = 0
-    diagrams_processed = 0
-
-    # Process each diagram
-    for idx, diagram in enumerate(all_diagrams, 1):
-        puml_content = diagram['content']
-        diagram_type = detect_diagram_type(puml_content)
-
-        # Validate syntax
-        is_valid, error_msg = validate_puml_syntax(puml_content, plantuml_jar)
-
-        if not is_valid:
-            print(f"❌ Diagram {idx} - Syntax error: {error_msg}", file=sys.stderr)
-            validation_errors += 1
-            continue
-        else:
-            print(f"✅ Diagram {idx} - Syntax valid ({diagram_type})")
-
-        if validate_only:
-            continue
+    writer = writer or OutputWriter()
+    writer.optimize = writer.optimize or optimize
+    settings = RenderSettings(output_dir, image_format, plantuml_jar, validate_only, paginate, jobs, history,
+                              embedder, layout, event_log, lint, native, writer, naming)
+    numbered = list(enumerate(all_diagrams, 1))
+    outcomes = schedule_renders(
+        [(idx, lambda diagram=diagram: diagram['content']) for idx, diagram in numbered],
+        settings
+    )
 
-        # Generate output filename
-        output_name = f"diagram_{idx}_{diagram_type}"
-        output_path = output_dir / output_name
+    validation_errors = sum(1 for status, _ in outcomes.values() if status == 'invalid')
+    converted = [(idx, diagram) for idx, diagram in numbered if outcomes[idx][1]]
+    if not validate_only:
+        record_outputs(output_dir, markdown_path.stem, outcomes, image_format)
 
-        # Convert to image
-        success = convert_puml_to_image(
-            puml_content,
-            str(output_path),
-            image_format,
-            plantuml_jar
-        )
+    if writer.optimize and writer.optimization:
+        print_optimization_report(writer.optimization)
 
-        if success:
-            # Replace in content (working backwards)
-            relative_image_path = f"{output_dir.name}/{output_name}.{image_format}"
-            image_link = f"![{output_name}]({relative_image_path})"
+    # Build replacements in document order, then splice them in working backwards
+    replacements = {idx: image_links(idx, outcomes[idx][1], settings) for idx, _ in reversed(converted)}
+    for idx, diagram in converted:
+        content = content[:diagram['start']] + replacements[idx] + content[diagram['end']:]
 
-            content = content[:diagram['start']] + image_link + content[diagram['end']:]
-            diagrams_processed += 1
-            print(f"✅ Converted diagram {idx} → {relative_image_path}")
-        else:
-            print(f"❌ Failed to convert diagram {idx}", file=sys.stderr)
+    diagrams_processed = len(converted)
 
     return content, diagrams_processed, validation_errors
 
@@ -315,7 +791,7 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog=__doc__
     )
-    parser.add_argument('markdown_file', type=str, help='Markdown file to process')
+    parser.add_argument('markdown_file', type=str, nargs='?', help='Markdown file to process')
     parser.add_argument(
         '--format',
         choices=['png', 'svg'],
@@ -333,14 +809,110 @@ def main():
         action='store_true',
         help='Validate PlantUML syntax without converting'
     )
+    parser.add_argument(
+        '--optimize',
+        action='store_true',
+        help='Losslessly recompress PNGs / minify SVGs after rendering'
+    )
+    parser.add_argument(
+        '--paginate',
+        action='store_true',
+        help='Split oversized or failing diagrams: sequence/activity into pages, '
+             'class/component into a package overview plus per-package diagrams'
+    )
+    parser.add_argument(
+        '--embed',
+        action='store_true',
+        help='Inline SVGs / small PNGs (as data URIs) instead of linking image files'
+    )
+    parser.add_argument(
+        '--embed-max-bytes',
+        type=int,
+        default=DEFAULT_MAX_PNG_BYTES,
+        help=f'Largest PNG to inline with --embed (default: {DEFAULT_MAX_PNG_BYTES})'
+    )
+    parser.add_argument(
+        '--large-input',
+        action='store_true',
+        help='Memory-map the markdown and stream the output (for very large files)'
+    )
+    parser.add_argument(
+        '--no-history',
+        action='store_true',
+        help='Do not learn timeouts from (or record to) the render history database'
+    )
+    parser.add_argument(
+        '--native',
+        action='store_true',
+        help='SVG only: draw plain json/yaml/mindmap/wbs diagrams in Python, PlantUML for the rest'
+    )
+    parser.add_argument(
+        '--no-lint',
+        action='store_true',
+        help='Skip the pure-Python lint pass and leave all syntax checking to PlantUML'
+    )
+    parser.add_argument(
+        '--naming',
+        choices=['index', 'stable'],
+        default='index',
+        help='Image names: index (diagram_<n>_<type>, default) or stable '
+             '(<id or title>_<content hash>, unaffected by inserting or reordering diagrams)'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=None,
+        help='Worker threads for parallel stages (default: profiled concurrency, else CPU count)'
+    )
+
+    parser.add_argument(
+        '--layout',
+        choices=['auto', 'keep'] + list(ENGINES),
+        default='auto',
+        help='Graphviz layout engine: auto (by diagram size and benchmarks, default), '
+             'keep (as written, no crash fallback) or a fixed engine'
+    )
+    parser.add_argument(
+        '--log',
+        metavar='PATH',
+        default=None,
+        help='Append render metrics and errors to this JSONL log (see event_log.py report)'
+    )
+    parser.add_argument(
+        '--changed-since',
+        metavar='GIT_REF',
+        default=None,
+        help='Process only markdown affected by changes since GIT_REF; '
+             'markdown_file is then a root directory (default: .)'
+    )
 
     args = parser.parse_args()
 
+    if args.jobs is None and PERF_PROFILE:
+        args.jobs = PERF_PROFILE.jobs
+
+    if args.changed_since:
+        root = Path(args.markdown_file or '.')
+        try:
+            markdown_files, _ = affected_files(args.changed_since, root)
+            markdown_files = [path for path in markdown_files if has_diagrams(path)]
+        except GitError as e:
+            print(f"❌ Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        if not markdown_files:
+            print(f"✅ No markdown affected by changes since {args.changed_since}")
+            return
+        print(f"🔀 {len(markdown_files)} markdown file(s) affected since {args.changed_since}")
+    elif args.markdown_file:
+        markdown_files = [Path(args.markdown_file)]
+    else:
+        parser.error('markdown_file is required unless --changed-since is given')
+
     # Check inputs
-    markdown_path = Path(args.markdown_file)
-    if not markdown_path.exists():
-        print(f"❌ Error: Markdown file not found: {args.markdown_file}", file=sys.stderr)
-        sys.exit(1)
+    for markdown_path in markdown_files:
+        if not markdown_path.exists():
+            print(f"❌ Error: Markdown file not found: {markdown_path}", file=sys.stderr)
+            sys.exit(1)
 
     # Find plantuml.jar
     plantuml_jar = find_plantuml_jar()
@@ -350,6 +922,26 @@ def main():
         print("   Place in ~/plantuml.jar or set PLANTUML_JAR env variable", file=sys.stderr)
         sys.exit(1)
 
+    history = None if args.no_history else RenderHistory()
+
+    failed = [path for path in markdown_files
+              if not process_markdown_file(path, args, plantuml_jar, history)]
+    if failed:
+        sys.exit(1)
+
+
+def process_markdown_file(
+    markdown_path: Path,
+    args: argparse.Namespace,
+    plantuml_jar: str,
+    history: Optional[RenderHistory]
+) -> bool:
+    """
+    Process one markdown file as configured on the command line.
+
+    Returns:
+        True on success (diagrams converted, or all valid in validation mode)
+    """
     print(f"📄 Processing: {markdown_path}")
     print(f"🔧 PlantUML: {plantuml_jar}")
 
@@ -358,36 +950,63 @@ def main():
 
     output_dir = markdown_path.parent / args.output_dir
 
+    embedder = ImageEmbedder(args.embed_max_bytes) if args.embed else None
+    layout = None if args.layout == 'keep' else args.layout
+    event_log = EventLog(Path(args.log)) if args.log else None
+    writer = OutputWriter(args.optimize)
+    output_path = markdown_path.with_stem(f"{markdown_path.stem}_with_images")
+
     # Process markdown
-    new_content, processed, errors = process_markdown(
-        markdown_path,
-        output_dir,
-        args.format,
-        plantuml_jar,
-        args.validate
-    )
+    if args.large_input:
+        # Streams the output itself; imported lazily as it builds on this module
+        from large_markdown import process_markdown_large
+
+        settings = RenderSettings(output_dir, args.format, plantuml_jar, args.validate,
+                                  args.paginate, args.jobs, history, embedder, layout, event_log,
+                                  not args.no_lint, args.native, writer, args.naming)
+        processed, errors = process_markdown_large(markdown_path, output_path, settings)
+    else:
+        new_content, processed, errors = process_markdown(
+            markdown_path,
+            output_dir,
+            args.format,
+            plantuml_jar,
+            args.validate,
+            args.optimize,
+            args.jobs,
+            args.paginate,
+            history,
+            embedder,
+            layout,
+            event_log,
+            not args.no_lint,
+            args.native,
+            writer,
+            args.naming
+        )
 
     # Save result
     if not args.validate and processed > 0:
-        output_path = markdown_path.with_stem(f"{markdown_path.stem}_with_images")
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
+        if not args.large_input:
+            writer.write_text(output_path, new_content)
 
         print(f"\n✅ Success!")
         print(f"   Processed: {processed} diagram(s)")
         print(f"   Output: {output_path}")
         print(f"   Images: {output_dir}/")
+        print(f"   Files: {writer.summary()}")
+        if embedder:
+            print(f"   Embedded: {embedder.bytes_inlined:,} bytes inline")
+        return True
     elif args.validate:
         print(f"\n🔍 Validation complete:")
         print(f"   Total diagrams: {processed + errors}")
         print(f"   Valid: {processed}")
         print(f"   Errors: {errors}")
-
-        if errors > 0:
-            sys.exit(1)
+        return errors == 0
     else:
         print("\n⚠️  No diagrams were converted")
-        sys.exit(1)
+        return False
 
 
 if __name__ == '__main__':
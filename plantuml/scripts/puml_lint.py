@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Fast, JVM-free structural lint for PlantUML sources.
+
+Catches the trivial mistakes that otherwise cost a JVM launch each: missing or
+mismatched `@start`/`@end` tags, unknown `@start` tags, unbalanced braces,
+sequence fragments (`alt`/`loop`/... without `end`), activity blocks
+(`if`/`endif`, `while`, `repeat`, `fork`/`end fork`, `split`, `switch`),
+unterminated notes, mindmap/WBS hierarchy jumps, malformed JSON and tab
+indentation in YAML. Each finding carries a line number and a link to the
+matching entry in references/common_syntax_errors.md.
+
+The checks are deliberately conservative: a diagram that passes may still be
+rejected by PlantUML, but one that fails is broken. Diagrams that use the
+preprocessor (`!include`, `!procedure`, `!if`...) are expanded with
+preprocessor.py first. Only structural preprocessing errors (unbalanced
+`!if`/`!endif`, unclosed `!procedure`...) are reported, linking to the
+preprocessor guide; diagrams that cannot be fully expanded locally (other
+preprocessing errors, standard-library or missing includes) only get the
+`@start`/`@end` checks.
+
+`process_markdown_puml.py`, `convert_puml.py` and `resilient_processor.py` run
+this before any JVM and skip diagrams that fail.
+
+Usage:
+    python puml_lint.py <file.puml|file.md> [more ...]
+
+Examples:
+    # Lint standalone diagrams and every ```puml block in a document
+    python puml_lint.py diagrams/*.puml article.md
+"""
+
+import json
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from preprocessor import GUIDE as PREPROCESSOR_GUIDE
+from preprocessor import Preprocessor, PreprocessorError, PreprocessorUnsupported
+
+GUIDE = 'references/common_syntax_errors.md'
+
+# Diagram types linted beyond the envelope (DiagramTypeIdentifier.START_TAG_MAPPING)
+LINTED_TAGS = ('uml', 'mindmap', 'gantt', 'salt', 'json', 'yaml', 'ditaa', 'wbs', 'nwdiag')
+
+# Every tag PlantUML accepts; anything else is reported as unknown
+KNOWN_TAGS = LINTED_TAGS + (
+    'dot', 'math', 'latex', 'regex', 'ebnf', 'chen', 'chronology', 'files', 'board',
+    'git', 'creole', 'def', 'sdl', 'wire', 'bpm', 'flow', 'project', 'jcckit', 'nwdiag2',
+)
+
+# Section headings of common_syntax_errors.md that findings point to
+DELIMITERS = '1. Always Use Proper Delimiters'
+BRACES = '3. Check Bracket/Brace Matching'
+FRAGMENTS = '5. Fragment Block Errors'
+DECISIONS = '2. Decision Diamond Syntax'
+FORKS = '3. Fork/Join Errors'
+COMPOSITE_STATES = '4. Composite State Errors'
+MINDMAP_HIERARCHY = '1. Node Hierarchy Errors'
+WBS_ROOTS = '2. Multiple Root Nodes'
+WBS_HIERARCHY = '4. Inconsistent Hierarchy Markers'
+JSON_FORMAT = '1. JSON Formatting Errors'
+JSON_DELIMITERS = '3. Missing Diagram Delimiters'
+YAML_INDENT = '2. YAML Indentation Errors'
+SALT_BRACKETS = '2. Layout Bracket Errors'
+
+START_RE = re.compile(r'^\s*@start(\w+)', re.IGNORECASE)
+END_RE = re.compile(r'^\s*@end(\w+)', re.IGNORECASE)
+PREPROCESSOR_RE = re.compile(
+    r'^\s*!(include|import|procedure|function|unquoted|define|definelong|if|ifdef|ifndef'
+    r'|while|foreach|startsub)\b', re.IGNORECASE | re.MULTILINE)
+QUOTED_RE = re.compile(r'"[^"]*"')
+
+# Text blocks whose contents are free text: (opener, closer, description)
+TEXT_BLOCKS = (
+    (re.compile(r'^(floating\s+)?[rh]?note\b[^:"]*$', re.I), re.compile(r'^end\s*[rh]?note\b', re.I), 'note'),
+    (re.compile(r'^legend\b[^:"]*$', re.I), re.compile(r'^end\s*legend\b', re.I), 'legend'),
+    (re.compile(r'^title\s*$', re.I), re.compile(r'^end\s*title\b', re.I), 'title'),
+    (re.compile(r'^((left|right|center)\s+)?header\s*$', re.I), re.compile(r'^end\s*header\b', re.I), 'header'),
+    (re.compile(r'^((left|right|center)\s+)?footer\s*$', re.I), re.compile(r'^end\s*footer\b', re.I), 'footer'),
+    (re.compile(r'^ref\s+over\b[^:]*$', re.I), re.compile(r'^end\s*ref\b', re.I), 'ref'),
+)
+
+# Sequence diagram blocks: (opener, closer, name)
+SEQUENCE_BLOCKS = (
+    (re.compile(r'^(alt|opt|loop|par|break|critical|group)(\s|$)', re.I),
+     re.compile(r'^end(\s+(alt|opt|loop|par|break|critical|group))?\s*$', re.I), 'fragment'),
+    (re.compile(r'^box(\s|$)', re.I), re.compile(r'^end\s*box\b', re.I), 'box'),
+)
+
+# Activity diagram blocks: (opener, middle, closer, name, section); closers are tested first
+ACTIVITY_BLOCKS = (
+    (re.compile(r'^if\s*\(', re.I), re.compile(r'^(else\s*if\s*\(|elseif\s*\(|else\b)', re.I),
+     re.compile(r'^end\s*if\b', re.I), 'if', DECISIONS),
+    (re.compile(r'^while\s*\(', re.I), None, re.compile(r'^end\s*while\b', re.I), 'while', BRACES),
+    (re.compile(r'^repeat\b', re.I), re.compile(r'^backward\b', re.I),
+     re.compile(r'^repeat\s*while\b', re.I), 'repeat', BRACES),
+    (re.compile(r'^fork\b', re.I), re.compile(r'^fork\s+again\b', re.I),
+     re.compile(r'^(end\s*fork|fork\s+end|end\s*merge)\b', re.I), 'fork', FORKS),
+    (re.compile(r'^split\b', re.I), re.compile(r'^split\s+again\b', re.I),
+     re.compile(r'^end\s*split\b', re.I), 'split', FORKS),
+    (re.compile(r'^switch\s*\(', re.I), re.compile(r'^case\s*\(', re.I),
+     re.compile(r'^end\s*switch\b', re.I), 'switch', DECISIONS),
+    (re.compile(r'^group\b', re.I), None, re.compile(r'^end\s*group\b', re.I), 'group', BRACES),
+)
+
+ACTION_END = (';', '|', '<', '>', '/', ']', '}')
+NODE_RE = re.compile(r'^([*+\-])\1*')
+
+
+def anchor(heading: str) -> str:
+    """GitHub-style anchor for a markdown heading."""
+    slug = re.sub(r'[^\w\s-]', '', heading.lower())
+    return re.sub(r'\s', '-', slug.strip())
+
+
+@dataclass
+class LintFinding:
+    """One structural problem in a diagram."""
+    line: int
+    message: str
+    section: str
+    guide: str = GUIDE
+
+    @property
+    def reference(self) -> str:
+        return f"{self.guide}#{anchor(self.section)}"
+
+    def __str__(self) -> str:
+        return f"line {self.line}: {self.message} (see {self.reference})"
+
+
+def _significant(body: List[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+    """Stripped, non-blank lines outside comments and <style> blocks."""
+    in_comment = in_style = False
+    for lineno, raw in body:
+        line = raw.strip()
+        if in_comment:
+            in_comment = "'/" not in line
+            continue
+        if in_style:
+            in_style = '</style>' not in line.lower()
+            continue
+        if line.startswith("/'"):
+            in_comment = "'/" not in line[2:]
+            continue
+        if line.lower().startswith('<style'):
+            in_style = '</style>' not in line.lower()
+            continue
+        if line and not line.startswith("'"):
+            yield lineno, line
+
+
+def _without_text_blocks(
+    lines: Iterator[Tuple[int, str]],
+    findings: List[LintFinding],
+    activity: bool = False
+) -> Iterator[Tuple[int, str]]:
+    """Drop note/legend/title/... contents and multi-line activity labels."""
+    closer = None
+    opened = (0, '')
+    in_action = False
+    for lineno, line in lines:
+        if closer is not None:
+            if closer.match(line):
+                closer = None
+            continue
+        if in_action:
+            in_action = not line.endswith(ACTION_END)
+            continue
+        if activity and line.startswith(':') and not line.endswith(ACTION_END):
+            in_action = True
+            yield lineno, line
+            continue
+        for opener, end, name in TEXT_BLOCKS:
+            if opener.match(line):
+                closer, opened = end, (lineno, name)
+                break
+        else:
+            yield lineno, line
+
+    if closer is not None:
+        lineno, name = opened
+        findings.append(LintFinding(lineno, f"'{name}' block is never closed with 'end {name}'", DELIMITERS))
+
+
+def _check_braces(lines: List[Tuple[int, str]], section: str, findings: List[LintFinding]) -> None:
+    """Block braces: '{' ending a line opens, '}' starting a line closes."""
+    stack = []
+    for lineno, line in lines:
+        unquoted = QUOTED_RE.sub('""', line)
+        if unquoted.startswith('}'):
+            if stack:
+                stack.pop()
+            else:
+                findings.append(LintFinding(lineno, "'}' without a matching '{'", section))
+            unquoted = unquoted[1:].strip()
+        if unquoted.endswith('{') and ':' not in unquoted:
+            stack.append(lineno)
+    for lineno in stack:
+        findings.append(LintFinding(lineno, "'{' is never closed", section))
+
+
+def _check_salt_braces(lines: List[Tuple[int, str]], findings: List[LintFinding]) -> None:
+    """Salt nests '{' '}' anywhere on a line; count them outside quotes."""
+    stack = []
+    for lineno, line in lines:
+        for char in QUOTED_RE.sub('""', line):
+            if char == '{':
+                stack.append(lineno)
+            elif char == '}':
+                if stack:
+                    stack.pop()
+                else:
+                    findings.append(LintFinding(lineno, "'}' without a matching '{'", SALT_BRACKETS))
+    for lineno in stack:
+        findings.append(LintFinding(lineno, "'{' is never closed", SALT_BRACKETS))
+
+
+def _check_sequence_blocks(lines: List[Tuple[int, str]], findings: List[LintFinding]) -> None:
+    stack = []
+    for lineno, line in lines:
+        if re.match(r'^\w+\s*[-.<(]', line) and not re.match(r'^(alt|opt|loop|par|break|critical|group|box)\s', line, re.I):
+            continue  # a message or relation whose first participant is named like a keyword
+        for opener, closer, name in SEQUENCE_BLOCKS:
+            if closer.match(line):
+                if stack and stack[-1][1] == name:
+                    stack.pop()
+                else:
+                    findings.append(LintFinding(lineno, f"'{line}' has no open {name} to close", FRAGMENTS))
+                break
+            if opener.match(line) and not line.endswith('{'):
+                stack.append((lineno, name, line.split()[0]))
+                break
+    for lineno, name, keyword in stack:
+        closing = 'end box' if name == 'box' else 'end'
+        findings.append(LintFinding(lineno, f"'{keyword}' is never closed with '{closing}'", FRAGMENTS))
+
+
+def _check_activity_blocks(lines: List[Tuple[int, str]], findings: List[LintFinding]) -> None:
+    stack = []
+    for lineno, line in lines:
+        if line.startswith(':'):
+            continue
+        for opener, middle, closer, name, section in ACTIVITY_BLOCKS:
+            if closer.match(line):
+                if stack and stack[-1][1] == name:
+                    stack.pop()
+                else:
+                    findings.append(LintFinding(lineno, f"'{line}' has no open '{name}' to close", section))
+                break
+            if middle is not None and middle.match(line):
+                if not stack or stack[-1][1] != name:
+                    findings.append(LintFinding(lineno, f"'{line}' outside any '{name}' block", section))
+                break
+            if opener.match(line):
+                stack.append((lineno, name, section))
+                break
+    for lineno, name, section in stack:
+        closing = {'if': 'endif', 'while': 'endwhile', 'repeat': 'repeat while', 'fork': 'end fork',
+                   'split': 'end split', 'switch': 'endswitch', 'group': 'end group'}[name]
+        findings.append(LintFinding(lineno, f"'{name}' is never closed with '{closing}'", section))
+
+
+def _check_tree(lines: List[Tuple[int, str]], wbs: bool, findings: List[LintFinding]) -> None:
+    """Mindmap/WBS: depth may grow by one level at a time; WBS has one root."""
+    previous = 0
+    roots = []
+    in_multiline = False
+    for lineno, line in lines:
+        if in_multiline:
+            in_multiline = not line.endswith(';')
+            continue
+        match = NODE_RE.match(line)
+        if not match:
+            continue
+        depth = len(match.group(0))
+        rest = line[depth:].lstrip('_').lstrip()
+        if rest.startswith('[') and ']' in rest:
+            rest = rest[rest.index(']') + 1:].lstrip()
+        in_multiline = rest.startswith(':') and not rest.endswith(';')
+
+        section = WBS_HIERARCHY if wbs else MINDMAP_HIERARCHY
+        if previous == 0 and depth != 1:
+            findings.append(LintFinding(lineno, f"first node is at level {depth}, expected level 1", section))
+        elif depth > previous + 1 and previous:
+            findings.append(LintFinding(lineno, f"node jumps from level {previous} to {depth}", section))
+        if depth == 1:
+            roots.append(lineno)
+        previous = depth
+
+    if wbs and len(roots) > 1:
+        findings.append(LintFinding(roots[1], f"{len(roots)} root nodes; a WBS has exactly one", WBS_ROOTS))
+
+
+def _check_json(body: List[Tuple[int, str]], findings: List[LintFinding], start_line: int) -> None:
+    data_start = next((i for i, (_, raw) in enumerate(body) if raw.lstrip().startswith(('{', '['))), None)
+    if data_start is None:
+        findings.append(LintFinding(start_line, "no JSON object or array in the diagram", JSON_DELIMITERS))
+        return
+    text = '\n'.join(raw for _, raw in body[data_start:])
+    try:
+        json.loads(text)
+    except json.JSONDecodeError as e:
+        findings.append(LintFinding(body[data_start][0] + e.lineno - 1, f"invalid JSON: {e.msg}", JSON_FORMAT))
+
+
+def _lint_preprocessed(
+    tag: str,
+    start_line: int,
+    body: List[Tuple[int, str]],
+    findings: List[LintFinding],
+    base_dir: Optional[Path]
+) -> None:
+    """
+    Lint a diagram that uses the preprocessor through its expanded source.
+
+    Only structural preprocessor errors (unbalanced !if/!endif and the like)
+    are reported; any other failure may be a gap in the Python preprocessor,
+    so the diagram is left to PlantUML.
+    """
+    source = '\n'.join([f"@start{tag}"] + [raw for _, raw in body] + [f"@end{tag}"])
+    preprocessor = Preprocessor(missing_includes='keep')
+    try:
+        expanded = preprocessor.expand(source, base_dir)
+    except PreprocessorError as e:
+        if not e.structural:
+            return
+        if e.path is None and e.line:
+            findings.append(LintFinding(start_line + e.line - 1, f"preprocessor: {e.message}",
+                                        e.section, PREPROCESSOR_GUIDE))
+        else:
+            findings.append(LintFinding(start_line, f"preprocessor: {e}", e.section, PREPROCESSOR_GUIDE))
+        return
+    except PreprocessorUnsupported:
+        return
+    if preprocessor.unresolved:
+        return  # blocks may come from includes only PlantUML can resolve
+
+    nested: List[LintFinding] = []
+    _lint_diagram(tag, start_line, list(enumerate(expanded.splitlines()[1:-1], 2)), nested, expanded=True)
+    for finding in nested:
+        findings.append(LintFinding(start_line, f"{finding.message} (line {finding.line} after preprocessing)",
+                                    finding.section))
+
+
+def _lint_diagram(
+    tag: str,
+    start_line: int,
+    body: List[Tuple[int, str]],
+    findings: List[LintFinding],
+    base_dir: Optional[Path] = None,
+    expanded: bool = False
+) -> None:
+    """Type-specific checks for one @start...@end body."""
+    if tag == 'json':
+        _check_json(body, findings, start_line)
+        return
+    if tag == 'yaml':
+        for lineno, raw in body:
+            indent = raw[:len(raw) - len(raw.lstrip())]
+            if '\t' in indent:
+                findings.append(LintFinding(lineno, "tab in YAML indentation", YAML_INDENT))
+        return
+    if tag in ('ditaa', 'gantt'):
+        return
+    if not expanded and PREPROCESSOR_RE.search('\n'.join(raw for _, raw in body)):
+        _lint_preprocessed(tag, start_line, body, findings, base_dir)
+        return
+
+    if tag == 'uml':
+        # Imported here to keep `python puml_lint.py` independent of the pagination module's import cost
+        from paginate_diagram import detect_layout_kind
+
+        source = '\n'.join(['@startuml'] + [raw for _, raw in body] + ['@enduml'])
+        activity = detect_layout_kind(source) == 'activity'
+        lines = list(_without_text_blocks(_significant(body), findings, activity))
+        state = any(re.match(r'^state\s', line, re.I) for _, line in lines)
+        _check_braces(lines, COMPOSITE_STATES if state else BRACES, findings)
+        if activity:
+            _check_activity_blocks(lines, findings)
+        else:
+            _check_sequence_blocks(lines, findings)
+    elif tag in ('mindmap', 'wbs'):
+        lines = list(_significant(body))
+        if any(raw[:1].isspace() and NODE_RE.match(raw.strip()) for _, raw in body):
+            return  # markdown-style (indented) trees: depth comes from indentation
+        _check_tree(lines, tag == 'wbs', findings)
+    elif tag == 'salt':
+        _check_salt_braces(list(_significant(body)), findings)
+    elif tag == 'nwdiag':
+        _check_braces(list(_significant(body)), BRACES, findings)
+
+
+def lint_puml(puml_content: str, first_line: int = 1, base_dir: Optional[Path] = None) -> List[LintFinding]:
+    """
+    Lint every @start...@end diagram in a source.
+
+    Args:
+        puml_content: PlantUML source (one or more diagrams)
+        first_line: Line number of the first line, for sources embedded in markdown
+        base_dir: Directory `!include` paths are relative to (default: cwd)
+
+    Returns:
+        Findings sorted by line; empty if nothing is wrong
+    """
+    findings: List[LintFinding] = []
+    lines = [(first_line + i, raw) for i, raw in enumerate(puml_content.splitlines())]
+
+    current: Optional[Tuple[str, int]] = None
+    body: List[Tuple[int, str]] = []
+    seen_start = False
+
+    for lineno, raw in lines:
+        start = START_RE.match(raw)
+        end = END_RE.match(raw)
+        if current is None:
+            if start:
+                tag = start.group(1).lower()
+                seen_start = True
+                if tag not in KNOWN_TAGS:
+                    findings.append(LintFinding(lineno, f"unknown diagram tag '@start{tag}'", DELIMITERS))
+                current, body = (tag, lineno), []
+            elif end:
+                findings.append(LintFinding(lineno, f"'@end{end.group(1)}' without a matching @start", DELIMITERS))
+            continue
+
+        if end:
+            tag, start_line = current
+            if end.group(1).lower() != tag:
+                findings.append(LintFinding(
+                    lineno, f"'@end{end.group(1)}' closes '@start{tag}' (line {start_line})", DELIMITERS))
+            elif tag in LINTED_TAGS:
+                _lint_diagram(tag, start_line, body, findings, base_dir)
+            current = None
+        elif start:
+            findings.append(LintFinding(lineno, f"'@start{start.group(1)}' inside an open diagram", DELIMITERS))
+        else:
+            body.append((lineno, raw))
+
+    if current is not None:
+        tag, start_line = current
+        findings.append(LintFinding(start_line, f"'@start{tag}' is never closed with '@end{tag}'", DELIMITERS))
+    elif not seen_start:
+        findings.append(LintFinding(first_line, "no @start tag (e.g. @startuml)", DELIMITERS))
+
+    return sorted(findings, key=lambda finding: finding.line)
+
+
+def lint_message(findings: List[LintFinding]) -> str:
+    """Error text for the processors, in the shape of a PlantUML syntax error."""
+    return "Syntax error (lint): " + "; ".join(str(finding) for finding in findings)
+
+
+def _markdown_blocks(content: str) -> Iterator[Tuple[int, str]]:
+    """(first line number, source) for each ```puml block in markdown."""
+    for match in re.finditer(r'```puml[^\n]*\n(.*?)```', content, re.DOTALL):
+        yield content[:match.start(1)].count('\n') + 1, match.group(1)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python puml_lint.py <file.puml|file.md> [more ...]")
+        sys.exit(1)
+
+    total = 0
+    for name in sys.argv[1:]:
+        path = Path(name)
+        if not path.exists():
+            print(f"❌ Error: File not found: {path}", file=sys.stderr)
+            sys.exit(1)
+        content = path.read_text(encoding='utf-8')
+        sources = _markdown_blocks(content) if path.suffix == '.md' else [(1, content)]
+        for first_line, source in sources:
+            for finding in lint_puml(source, first_line, path.parent):
+                print(f"{path}:{finding}")
+                total += 1
+
+    if total:
+        print(f"\n❌ {total} problem(s) found")
+        sys.exit(1)
+    print("✅ No problems found")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Offline full-text index over the reference and troubleshooting guides.
+
+When ErrorHandler cannot tie an error to a known guide entry, the only other
+lead used to be web search queries, a dead end on air-gapped build machines.
+This index answers the same question locally: every markdown guide under
+references/ (troubleshooting/ and workflows/ included, tables of contents
+left out) is split into sections
+at its #, ## and ### headings, and the sections are indexed with SQLite FTS5.
+Searches rank sections with BM25, weighting headings above body text and
+troubleshooting guides above the syntax references, and take milliseconds.
+
+The index is brought up to date whenever it is opened: files whose size or
+modification time changed are re-indexed and deleted files are dropped, so
+an unchanged tree costs one stat per guide. There is one index per references
+directory, under ~/.cache/plantuml/reference_index/ unless the
+PLANTUML_REFERENCE_INDEX environment variable names another directory (set it
+to "off" to disable the index).
+
+Usage:
+    python reference_index.py search ERROR_TEXT [--limit 5]
+    python reference_index.py build [--force]
+
+Examples:
+    # Guide sections for an error message
+    python reference_index.py search "Dot executable does not exist"
+
+    # Re-index every guide from scratch
+    python reference_index.py build --force
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+SCRIPT_DIR = Path(__file__).parent
+REFERENCES_PATH = SCRIPT_DIR.parent / 'references'
+
+DEFAULT_INDEX_DIR = Path.home() / '.cache' / 'plantuml' / 'reference_index'
+
+# Bump when the schema or the sectioning changes, to rebuild old indexes
+INDEX_VERSION = 2
+
+# Tables of contents only repeat the guides' headings, and would crowd them out of results
+SKIP_FILES = {'toc.md'}
+
+# Ranking: BM25 column weights (path, heading, body, line) and the troubleshooting boost
+COLUMN_WEIGHTS = (0.0, 4.0, 1.0, 0.0)
+TROUBLESHOOTING_BOOST = 1.5
+
+# Distinct error words searched for; the rest of a long stack trace adds only noise
+MAX_QUERY_TERMS = 16
+
+HEADING_RE = re.compile(r'^(#{1,3})\s+(.+?)\s*#*\s*$')
+FENCE_RE = re.compile(r'^\s*(```|~~~)')
+WORD_RE = re.compile(r'[A-Za-z][A-Za-z0-9_]{2,}')
+
+# Words that occur in nearly every error or stack frame
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'not', 'was', 'are', 'this', 'that', 'from', 'has', 'have',
+    'but', 'can', 'cannot', 'does', 'did', 'you', 'your', 'line', 'error', 'errors', 'exception',
+    'java', 'lang', 'net', 'sourceforge', 'plantuml', 'puml', 'startuml', 'enduml', 'file', 'some',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS sections USING fts5(
+    path UNINDEXED, heading, body, line UNINDEXED, tokenize = 'porter unicode61'
+);
+"""
+
+
+@dataclass
+class GuideSection:
+    """One ranked section of a reference guide."""
+    path: str  # relative to the references directory
+    heading: str
+    line: int
+    score: float
+    snippet: str
+
+    def __str__(self) -> str:
+        return f"{self.path}:{self.line} {self.heading}"
+
+
+def split_sections(text: str) -> List[Tuple[int, str, str]]:
+    """
+    Split markdown into sections at #, ## and ### headings outside code fences.
+
+    Returns:
+        List of (heading line number, heading, body) tuples; text before the
+        first heading is a section with an empty heading
+    """
+    sections = []
+    heading, start, body = '', 1, []
+    in_fence = False
+    for number, line in enumerate(text.splitlines(), 1):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        elif not in_fence:
+            match = HEADING_RE.match(line)
+            if match:
+                if heading or any(part.strip() for part in body):
+                    sections.append((start, heading, '\n'.join(body)))
+                heading, start, body = match.group(2), number, []
+                continue
+        body.append(line)
+    if heading or any(part.strip() for part in body):
+        sections.append((start, heading, '\n'.join(body)))
+    return sections
+
+
+def query_terms(error_text: str) -> List[str]:
+    """The distinct, meaningful words of an error message, in order of appearance."""
+    terms: List[str] = []
+    for word in WORD_RE.findall(error_text):
+        word = word.lower()
+        if word not in STOPWORDS and word not in terms:
+            terms.append(word)
+            if len(terms) >= MAX_QUERY_TERMS:
+                break
+    return terms
+
+
+class ReferenceIndex:
+    """SQLite FTS5 index of one references directory, safe to share across threads."""
+
+    def __init__(self, references_path: Path = REFERENCES_PATH, index_dir: Optional[Path] = None):
+        self.references_path = references_path
+        env_dir = os.environ.get('PLANTUML_REFERENCE_INDEX')
+        self.enabled = env_dir != 'off'
+        key = hashlib.sha1(str(references_path.resolve()).encode('utf-8')).hexdigest()[:16]
+        self.db_path = Path(index_dir or env_dir or DEFAULT_INDEX_DIR) / f"{key}.sqlite3"
+        self._fresh = False
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            try:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                with self._connect() as conn:
+                    if conn.execute('PRAGMA user_version').fetchone()[0] != INDEX_VERSION:
+                        conn.execute('DROP TABLE IF EXISTS files')
+                        conn.execute('DROP TABLE IF EXISTS sections')
+                        conn.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+                    conn.executescript(SCHEMA)
+            except (OSError, sqlite3.Error) as e:
+                # Also the case for SQLite builds without FTS5
+                print(f"⚠️  Reference index disabled ({self.db_path}): {e}", file=sys.stderr)
+                self.enabled = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per call keeps worker threads independent
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _guides(self) -> List[Tuple[str, int, int]]:
+        """(relative path, size, mtime_ns) of every guide on disk."""
+        guides = []
+        for path in sorted(self.references_path.rglob('*.md')):
+            if path.name in SKIP_FILES:
+                continue
+            stat = path.stat()
+            guides.append((path.relative_to(self.references_path).as_posix(), stat.st_size, stat.st_mtime_ns))
+        return guides
+
+    def refresh(self, force: bool = False) -> Tuple[int, int]:
+        """
+        Re-index guides that changed since the index was built.
+
+        Args:
+            force: Re-index every guide
+
+        Returns:
+            Tuple of (guides re-indexed, guides dropped)
+        """
+        if not self.enabled:
+            return 0, 0
+        guides = self._guides()
+        with self._connect() as conn:
+            # Serializes concurrent refreshes, in this and other processes
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute('SELECT path, size, mtime_ns FROM files')
+            indexed = {path: (size, mtime) for path, size, mtime in rows}
+            changed = [(path, size, mtime) for path, size, mtime in guides
+                       if force or indexed.get(path) != (size, mtime)]
+            removed = set(indexed) - {path for path, _, _ in guides}
+            for path in removed | {path for path, _, _ in changed}:
+                conn.execute('DELETE FROM sections WHERE path = ?', (path,))
+                conn.execute('DELETE FROM files WHERE path = ?', (path,))
+            for path, size, mtime in changed:
+                text = (self.references_path / path).read_text(encoding='utf-8', errors='replace')
+                conn.executemany(
+                    'INSERT INTO sections (path, heading, body, line) VALUES (?, ?, ?, ?)',
+                    [(path, heading, body, line) for line, heading, body in split_sections(text)]
+                )
+                conn.execute('INSERT INTO files (path, size, mtime_ns) VALUES (?, ?, ?)', (path, size, mtime))
+        return len(changed), len(removed)
+
+    def search(self, error_text: str, limit: int = 3) -> List[GuideSection]:
+        """
+        Find the guide sections that best match an error message.
+
+        The index is refreshed on the first search of this instance.
+
+        Args:
+            error_text: Error output, e.g. PlantUML's stderr
+            limit: Maximum number of sections to return
+
+        Returns:
+            Sections ordered best first; empty when nothing matches or the index is disabled
+        """
+        terms = query_terms(error_text)
+        if not self.enabled or not terms:
+            return []
+        try:
+            with self._lock:
+                if not self._fresh:
+                    self.refresh()
+                    self._fresh = True
+            query = ' OR '.join(f'"{term}"' for term in terms)
+            weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"""
+                    SELECT path, heading, line,
+                           bm25(sections, {weights})
+                           * (CASE WHEN path LIKE 'troubleshooting/%' THEN ? ELSE 1.0 END) AS score,
+                           snippet(sections, 2, '', '', '…', 16)
+                    FROM sections WHERE sections MATCH ?
+                    ORDER BY score LIMIT ?
+                    """,
+                    (TROUBLESHOOTING_BOOST, query, limit)
+                ).fetchall()
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️  Reference index search failed: {e}", file=sys.stderr)
+            return []
+        # bm25() is lower for better matches; report a positive relevance
+        return [GuideSection(path, heading, int(line), round(-score, 3), ' '.join(snippet.split()))
+                for path, heading, line, score, snippet in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Offline full-text search over the PlantUML reference guides',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    search_parser = subparsers.add_parser('search', help='Guide sections matching an error message')
+    search_parser.add_argument('error', nargs='+', help='Error text')
+    search_parser.add_argument('--limit', type=int, default=5, help='Sections to show (default: 5)')
+    build_parser = subparsers.add_parser('build', help='Bring the index up to date')
+    build_parser.add_argument('--force', action='store_true', help='Re-index every guide')
+    args = parser.parse_args()
+
+    index = ReferenceIndex()
+    if not index.enabled:
+        print("❌ Error: Reference index is disabled", file=sys.stderr)
+        sys.exit(1)
+
+    started = time.monotonic()
+    if args.command == 'build':
+        indexed, removed = index.refresh(force=args.force)
+        elapsed = time.monotonic() - started
+        print(f"📚 {indexed} guide(s) indexed, {removed} removed in {elapsed:.2f}s ({index.db_path})")
+        return
+
+    sections = index.search(' '.join(args.error), args.limit)
+    elapsed = (time.monotonic() - started) * 1000
+    if not sections:
+        print(f"No matching guide sections ({elapsed:.0f} ms)")
+        sys.exit(1)
+    for section in sections:
+        print(f"{section.score:6.2f}  {section}")
+        print(f"        {section.snippet}")
+    print(f"({elapsed:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
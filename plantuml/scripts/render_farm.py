@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+Multi-node PlantUML render farm backed by a shared-directory work queue.
+
+The coordinator extracts every diagram from the given markdown files (with the
+same extraction as process_markdown_puml.py) and writes one task file per
+diagram into the queue. Any number of worker processes, on this host or on
+others that mount the same directory, claim tasks by creating a lease file,
+render them, and write a result file. The coordinator then assembles each
+`<name>_with_images.md` from the results.
+
+Queue layout:
+    <queue>/tasks/<key>.json    diagram source and render options
+    <queue>/leases/<key>.lease  claim held by a worker (mtime = heartbeat)
+    <queue>/results/<key>.json  status and output image names
+    <queue>/jobs/<doc>.json     per-document manifest used for assembly
+
+Task keys start with an inverted cost estimate, so workers claiming tasks in
+sorted order start the most expensive diagrams first. Workers refresh their
+lease while rendering; a lease whose heartbeat is older than --lease-seconds is
+reclaimed by another worker, so a crashed worker cannot stall the build.
+
+Usage:
+    python render_farm.py coordinate docs/*.md --queue /shared/queue [--local-workers 4]
+    python render_farm.py work --queue /shared/queue
+    python render_farm.py assemble --queue /shared/queue
+    python render_farm.py status --queue /shared/queue
+
+Examples:
+    # Enqueue, render with 4 local worker processes, assemble
+    python render_farm.py coordinate docs/*.md --queue /tmp/farm --local-workers 4
+
+    # Enqueue only; workers on other hosts run `work`, then assemble later
+    python render_farm.py coordinate docs/*.md --queue /mnt/farm --no-wait
+    python render_farm.py assemble --queue /mnt/farm
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from complexity_estimator import estimate_complexity
+from process_markdown_puml import (
+    RenderSettings,
+    detect_diagram_type,
+    extract_embedded_puml_blocks,
+    extract_linked_puml_files,
+    find_plantuml_jar,
+    image_links,
+    record_outputs,
+    render_diagram,
+)
+from render_history import RenderHistory
+from stable_output import OutputWriter
+
+SCRIPT_PATH = Path(__file__).resolve()
+
+DEFAULT_LEASE_SECONDS = 120
+POLL_INTERVAL = 1.0
+
+
+class FarmQueue:
+    """Shared-directory task queue with lease files."""
+
+    def __init__(self, root: Path, lease_seconds: int = DEFAULT_LEASE_SECONDS):
+        self.root = root
+        self.lease_seconds = lease_seconds
+        self.tasks_dir = root / 'tasks'
+        self.leases_dir = root / 'leases'
+        self.results_dir = root / 'results'
+        self.jobs_dir = root / 'jobs'
+
+    def ensure_directories(self) -> None:
+        for directory in (self.tasks_dir, self.leases_dir, self.results_dir, self.jobs_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _write_json(path: Path, data: dict) -> None:
+        """Write JSON atomically so readers never see a partial file."""
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(data, indent=2), encoding='utf-8')
+        os.replace(tmp_path, path)
+
+    def add_task(self, key: str, task: dict) -> None:
+        self._write_json(self.tasks_dir / f"{key}.json", task)
+
+    def add_job(self, name: str, job: dict) -> None:
+        self._write_json(self.jobs_dir / f"{name}.json", job)
+
+    def pending_keys(self) -> List[str]:
+        """Task keys without a result, in claim order (most expensive first)."""
+        done = {path.stem for path in self.results_dir.glob('*.json')}
+        return sorted(path.stem for path in self.tasks_dir.glob('*.json') if path.stem not in done)
+
+    def _lease_path(self, key: str) -> Path:
+        return self.leases_dir / f"{key}.lease"
+
+    def claim(self, key: str, worker_id: str) -> bool:
+        """Try to take the lease on a task, reclaiming it if it has expired."""
+        lease_path = self._lease_path(key)
+        try:
+            fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if not self._reclaim_expired(lease_path, worker_id):
+                return False
+            try:
+                fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                return False
+
+        with os.fdopen(fd, 'w') as f:
+            f.write(worker_id)
+
+        # Another reclaimer may have taken the lease over since it was written
+        if self.lease_owner(key) != worker_id:
+            return False
+
+        # A result may have landed between listing and claiming
+        if (self.results_dir / f"{key}.json").exists():
+            self.release(key, worker_id)
+            return False
+        return True
+
+    def _reclaim_expired(self, lease_path: Path, worker_id: str) -> bool:
+        """Remove an expired lease; rename first so only one reclaimer wins."""
+        try:
+            age = time.time() - lease_path.stat().st_mtime
+        except FileNotFoundError:
+            return True
+        if age < self.lease_seconds:
+            return False
+
+        stale_path = lease_path.with_name(f"{lease_path.name}.stale.{worker_id}")
+        try:
+            os.rename(lease_path, stale_path)
+        except FileNotFoundError:
+            return False
+
+        # Between the stat and the rename another reclaimer may have replaced the
+        # expired lease with its own fresh one: put that back and give up
+        try:
+            renamed_age = time.time() - stale_path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        if renamed_age < self.lease_seconds:
+            try:
+                os.link(stale_path, lease_path)
+            except OSError:
+                pass
+            stale_path.unlink(missing_ok=True)
+            return False
+
+        stale_path.unlink(missing_ok=True)
+        print(f"♻️  Reclaimed expired lease {lease_path.stem} ({age:.0f}s old)")
+        return True
+
+    def lease_owner(self, key: str) -> Optional[str]:
+        """Worker id recorded in a task's lease, or None if it is not leased."""
+        try:
+            return self._lease_path(key).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+
+    def heartbeat(self, key: str, worker_id: str) -> None:
+        # Never extend a lease that another worker has taken over
+        if self.lease_owner(key) != worker_id:
+            return
+        try:
+            os.utime(self._lease_path(key))
+        except FileNotFoundError:
+            pass
+
+    def release(self, key: str, worker_id: str) -> None:
+        """Drop a worker's lease on a task; a lease held by another worker is left alone."""
+        if self.lease_owner(key) == worker_id:
+            self._lease_path(key).unlink(missing_ok=True)
+
+    def load_task(self, key: str) -> dict:
+        return json.loads((self.tasks_dir / f"{key}.json").read_text(encoding='utf-8'))
+
+    def complete(self, key: str, result: dict, worker_id: str) -> None:
+        self._write_json(self.results_dir / f"{key}.json", result)
+        self.release(key, worker_id)
+
+    def load_result(self, key: str) -> Optional[dict]:
+        path = self.results_dir / f"{key}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding='utf-8'))
+
+    def load_job(self, name: str) -> Optional[dict]:
+        path = self.jobs_dir / f"{name}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding='utf-8'))
+
+    def retry_failed(self, key: str) -> bool:
+        """Drop a task's result unless it converted, so the task is rendered again."""
+        result = self.load_result(key)
+        if result is None or result.get('status') == 'converted':
+            return False
+        (self.results_dir / f"{key}.json").unlink(missing_ok=True)
+        return True
+
+    def remove_task(self, key: str) -> None:
+        for path in (self.tasks_dir / f"{key}.json", self.results_dir / f"{key}.json"):
+            path.unlink(missing_ok=True)
+
+    def load_jobs(self) -> List[dict]:
+        return [json.loads(path.read_text(encoding='utf-8')) for path in sorted(self.jobs_dir.glob('*.json'))]
+
+
+def task_key(doc_id: str, idx: int, puml_content: str, options: dict) -> str:
+    """
+    Sortable task key: inverted cost first so the heaviest diagrams sort first.
+
+    The hash suffix covers the diagram source and the render options (format,
+    output directory, pagination, naming), so converted results from earlier
+    runs are reused only when the diagram is unchanged and would be rendered
+    the same way; failed results are retried on the next enqueue. With stable naming, idx is 0, so results survive diagrams being
+    inserted or reordered, and identical diagrams share a task.
+    """
+    cost_rank = max(0, 999999 - int(estimate_complexity(puml_content).cost * 100))
+    digest = hashlib.sha256(puml_content.encode('utf-8'))
+    digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    return f"{cost_rank:06d}_{doc_id}_{idx:04d}_{digest.hexdigest()[:8]}"
+
+
+def enqueue_markdown(
+    queue: FarmQueue,
+    markdown_path: Path,
+    output_dir_name: str,
+    image_format: str,
+    paginate: bool = False,
+    naming: str = 'index'
+) -> int:
+    """
+    Write one task per diagram in a markdown file plus its assembly manifest.
+
+    naming selects the image names, as in process_markdown_puml.output_name.
+
+    Returns:
+        Number of diagrams enqueued
+    """
+    markdown_path = markdown_path.resolve()
+    content = markdown_path.read_text(encoding='utf-8')
+    doc_id = hashlib.sha256(str(markdown_path).encode('utf-8')).hexdigest()[:12]
+    output_dir = markdown_path.parent / output_dir_name
+
+    # Same collection and numbering as process_markdown
+    diagrams = [(puml, start, end) for puml, start, end in extract_embedded_puml_blocks(content)]
+    diagrams += [(puml, start, end)
+                 for puml, _, start, end in extract_linked_puml_files(content, markdown_path.parent)]
+    diagrams.sort(key=lambda d: d[1], reverse=True)
+
+    spans = []
+    options = {
+        'output_dir': str(output_dir),
+        'format': image_format,
+        'paginate': paginate,
+        'naming': naming,
+    }
+    for idx, (puml_content, start, end) in enumerate(diagrams, 1):
+        key = task_key(doc_id, idx if naming == 'index' else 0, puml_content, options)
+        queue.add_task(key, {
+            'idx': idx,
+            'content': puml_content,
+            'diagram_type': detect_diagram_type(puml_content),
+            **options,
+        })
+        # A failure may have been environmental (missing Graphviz, a timeout): try again
+        queue.retry_failed(key)
+        spans.append({'key': key, 'idx': idx, 'start': start, 'end': end})
+
+    # Drop tasks from an earlier enqueue of this document that no longer apply
+    previous = queue.load_job(doc_id)
+    if previous:
+        current = {span['key'] for span in spans}
+        for span in previous['spans']:
+            if span['key'] not in current:
+                queue.remove_task(span['key'])
+
+    queue.add_job(doc_id, {
+        'markdown': str(markdown_path),
+        'output_dir': str(output_dir),
+        'format': image_format,
+        'spans': spans,
+    })
+    return len(diagrams)
+
+
+def run_worker(
+    queue: FarmQueue,
+    worker_id: str,
+    plantuml_jar: str,
+    idle_exit: float = 0,
+    history: Optional[RenderHistory] = None
+) -> int:
+    """
+    Claim and render tasks until the queue is drained.
+
+    Args:
+        idle_exit: Keep polling this many seconds after the queue empties
+            (0 exits as soon as nothing is claimable)
+
+    Returns:
+        Number of tasks rendered by this worker
+    """
+    rendered = 0
+    idle_since = None
+
+    while True:
+        claimed = None
+        for key in queue.pending_keys():
+            if queue.claim(key, worker_id):
+                claimed = key
+                break
+
+        if claimed is None:
+            if not queue.pending_keys():
+                idle_since = idle_since or time.monotonic()
+                if time.monotonic() - idle_since >= idle_exit:
+                    return rendered
+            # Tasks leased by others: wait for them to finish or expire
+            time.sleep(POLL_INTERVAL)
+            continue
+        idle_since = None
+
+        stop = threading.Event()
+
+        def beat(key: str = claimed) -> None:
+            while not stop.wait(max(1.0, queue.lease_seconds / 3)):
+                queue.heartbeat(key, worker_id)
+
+        heartbeat = threading.Thread(target=beat, daemon=True)
+        heartbeat.start()
+
+        started = time.monotonic()
+        try:
+            task = queue.load_task(claimed)
+            output_dir = Path(task['output_dir'])
+            output_dir.mkdir(parents=True, exist_ok=True)
+            settings = RenderSettings(output_dir, task['format'], plantuml_jar,
+                                      paginate=task.get('paginate', False), jobs=1, history=history,
+                                      naming=task.get('naming', 'index'))
+            status, output_names = render_diagram(task['idx'], task['content'], settings)
+        except Exception as e:
+            status, output_names = 'failed', None
+            print(f"❌ Task {claimed} failed: {e}", file=sys.stderr)
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        queue.complete(claimed, {
+            'status': status,
+            'output_names': output_names,
+            'worker': worker_id,
+            'duration': round(time.monotonic() - started, 3),
+        }, worker_id)
+        rendered += 1
+
+
+def wait_for_results(queue: FarmQueue, timeout: Optional[float] = None) -> bool:
+    """Block until every task has a result; returns False on timeout."""
+    deadline = time.monotonic() + timeout if timeout else None
+    while queue.pending_keys():
+        if deadline and time.monotonic() > deadline:
+            return False
+        time.sleep(POLL_INTERVAL)
+    return True
+
+
+def assemble(queue: FarmQueue) -> Dict[str, int]:
+    """
+    Write `<name>_with_images.md` for every document in the queue, and delete
+    images its previous run wrote but this one did not.
+
+    Returns:
+        Mapping of markdown path to the number of diagrams replaced
+    """
+    summary = {}
+    for job in queue.load_jobs():
+        markdown_path = Path(job['markdown'])
+        content = markdown_path.read_text(encoding='utf-8')
+        settings = RenderSettings(Path(job['output_dir']), job['format'], plantuml_jar='')
+
+        converted = []
+        outcomes = {}
+        for span in job['spans']:
+            result = queue.load_result(span['key']) or {}
+            outcomes[span['idx']] = (result.get('status', 'failed'), result.get('output_names'))
+            if result.get('output_names'):
+                converted.append((span, result['output_names']))
+
+        # Spans are stored end-to-start; build links in document order, splice backwards
+        replacements = {span['key']: image_links(span['idx'], names, settings)
+                        for span, names in reversed(converted)}
+        for span, _ in converted:
+            content = content[:span['start']] + replacements[span['key']] + content[span['end']:]
+
+        if converted:
+            output_path = markdown_path.with_stem(f"{markdown_path.stem}_with_images")
+            OutputWriter().write_text(output_path, content)
+        record_outputs(settings.output_dir, markdown_path.stem, outcomes, settings.image_format)
+        summary[str(markdown_path)] = len(converted)
+
+    return summary
+
+
+def spawn_local_workers(queue: FarmQueue, count: int, lease_seconds: int) -> List[subprocess.Popen]:
+    """Start worker processes on this host."""
+    return [
+        subprocess.Popen([
+            sys.executable, str(SCRIPT_PATH), 'work',
+            '--queue', str(queue.root),
+            '--lease-seconds', str(lease_seconds),
+            '--worker-id', f"{socket.gethostname()}-{os.getpid()}-{num}",
+        ])
+        for num in range(1, count + 1)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Distributed PlantUML rendering over a shared-directory queue',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_queue_args(sub):
+        sub.add_argument('--queue', required=True, help='Shared queue directory')
+        sub.add_argument('--lease-seconds', type=int, default=DEFAULT_LEASE_SECONDS,
+                         help=f'Lease expiry without heartbeat (default: {DEFAULT_LEASE_SECONDS})')
+
+    coordinate = subparsers.add_parser('coordinate', help='Enqueue diagrams, wait, assemble')
+    coordinate.add_argument('markdown_files', nargs='+', help='Markdown files to process')
+    add_queue_args(coordinate)
+    coordinate.add_argument('--format', choices=['png', 'svg'], default='png',
+                            help='Output image format (default: png)')
+    coordinate.add_argument('--output-dir', default='images',
+                            help='Image directory next to each markdown file (default: images/)')
+    coordinate.add_argument('--paginate', action='store_true',
+                            help='Split oversized sequence/activity diagrams into pages')
+    coordinate.add_argument('--naming', choices=['index', 'stable'], default='index',
+                            help='Image names: index (default) or stable (<id or title>_<content hash>)')
+    coordinate.add_argument('--local-workers', type=int, default=0,
+                            help='Worker processes to start on this host (default: 0)')
+    coordinate.add_argument('--no-wait', action='store_true',
+                            help='Only enqueue; run `assemble` once workers finish')
+    coordinate.add_argument('--timeout', type=float, default=None,
+                            help='Give up waiting for results after this many seconds')
+
+    work = subparsers.add_parser('work', help='Claim and render tasks')
+    add_queue_args(work)
+    work.add_argument('--worker-id', default=None, help='Worker name (default: host-pid)')
+    work.add_argument('--idle-exit', type=float, default=0,
+                      help='Seconds to keep polling once the queue is empty (default: 0)')
+    work.add_argument('--no-history', action='store_true',
+                      help='Do not learn timeouts from the render history database')
+
+    assemble_cmd = subparsers.add_parser('assemble', help='Write _with_images.md from results')
+    add_queue_args(assemble_cmd)
+
+    status = subparsers.add_parser('status', help='Show queue progress')
+    add_queue_args(status)
+
+    args = parser.parse_args()
+    queue = FarmQueue(Path(args.queue), args.lease_seconds)
+    queue.ensure_directories()
+
+    if args.command == 'coordinate':
+        total = 0
+        for markdown_file in args.markdown_files:
+            markdown_path = Path(markdown_file)
+            if not markdown_path.exists():
+                print(f"❌ Error: Markdown file not found: {markdown_file}", file=sys.stderr)
+                sys.exit(1)
+            count = enqueue_markdown(queue, markdown_path, args.output_dir, args.format, args.paginate,
+                                     args.naming)
+            print(f"📥 Enqueued {count} diagram(s) from {markdown_path}")
+            total += count
+
+        if args.no_wait:
+            print(f"\n✅ {total} task(s) queued in {queue.root}")
+            return
+
+        workers = spawn_local_workers(queue, args.local_workers, args.lease_seconds)
+        finished = wait_for_results(queue, args.timeout)
+        for worker in workers:
+            worker.wait()
+
+        if not finished:
+            print(f"❌ Timed out with {len(queue.pending_keys())} task(s) pending", file=sys.stderr)
+            sys.exit(1)
+
+        summary = assemble(queue)
+        print(f"\n✅ Assembled {len(summary)} document(s), {sum(summary.values())}/{total} diagram(s) converted")
+        sys.exit(0 if sum(summary.values()) == total else 1)
+
+    elif args.command == 'work':
+        plantuml_jar = find_plantuml_jar()
+        if not plantuml_jar:
+            print("❌ Error: plantuml.jar not found", file=sys.stderr)
+            sys.exit(1)
+        worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        history = None if args.no_history else RenderHistory()
+        rendered = run_worker(queue, worker_id, plantuml_jar, args.idle_exit, history)
+        print(f"👷 Worker {worker_id} rendered {rendered} task(s)")
+
+    elif args.command == 'assemble':
+        summary = assemble(queue)
+        for markdown, count in summary.items():
+            print(f"✅ {markdown}: {count} diagram(s)")
+
+    elif args.command == 'status':
+        tasks = len(list(queue.tasks_dir.glob('*.json')))
+        results = len(list(queue.results_dir.glob('*.json')))
+        leases = len(list(queue.leases_dir.glob('*.lease')))
+        print(f"Tasks: {tasks}  Done: {results}  In progress: {leases}  Pending: {tasks - results}")
+
+
+if __name__ == '__main__':
+    main()
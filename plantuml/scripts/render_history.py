@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Local history of PlantUML render durations and the timeouts learned from it.
+
+Every validation and render is recorded in a small SQLite database keyed by a
+fingerprint of the diagram source and its diagram type. Timeouts are then set
+from that history (p99 of recent successful runs x a safety margin) instead of
+hard-coded values. Diagrams without enough history of their own use the history
+of their diagram type, raised to the caller's estimate when that is larger, so
+a big diagram of a usually quick type keeps its longer estimate. A diagram
+whose last run timed out gets double its previous timeout on the next attempt.
+Render timeouts keep the complexity estimator's floor (30 seconds unless
+PLANTUML_MIN_TIMEOUT says otherwise), however fast a diagram has been.
+
+The database lives at ~/.cache/plantuml/render_history.sqlite3 unless the
+PLANTUML_HISTORY_DB environment variable points elsewhere (set it to "off" to
+disable recording). It stays bounded: each diagram keeps its latest
+MAX_SAMPLES_PER_DIAGRAM runs per operation, runs older than MAX_AGE_DAYS are
+dropped (diagrams that no longer exist age out), and the oldest runs beyond
+MAX_ROWS are evicted. `prune` applies the limits on demand.
+
+Usage:
+    python render_history.py report [--min-samples 6] [--threshold 1.25]
+    python render_history.py stats
+    python render_history.py prune
+
+Examples:
+    # Diagrams whose recent render times are at least 25% slower than before
+    python render_history.py report
+
+    # Per diagram type sample counts and p50/p99 durations
+    python render_history.py stats
+
+    # Drop runs beyond the retention limits without waiting for the next prune
+    python render_history.py prune
+"""
+
+import argparse
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from complexity_estimator import min_timeout
+
+DEFAULT_DB_PATH = Path.home() / '.cache' / 'plantuml' / 'render_history.sqlite3'
+
+# Timeout policy
+MIN_SAMPLES = 3
+TYPE_MIN_SAMPLES = 10
+RECENT_SAMPLES = 50
+PERCENTILE = 99
+MARGIN = 2.0
+MIN_TIMEOUT = 5
+MAX_TIMEOUT = 600
+
+# Retention: runs kept per diagram and operation, overall, and how long
+MAX_SAMPLES_PER_DIAGRAM = 100
+MAX_ROWS = 200000
+MAX_AGE_DAYS = 180
+# Age/size pruning runs once every this many recorded runs
+PRUNE_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS renders (
+    fingerprint TEXT NOT NULL,
+    diagram_type TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    duration REAL NOT NULL,
+    timeout REAL,
+    success INTEGER NOT NULL,
+    source TEXT,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_renders_fingerprint ON renders (fingerprint, operation, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_renders_type ON renders (diagram_type, operation, recorded_at);
+"""
+
+
+@dataclass
+class Trend:
+    """A diagram whose recent render times are higher than its earlier ones."""
+    fingerprint: str
+    diagram_type: str
+    source: Optional[str]
+    samples: int
+    earlier_mean: float
+    recent_mean: float
+
+    @property
+    def ratio(self) -> float:
+        return self.recent_mean / self.earlier_mean if self.earlier_mean else float('inf')
+
+
+def diagram_fingerprint(puml_content: str) -> str:
+    """Stable fingerprint of a diagram, insensitive to surrounding/trailing whitespace."""
+    normalized = '\n'.join(line.rstrip() for line in puml_content.strip().splitlines())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def history_diagram_type(puml_content: str) -> str:
+    """Diagram type used as the history fallback key (the @start tag)."""
+    match = re.search(r'@start(\w+)', puml_content)
+    return match.group(1).lower() if match else 'uml'
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class RenderHistory:
+    """SQLite-backed render duration history, safe to share across threads."""
+
+    def __init__(self, db_path: Optional[Path] = None):
+        env_path = os.environ.get('PLANTUML_HISTORY_DB')
+        self.enabled = env_path != 'off'
+        self.db_path = Path(db_path or env_path or DEFAULT_DB_PATH)
+
+        if self.enabled:
+            try:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                with self._connect() as conn:
+                    conn.executescript(SCHEMA)
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️  Render history disabled ({self.db_path}): {e}", file=sys.stderr)
+                self.enabled = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per call keeps worker threads independent
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(
+        self,
+        puml_content: str,
+        operation: str,
+        duration: float,
+        success: bool,
+        timeout: Optional[float] = None,
+        diagram_type: Optional[str] = None,
+        source: Optional[str] = None
+    ) -> None:
+        """Record one validation or render run, evicting runs beyond the retention limits."""
+        if not self.enabled:
+            return
+        fingerprint = diagram_fingerprint(puml_content)
+        try:
+            # Insert and eviction commit together, so readers never see a half-pruned history
+            with self._connect() as conn:
+                cursor = conn.execute(
+                    'INSERT INTO renders VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (fingerprint, diagram_type or history_diagram_type(puml_content),
+                     operation, duration, timeout, int(success), source, time.time())
+                )
+                conn.execute(
+                    'DELETE FROM renders WHERE fingerprint = ? AND operation = ? AND rowid NOT IN '
+                    '(SELECT rowid FROM renders WHERE fingerprint = ? AND operation = ? '
+                    'ORDER BY recorded_at DESC LIMIT ?)',
+                    (fingerprint, operation, fingerprint, operation, MAX_SAMPLES_PER_DIAGRAM)
+                )
+                if cursor.lastrowid % PRUNE_EVERY == 0:
+                    self._prune(conn)
+        except sqlite3.Error as e:
+            print(f"⚠️  Could not record render history: {e}", file=sys.stderr)
+
+    @staticmethod
+    def _prune(conn: sqlite3.Connection) -> int:
+        removed = conn.execute('DELETE FROM renders WHERE recorded_at < ?',
+                               (time.time() - MAX_AGE_DAYS * 86400,)).rowcount
+        removed += conn.execute(
+            'DELETE FROM renders WHERE rowid IN '
+            '(SELECT rowid FROM renders ORDER BY recorded_at DESC LIMIT -1 OFFSET ?)',
+            (MAX_ROWS,)
+        ).rowcount
+        return removed
+
+    def prune(self) -> int:
+        """Apply the age and size limits now; returns the number of runs removed."""
+        if not self.enabled:
+            return 0
+        with self._connect() as conn:
+            return self._prune(conn)
+
+    def timeout_for(
+        self,
+        puml_content: str,
+        operation: str,
+        fallback: Optional[float] = None,
+        diagram_type: Optional[str] = None
+    ) -> int:
+        """
+        Choose a timeout for a diagram from its history.
+
+        Order of preference: the diagram's own history (p99 x margin, doubled
+        after a timeout), then the diagram type's history (p99 x margin, but
+        never below the caller's fallback), then the fallback itself.
+
+        Returns:
+            Timeout in whole seconds, clamped to [MIN_TIMEOUT, MAX_TIMEOUT]; renders
+            are never given less than min_timeout()
+        """
+        default = fallback if fallback is not None else 30
+        if not self.enabled:
+            return int(default)
+
+        floor = min_timeout() if operation == 'render' else MIN_TIMEOUT
+        fingerprint = diagram_fingerprint(puml_content)
+        dtype = diagram_type or history_diagram_type(puml_content)
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    'SELECT duration, timeout, success FROM renders '
+                    'WHERE fingerprint = ? AND operation = ? ORDER BY recorded_at DESC LIMIT ?',
+                    (fingerprint, operation, RECENT_SAMPLES)
+                ).fetchall()
+                type_rows = conn.execute(
+                    'SELECT duration FROM renders '
+                    'WHERE diagram_type = ? AND operation = ? AND success = 1 '
+                    'ORDER BY recorded_at DESC LIMIT ?',
+                    (dtype, operation, RECENT_SAMPLES * 4)
+                ).fetchall()
+        except sqlite3.Error:
+            return int(default)
+
+        if rows:
+            last_duration, last_timeout, last_success = rows[0]
+            if not last_success and last_timeout and last_duration >= 0.95 * last_timeout:
+                return self._clamp(last_timeout * 2, floor)
+
+            durations = [duration for duration, _, success in rows if success]
+            if len(durations) >= MIN_SAMPLES:
+                return self._clamp(percentile(durations, PERCENTILE) * MARGIN, floor)
+
+        if len(type_rows) >= TYPE_MIN_SAMPLES:
+            type_timeout = self._clamp(percentile([row[0] for row in type_rows], PERCENTILE) * MARGIN, floor)
+            # The caller's fallback is a per-diagram estimate: keep it for diagrams bigger than usual
+            return max(type_timeout, int(fallback)) if fallback is not None else type_timeout
+
+        return int(default)
+
+    @staticmethod
+    def _clamp(seconds: float, floor: int = MIN_TIMEOUT) -> int:
+        return int(min(MAX_TIMEOUT, max(floor, math.ceil(seconds))))
+
+    def trending(self, min_samples: int = 6, threshold: float = 1.25) -> List[Trend]:
+        """
+        Find diagrams whose recent render times are trending up.
+
+        Compares the mean of the newer half of each diagram's successful renders
+        with the mean of the older half.
+
+        Returns:
+            Trends with recent/earlier ratio >= threshold, worst first
+        """
+        if not self.enabled:
+            return []
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT fingerprint, diagram_type, source, duration FROM renders "
+                "WHERE operation = 'render' AND success = 1 ORDER BY fingerprint, recorded_at"
+            ).fetchall()
+
+        by_fingerprint = {}
+        for fingerprint, dtype, source, duration in rows:
+            entry = by_fingerprint.setdefault(fingerprint, [dtype, source, []])
+            entry[1] = source or entry[1]
+            entry[2].append(duration)
+
+        trends = []
+        for fingerprint, (dtype, source, durations) in by_fingerprint.items():
+            if len(durations) < min_samples:
+                continue
+            half = len(durations) // 2
+            earlier = sum(durations[:half]) / half
+            recent = sum(durations[-half:]) / half
+            trend = Trend(fingerprint, dtype, source, len(durations), earlier, recent)
+            if trend.ratio >= threshold:
+                trends.append(trend)
+
+        return sorted(trends, key=lambda t: t.ratio, reverse=True)
+
+    def type_stats(self) -> List[tuple]:
+        """Return (diagram_type, operation, samples, p50, p99) for each type."""
+        if not self.enabled:
+            return []
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT diagram_type, operation, duration FROM renders WHERE success = 1'
+            ).fetchall()
+
+        grouped = {}
+        for dtype, operation, duration in rows:
+            grouped.setdefault((dtype, operation), []).append(duration)
+
+        return [(dtype, operation, len(durations), percentile(durations, 50), percentile(durations, 99))
+                for (dtype, operation), durations in sorted(grouped.items())]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Inspect the local PlantUML render duration history',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--db', default=None, help='History database path')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    report = subparsers.add_parser('report', help='List diagrams with render times trending up')
+    report.add_argument('--min-samples', type=int, default=6,
+                        help='Minimum successful renders per diagram (default: 6)')
+    report.add_argument('--threshold', type=float, default=1.25,
+                        help='Recent/earlier mean ratio to report (default: 1.25)')
+
+    subparsers.add_parser('stats', help='Show per-type duration percentiles')
+    subparsers.add_parser('prune', help='Drop runs beyond the retention limits now')
+
+    args = parser.parse_args()
+    history = RenderHistory(Path(args.db) if args.db else None)
+
+    if not history.enabled:
+        print("❌ Error: Render history is disabled", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == 'report':
+        trends = history.trending(args.min_samples, args.threshold)
+        if not trends:
+            print("✅ No diagrams with render times trending up")
+            return
+        print(f"📈 {len(trends)} diagram(s) trending slower:")
+        for t in trends:
+            print(f"  {t.fingerprint} ({t.diagram_type}) {t.earlier_mean:.2f}s → {t.recent_mean:.2f}s "
+                  f"(x{t.ratio:.2f}, {t.samples} samples) {t.source or ''}")
+
+    elif args.command == 'prune':
+        print(f"🧹 Removed {history.prune()} run(s) from {history.db_path}")
+
+    elif args.command == 'stats':
+        for dtype, operation, samples, p50, p99 in history.type_stats():
+            print(f"  {dtype:<10} {operation:<9} n={samples:<5} p50={p50:.2f}s p99={p99:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,8 @@ Usage:
     python resilient_processor.py article.md --format png
     python resilient_processor.py diagram.puml --format svg
     python resilient_processor.py article.md --validate-only
+    python resilient_processor.py docs/ --changed-since origin/main --jobs 4
+    python resilient_processor.py article.md --naming stable
 """
 
 import sys
@@ -19,14 +21,28 @@ import os
 import re
 import json
 import argparse
+import hashlib
 import subprocess
 import shutil
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from dataclasses import dataclass, field
 from typing import List, Tuple, Optional, Dict
 from glob import glob
 
+from changed_files import GitError, affected_files, has_diagrams
+from complexity_estimator import longest_first
+from diagram_names import content_hash, diagram_id, sync_outputs
+from event_log import DEFAULT_LOG_NAME, EventLog
+from layout_engine import apply_engine, choose_engine, fallback_engine, load_benchmarks
+from perf_config import load_perf_profile
+from reference_index import GuideSection, ReferenceIndex
+from stable_output import OutputWriter
+
 # Get the script directory for relative imports
 SCRIPT_DIR = Path(__file__).parent
 SKILL_ROOT = SCRIPT_DIR.parent
@@ -43,6 +59,7 @@ class ErrorResolution:
     suggested_fix: Optional[str] = None
     fixed_content: Optional[str] = None
     search_queries: List[str] = field(default_factory=list)
+    guide_sections: List[GuideSection] = field(default_factory=list)
     resolved: bool = False
 
 
@@ -59,6 +76,7 @@ class ProcessingResult:
     errors: List[ErrorResolution] = field(default_factory=list)
     external_search_needed: bool = False
     search_queries: List[str] = field(default_factory=list)
+    error_log: List[Dict] = field(default_factory=list)
 
 
 class DiagramTypeIdentifier:
@@ -180,11 +198,18 @@ class DiagramTypeIdentifier:
 
 
 class FileNamingConvention:
-    """Implements structured naming convention for diagram files."""
+    """
+    Implements structured naming convention for diagram files.
+
+    In 'index' mode names carry the diagram's position in the document; in
+    'stable' mode the position is replaced by a hash of the diagram source,
+    so inserting or reordering diagrams does not rename the others.
+    """
 
-    def __init__(self, base_dir: Path = None):
+    def __init__(self, base_dir: Path = None, mode: str = 'index'):
         self.base_dir = base_dir or Path('.')
         self.diagrams_dir = self.base_dir / 'diagrams'
+        self.mode = mode
 
     def ensure_directory(self) -> Path:
         """Create diagrams directory if it doesn't exist."""
@@ -196,12 +221,22 @@ class FileNamingConvention:
         markdown_file: str,
         diagram_num: int,
         diagram_type: str,
-        title: Optional[str] = None
+        title: Optional[str] = None,
+        puml_content: Optional[str] = None
     ) -> str:
-        """Generate structured filename following convention."""
+        """
+        Generate structured filename following convention.
+
+        Index mode: <document>_<nnn>_<type>_<title>. Stable mode (needs
+        puml_content): <document>_<type>_<id or title>_<source hash>.
+        """
         # Sanitize markdown filename
         md_name = self._sanitize(markdown_file.replace('.md', ''))
 
+        if self.mode == 'stable' and puml_content is not None:
+            label = self._sanitize(diagram_id(puml_content) or title or 'diagram')[:10]
+            return f"{md_name}_{diagram_type}_{label}_{content_hash(puml_content)}"
+
         # Zero-pad diagram number
         num_padded = f"{diagram_num:03d}"
 
@@ -230,6 +265,7 @@ class ErrorHandler:
         r'headlessexception': ('installation_setup_guide.md', 6),
         r'no dot executable': ('installation_setup_guide.md', 2),
         r'graphviz has crashed': ('installation_setup_guide.md', 3),
+        r'graphviz layout failed': ('performance_guide.md', 4),
         r'no @startuml.*found': ('general_syntax_guide.md', 1),
         r'syntax error': ('general_syntax_guide.md', None),
         r'duplicate participant': ('sequence_diagrams_guide.md', 3),
@@ -241,9 +277,25 @@ class ErrorHandler:
         r'nullpointerexception': ('general_syntax_guide.md', 15),
     }
 
-    def __init__(self, troubleshooting_path: Path = TROUBLESHOOTING_PATH):
+    # Classifications that a different layout engine can get around
+    LAYOUT_CRASHES = {
+        ('installation_setup_guide.md', 3),
+        ('performance_guide.md', 4),
+    }
+
+    # Guide sections attached to an error the patterns do not pin down
+    MAX_GUIDE_SECTIONS = 3
+
+    def __init__(self, troubleshooting_path: Path = TROUBLESHOOTING_PATH, references_path: Path = REFERENCES_PATH):
         self.troubleshooting_path = troubleshooting_path
+        self.references_path = references_path
         self.max_retries = 3
+        self._reference_index: Optional[ReferenceIndex] = None
+        self._index_lock = threading.Lock()
+
+    def is_layout_crash(self, error_output: str) -> bool:
+        """Whether an error is Graphviz failing to lay out the diagram."""
+        return self._classify_error(error_output) in self.LAYOUT_CRASHES
 
     def handle_error(
         self,
@@ -266,6 +318,12 @@ class ErrorHandler:
             if guide_content and error_num:
                 resolution.suggested_fix = f"See {guide} error #{error_num}"
 
+        # Not tied to one guide entry: search the guides offline
+        if not error_num:
+            resolution.guide_sections = self._search_guides(error_output)
+            if resolution.guide_sections and not resolution.suggested_fix:
+                resolution.suggested_fix = f"See {resolution.guide_sections[0]}"
+
         # Generate search queries for external fallback
         resolution.search_queries = self._generate_search_queries(error_output)
 
@@ -288,6 +346,13 @@ class ErrorHandler:
             return guide_path.read_text()
         return None
 
+    def _search_guides(self, error_output: str) -> List[GuideSection]:
+        """Best-matching reference guide sections from the local full-text index."""
+        with self._index_lock:
+            if self._reference_index is None:
+                self._reference_index = ReferenceIndex(self.references_path)
+        return self._reference_index.search(error_output, self.MAX_GUIDE_SECTIONS)
+
     def _generate_search_queries(self, error_output: str) -> List[str]:
         """Generate search queries for external tools."""
         # Extract first 50 chars of error for query
@@ -322,6 +387,17 @@ class ValidationEngine:
         return f"![{alt_text}](diagrams/{filename}.{format})"
 
 
+@dataclass
+class DocumentRun:
+    """Per-call state for one document: where its diagrams go and what it contains."""
+    naming: FileNamingConvention
+    validator: ValidationEngine
+    document_name: str
+    markdown_path: Optional[Path] = None
+    content: str = ''
+    blocks: List[Tuple[str, str]] = field(default_factory=list)
+
+
 class ResilientProcessor:
     """Main orchestrator implementing the 4-step resilient workflow."""
 
@@ -330,21 +406,43 @@ class ResilientProcessor:
         base_dir: Path = None,
         max_retries: int = 3,
         format: str = 'png',
-        verbose: bool = False
+        verbose: bool = False,
+        log_path: Optional[Path] = None,
+        naming_mode: str = 'index'
     ):
         self.base_dir = base_dir or Path('.')
+        self.naming_mode = naming_mode
         self.max_retries = max_retries
         self.format = format
         self.verbose = verbose
+        self.log_path = log_path
 
         # Initialize components
+        self.layout_benchmarks = load_benchmarks()
         self.type_identifier = DiagramTypeIdentifier()
-        self.naming = FileNamingConvention(self.base_dir)
+        self.naming = FileNamingConvention(self.base_dir, naming_mode)
         self.error_handler = ErrorHandler()
         self.validator = ValidationEngine(self.naming.diagrams_dir)
 
-        # Error log
+        # Error log (summary) in document and diagram order, also kept per
+        # diagrams directory; events are streamed to the event log as they happen
         self.error_log = []
+        self._error_logs: Dict[Path, List[Dict]] = {}
+
+        # .puml, image and markdown outputs are only rewritten when their bytes change
+        self.writer = OutputWriter()
+
+        # Document names in use per diagrams directory, so two documents never share output files
+        self._claims: Dict[Tuple[Path, str], Path] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def event_log(self) -> EventLog:
+        """JSONL sink for errors and render metrics (default: diagrams/render_log.jsonl)."""
+        return self._event_log(self.naming.diagrams_dir)
+
+    def _event_log(self, diagrams_dir: Path) -> EventLog:
+        return EventLog(self.log_path or diagrams_dir / DEFAULT_LOG_NAME)
 
     def _log(self, message: str):
         """Log message if verbose mode."""
@@ -356,10 +454,21 @@ class ResilientProcessor:
         puml_content: str,
         markdown_file: str = None,
         diagram_num: int = 1,
-        title: Optional[str] = None
+        title: Optional[str] = None,
+        run: Optional[DocumentRun] = None
     ) -> ProcessingResult:
-        """Process a single PlantUML diagram through the 4-step workflow."""
+        """
+        Process a single PlantUML diagram through the 4-step workflow.
+
+        All state lives in the result and the given DocumentRun (by default
+        the processor's base directory), so diagrams can be processed
+        concurrently on one instance.
+        """
         result = ProcessingResult()
+        standalone = run is None
+        if standalone:
+            run = DocumentRun(self.naming, self.validator, markdown_file or 'standalone')
+        naming, validator = run.naming, run.validator
 
         # Step 1: Identify diagram type
         diagram_type = self.type_identifier.identify_from_content(puml_content)
@@ -368,29 +477,36 @@ class ResilientProcessor:
         self._log(f"Step 1: Identified diagram type: {diagram_type}")
 
         # Step 2: Create file with structured naming
-        self.naming.ensure_directory()
-        filename = self.naming.generate_filename(
+        naming.ensure_directory()
+        filename = naming.generate_filename(
             markdown_file or 'standalone',
             diagram_num,
             diagram_type,
-            title
+            title,
+            puml_content
         )
-        puml_path = self.naming.get_full_path(filename, 'puml')
+        puml_path = naming.get_full_path(filename, 'puml')
         result.puml_path = puml_path
 
-        # Write .puml file
-        puml_path.write_text(puml_content)
-        self._log(f"Step 2: Created {puml_path}")
+        # Write .puml file, with the layout engine suited to its size
+        engine = choose_engine(puml_content, self.layout_benchmarks)
+        current_content = apply_engine(puml_content, engine)
+        self.writer.write_text(puml_path, current_content)
+        self._log(f"Step 2: Created {puml_path}" + (f" (layout: {engine})" if engine else ''))
 
         # Step 3: Convert with error handling
         success = False
-        current_content = puml_content
+        started = time.monotonic()
+        attempts = 0
 
         for retry in range(self.max_retries):
-            success, error = self._convert(puml_path)
+            attempts += 1
+            success, error = self._convert(puml_path, naming.diagrams_dir)
 
             if success:
                 self._log(f"Step 3: Conversion successful (attempt {retry + 1})")
+                if result.errors and result.errors[-1].fixed_content:
+                    result.errors[-1].resolved = True
                 break
             else:
                 self._log(f"Step 3: Conversion failed (attempt {retry + 1}): {error}")
@@ -401,20 +517,39 @@ class ResilientProcessor:
                 )
                 result.errors.append(resolution)
 
+                # Graphviz crashes: retry with the next layout engine
+                next_engine = None
+                if self.error_handler.is_layout_crash(error):
+                    next_engine = fallback_engine(current_content)
+                if next_engine:
+                    current_content = apply_engine(current_content, next_engine)
+                    self.writer.write_text(puml_path, current_content)
+                    resolution.fixed_content = current_content
+                    resolution.suggested_fix = f"Retry with !pragma layout {next_engine}"
+                    self._log(f"Step 3: Graphviz crashed, switching layout to {next_engine}")
+
                 # Log error
-                self._log_error(filename, error, resolution)
+                self._log_error(filename, error, resolution, result, naming.diagrams_dir)
 
-                if not resolution.resolved:
+                if not resolution.resolved and not resolution.guide_sections:
                     result.external_search_needed = True
                     result.search_queries = resolution.search_queries
 
         result.conversion_success = success
+        self._event_log(naming.diagrams_dir).write(
+            'render',
+            diagram=filename,
+            diagram_type=diagram_type,
+            duration=round(time.monotonic() - started, 3),
+            attempts=attempts,
+            success=success
+        )
 
         # Step 4: Validate and create markdown link
         if success:
-            if self.validator.verify_image_exists(filename, self.format):
-                result.image_path = self.naming.get_full_path(filename, self.format)
-                result.markdown_link = self.validator.generate_markdown_link(
+            if validator.verify_image_exists(filename, self.format):
+                result.image_path = naming.get_full_path(filename, self.format)
+                result.markdown_link = validator.generate_markdown_link(
                     filename,
                     self.format,
                     title
@@ -424,72 +559,146 @@ class ResilientProcessor:
                 result.validation_error = "Image file not created despite successful conversion"
                 self._log(f"Step 4: FAILED - {result.validation_error}")
 
+        if standalone:
+            self._merge_errors(naming.diagrams_dir, [result])
         return result
 
     def process_markdown(self, markdown_path: Path) -> Tuple[List[ProcessingResult], str]:
         """Process all PlantUML diagrams in a markdown file."""
-        content = markdown_path.read_text()
-        markdown_name = markdown_path.stem
-
-        # Update naming base directory to markdown file's directory
-        self.naming = FileNamingConvention(markdown_path.parent)
-        self.validator = ValidationEngine(self.naming.diagrams_dir)
-
-        # Extract puml blocks
-        blocks = self._extract_puml_blocks(content)
-        results = []
-        updated_content = content
+        run = self._prepare(markdown_path)
+        self._log(f"Found {len(run.blocks)} PlantUML block(s) in {markdown_path}")
 
-        self._log(f"Found {len(blocks)} PlantUML block(s) in {markdown_path}")
-
-        for i, (block_content, full_match) in enumerate(blocks, 1):
-            # Extract title from first line if comment
-            title = self._extract_title(block_content)
-
-            result = self.process_diagram(
-                block_content,
-                markdown_file=markdown_name,
-                diagram_num=i,
-                title=title
-            )
-            results.append(result)
+        results = [
+            self.process_diagram(block_content, run.document_name, i, self._extract_title(block_content), run)
+            for i, (block_content, _) in enumerate(run.blocks, 1)
+        ]
+        return results, self._finish(run, results)
 
-            # Replace block with image link if successful
+    def process_many(
+        self,
+        markdown_paths: List[Path],
+        jobs: Optional[int] = None
+    ) -> Dict[Path, Tuple[List[ProcessingResult], str]]:
+        """
+        Process several markdown files, their diagrams running concurrently.
+
+        Every diagram of every document goes onto one pool of `jobs` threads,
+        most expensive first. Documents whose names would give the same output
+        files in a shared diagrams directory get a suffix derived from their
+        file name, so naming does not depend on scheduling. Results, the
+        merged error log and error_log.json follow the input order.
+
+        Returns:
+            Mapping of markdown path (in input order) to (results, updated_content)
+        """
+        markdown_paths = list(dict.fromkeys(markdown_paths))
+        names = self._document_names(markdown_paths)
+        runs = [self._prepare(path, names[path]) for path in markdown_paths]
+        tasks = [(run, i, block_content) for run in runs for i, (block_content, _) in enumerate(run.blocks, 1)]
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs or os.cpu_count() or 1)) as pool:
+            futures = {
+                (id(run), i): pool.submit(self.process_diagram, block_content, run.document_name, i,
+                                          self._extract_title(block_content), run)
+                for run, i, block_content in longest_first(tasks, lambda task: task[2])
+            }
+            outcome = {}
+            for run in runs:
+                results = [futures[(id(run), i)].result() for i in range(1, len(run.blocks) + 1)]
+                outcome[run.markdown_path] = (results, self._finish(run, results))
+        return outcome
+
+    def _prepare(self, markdown_path: Path, document_name: Optional[str] = None) -> DocumentRun:
+        """Read a document and set up its per-call state; diagrams go to diagrams/ next to it."""
+        content = markdown_path.read_text()
+        naming = FileNamingConvention(markdown_path.parent, self.naming_mode)
+        if document_name is None:
+            document_name = self._document_names([markdown_path])[markdown_path]
+        return DocumentRun(naming, ValidationEngine(naming.diagrams_dir), document_name,
+                           markdown_path, content, self._extract_puml_blocks(content))
+
+    def _finish(self, run: DocumentRun, results: List[ProcessingResult]) -> str:
+        """
+        Replace converted blocks with image links and merge the document's errors.
+
+        Files the document's previous run wrote to the diagrams directory but
+        this one did not are deleted, unless a diagram failed
+        (diagram_names.sync_outputs).
+        """
+        updated_content = run.content
+        for (_, full_match), result in zip(run.blocks, results):
             if result.conversion_success and result.markdown_link:
-                updated_content = updated_content.replace(
-                    full_match,
-                    result.markdown_link
-                )
-
-        return results, updated_content
-
-    def _convert(self, puml_path: Path) -> Tuple[bool, str]:
+                updated_content = updated_content.replace(full_match, result.markdown_link)
+        self._merge_errors(run.naming.diagrams_dir, results)
+
+        files = [path.name for result in results for path in (result.puml_path, result.image_path) if path]
+        complete = all(result.conversion_success for result in results)
+        removed = sync_outputs(run.naming.diagrams_dir, run.document_name, files, complete)
+        if removed:
+            self._log(f"Removed {len(removed)} orphaned file(s) from earlier runs")
+        return updated_content
+
+    def _document_names(self, markdown_paths: List[Path]) -> Dict[Path, str]:
+        """
+        Output name per document, unique within each diagrams directory.
+
+        A document keeps its sanitized stem unless another document (in this
+        call or an earlier one) already uses it in the same directory, e.g.
+        "My Doc.md" and "my-doc.md". Then each gets the stem plus a short
+        hash of its own file name.
+        """
+        groups = defaultdict(list)
+        for path in markdown_paths:
+            naming = FileNamingConvention(path.parent)
+            groups[(naming.diagrams_dir.resolve(), naming._sanitize(path.stem))].append(path)
+
+        names = {}
+        with self._lock:
+            for key, members in groups.items():
+                diagrams_dir, stem = key
+                owner = self._claims.get(key)
+                shared = len(members) > 1 or (owner is not None and owner != members[0].resolve())
+                for path in members:
+                    name = stem
+                    if shared:
+                        name = f"{stem}_{hashlib.sha1(path.name.encode('utf-8')).hexdigest()[:6]}"
+                    self._claims.setdefault((diagrams_dir, name), path.resolve())
+                    names[path] = name
+        return names
+
+    def _merge_errors(self, diagrams_dir: Path, results: List[ProcessingResult]) -> None:
+        entries = [entry for result in results for entry in result.error_log]
+        with self._lock:
+            self.error_log.extend(entries)
+            self._error_logs.setdefault(diagrams_dir, []).extend(entries)
+
+    def _convert(self, puml_path: Path, diagrams_dir: Path) -> Tuple[bool, str]:
         """Execute PlantUML conversion."""
         # Import convert_puml function
         try:
-            from convert_puml import convert_puml, find_plantuml_jar
+            from convert_puml import render_puml
         except ImportError:
             # Fallback: call convert_puml.py directly
-            return self._convert_subprocess(puml_path)
+            return self._convert_subprocess(puml_path, diagrams_dir)
 
         try:
-            success = convert_puml(
+            return render_puml(
                 str(puml_path),
                 self.format,
-                str(self.naming.diagrams_dir)
+                str(diagrams_dir),
+                writer=self.writer
             )
-            return (success, '' if success else 'Conversion failed')
         except Exception as e:
             return (False, str(e))
 
-    def _convert_subprocess(self, puml_path: Path) -> Tuple[bool, str]:
+    def _convert_subprocess(self, puml_path: Path, diagrams_dir: Path) -> Tuple[bool, str]:
         """Fallback conversion using subprocess."""
         script_path = SCRIPT_DIR / 'convert_puml.py'
         cmd = [
             sys.executable, str(script_path),
             str(puml_path),
             '--format', self.format,
-            '--output-dir', str(self.naming.diagrams_dir)
+            '--output-dir', str(diagrams_dir)
         ]
 
         result = subprocess.run(cmd, capture_output=True, text=True)
@@ -524,23 +733,82 @@ class ResilientProcessor:
 
         return None
 
-    def _log_error(self, filename: str, error: str, resolution: ErrorResolution):
-        """Log error to error log."""
+    def _log_error(
+        self,
+        filename: str,
+        error: str,
+        resolution: ErrorResolution,
+        result: ProcessingResult,
+        diagrams_dir: Path
+    ):
+        """Record an error on the diagram's result (merged into error_log later) and stream it."""
         entry = {
             'timestamp': datetime.now().isoformat(),
             'file': filename,
             'error': error[:200],
             'guide_consulted': resolution.guide_loaded,
+            'guide_sections': [str(section) for section in resolution.guide_sections],
             'resolved': resolution.resolved
         }
-        self.error_log.append(entry)
+        result.error_log.append(entry)
+        self._event_log(diagrams_dir).write(
+            'error',
+            diagram=filename,
+            error=error[:200],
+            guide=resolution.guide_loaded,
+            error_number=resolution.error_number,
+            sections=[str(section) for section in resolution.guide_sections],
+            resolved=resolution.resolved
+        )
 
     def save_error_log(self):
-        """Save error log to JSON file."""
-        if self.error_log:
-            log_path = self.naming.diagrams_dir / 'error_log.json'
-            with open(log_path, 'w') as f:
-                json.dump({'entries': self.error_log}, f, indent=2)
+        """
+        Save this run's error summary to error_log.json.
+
+        Each diagrams directory gets the entries of the documents processed
+        into it, in document and diagram order. The durable, append-only
+        record is the JSONL event log; this file only reflects the last run in
+        its directory.
+        """
+        for diagrams_dir, entries in self._error_logs.items():
+            if entries:
+                with open(diagrams_dir / 'error_log.json', 'w') as f:
+                    json.dump({'entries': entries}, f, indent=2)
+
+
+def process_changed(root: Path, args: argparse.Namespace) -> int:
+    """Process every markdown file under root affected since args.changed_since."""
+    try:
+        markdown_files, _ = affected_files(args.changed_since, root)
+    except GitError as e:
+        print(f"ERROR: {e}")
+        return 1
+
+    markdown_files = [path for path in markdown_files if has_diagrams(path)]
+    print(f"{len(markdown_files)} markdown file(s) affected since {args.changed_since}")
+
+    processor = ResilientProcessor(
+        base_dir=Path(args.output_dir) if args.output_dir else root,
+        max_retries=args.max_retries,
+        format=args.format,
+        verbose=args.verbose,
+        log_path=Path(args.log) if args.log else None,
+        naming_mode=args.naming
+    )
+
+    all_ok = True
+    for markdown_path, (results, updated_content) in processor.process_many(markdown_files, args.jobs).items():
+        success_count = sum(1 for r in results if r.conversion_success)
+        print(f"  {markdown_path}: {success_count}/{len(results)} diagram(s)")
+
+        if success_count > 0:
+            output_path = markdown_path.with_name(f"{markdown_path.stem}_with_images.md")
+            processor.writer.write_text(output_path, updated_content)
+        all_ok = all_ok and success_count == len(results)
+
+    print(f"Files: {processor.writer.summary()}")
+    processor.save_error_log()
+    return 0 if all_ok else 1
 
 
 def main():
@@ -559,15 +827,31 @@ def main():
                         help='Only validate syntax without converting')
     parser.add_argument('--verbose', '-v', action='store_true',
                         help='Verbose output')
+    parser.add_argument('--changed-since', metavar='GIT_REF', default=None,
+                        help='Process only markdown under input (a directory) '
+                             'affected by changes since GIT_REF')
+    parser.add_argument('--log', default=None,
+                        help=f'JSONL event log, shareable between runs (default: diagrams/{DEFAULT_LOG_NAME})')
+    parser.add_argument('--naming', choices=['index', 'stable'], default='index',
+                        help='File names: index (<doc>_<nnn>_...) or stable (<doc>_<type>_<id or title>_<hash>)')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Diagrams converted concurrently (default: profiled concurrency, else CPU count)')
 
     args = parser.parse_args()
 
+    if args.jobs is None:
+        profile = load_perf_profile()
+        args.jobs = profile.jobs if profile else None
+
     input_path = Path(args.input)
 
     if not input_path.exists():
         print(f"ERROR: File not found: {input_path}")
         sys.exit(1)
 
+    if args.changed_since:
+        sys.exit(process_changed(input_path, args))
+
     # Determine base directory
     base_dir = Path(args.output_dir) if args.output_dir else input_path.parent
 
@@ -575,7 +859,9 @@ def main():
         base_dir=base_dir,
         max_retries=args.max_retries,
         format=args.format,
-        verbose=args.verbose
+        verbose=args.verbose,
+        log_path=Path(args.log) if args.log else None,
+        naming_mode=args.naming
     )
 
     if input_path.suffix == '.puml':
@@ -597,12 +883,15 @@ def main():
             print(f"Markdown: {result.markdown_link}")
         else:
             print(f"Errors: {len(result.errors)}")
+            sections = result.errors[-1].guide_sections if result.errors else []
+            for section in sections:
+                print(f"Guide: {section}")
             if result.external_search_needed:
                 print(f"Search queries: {result.search_queries}")
 
     elif input_path.suffix == '.md':
-        # Process markdown file
-        results, updated_content = processor.process_markdown(input_path)
+        # Process markdown file, its diagrams concurrently
+        results, updated_content = processor.process_many([input_path], args.jobs)[input_path]
 
         print(f"\n{'='*50}")
         print(f"Processed {len(results)} diagram(s)")
@@ -617,13 +906,15 @@ def main():
         if success_count > 0:
             # Save updated markdown
             output_path = input_path.with_name(f"{input_path.stem}_with_images.md")
-            output_path.write_text(updated_content)
+            processor.writer.write_text(output_path, updated_content)
             print(f"\nUpdated markdown saved to: {output_path}")
 
     else:
         print(f"ERROR: Unsupported file type: {input_path.suffix}")
         sys.exit(1)
 
+    print(f"Files: {processor.writer.summary()}")
+
     # Save error log if any errors occurred
     processor.save_error_log()
 
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Load-aware governor for the JVMs that render diagrams.
+
+Every processor sizes its own thread pool, so two builds (or a build and a
+preview server) on one machine each start a JVM per CPU and together push it
+into swap. The Performance guide (Error #13) fixes this by hand with nice,
+ionice and a lower --jobs; the governor does it for every JVM the scripts
+start:
+
+- Caps concurrent JVMs machine-wide, across processes: a render holds one of
+  `max_jvms` slot files under an exclusive lock for as long as its JVM runs.
+  The default cap is the profile's `jobs` (check_setup.py --profile), else as
+  many JVMs as fit in available memory, at most one per CPU.
+- Lowers child priority with nice and, where available, ionice (best-effort
+  class, lowest level).
+- Applies a per-child CPU-seconds rlimit, which Graphviz (started by the
+  JVM) inherits, and bounds JVM memory outside the heap with
+  -XX:MaxMetaspaceSize (jvm_command). Address space is never limited: a
+  64-bit JVM reserves far more of it than it uses and would fail to start.
+  A hard data-segment limit (-Xmx plus `memory_overhead_mb`, RLIMIT_DATA)
+  is opt-in with `hard_memory_limit`.
+- Throttles: while the load average per CPU is above `max_load` or available
+  memory is below `min_free_mb`, new JVMs wait for the pressure to drop. The
+  first slot is exempt, so work always progresses.
+
+Limits are applied by a `sh -c 'ulimit ...; exec "$@"'` prefix rather than
+preexec_fn, which is not safe in threaded processes.
+
+Settings are per machine, in the "governor" section of the performance
+profile (perf_config.py), e.g.:
+
+    "governor": {"max_jvms": 4, "nice": 10, "ionice": true, "cpu_seconds": 900,
+                 "max_metaspace_mb": 256, "hard_memory_limit": false,
+                 "memory_overhead_mb": 2048, "max_load": 1.5, "min_free_mb": 512}
+
+Set PLANTUML_GOVERNOR=off to disable the governor.
+
+Usage:
+    python resource_governor.py status
+    python resource_governor.py run [--heap-mb N] -- COMMAND...
+
+Examples:
+    # Show the effective settings, current pressure and busy slots
+    python resource_governor.py status
+
+    # Run any JVM under the same limits and slots as the processors
+    python resource_governor.py run --heap-mb 1024 -- java -Xmx1024m -jar plantuml.jar big.puml
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: slots are per process
+    fcntl = None
+
+from perf_config import PerfProfile, load_perf_profile
+
+DEFAULT_SLOT_DIR = Path.home() / '.cache' / 'plantuml' / 'jvm-slots'
+
+# Seconds between checks while waiting for a slot or for pressure to drop
+POLL_INTERVAL = 0.25
+
+# Heap assumed for a JVM when sizing the default cap without a profile
+DEFAULT_JVM_MB = 1024
+
+
+@dataclass
+class GovernorConfig:
+    """Per-machine governor settings; see the module docstring."""
+    max_jvms: Optional[int] = None
+    nice: int = 10
+    ionice: bool = True
+    cpu_seconds: Optional[int] = 900
+    max_metaspace_mb: Optional[int] = 256
+    hard_memory_limit: bool = False
+    memory_overhead_mb: int = 2048
+    max_load: float = 1.5
+    min_free_mb: int = 512
+
+
+def load_governor_config(profile: Optional[PerfProfile]) -> GovernorConfig:
+    """Governor settings from the profile's "governor" section; defaults for anything missing or invalid."""
+    settings = profile.governor if profile else {}
+    known = {key: value for key, value in settings.items() if key in GovernorConfig.__dataclass_fields__}
+    try:
+        config = GovernorConfig(**known)
+        if config.max_jvms is not None and int(config.max_jvms) < 1:
+            raise ValueError("max_jvms must be at least 1")
+        if float(config.max_load) <= 0 or int(config.min_free_mb) < 0:
+            raise ValueError("max_load must be positive and min_free_mb not negative")
+    except (TypeError, ValueError) as e:
+        print(f"⚠️  Ignoring governor settings: {e}", file=sys.stderr)
+        return GovernorConfig()
+    return config
+
+
+def default_max_jvms(profile: Optional[PerfProfile]) -> int:
+    """The profile's job count, else as many JVMs as fit in available memory, at most one per CPU."""
+    if profile:
+        return profile.jobs
+    from check_setup import JVM_OVERHEAD_MB, available_memory_mb
+    cpu_count = os.cpu_count() or 1
+    available_mb = available_memory_mb()
+    if not available_mb:
+        return cpu_count
+    return max(1, min(cpu_count, int(available_mb * 0.75 // (DEFAULT_JVM_MB + JVM_OVERHEAD_MB))))
+
+
+def pressure(config: GovernorConfig) -> Optional[str]:
+    """Why new JVMs should wait right now, or None if the machine has headroom."""
+    from check_setup import available_memory_mb
+    try:
+        load = os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        load = 0.0
+    if load > config.max_load:
+        return f"load {load:.2f}/CPU"
+    available_mb = available_memory_mb()
+    if available_mb is not None and available_mb < config.min_free_mb:
+        return f"{available_mb} MB free"
+    return None
+
+
+class ResourceGovernor:
+    """
+    Hands out JVM slots and the command prefix that applies priority and rlimits.
+
+    Safe to share between threads; slots are also shared with other processes
+    through lock files in slot_dir (per process only where fcntl is missing).
+    """
+
+    def __init__(self, config: GovernorConfig, max_jvms: int, slot_dir: Path = DEFAULT_SLOT_DIR):
+        self.config = config
+        self.max_jvms = max_jvms
+        self.slot_dir = slot_dir
+        self.throttled = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+        self._local_slots = [threading.Lock() for _ in range(max_jvms)]
+        self._ionice = config.ionice and shutil.which('ionice') is not None
+
+    def _try_slot(self, index: int):
+        """A held slot (lock file handle, or local lock), or None if it is busy."""
+        if fcntl is None:
+            local = self._local_slots[index]
+            return local if local.acquire(blocking=False) else None
+        handle = open(self.slot_dir / f"slot{index}.lock", 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+        return handle
+
+    @staticmethod
+    def _release(held) -> None:
+        if fcntl is None:
+            held.release()
+        else:
+            fcntl.flock(held, fcntl.LOCK_UN)
+            held.close()
+
+    def _acquire(self) -> Tuple[int, object]:
+        """Block until a slot is free and, for all but the first slot, the machine has headroom."""
+        if fcntl is not None:
+            self.slot_dir.mkdir(parents=True, exist_ok=True)
+        started = time.monotonic()
+        throttled = False
+        while True:
+            for index in range(self.max_jvms):
+                held = self._try_slot(index)
+                if held is None:
+                    continue
+                if index > 0 and pressure(self.config):
+                    self._release(held)
+                    throttled = True
+                    break
+                waited = time.monotonic() - started
+                with self._lock:
+                    self.throttled += throttled
+                    self.waited += waited
+                return index, held
+            time.sleep(POLL_INTERVAL)
+
+    def command_prefix(self, heap_mb: Optional[int] = None) -> List[str]:
+        """
+        Arguments to put before a JVM command line to apply priority and rlimits.
+
+        Args:
+            heap_mb: The JVM's -Xmx in MB; with hard_memory_limit, the data-segment
+                limit is only set when it is known
+
+        Returns:
+            The prefix, empty on platforms without a POSIX shell
+        """
+        if os.name != 'posix':
+            return []
+        limits = []
+        if self.config.cpu_seconds:
+            limits.append(f"ulimit -t {int(self.config.cpu_seconds)}")
+        if heap_mb and self.config.hard_memory_limit and self.config.memory_overhead_mb:
+            limits.append(f"ulimit -d {(int(heap_mb) + int(self.config.memory_overhead_mb)) * 1024}")
+        prefix = ['sh', '-c', '; '.join(limits) + '; exec "$@"', 'sh'] if limits else []
+        if self.config.nice:
+            prefix += ['nice', '-n', str(int(self.config.nice))]
+        if self._ionice:
+            prefix += ['ionice', '-c', '2', '-n', '7']
+        return prefix
+
+    def jvm_options(self) -> List[str]:
+        """JVM flags bounding memory outside the heap."""
+        if not self.config.max_metaspace_mb:
+            return []
+        return [f"-XX:MaxMetaspaceSize={int(self.config.max_metaspace_mb)}m"]
+
+    @contextmanager
+    def slot(self, heap_mb: Optional[int] = None) -> Iterator[List[str]]:
+        """Hold a JVM slot for the duration of the block; yields command_prefix(heap_mb)."""
+        _, held = self._acquire()
+        try:
+            yield self.command_prefix(heap_mb)
+        finally:
+            self._release(held)
+
+    def busy_slots(self) -> int:
+        """Slots currently held by any process (only this process's where fcntl is missing)."""
+        if fcntl is not None and not self.slot_dir.exists():
+            return 0
+        busy = 0
+        for index in range(self.max_jvms):
+            held = self._try_slot(index)
+            if held is None:
+                busy += 1
+            else:
+                self._release(held)
+        return busy
+
+
+_governor: Optional[ResourceGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> Optional[ResourceGovernor]:
+    """The process-wide governor, created from the performance profile; None when disabled."""
+    global _governor
+    if os.environ.get('PLANTUML_GOVERNOR') == 'off':
+        return None
+    with _governor_lock:
+        if _governor is None:
+            profile = load_perf_profile()
+            config = load_governor_config(profile)
+            slot_dir = Path(os.environ.get('PLANTUML_GOVERNOR_DIR', DEFAULT_SLOT_DIR))
+            _governor = ResourceGovernor(config, config.max_jvms or default_max_jvms(profile), slot_dir)
+        return _governor
+
+
+def jvm_command(cmd: List[str]) -> List[str]:
+    """
+    A command line with the governor's JVM flags inserted after a leading `java`.
+
+    Other commands (a `plantuml` wrapper script) and a disabled governor
+    leave the command unchanged.
+    """
+    governor = get_governor()
+    if governor is None or not cmd or os.path.basename(cmd[0]) not in ('java', 'java.exe'):
+        return cmd
+    return cmd[:1] + governor.jvm_options() + cmd[1:]
+
+
+@contextmanager
+def jvm_slot(heap_mb: Optional[int] = None) -> Iterator[List[str]]:
+    """
+    Wait for a JVM slot and yield the command prefix to run the JVM with.
+
+    Start timing inside the block, so waiting for a slot does not count
+    against render timeouts and history. Yields an empty prefix when the
+    governor is disabled.
+
+    Example:
+        with jvm_slot(heap_mb) as prefix:
+            result = subprocess.run(prefix + cmd, ...)
+    """
+    governor = get_governor()
+    if governor is None:
+        yield []
+        return
+    with governor.slot(heap_mb) as prefix:
+        yield prefix
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Machine-wide slots, priority and rlimits for PlantUML JVMs',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('status', help='Show settings, pressure and busy slots')
+    run_parser = subparsers.add_parser('run', help='Run a command under the governor')
+    run_parser.add_argument('--heap-mb', type=int, default=None, help="The command's -Xmx in MB")
+    run_parser.add_argument('cmd', nargs=argparse.REMAINDER, help='Command to run (after --)')
+    args = parser.parse_args()
+
+    governor = get_governor()
+    if governor is None:
+        print("⚠️  Governor disabled (PLANTUML_GOVERNOR=off)", file=sys.stderr)
+        if args.command == 'status':
+            return
+
+    if args.command == 'status':
+        print(f"🚦 JVM slots: {governor.busy_slots()}/{governor.max_jvms} busy ({governor.slot_dir})")
+        settings = asdict(governor.config)
+        settings['max_jvms'] = governor.max_jvms
+        for key, value in settings.items():
+            print(f"   {key}: {value}")
+        reason = pressure(governor.config)
+        print(f"   Pressure: {reason or 'none'}")
+        print(f"   Prefix: {' '.join(governor.command_prefix(DEFAULT_JVM_MB)) or '(none)'}")
+        print(f"   JVM options: {' '.join(governor.jvm_options()) or '(none)'}")
+        return
+
+    cmd = args.cmd[1:] if args.cmd[:1] == ['--'] else args.cmd
+    if not cmd:
+        parser.error("run needs a command after --")
+    try:
+        with jvm_slot(args.heap_mb) as prefix:
+            sys.exit(subprocess.run(prefix + jvm_command(cmd)).returncode)
+    except FileNotFoundError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(127)
+
+
+if __name__ == '__main__':
+    main()
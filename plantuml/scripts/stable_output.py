@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Deterministic, write-if-changed output files.
+
+PlantUML output is not byte-stable: SVGs carry the PlantUML version and the
+diagram source in processing instructions and comments, PNGs carry the source
+(and, depending on the version, a timestamp) in metadata chunks. Rewriting
+every output on every run bumps mtimes, invalidates CDN caches, triggers
+re-uploads and dirties git even when nothing was redrawn.
+
+normalize_render() strips that metadata without touching what is drawn, and
+OutputWriter only replaces a file when its new bytes differ from what is on
+disk, so unchanged outputs keep their mtime. Replacements go through a
+temporary file in the same directory and os.replace, so readers never see a
+half-written file. The writer counts written and unchanged files for the run
+summary, and can optimize images in memory (optimize_images) before comparing,
+so optimized outputs stay stable too.
+
+Usage:
+    python stable_output.py images/*.png images/*.svg [--check]
+
+Examples:
+    # Normalize existing renders in place (once, after upgrading)
+    python stable_output.py images/*.svg images/*.png
+
+    # CI: exit 1 if any output still carries volatile metadata
+    python stable_output.py images/* --check
+"""
+
+import argparse
+import os
+import re
+import sys
+import threading
+import zlib
+from pathlib import Path
+from typing import List, Union
+
+from optimize_images import (
+    CACHE_DIRNAME, PNG_METADATA_CHUNKS, PNG_SIGNATURE, OptimizationResult,
+    optimize_bytes, png_chunk, read_png_chunks
+)
+
+# Version and source PIs (<?plantuml 1.2024.3?>, <?plantuml-src ...?>) and source comments
+SVG_VOLATILE = re.compile(rb'<\?plantuml(?:-src)?\b.*?\?>|<!--(?:SRC=\[|\s*@start).*?-->', re.DOTALL)
+
+# Unchanged files are compared in chunks of this size
+COMPARE_CHUNK = 1024 * 1024
+
+
+def normalize_svg(data: bytes) -> bytes:
+    """SVG bytes without the PlantUML version and embedded diagram source."""
+    return SVG_VOLATILE.sub(b'', data)
+
+
+def normalize_png(data: bytes) -> bytes:
+    """PNG bytes without text, time and EXIF chunks; image data is copied as is."""
+    try:
+        chunks = read_png_chunks(data)
+    except ValueError:
+        return data
+    if not any(chunk_type in PNG_METADATA_CHUNKS for chunk_type, _ in chunks):
+        return data
+    return PNG_SIGNATURE + b''.join(png_chunk(chunk_type, payload) for chunk_type, payload in chunks
+                                    if chunk_type not in PNG_METADATA_CHUNKS)
+
+
+NORMALIZERS = {
+    '.png': normalize_png,
+    '.svg': normalize_svg,
+}
+
+
+def normalize_render(data: bytes, suffix: str) -> bytes:
+    """Strip volatile metadata from a rendered image ('.png' or '.svg'); other files are returned as is."""
+    normalizer = NORMALIZERS.get(suffix.lower())
+    return normalizer(data) if normalizer else data
+
+
+def same_content(path: Path, data: bytes) -> bool:
+    """True if path exists and holds exactly data."""
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        with open(path, 'rb') as f:
+            for pos in range(0, len(data), COMPARE_CHUNK):
+                if f.read(COMPARE_CHUNK) != data[pos:pos + COMPARE_CHUNK]:
+                    return False
+        return True
+    except OSError:
+        return False
+
+
+def same_files(a: Path, b: Path) -> bool:
+    """True if both files exist with identical bytes."""
+    try:
+        if a.stat().st_size != b.stat().st_size:
+            return False
+        with open(a, 'rb') as fa, open(b, 'rb') as fb:
+            while True:
+                chunk = fa.read(COMPARE_CHUNK)
+                if chunk != fb.read(COMPARE_CHUNK):
+                    return False
+                if not chunk:
+                    return True
+    except OSError:
+        return False
+
+
+class OutputWriter:
+    """
+    Writes output files only when their content changed.
+
+    Safe to share between render threads. `written` and `unchanged` list the
+    paths seen this run; with optimize set, `optimization` holds one
+    OptimizationResult per image for print_optimization_report.
+    """
+
+    def __init__(self, optimize: bool = False, use_cache: bool = True):
+        self.optimize = optimize
+        self.use_cache = use_cache
+        self.written: List[Path] = []
+        self.unchanged: List[Path] = []
+        self.optimization: List[OptimizationResult] = []
+        self._lock = threading.Lock()
+
+    def write_bytes(self, path: Union[str, Path], data: bytes) -> bool:
+        """
+        Write data to path unless it already holds exactly these bytes.
+
+        Returns:
+            True if the file was (re)written, False if it was left untouched
+        """
+        path = Path(path)
+        if same_content(path, data):
+            self._count(path, False)
+            return False
+
+        # Unique per writer thread; opened normally (unlike mkstemp) so the umask sets permissions
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            raise
+        self._count(path, True)
+        return True
+
+    def write_text(self, path: Union[str, Path], text: str) -> bool:
+        """write_bytes for UTF-8 text."""
+        return self.write_bytes(path, text.encode('utf-8'))
+
+    def write_render(self, path: Union[str, Path], data: bytes) -> bool:
+        """
+        Normalize (and optionally optimize) a rendered image, then write it if changed.
+
+        Returns:
+            True if the file was (re)written, False if it was left untouched
+        """
+        path = Path(path)
+        data = normalize_render(data, path.suffix)
+        if self.optimize:
+            result = OptimizationResult(path=path, original_size=len(data))
+            cache_dir = path.parent / CACHE_DIRNAME if self.use_cache else None
+            try:
+                data, result.from_cache = optimize_bytes(data, path.suffix, cache_dir)
+            except (OSError, ValueError, zlib.error) as e:
+                result.error = str(e)
+            result.optimized_size = len(data)
+            with self._lock:
+                self.optimization.append(result)
+        return self.write_bytes(path, data)
+
+    def replace(self, tmp_path: Union[str, Path], path: Union[str, Path]) -> bool:
+        """
+        Move a fully written temporary file into place unless path already has the same bytes.
+
+        The temporary file is removed either way.
+
+        Returns:
+            True if path was replaced, False if it was left untouched
+        """
+        tmp_path, path = Path(tmp_path), Path(path)
+        if same_files(tmp_path, path):
+            tmp_path.unlink()
+            self._count(path, False)
+            return False
+        os.replace(tmp_path, path)
+        self._count(path, True)
+        return True
+
+    def _count(self, path: Path, written: bool) -> None:
+        with self._lock:
+            (self.written if written else self.unchanged).append(path)
+
+    def summary(self) -> str:
+        """One-line count of written and unchanged files."""
+        return f"{len(self.written)} written, {len(self.unchanged)} unchanged"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Strip volatile metadata from rendered PlantUML images, rewriting only changed files',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('images', nargs='+', help='PNG/SVG files')
+    parser.add_argument('--check', action='store_true',
+                        help='Only report files that are not normalized; exit 1 if any')
+    args = parser.parse_args()
+
+    writer = OutputWriter()
+    unnormalized = []
+    for name in args.images:
+        path = Path(name)
+        if path.suffix.lower() not in NORMALIZERS or not path.is_file():
+            print(f"⚠️  Skipping {path}: not a PNG/SVG file", file=sys.stderr)
+            continue
+        data = path.read_bytes()
+        if args.check:
+            if normalize_render(data, path.suffix) != data:
+                unnormalized.append(path)
+                print(f"❌ {path}: contains volatile metadata")
+        elif writer.write_render(path, data):
+            print(f"✅ Normalized {path}")
+
+    if args.check:
+        sys.exit(1 if unnormalized else 0)
+    print(f"💾 {writer.summary()}")
+
+
+if __name__ == '__main__':
+    main()
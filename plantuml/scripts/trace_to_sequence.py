@@ -0,0 +1,772 @@
+#!/usr/bin/env python3
+"""
+Generate sequence diagrams from request traces.
+
+Reads either an OpenTelemetry JSON export (OTLP JSON, as one document or the
+collector's one-request-per-line file export) or a Python call capture made
+with capture() below, and turns one request into a renderable sequence
+diagram:
+
+- OpenTelemetry: participants are services (resource `service.name`), plus
+  databases, queues and remote peers named by CLIENT/PRODUCER span
+  attributes. A CLIENT span and the SERVER span it caused become one message.
+- Python capture: participants are modules (or classes, with --group class);
+  calls inside one participant are left out unless --self-calls is given.
+
+Raw traces are far too big to lay out, so the call tree is compacted:
+consecutive identical calls become one `loop N times` message, and runs of
+sibling calls that keep starting with the same call become a loop over
+those iterations, with `alt` branches when iterations did different things
+(say, a cache lookup that only sometimes falls through to the database).
+Beyond the
+participant budget the least used participants are folded into "Others";
+beyond the message budget the diagram is truncated with a note.
+
+Input is streamed, so memory stays bounded on multi-GB files: OTLP spans are
+decoded one at a time and only the selected trace is kept (at most
+MAX_TRACE_SPANS spans); capture events are folded into the tree as they are
+read, each level is compacted as it grows, and at most MAX_NODES distinct
+calls are retained.
+
+Usage:
+    python trace_to_sequence.py TRACE [--trace-id ID] [--list-traces]
+                                [--max-participants 12] [--max-messages 200]
+                                [--group module|class] [--self-calls] [-o out.puml]
+
+Examples:
+    # Longest traces in an OpenTelemetry export, then one of them as a diagram
+    python trace_to_sequence.py otel-export.json --list-traces
+    python trace_to_sequence.py otel-export.json --trace-id 5b8aa5a2d2c872e8321cf37308d69df2 -o order.puml
+
+    # Capture a Python call path and draw it
+    #   from trace_to_sequence import capture
+    #   with capture('checkout.trace', include=['shop']):
+    #       checkout(cart)
+    python trace_to_sequence.py checkout.trace --group class -o checkout.puml
+"""
+
+import argparse
+import json
+import re
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Default diagram budgets
+MAX_PARTICIPANTS = 12
+MAX_MESSAGES = 200
+
+# Memory bounds: spans kept for the selected trace, distinct calls kept from a capture
+MAX_TRACE_SPANS = 100_000
+MAX_NODES = 50_000
+
+# Longest loop body (sibling calls per iteration) recognised
+MAX_BODY = 8
+
+# Siblings a capture level collects before it is compacted while streaming
+COMPACT_AT = 256
+
+READ_CHUNK = 1024 * 1024
+
+ROOT = 'Client'
+OTHERS = 'Others'
+
+# OTLP span kinds (JSON exports use either the number or the enum name)
+SPAN_KINDS = {1: 'INTERNAL', 2: 'SERVER', 3: 'CLIENT', 4: 'PRODUCER', 5: 'CONSUMER'}
+
+# Span attributes naming the remote side of a CLIENT/PRODUCER span, with its participant shape
+PEER_ATTRIBUTES = (
+    ('db.system', 'database'),
+    ('messaging.system', 'queue'),
+    ('peer.service', 'participant'),
+    ('server.address', 'participant'),
+    ('net.peer.name', 'participant'),
+    ('http.host', 'participant'),
+)
+
+
+@dataclass
+class Call:
+    """
+    One message in the call tree, or a loop group when branches is set.
+
+    count > 1 once identical consecutive calls are merged. A loop group stands
+    for consecutive runs of sibling calls that each start with the same call;
+    branches holds every distinct iteration body with the number of
+    iterations that ran it. Loop signatures ignore iteration counts, so calls
+    whose nested loops ran a different number of times still merge (the
+    diagram shows the counts of the first one).
+    """
+    source: str
+    target: str
+    label: str
+    asynchronous: bool = False
+    error: bool = False
+    children: List['Call'] = field(default_factory=list)
+    count: int = 1
+    branches: List[Tuple[int, List['Call']]] = field(default_factory=list)
+    signature: int = 0
+
+    @property
+    def head(self) -> Tuple[str, str, str, bool, bool]:
+        return self.source, self.target, self.label, self.asynchronous, self.error
+
+    @property
+    def iterations(self) -> int:
+        return sum(seen for seen, _ in self.branches)
+
+    def seal(self) -> 'Call':
+        """Compute the structural signature once the children are final."""
+        self.signature = hash((self.head, _shape(self.children), tuple(_shape(body) for _, body in self.branches)))
+        return self
+
+
+def _shape(calls: List[Call]) -> Tuple[Tuple[int, int], ...]:
+    return tuple((c.signature, c.count) for c in calls)
+
+
+# --- Compaction ---
+
+def _extend_loop(loop: Call, branches: List[Tuple[int, List[Call]]]) -> None:
+    """Add iterations to a loop group, counting bodies it has already seen."""
+    shapes = {_shape(body): num for num, (_, body) in enumerate(loop.branches)}
+    for seen, body in branches:
+        num = shapes.get(_shape(body))
+        if num is None:
+            shapes[_shape(body)] = len(loop.branches)
+            loop.branches.append((seen, body))
+        else:
+            loop.branches[num] = (loop.branches[num][0] + seen, loop.branches[num][1])
+    loop.seal()
+
+
+def _merge_sibling(siblings: List[Call], call: Call) -> None:
+    """Append a finished call, merging it into the previous sibling when it repeats it."""
+    if siblings and siblings[-1].signature == call.signature:
+        last = siblings[-1]
+        if last.branches:
+            _extend_loop(last, call.branches)
+        else:
+            last.count += call.count
+        return
+    siblings.append(call)
+
+
+def _iterations(siblings: List[Call], start: int, known: Optional[set], final: bool) -> List[List[Call]]:
+    """
+    Split the siblings from start into loop iterations that each begin with siblings[start]'s call.
+
+    Args:
+        siblings: Calls at one level of the tree
+        start: Index of the first iteration's first call
+        known: Calls (heads) seen in earlier iterations; the last iteration
+            ends before the first call not among them
+        final: False while streaming, when an iteration reaching the end of
+            siblings may still be running and is left out
+
+    Returns:
+        The iteration bodies, in order
+    """
+    head = siblings[start].head
+    bounds: List[Tuple[int, int]] = []
+    j = start
+    while j < len(siblings) and siblings[j].head == head and not siblings[j].branches:
+        k = j + 1
+        while k < len(siblings) and k - j < MAX_BODY and siblings[k].head != head:
+            k += 1
+        bounds.append((j, k))
+        j = k
+        if k < len(siblings) and siblings[k].head != head:
+            break  # body longer than MAX_BODY: the loop ends here
+    if j >= len(siblings) and not final and bounds:
+        bounds.pop()
+    if not bounds:
+        return []
+    if known is None:
+        known = {call.head for a, b in bounds[:-1] for call in siblings[a:b]}
+    a, b = bounds[-1]
+    k = a + 1
+    while k < b and siblings[k].head in known:
+        k += 1
+    bounds[-1] = (a, k)
+    return [siblings[a:b] for a, b in bounds]
+
+
+def _weigh(body: List[Call]) -> List[Tuple[int, List[Call]]]:
+    """An iteration body as loop branches: a first call merged N times is N - 1 iterations on its own."""
+    first = body[0]
+    if first.count == 1:
+        return [(1, body)]
+    single = replace(first, count=1)
+    return [(first.count - 1, [single]), (1, [single] + body[1:])]
+
+
+def _collapse_loops(siblings: List[Call], final: bool = True) -> List[Call]:
+    """Replace runs of iterations that start with the same call by loop groups."""
+    if len({call.head for call in siblings}) == len(siblings):
+        return siblings  # no call repeats: nothing to collapse
+    result: List[Call] = []
+    i = 0
+    while i < len(siblings):
+        call = siblings[i]
+        previous = result[-1] if result else None
+        extending = bool(previous and previous.branches and previous.head == call.head)
+        bodies: List[List[Call]] = []
+        if not call.branches:
+            known = {c.head for _, body in previous.branches for c in body} if extending else None
+            bodies = _iterations(siblings, i, known, final)
+        if bodies and (extending or len(bodies) > 1):
+            loop = Call(*call.head)
+            _extend_loop(loop, [branch for body in bodies for branch in _weigh(body)])
+            # A new loop only pays off when some iteration body repeats
+            if extending or loop.iterations > len(loop.branches):
+                if extending:
+                    _extend_loop(previous, loop.branches)
+                else:
+                    result.append(loop)
+                i += sum(len(body) for body in bodies)
+                continue
+        result.append(call)
+        i += 1
+    return result
+
+
+def compact(calls: List[Call]) -> List[Call]:
+    """Compact a finished tree bottom-up: merge repeats, then collapse loops."""
+    merged: List[Call] = []
+    for call in calls:
+        call.children = compact(call.children)
+        call.branches = [(seen, compact(body)) for seen, body in call.branches]
+        _merge_sibling(merged, call.seal())
+    return _collapse_loops(merged)
+
+
+# --- OpenTelemetry input ---
+
+def _attribute_value(value: Dict):
+    """Plain value of an OTLP AnyValue ({'stringValue': ...}, {'intValue': ...}, ...)."""
+    for key in ('stringValue', 'intValue', 'doubleValue', 'boolValue'):
+        if key in value:
+            return value[key]
+    return None
+
+
+def _attributes(items: Optional[List[Dict]]) -> Dict[str, object]:
+    return {item.get('key'): _attribute_value(item.get('value') or {}) for item in items or []}
+
+
+def _span_kind(kind) -> str:
+    if isinstance(kind, int):
+        return SPAN_KINDS.get(kind, 'INTERNAL')
+    return str(kind or 'INTERNAL').replace('SPAN_KIND_', '')
+
+
+SECTION_RE = re.compile(r'"(resource|spans)"\s*:\s*')
+
+
+def iter_otel_spans(path: Path) -> Iterator[Tuple[str, Dict]]:
+    """
+    Stream (service_name, span) pairs from an OTLP JSON export without loading it.
+
+    Works on a single ExportTraceServiceRequest document as well as on JSON
+    Lines of them: the text between span objects is scanned for the next
+    `"resource"` (whose service.name applies to the following spans) or
+    `"spans"` key, and each span object is decoded on its own.
+    """
+    decoder = json.JSONDecoder()
+    service = 'unknown'
+    buf, pos, eof = '', 0, False
+    in_spans = False
+
+    with open(path, 'r', encoding='utf-8') as f:
+        def more() -> bool:
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            chunk = f.read(READ_CHUNK)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            return bool(chunk)
+
+        while True:
+            if in_spans:
+                while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos >= len(buf):
+                    if not more():
+                        return
+                    continue
+                if buf[pos] == ']':
+                    in_spans = False
+                    pos += 1
+                    continue
+                try:
+                    span, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    if not more():
+                        raise ValueError(f"{path}: truncated or malformed span near offset {pos}")
+                    continue
+                pos = end
+                yield service, span
+                continue
+
+            match = SECTION_RE.search(buf, pos)
+            if match is None or match.end() >= len(buf):
+                keep = max(pos, len(buf) - 32)  # a key may straddle the chunk boundary
+                pos = keep
+                if not more():
+                    return
+                continue
+            if match.group(1) == 'spans':
+                if buf[match.end()] != '[':
+                    pos = match.end()
+                    continue
+                pos = match.end() + 1
+                in_spans = True
+                continue
+            try:
+                resource, end = decoder.raw_decode(buf, match.end())
+            except ValueError:
+                pos = match.start()
+                if not more():
+                    return
+                continue
+            service = str(_attributes(resource.get('attributes')).get('service.name') or 'unknown')
+            pos = end
+
+
+def list_traces(path: Path, limit: int = 20) -> List[Tuple[str, int, str]]:
+    """(trace_id, span_count, root_span) for the largest traces in an export."""
+    counts: Counter = Counter()
+    roots: Dict[str, str] = {}
+    for service, span in iter_otel_spans(path):
+        trace_id = span.get('traceId', '')
+        counts[trace_id] += 1
+        if not span.get('parentSpanId'):
+            roots[trace_id] = f"{service}: {span.get('name', '')}"
+    return [(trace_id, count, roots.get(trace_id, '?')) for trace_id, count in counts.most_common(limit)]
+
+
+@dataclass
+class Span:
+    """The fields of an OTLP span the diagram needs."""
+    span_id: str
+    parent_id: str
+    service: str
+    name: str
+    kind: str
+    start: int
+    error: bool
+    peer: Optional[Tuple[str, str]]
+
+
+def _peer(attributes: Dict[str, object]) -> Optional[Tuple[str, str]]:
+    for key, shape in PEER_ATTRIBUTES:
+        if attributes.get(key):
+            return str(attributes[key]), shape
+    return None
+
+
+def read_otel_trace(path: Path, trace_id: Optional[str] = None) -> Tuple[List[Span], Dict[str, str], int]:
+    """
+    Collect the spans of one trace (the first one seen unless trace_id is given).
+
+    Returns:
+        Tuple of (spans, participant shapes, spans dropped over MAX_TRACE_SPANS)
+    """
+    spans: List[Span] = []
+    shapes: Dict[str, str] = {}
+    dropped = 0
+    for service, raw in iter_otel_spans(path):
+        if trace_id is None:
+            trace_id = raw.get('traceId')
+        if raw.get('traceId') != trace_id:
+            continue
+        if len(spans) >= MAX_TRACE_SPANS:
+            dropped += 1
+            continue
+        attributes = _attributes(raw.get('attributes'))
+        peer = _peer(attributes)
+        if peer:
+            shapes.setdefault(peer[0], peer[1])
+        spans.append(Span(
+            span_id=raw.get('spanId', ''),
+            parent_id=raw.get('parentSpanId') or '',
+            service=service,
+            name=raw.get('name', ''),
+            kind=_span_kind(raw.get('kind')),
+            start=int(raw.get('startTimeUnixNano') or 0),
+            error=(raw.get('status') or {}).get('code') in (2, 'STATUS_CODE_ERROR'),
+            peer=peer,
+        ))
+    return spans, shapes, dropped
+
+
+def otel_calls(spans: List[Span], self_calls: bool = False) -> List[Call]:
+    """Turn one trace's spans into a call tree between services."""
+    by_id = {span.span_id: span for span in spans}
+    children: Dict[str, List[Span]] = {}
+    roots: List[Span] = []
+    for span in spans:
+        if span.parent_id and span.parent_id in by_id:
+            children.setdefault(span.parent_id, []).append(span)
+        else:
+            roots.append(span)
+    for siblings in children.values():
+        siblings.sort(key=lambda s: s.start)
+    roots.sort(key=lambda s: s.start)
+
+    def build(span: Span, caller: str) -> List[Call]:
+        kids = children.get(span.span_id, [])
+        asynchronous = span.kind in ('PRODUCER', 'CONSUMER')
+        if span.kind in ('CLIENT', 'PRODUCER'):
+            remote = [kid for kid in kids if kid.service != span.service]
+            if remote:
+                # The CLIENT span and the SERVER span it caused are one message
+                calls = []
+                for kid in remote:
+                    calls.extend(build(kid, span.service))
+                local = [kid for kid in kids if kid.service == span.service]
+                return calls + [c for kid in local for c in build(kid, span.service)]
+            target = span.peer[0] if span.peer else span.service
+        else:
+            target = span.service
+
+        nested = [c for kid in kids for c in build(kid, target)]
+        if target == caller and not self_calls:
+            return nested
+        return [Call(caller, target, span.name, asynchronous, span.error, nested)]
+
+    calls = []
+    for root in roots:
+        calls.extend(build(root, ROOT))
+    return calls
+
+
+# --- Python capture input ---
+
+@contextmanager
+def capture(path, include: Optional[Sequence[str]] = None):
+    """
+    Record the Python call path of the enclosed block to a capture file.
+
+    Uses sys.setprofile on the current thread. Each call and return of a
+    Python function whose module starts with one of the include prefixes (all
+    modules when None) is written as one tab-separated line, so the file can be
+    far larger than memory and is read back incrementally.
+
+    Args:
+        path: Capture file to write
+        include: Module name prefixes to record
+    """
+    prefixes = tuple(include) if include else None
+    recorded = set()
+
+    with open(path, 'w', encoding='utf-8') as out:
+        write = out.write
+
+        def profile(frame, event, arg):
+            if event == 'call':
+                module = frame.f_globals.get('__name__', '?')
+                if prefixes and not module.startswith(prefixes):
+                    return
+                recorded.add(frame)
+                owner = frame.f_locals.get('self')
+                cls = type(owner).__name__ if owner is not None else ''
+                write(f"C\t{module}\t{cls}\t{frame.f_code.co_name}\n")
+            elif event == 'return' and frame in recorded:
+                recorded.discard(frame)
+                write("R\n")
+
+        previous = sys.getprofile()
+        sys.setprofile(profile)
+        try:
+            yield
+        finally:
+            sys.setprofile(previous)
+
+
+@dataclass
+class _Frame:
+    participant: str
+    call: Optional[Call]
+    children: List[Call] = field(default_factory=list)
+    compact_at: int = COMPACT_AT
+    size: int = 0  # calls retained in children, at any depth
+
+
+def _count_nodes(calls: List[Call]) -> int:
+    return sum(1 + _count_nodes(c.children) + sum(_count_nodes(body) for _, body in c.branches) for c in calls)
+
+
+def read_capture(path: Path, group: str = 'module', self_calls: bool = False) -> Tuple[List[Call], int]:
+    """
+    Fold a capture file into a compacted call tree while streaming it.
+
+    Repeated calls are merged as soon as they return, and a level's loops are
+    collapsed whenever it has grown by COMPACT_AT calls, so the tree stays
+    small for loops of any length; at most about MAX_NODES calls are kept.
+
+    Returns:
+        Tuple of (top-level calls, calls dropped over MAX_NODES)
+    """
+    stack = [_Frame(ROOT, None)]
+    retained = 0
+    dropped = 0
+
+    def add(frame: _Frame, call: Call, size: int) -> None:
+        """Add a finished call holding size retained calls (itself included) to frame's level."""
+        nonlocal retained, dropped
+        merges = bool(frame.children) and frame.children[-1].signature == call.signature
+        if merges or retained >= MAX_NODES:
+            # Merged into the previous sibling or dropped: the call's subtree is released
+            retained -= size - 1
+            dropped += not merges
+            if merges:
+                _merge_sibling(frame.children, call)
+            return
+        frame.children.append(call)
+        frame.size += size
+        retained += 1
+        if len(frame.children) >= frame.compact_at:
+            frame.children = _collapse_loops(frame.children, final=False)
+            frame.compact_at = len(frame.children) + COMPACT_AT
+            before, frame.size = frame.size, _count_nodes(frame.children)
+            retained += frame.size - before
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('C\t'):
+                _, module, cls, function = line.rstrip('\n').split('\t', 3)
+                participant = f"{module}.{cls}" if group == 'class' and cls else module
+                caller = stack[-1].participant
+                call = None
+                if participant != caller or self_calls:
+                    call = Call(caller, participant, f"{function}()")
+                stack.append(_Frame(participant, call))
+            elif line.startswith('R') and len(stack) > 1:
+                frame = stack.pop()
+                if frame.call is None:
+                    # Not a message: its calls belong to the caller's level
+                    retained -= frame.size
+                    for child in frame.children:
+                        size = _count_nodes([child])
+                        retained += size - 1
+                        add(stack[-1], child, size)
+                    continue
+                frame.call.children = _collapse_loops(frame.children)
+                add(stack[-1], frame.call.seal(), 1 + frame.size)
+    # Calls still open at the end of the capture
+    while len(stack) > 1:
+        frame = stack.pop()
+        if frame.call is not None:
+            frame.call.children = _collapse_loops(frame.children)
+            _merge_sibling(stack[-1].children, frame.call.seal())
+        else:
+            stack[-1].children.extend(frame.children)
+    return stack[0].children, dropped
+
+
+# --- Rendering ---
+
+def _walk(calls: List[Call]) -> Iterator[Call]:
+    for call in calls:
+        if call.branches:
+            for _, body in call.branches:
+                yield from _walk(body)
+            continue
+        yield call
+        yield from _walk(call.children)
+
+
+def _fold_participants(calls: List[Call], budget: int) -> Dict[str, str]:
+    """Map each participant to itself, or to OTHERS when it is outside the budget."""
+    usage: Counter = Counter()
+    order: Dict[str, int] = {}
+    for call in _walk(calls):
+        for name in (call.source, call.target):
+            usage[name] += 1
+            order.setdefault(name, len(order))
+    if len(usage) <= budget:
+        keep = set(usage)
+    else:
+        # Room for the client and "Others" besides the busiest participants
+        busiest = [name for name, _ in usage.most_common() if name != ROOT]
+        keep = set(busiest[:max(1, budget - 2)]) | {ROOT}
+    return {name: name if name in keep else OTHERS for name in sorted(usage, key=order.get)}
+
+
+def _count_messages(calls: List[Call]) -> int:
+    """Messages render_sequence draws for calls without a budget."""
+    total = 0
+    for call in calls:
+        if call.branches:
+            total += sum(_count_messages(body) for _, body in call.branches)
+        else:
+            total += 1 + _count_messages(call.children)
+    return total
+
+
+def render_sequence(
+    calls: List[Call],
+    title: Optional[str] = None,
+    shapes: Optional[Dict[str, str]] = None,
+    max_participants: int = MAX_PARTICIPANTS,
+    max_messages: int = MAX_MESSAGES
+) -> str:
+    """
+    Render a compacted call tree as a PlantUML sequence diagram within the budgets.
+
+    Args:
+        calls: Top-level calls (see compact)
+        title: Diagram title
+        shapes: Participant keyword per name ('database', 'queue', ...)
+        max_participants: Participants drawn before the rest are folded into "Others"
+        max_messages: Messages drawn before the diagram is truncated
+    """
+    shapes = shapes or {}
+    folded = _fold_participants(calls, max_participants)
+    aliases: Dict[str, str] = {}
+    lines = ['@startuml']
+    if title:
+        lines.append(f"title {title}")
+    for name in folded.values():
+        if name in aliases:
+            continue
+        aliases[name] = f"P{len(aliases)}"
+        keyword = 'actor' if name == ROOT else shapes.get(name, 'participant')
+        lines.append(f'{keyword} "{name}" as {aliases[name]}')
+    lines.append('')
+
+    emitted = 0
+    total = _count_messages(calls)
+
+    def arrow(call: Call, back: bool = False) -> str:
+        color = '[#red]' if call.error else ''
+        if back:
+            return f"-{color}->"
+        return f"-{color}>>" if call.asynchronous else f"-{color}>"
+
+    def emit(items: List[Call], indent: str) -> None:
+        nonlocal emitted
+        for call in items:
+            if emitted >= max_messages:
+                return
+            if call.branches:
+                lines.append(f"{indent}loop {call.iterations} times")
+                if len(call.branches) == 1:
+                    emit(call.branches[0][1], indent + '  ')
+                else:
+                    for num, (seen, body) in enumerate(call.branches):
+                        if num and emitted >= max_messages:
+                            break
+                        lines.append(f"{indent}  {'alt' if num == 0 else 'else'} {seen} of {call.iterations}")
+                        emit(body, indent + '    ')
+                    lines.append(f"{indent}  end")
+                lines.append(f"{indent}end")
+            elif call.count > 1:
+                lines.append(f"{indent}loop {call.count} times")
+                emit_message(call, indent + '  ')
+                lines.append(f"{indent}end")
+            else:
+                emit_message(call, indent)
+
+    def emit_message(call: Call, indent: str) -> None:
+        nonlocal emitted
+        if emitted >= max_messages:
+            return
+        source, target = aliases[folded[call.source]], aliases[folded[call.target]]
+        label = call.label.replace('\n', ' ')
+        lines.append(f"{indent}{source} {arrow(call)} {target} : {label}")
+        emitted += 1
+        if call.children:
+            lines.append(f"{indent}activate {target}")
+            emit(call.children, indent)
+            if not call.asynchronous:
+                lines.append(f"{indent}{target} {arrow(call, back=True)} {source}")
+            lines.append(f"{indent}deactivate {target}")
+
+    emit(calls, '')
+    if emitted < total:
+        lines.append(f"note across : {total - emitted} more messages not shown (budget {max_messages})")
+    return '\n'.join(lines + ['@enduml'])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate a PlantUML sequence diagram from an OpenTelemetry export or a Python call capture',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('trace', help='OTLP JSON export or capture() file')
+    parser.add_argument('--format', choices=['auto', 'otel', 'capture'], default='auto',
+                        help='Input format (default: detected from the first byte)')
+    parser.add_argument('--trace-id', default=None, help='OpenTelemetry trace to draw (default: the first one)')
+    parser.add_argument('--list-traces', action='store_true', help='List the largest traces and exit')
+    parser.add_argument('--max-participants', type=int, default=MAX_PARTICIPANTS,
+                        help=f'Participants before folding into "{OTHERS}" (default: {MAX_PARTICIPANTS})')
+    parser.add_argument('--max-messages', type=int, default=MAX_MESSAGES,
+                        help=f'Messages before truncating (default: {MAX_MESSAGES})')
+    parser.add_argument('--group', choices=['module', 'class'], default='module',
+                        help='Capture participants: modules or classes (default: module)')
+    parser.add_argument('--self-calls', action='store_true',
+                        help='Also draw calls within one participant')
+    parser.add_argument('--title', default=None, help='Diagram title')
+    parser.add_argument('-o', '--output', default=None, help='Output .puml file (default: stdout)')
+    args = parser.parse_args()
+
+    path = Path(args.trace)
+    if not path.is_file():
+        print(f"❌ Error: File not found: {path}", file=sys.stderr)
+        sys.exit(1)
+    if args.max_participants < 2 or args.max_messages < 1:
+        parser.error("--max-participants must be at least 2 and --max-messages at least 1")
+
+    kind = args.format
+    if kind == 'auto':
+        with open(path, 'r', encoding='utf-8') as f:
+            kind = 'otel' if f.read(64).lstrip().startswith('{') else 'capture'
+
+    try:
+        if args.list_traces:
+            if kind != 'otel':
+                parser.error("--list-traces needs an OpenTelemetry export")
+            for trace_id, count, root in list_traces(path):
+                print(f"{trace_id}  {count:>7} spans  {root}")
+            return
+
+        shapes: Dict[str, str] = {}
+        if kind == 'otel':
+            spans, shapes, dropped = read_otel_trace(path, args.trace_id)
+            if not spans:
+                print(f"❌ Error: No spans{' for trace ' + args.trace_id if args.trace_id else ''} in {path}",
+                      file=sys.stderr)
+                sys.exit(1)
+            calls = otel_calls(spans, args.self_calls)
+            source = f"{len(spans)} spans"
+        else:
+            calls, dropped = read_capture(path, args.group, args.self_calls)
+            source = "capture"
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: Cannot read {path}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if dropped:
+        print(f"⚠️  {dropped} {'spans' if kind == 'otel' else 'calls'} over the memory bound were skipped",
+              file=sys.stderr)
+    calls = compact(calls)
+    diagram = render_sequence(calls, args.title or path.stem, shapes, args.max_participants, args.max_messages)
+
+    if args.output:
+        Path(args.output).write_text(diagram + '\n', encoding='utf-8')
+        print(f"✅ {path} ({source}) → {args.output}", file=sys.stderr)
+    else:
+        print(diagram)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+"""Make the scripts importable the way they import each other (`python scripts/x.py`)."""
+
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_DIR))
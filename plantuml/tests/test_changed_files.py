@@ -0,0 +1,31 @@
+"""Tests for changed_files git selection."""
+
+import subprocess
+
+from changed_files import affected_files
+
+
+def git(repo, *args):
+    subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True)
+
+
+def commit(repo, name, content):
+    (repo / name).write_text(content)
+    git(repo, 'add', name)
+    git(repo, '-c', 'user.name=t', '-c', 'user.email=t@t', 'commit', '-q', '-m', name)
+
+
+def test_changes_that_landed_on_ref_after_branching_are_ignored(tmp_path):
+    git(tmp_path, 'init', '-q', '-b', 'main')
+    commit(tmp_path, 'base.puml', '@startuml\nA -> B\n@enduml\n')
+    git(tmp_path, 'checkout', '-q', '-b', 'feature')
+    commit(tmp_path, 'mine.puml', '@startuml\nC -> D\n@enduml\n')
+    git(tmp_path, 'checkout', '-q', 'main')
+    commit(tmp_path, 'base.puml', '@startuml\nA -> B : changed on main\n@enduml\n')
+    git(tmp_path, 'checkout', '-q', 'feature')
+    (tmp_path / 'wip.puml').write_text('@startuml\nG -> H\n@enduml\n')
+
+    markdown, puml = affected_files('main', tmp_path)
+
+    assert markdown == []
+    assert [path.name for path in puml] == ['mine.puml', 'wip.puml']
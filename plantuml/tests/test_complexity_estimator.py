@@ -0,0 +1,28 @@
+"""Tests for the complexity estimator's timeout floor."""
+
+from complexity_estimator import DEFAULT_MIN_TIMEOUT, estimate_complexity
+from render_history import RenderHistory
+
+SOURCE = '@startuml\nAlice -> Bob\n@enduml'
+
+
+def test_small_diagrams_keep_the_old_fixed_timeout(monkeypatch):
+    monkeypatch.delenv('PLANTUML_MIN_TIMEOUT', raising=False)
+    assert estimate_complexity(SOURCE).timeout == DEFAULT_MIN_TIMEOUT == 30
+
+
+def test_floor_is_configurable(monkeypatch):
+    monkeypatch.setenv('PLANTUML_MIN_TIMEOUT', '45')
+    assert estimate_complexity(SOURCE).timeout == 45
+    monkeypatch.setenv('PLANTUML_MIN_TIMEOUT', 'soon')
+    assert estimate_complexity(SOURCE).timeout == 30
+
+
+def test_learned_render_timeouts_respect_the_floor(tmp_path, monkeypatch):
+    monkeypatch.delenv('PLANTUML_MIN_TIMEOUT', raising=False)
+    history = RenderHistory(tmp_path / 'history.sqlite3')
+    for _ in range(5):
+        history.record(SOURCE, 'render', 0.5, True, 30)
+        history.record(SOURCE, 'validate', 0.5, True, 10)
+    assert history.timeout_for(SOURCE, 'render') == 30
+    assert history.timeout_for(SOURCE, 'validate') < 30
@@ -0,0 +1,54 @@
+"""Tests for reading the Confluence attachment manifest."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from confluence_publish import HASH_PREFIX, ConfluenceAttachments
+
+ATTACHMENTS = 120
+SERVER_LIMIT = 50
+
+
+def serve(with_links: bool):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            start = int(query['start'][0])
+            limit = min(int(query['limit'][0]), SERVER_LIMIT)
+            results = [{'title': f"diagram_{num}.png", 'metadata': {'comment': f"{HASH_PREFIX}{num:064x}"}}
+                       for num in range(start, min(start + limit, ATTACHMENTS))]
+            data = {'results': results, 'start': start, 'limit': limit, 'size': len(results), '_links': {}}
+            if with_links and start + limit < ATTACHMENTS:
+                # Confluence links are relative to the context path
+                data['_links']['next'] = f"{url.path[len('/wiki'):]}?start={start + limit}&limit={limit}"
+            body = json.dumps(data).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.mark.parametrize('with_links', [True, False])
+def test_manifest_is_complete_when_the_server_caps_page_size(with_links):
+    server = serve(with_links)
+    client = ConfluenceAttachments(f"http://127.0.0.1:{server.server_port}/wiki", '123', None, jobs=1)
+    try:
+        manifest = client.remote_manifest()
+    finally:
+        client.close()
+        server.shutdown()
+    assert len(manifest) == ATTACHMENTS
+    assert manifest['diagram_119.png'] == f"{119:064x}"
@@ -0,0 +1,31 @@
+"""Tests for embed_images.ImageEmbedder."""
+
+from embed_images import ImageEmbedder
+
+SVG = (b'<?xml version="1.0"?><svg xmlns="http://www.w3.org/2000/svg">'
+       b'<defs><filter id="f1"/></defs><rect id="r1" filter="url(#f1)"/></svg>')
+
+
+def test_duplicate_diagrams_share_one_embedded_image(tmp_path):
+    # With --naming stable, identical diagrams link the same image file
+    image = tmp_path / 'login_c66ee2b7.svg'
+    image.write_bytes(SVG)
+    embedder = ImageEmbedder()
+
+    first = embedder.markdown_for(image, 'login_c66ee2b7')
+    second = embedder.markdown_for(image, 'login_c66ee2b7')
+
+    assert first.startswith('<svg') and second.startswith('<svg')
+    assert not image.exists()
+    # Each copy gets its own id prefix so the page has no duplicate ids
+    assert 'id="d1_r1"' in first and 'id="d2_r1"' in second
+
+
+def test_duplicate_png_links_inline_the_same_data_uri(tmp_path):
+    image = tmp_path / 'diagram.png'
+    image.write_bytes(b'\x89PNG\r\n\x1a\nfake')
+    embedder = ImageEmbedder()
+
+    first = embedder.markdown_for(image, 'diagram')
+    assert embedder.markdown_for(image, 'diagram') == first
+    assert first.startswith('![diagram](data:image/png;base64,')
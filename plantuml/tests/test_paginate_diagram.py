@@ -0,0 +1,31 @@
+"""Tests for splitting sequence/activity diagrams into pages."""
+
+from paginate_diagram import paginate_diagram
+from process_markdown_puml import split_diagram
+
+
+def sequence(messages: int) -> str:
+    body = '\n'.join(f"Alice -> Bob : message {num}" for num in range(messages))
+    return f"@startuml\n{body}\n@enduml"
+
+
+def test_split_leaves_small_diagrams_whole():
+    assert split_diagram(sequence(10)) == [('', sequence(10))]
+
+
+def test_forced_split_halves_a_diagram_within_the_page_budget():
+    parts = split_diagram(sequence(10), force=True)
+    assert [suffix for suffix, _ in parts] == ['_p1', '_p2']
+    assert all(source.count('Alice -> Bob') == 5 for _, source in parts)
+
+
+def test_activity_pages_never_start_with_an_arrow():
+    actions = '\n'.join(f":step {num};\n-> then;" for num in range(6))
+    source = f"@startuml\nstart\n{actions}\nstop\n@enduml"
+
+    pages = paginate_diagram(source, max_units=2)
+
+    assert len(pages) > 1
+    for page in pages:
+        first = page.splitlines()[1]
+        assert not first.startswith('->'), page
@@ -0,0 +1,40 @@
+"""Tests for the in-process preprocessor's fallback to PlantUML."""
+
+import pytest
+
+from preprocessor import Preprocessor, PreprocessorUnsupported
+from puml_lint import lint_puml
+
+
+@pytest.mark.parametrize('expr', ['["a", "b"]', '{"k": 1}', '$list[0]', '1 +'])
+def test_expressions_outside_the_grammar_are_unsupported(expr):
+    preprocessor = Preprocessor()
+    preprocessor.globals['$list'] = 'x'
+    with pytest.raises(PreprocessorUnsupported):
+        preprocessor.evaluate(expr)
+
+
+def test_json_variables_are_left_to_plantuml():
+    source = '\n'.join([
+        '@startuml',
+        '!$list = ["a", "b"]',
+        '!$d = {"k": 1}',
+        '!foreach $i in $list',
+        'Alice -> Bob : $i',
+        '!endfor',
+        '@enduml',
+    ])
+    assert lint_puml(source) == []
+
+
+def test_lint_reports_unbalanced_conditionals():
+    source = '@startuml\n!if 1\nAlice -> Bob\n@enduml'
+    findings = lint_puml(source)
+    assert len(findings) == 1
+    assert 'never closed' in findings[0].message
+
+
+def test_lint_leaves_other_preprocessor_errors_to_plantuml():
+    # An undefined variable may come from -D or an include only PlantUML resolves
+    source = '@startuml\n!$x = $undefined + 1\nAlice -> Bob : $x\n@enduml'
+    assert lint_puml(source) == []
@@ -0,0 +1,129 @@
+"""Tests for the render_farm queue: keys, leases and retries."""
+
+import multiprocessing
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+import render_farm
+from render_farm import FarmQueue, enqueue_markdown, task_key
+
+DOCUMENT = """# Doc
+
+```puml
+@startuml
+A -> B
+@enduml
+```
+
+```puml
+@startuml
+C -> D
+@enduml
+```
+"""
+
+
+@pytest.fixture
+def queue(tmp_path):
+    farm = FarmQueue(tmp_path / 'queue', lease_seconds=5)
+    farm.ensure_directories()
+    return farm
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / 'doc.md'
+    path.write_text(DOCUMENT, encoding='utf-8')
+    return path
+
+
+def test_task_key_covers_render_options():
+    source = '@startuml\nA -> B\n@enduml'
+    options = {'output_dir': '/docs/images', 'format': 'png', 'paginate': False, 'naming': 'index'}
+    key = task_key('doc', 1, source, options)
+    assert task_key('doc', 1, source, dict(options)) == key
+    for change in ({'format': 'svg'}, {'paginate': True}, {'output_dir': '/other'}, {'naming': 'stable'}):
+        assert task_key('doc', 1, source, {**options, **change}) != key
+
+
+def test_changed_format_is_rendered_again(queue, document):
+    enqueue_markdown(queue, document, 'images', 'png')
+    for key in queue.pending_keys():
+        queue.complete(key, {'status': 'converted', 'output_names': ['x']}, 'w')
+    assert queue.pending_keys() == []
+
+    enqueue_markdown(queue, document, 'images', 'svg')
+    assert len(queue.pending_keys()) == 2
+
+
+def test_failed_results_are_retried_on_enqueue(queue, document):
+    assert enqueue_markdown(queue, document, 'images', 'png') == 2
+    keys = queue.pending_keys()
+    queue.complete(keys[0], {'status': 'failed', 'output_names': None}, 'w')
+    queue.complete(keys[1], {'status': 'converted', 'output_names': ['x']}, 'w')
+
+    enqueue_markdown(queue, document, 'images', 'png')
+    assert queue.pending_keys() == [keys[0]]
+
+
+def test_release_leaves_another_workers_lease(queue):
+    assert queue.claim('k', 'worker-a')
+    assert not queue.claim('k', 'worker-b')
+    queue.release('k', 'worker-b')
+    assert queue.lease_owner('k') == 'worker-a'
+    queue.release('k', 'worker-a')
+    assert queue.lease_owner('k') is None
+
+
+def test_expired_lease_is_reclaimed(queue):
+    assert queue.claim('k', 'crashed')
+    expired = time.time() - queue.lease_seconds - 1
+    os.utime(queue._lease_path('k'), (expired, expired))
+
+    assert queue.claim('k', 'worker-b')
+    assert queue.lease_owner('k') == 'worker-b'
+    # The crashed worker finishing late must not drop the new lease
+    queue.complete('k', {'status': 'converted'}, 'crashed')
+    assert queue.lease_owner('k') == 'worker-b'
+
+
+def test_fresh_lease_renamed_by_a_late_reclaimer_is_restored(queue, monkeypatch):
+    assert queue.claim('k', 'worker-a')
+    # worker-b saw the previous, expired lease before worker-a replaced it
+    now = time.time()
+    stamps = [now + queue.lease_seconds + 1]
+    monkeypatch.setattr(render_farm.time, 'time', lambda: stamps.pop(0) if stamps else now)
+
+    assert not queue._reclaim_expired(queue._lease_path('k'), 'worker-b')
+    assert queue.lease_owner('k') == 'worker-a'
+
+
+def _claim_all(root: str, worker_id: str, keys, claimed) -> None:
+    farm = FarmQueue(Path(root), lease_seconds=60)
+    for key in keys:
+        if farm.claim(key, worker_id):
+            claimed.put((key, worker_id))
+
+
+def test_each_task_is_claimed_by_one_of_several_worker_processes(queue):
+    keys = [f"{num:04d}" for num in range(40)]
+    for key in keys:
+        queue.add_task(key, {'idx': 0})
+    claimed = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_claim_all, args=(str(queue.root), f"w{num}", keys, claimed))
+               for num in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+
+    owners = {}
+    for _ in keys:
+        key, worker_id = claimed.get(timeout=10)
+        assert key not in owners
+        owners[key] = worker_id
+    assert sorted(owners) == keys
+    assert claimed.empty()
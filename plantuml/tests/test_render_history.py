@@ -0,0 +1,44 @@
+"""Tests for render_history timeouts and retention."""
+
+import sqlite3
+import time
+
+import render_history
+from render_history import RenderHistory
+
+SOURCE = '@startuml\nAlice -> Bob\n@enduml'
+
+
+def count(history: RenderHistory) -> int:
+    with sqlite3.connect(str(history.db_path)) as conn:
+        return conn.execute('SELECT COUNT(*) FROM renders').fetchone()[0]
+
+
+def test_each_diagram_keeps_only_its_latest_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(render_history, 'MAX_SAMPLES_PER_DIAGRAM', 5)
+    history = RenderHistory(tmp_path / 'history.sqlite3')
+    for _ in range(12):
+        history.record(SOURCE, 'render', 1.0, True, 30)
+    history.record(SOURCE, 'validate', 1.0, True, 10)
+    assert count(history) == 6
+
+
+def test_prune_drops_old_runs_and_caps_the_total(tmp_path, monkeypatch):
+    monkeypatch.setattr(render_history, 'MAX_ROWS', 3)
+    history = RenderHistory(tmp_path / 'history.sqlite3')
+    for num in range(5):
+        history.record(f"@startuml\nA{num} -> B\n@enduml", 'render', 1.0, True, 30)
+    with sqlite3.connect(str(history.db_path)) as conn:
+        conn.execute('UPDATE renders SET recorded_at = ? WHERE rowid = 1',
+                     (time.time() - (render_history.MAX_AGE_DAYS + 1) * 86400,))
+
+    assert history.prune() == 2
+    assert count(history) == 3
+
+
+def test_type_history_is_used_for_unseen_diagrams(tmp_path):
+    history = RenderHistory(tmp_path / 'history.sqlite3')
+    for num in range(render_history.TYPE_MIN_SAMPLES):
+        history.record(f"@startuml\nA{num} -> B\n@enduml", 'render', 20.0, True, 60)
+    assert history.timeout_for(SOURCE, 'render', fallback=8) == 40
+    assert history.timeout_for(SOURCE, 'render', fallback=90) == 90